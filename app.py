@@ -3,14 +3,18 @@ NORCONSULT BÆREEVNEBEREGNING
 Geoteknisk bæreevneanalyse iht. Eurokode 7 (NS-EN 1997-1)
 """
 
+import os
+import textwrap
 import streamlit as st
 import numpy as np
 from datetime import datetime
 
-from models import JordParameter, FundamentGeometri, Belastning, TerrengForhold
+from models import JordParameter, FundamentGeometri, Belastning, TerrengForhold, stabil_hash
 from calculator import BaereevneKalkulator
-from visualizations import lag_fundament_figur, lag_utnyttelse_gauge
-from report import generer_rapport_html
+from beregningsgraf import Beregningsgraf
+
+# Figurer, rapport, sensitivitet og pålitelighet importeres ved første bruk
+# (i de mellomlagrede funksjonene under), så oppstarten ikke venter på dem.
 
 # Sidekonfigurasjon
 st.set_page_config(
@@ -140,6 +144,205 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
+# Mellomlagring på tvers av reruns og økter. Nøklene er stabil_hash av
+# inndataene; argumenter med _ hashes ikke av Streamlit. Antall og levetid
+# er begrenset slik at minnebruken holdes nede med mange samtidige brukere.
+CACHE_MAKS_ANTALL = 128
+CACHE_LEVETID = 3600  # sekunder
+
+# SQLite-fil for lagrede beregninger, delt mellom økter og brukere
+BEREGNINGSLAGER = os.environ.get('BAEREEVNE_LAGER', 'beregninger.sqlite')
+
+
+@st.cache_resource
+def hent_kalkulator() -> BaereevneKalkulator:
+    """Én delt kalkulator for alle økter"""
+    return BaereevneKalkulator()
+
+
+@st.cache_resource
+def hent_beregningslager():
+    """Ett delt beregningslager for alle økter"""
+    from beregningslager import Beregningslager
+    return Beregningslager(BEREGNINGSLAGER)
+
+
+def hent_beregningsgraf() -> Beregningsgraf:
+    """Avhengighetsgraf per økt: bare størrelser som avhenger av endrede inndata beregnes på nytt"""
+    if 'beregningsgraf' not in st.session_state:
+        st.session_state['beregningsgraf'] = Beregningsgraf(hent_kalkulator())
+    return st.session_state['beregningsgraf']
+
+
+@st.cache_resource(max_entries=CACHE_MAKS_ANTALL, ttl=CACHE_LEVETID, show_spinner=False)
+def lag_figurer_mellomlagret(nokkel, _fundament, _terreng, _resultat, _belastning):
+    """Tverrsnitt og gauge. Figurene deles mellom økter og må ikke endres."""
+    from visualizations import lag_fundament_figur, lag_utnyttelse_gauge
+    return (lag_fundament_figur(_fundament, _terreng, _resultat, _belastning),
+            lag_utnyttelse_gauge(_resultat.utnyttelsesgrad))
+
+
+@st.cache_data(max_entries=CACHE_MAKS_ANTALL, ttl=CACHE_LEVETID, show_spinner=False)
+def sensitivitet_mellomlagret(nokkel, variasjon, _jord, _fundament, _belastning, _terreng):
+    """Sensitivitetsanalyse for inndata med hash nokkel"""
+    from sensitivitet import sensitivitetsanalyse
+    return sensitivitetsanalyse(hent_kalkulator(), _jord, _fundament, _belastning, _terreng,
+                                variasjon=variasjon)
+
+
+@st.cache_resource(max_entries=CACHE_MAKS_ANTALL, ttl=CACHE_LEVETID, show_spinner=False)
+def tornado_mellomlagret(nokkel, variasjon, _sensitivitet):
+    """Tornado-figur; deles mellom økter og må ikke endres"""
+    from visualizations import lag_tornado_figur
+    return lag_tornado_figur(_sensitivitet)
+
+
+@st.cache_data(max_entries=CACHE_MAKS_ANTALL, ttl=CACHE_LEVETID, show_spinner=False)
+def form_mellomlagret(nokkel, _jord, _fundament, _belastning, _terreng, _fordelinger):
+    """FORM-analyse for inndata og fordelinger med hash nokkel"""
+    from paalitelighet import form_analyse
+    return form_analyse(hent_kalkulator(), _jord, _fundament, _belastning, _terreng, _fordelinger)
+
+
+@st.cache_data(max_entries=CACHE_MAKS_ANTALL, ttl=CACHE_LEVETID, show_spinner=False)
+def rapport_mellomlagret(nokkel, _prosjekt_info, _jord, _fundament, _belastning, _terreng,
+                         _resultat, _sensitivitet, _form):
+    """HTML-rapport; nokkel må også dekke prosjektinfo og dato"""
+    from report import generer_rapport_html
+    return generer_rapport_html(_prosjekt_info, _jord, _fundament, _belastning, _terreng,
+                                _resultat, sensitivitet=_sensitivitet, form=_form)
+
+
+@st.cache_data(max_entries=CACHE_MAKS_ANTALL, ttl=CACHE_LEVETID, show_spinner=False)
+def rapport_pdf_mellomlagret(nokkel, _prosjekt_info, _jord, _fundament, _belastning, _terreng,
+                             _resultat, _sensitivitet, _form):
+    """PDF-rapport; nokkel må også dekke prosjektinfo og dato"""
+    from pdfrapport import generer_rapport_pdf
+    return generer_rapport_pdf(_prosjekt_info, _jord, _fundament, _belastning, _terreng,
+                               _resultat, sensitivitet=_sensitivitet, form=_form)
+
+
+def prosjekt_pdf(prosjekt_info, lagret) -> bytes:
+    """Prosjekt-PDF med én side per lagret beregning, beregnet på nytt fra lagrede inndata"""
+    from batch_cli import INNDATAFELT, enkelttilfeller
+    from pdfrapport import generer_prosjekt_pdf
+    kalkulator = hent_kalkulator()
+    rader = [{felt: lagret[felt][i] for felt in INNDATAFELT if felt in lagret}
+             for i in range(len(lagret['utnyttelsesgrad']))]
+    tilfeller = enkelttilfeller(rader)
+    beregninger = (
+        ({'beregningsnavn': navn, 'revisjon': revisjon}, *tilfelle, kalkulator.beregn(*tilfelle))
+        for navn, revisjon, tilfelle in zip(lagret['beregningsnavn'], lagret['revisjon'], tilfeller))
+    return generer_prosjekt_pdf(prosjekt_info, beregninger)
+
+
+@st.cache_data(max_entries=CACHE_MAKS_ANTALL, ttl=CACHE_LEVETID, show_spinner=False)
+def utnyttelseskart_mellomlagret(nokkel, akser, _jord, _fundament, _belastning, _terreng):
+    """Utnyttelseskart; akser = (felt_x, x_fra, x_til, felt_y, y_fra, y_til, punkter per akse)"""
+    from sensitivitet import utnyttelseskart
+    felt_x, x_fra, x_til, felt_y, y_fra, y_til, antall = akser
+    return utnyttelseskart(hent_kalkulator(), _jord, _fundament, _belastning, _terreng,
+                           felt_x, np.linspace(x_fra, x_til, antall),
+                           felt_y, np.linspace(y_fra, y_til, antall))
+
+
+@st.cache_resource(max_entries=CACHE_MAKS_ANTALL, ttl=CACHE_LEVETID, show_spinner=False)
+def utnyttelseskart_figur_mellomlagret(nokkel, akser, _kart):
+    """Figur for utnyttelseskartet; deles mellom økter og må ikke endres"""
+    from visualizations import lag_utnyttelseskart
+    return lag_utnyttelseskart(_kart)
+
+
+@st.cache_resource(max_entries=CACHE_MAKS_ANTALL, ttl=CACHE_LEVETID, show_spinner=False)
+def omhylling_figurer_mellomlagret(nokkel, _jord, _fundament, _belastning, _terreng):
+    """V–H–M-omhylling rundt gjeldende last og to snittfigurer; deles mellom økter"""
+    from omhylling import Kapasitetsomhylling
+    from visualizations import lag_omhyllingssnitt
+    V, H, M = _belastning.vertikal, _belastning.horisontal_B, _belastning.moment_B
+    
+    def spenn(verdi, minst):
+        ytre = 2 * max(abs(verdi), minst)
+        return (-ytre, ytre) if verdi < 0 else (0.0, ytre)
+    
+    grenser = {'vertikal': (0.1 * V, 2 * V), 'horisontal_B': spenn(H, 0.2 * V),
+               'moment_B': spenn(M, 0.1 * V * _fundament.bredde)}
+    omhylling = Kapasitetsomhylling(hent_kalkulator(), _jord, _fundament, _belastning, _terreng, grenser)
+    last = {'vertikal': V, 'horisontal_B': H, 'moment_B': M}
+    return (lag_omhyllingssnitt(omhylling, 'vertikal', 'horisontal_B', 'moment_B', last=last),
+            lag_omhyllingssnitt(omhylling, 'vertikal', 'moment_B', 'horisontal_B', last=last))
+
+
+# Standard spenn i utnyttelseskartet for felt der gjeldende verdi er 0
+KART_SPENN = {'horisontal_B': 100.0, 'moment_B': 100.0, 'skraaningshelning': 30.0,
+              'overflatelast': 50.0, 'attraksjon': 20.0}
+
+
+@st.cache_data(show_spinner=False)
+def formel_html(analysetype: str) -> str:
+    """HTML for "Anvendte formler", bygget én gang per analysetype"""
+    if analysetype == 'effektiv':
+        bokser = [
+            """
+            <div class="formula-box">
+                <div class="formula-title">Bæreevneformel (Effektivspenningsanalyse)</div>
+                <strong>s = f<sub>β</sub> · s<sub>q</sub> · N<sub>q</sub> · (γ'·D + q₀ + a) + f<sub>β</sub> · s<sub>γ</sub> · ½ · N<sub>γ</sub> · γ' · B₀ - a</strong>
+            </div>
+            """,
+            """
+            <div class="formula-box">
+                <div class="formula-title">Bæreevnefaktor N<sub>q</sub></div>
+                <strong>N<sub>q</sub> = ½ · (K<sub>p,ref</sub> + 1 + (K<sub>p,ref</sub> - 1) · cos(2θ<sub>m</sub>)) · e<sup>(π - 2θ<sub>m</sub>) · tan(φ'<sub>d</sub>)</sup></strong><br>
+                hvor K<sub>p,ref</sub> = tan²(45° + φ'<sub>d</sub>/2)
+            </div>
+            """,
+            """
+            <div class="formula-box">
+                <div class="formula-title">Bæreevnefaktor N<sub>γ</sub></div>
+                Interpolert fra tabell basert på tan(φ'<sub>d</sub>) og ruhet r (Brinch Hansen, 1970)
+            </div>
+            """
+        ]
+    else:
+        bokser = [
+            """
+            <div class="formula-box">
+                <div class="formula-title">Bæreevneformel (Totalspenningsanalyse)</div>
+                <strong>s = f<sub>β</sub> · s<sub>c</sub> · N<sub>c</sub> · s<sub>u</sub>/γ<sub>M</sub> + (γ·D + q₀) · cos²(β)</strong>
+            </div>
+            """,
+            """
+            <div class="formula-box">
+                <div class="formula-title">Bæreevnefaktor N<sub>c</sub></div>
+                <strong>N<sub>c</sub> = π + 2 + √(1 - r²) - arcsin(r)</strong>
+            </div>
+            """
+        ]
+    bokser += [
+        """
+        <div class="formula-box">
+            <div class="formula-title">Effektiv bredde og eksentrisitet</div>
+            <strong>e<sub>B</sub> = M / V</strong><br>
+            <strong>B₀ = B - 2·|e<sub>B</sub>|</strong>
+        </div>
+        """,
+        """
+        <div class="formula-box">
+            <div class="formula-title">Grunntrykk</div>
+            <strong>q = V<sub>total</sub> / A<sub>eff</sub></strong><br>
+            hvor A<sub>eff</sub> = B₀ (stripefundament) eller A<sub>eff</sub> = B₀ · L₀ (rektangulært)
+        </div>
+        """,
+        """
+        <div class="formula-box">
+            <div class="formula-title">Skråningsreduksjon f<sub>β</sub></div>
+            <strong>Effektiv: f<sub>β</sub> = (1 - 0.55·tan(β<sub>s</sub>))⁵</strong><br>
+            <strong>Udrenert: f<sub>β</sub> = 1 - 4·β<sub>s</sub>/(π + 2)</strong>
+        </div>
+        """
+    ]
+    return "\n".join(textwrap.dedent(boks) for boks in bokser)
+
+
 def main():
     # Header
     st.markdown("""
@@ -149,7 +352,7 @@ def main():
     </div>
     """, unsafe_allow_html=True)
     
-    kalkulator = BaereevneKalkulator()
+    kalkulator = hent_kalkulator()
     
     # === SIDEBAR ===
     with st.sidebar:
@@ -182,6 +385,11 @@ def main():
         st.markdown("---")
         st.markdown("### 📤 Eksport")
         export_btn = st.button("📄 Generer rapport", use_container_width=True)
+        har_prosjektnummer = bool(prosjekt_info['prosjektnummer'].strip())
+        lagre_btn = st.button("💾 Lagre beregning", use_container_width=True,
+                              disabled=not har_prosjektnummer,
+                              help="Lagrer inndata og resultat under prosjektnummer, beregningsnavn og revisjon"
+                                   if har_prosjektnummer else "Fyll inn prosjektnummer for å lagre")
     
     # Prosjektinfo-visning
     if prosjekt_info['prosjektnummer'] or prosjekt_info['prosjektnavn']:
@@ -225,10 +433,16 @@ def main():
     with col2:
         st.markdown("### 🧱 Fundament")
         
-        B = st.number_input("Bredde, B [m]", min_value=0.1, max_value=20.0, value=2.0, step=0.1)
+        # Optimal størrelse fra "Finn minste bredde" fylles inn før feltene tegnes
+        if 'dimensjon_ny' in st.session_state:
+            st.session_state.update(st.session_state.pop('dimensjon_ny'))
+        st.session_state.setdefault('inp_B', 2.0)
+        st.session_state.setdefault('inp_L', 4.0)
+        
+        B = st.number_input("Bredde, B [m]", min_value=0.1, max_value=20.0, step=0.1, key='inp_B')
         
         if fund_type == 'rektangulær':
-            L = st.number_input("Lengde, L [m]", min_value=0.1, max_value=50.0, value=4.0, step=0.1)
+            L = st.number_input("Lengde, L [m]", min_value=0.1, max_value=50.0, step=0.1, key='inp_L')
             if L < B:
                 st.warning("⚠️ L bør være ≥ B")
         else:
@@ -307,11 +521,9 @@ def main():
         centeravvik_L=e_input_L
     )
     
-    if analysetype == 'effektiv':
-        phi_d = np.degrees(np.arctan(np.tan(np.radians(phi)) / gamma_M))
-        Ka, Kp = kalkulator.beregn_jordtrykkskoeffisienter(phi_d)
-    else:
-        Ka, Kp = 0.5, 2.0
+    graf = hent_beregningsgraf()
+    graf.sett_inndata(jord, fundament, belastning)
+    Ka, Kp = float(graf['Ka']), float(graf['Kp'])
     
     terreng = TerrengForhold(
         fundamentdybde=D,
@@ -324,8 +536,10 @@ def main():
     )
     
     # Kjør beregning
+    nokkel = stabil_hash(jord, fundament, belastning, terreng)
     try:
-        resultat = kalkulator.beregn(jord, fundament, belastning, terreng)
+        graf.sett_inndata(terreng=terreng)
+        resultat = graf.resultat()
         beregning_ok = True
     except Exception as e:
         st.error(f"Beregningsfeil: {str(e)}")
@@ -385,12 +599,11 @@ def main():
         
         with fig_col:
             st.markdown("#### Fundamenttverrsnitt")
-            fig = lag_fundament_figur(fundament, terreng, resultat, belastning)
+            fig, gauge = lag_figurer_mellomlagret(nokkel, fundament, terreng, resultat, belastning)
             st.plotly_chart(fig, use_container_width=True)
         
         with gauge_col:
             st.markdown("#### Kapasitetsutnyttelse")
-            gauge = lag_utnyttelse_gauge(resultat.utnyttelsesgrad)
             st.plotly_chart(gauge, use_container_width=True)
         
         # Detaljer
@@ -434,85 +647,200 @@ def main():
             
             if resultat.ruhet > 0.9:
                 st.warning("⚠️ r > 0.9: Nær glidning")
+            
+            if st.button("🎯 Finn minste bredde", help="Minste B (og L med samme L/B) med q/s ≤ 1.0"):
+                forhold = L / B if L is not None else None
+                dim = kalkulator.dimensjoner(
+                    jord, fundament, belastning, terreng,
+                    B_min=0.1, B_max=20.0 if forhold is None else min(20.0, 50.0 / forhold),
+                    L_B_forhold=forhold, avrunding=0.1
+                )
+                if dim.konvergert:
+                    ny = {'inp_B': round(dim.bredde, 2)}
+                    if dim.lengde is not None:
+                        ny['inp_L'] = round(dim.lengde, 2)
+                    st.session_state['dimensjon_ny'] = ny
+                    st.rerun()
+                else:
+                    st.error("❌ Ingen bredde opp til maksimum gir q/s ≤ 1.0")
+        
+        # === SENSITIVITET ===
+        # Analysene under beregnes bare når de slås på; Streamlit kjører
+        # innholdet i en expander også når den er lukket
+        sensitivitet = None
+        with st.expander("🌪️ Sensitivitetsanalyse"):
+            if st.toggle("Beregn sensitivitet", key='vis_sensitivitet', help="Tas også med i rapporten"):
+                variasjon = st.slider("Variasjon i inndata [%]", min_value=5, max_value=50, value=10, step=5)
+                sensitivitet = sensitivitet_mellomlagret(nokkel, variasjon / 100, jord, fundament,
+                                                         belastning, terreng)
+                st.plotly_chart(tornado_mellomlagret(nokkel, variasjon, sensitivitet),
+                                use_container_width=True)
+                st.caption("Søylene viser q/s når hver parameter endres ±"
+                           f"{variasjon} % mens de andre holdes fast.")
+        
+        # === UTNYTTELSESKART ===
+        with st.expander("🗺️ Utnyttelseskart"):
+            if st.toggle("Beregn utnyttelseskart", key='vis_kart'):
+                from sensitivitet import FELTNAVN
+                
+                kartfelt = ['bredde'] + (['lengde'] if L is not None else []) + [
+                    'fundamentdybde', 'tykkelse',
+                    'friksjonsvinkel' if analysetype == 'effektiv' else 'udrenert_skjaerstyrke',
+                    'vertikal', 'horisontal_B', 'moment_B', 'skraaningshelning', 'overflatelast'
+                ]
+                k1, k2, k3 = st.columns(3)
+                with k1:
+                    felt_x = st.selectbox("X-akse", kartfelt, format_func=FELTNAVN.get, key='kart_x')
+                with k2:
+                    y_valg = [f for f in kartfelt if f != felt_x]
+                    felt_y = st.selectbox("Y-akse", y_valg, format_func=FELTNAVN.get, key='kart_y',
+                                          index=y_valg.index('fundamentdybde') if 'fundamentdybde' in y_valg else 0)
+                with k3:
+                    punkter = st.slider("Punkter per akse", min_value=20, max_value=400, value=150, step=10)
+                
+                def omraade(felt):
+                    """Fra/til for et felt; standard ±50 % rundt gjeldende verdi"""
+                    verdi = next(getattr(o, felt) for o in (jord, fundament, belastning, terreng)
+                                 if hasattr(o, felt))
+                    if verdi:
+                        fra, til = sorted((0.5 * verdi, 1.5 * verdi))
+                    else:
+                        fra, til = 0.0, KART_SPENN.get(felt, 1.0)
+                    f1, f2 = st.columns(2)
+                    with f1:
+                        fra = st.number_input(f"{FELTNAVN[felt]} fra", value=float(fra), key=f'kart_{felt}_fra')
+                    with f2:
+                        til = st.number_input(f"{FELTNAVN[felt]} til", value=float(til), key=f'kart_{felt}_til')
+                    return fra, til
+                
+                x_fra, x_til = omraade(felt_x)
+                y_fra, y_til = omraade(felt_y)
+                if x_fra >= x_til or y_fra >= y_til:
+                    st.warning("⚠️ «Fra» må være mindre enn «til» for begge aksene")
+                else:
+                    akser = (felt_x, x_fra, x_til, felt_y, y_fra, y_til, punkter)
+                    kart = utnyttelseskart_mellomlagret(nokkel, akser, jord, fundament, belastning, terreng)
+                    st.plotly_chart(utnyttelseskart_figur_mellomlagret(nokkel, akser, kart),
+                                    use_container_width=True)
+                    st.caption(f"q/s for {punkter}×{punkter} kombinasjoner; hvit linje er q/s = 1.0 "
+                               "og krysset er gjeldende beregning. Øvrige inndata holdes fast.")
+        
+        # === KAPASITETSOMHYLLING ===
+        with st.expander("🧭 V–H–M-omhylling"):
+            if st.toggle("Beregn omhylling", key='vis_omhylling'):
+                if belastning.vertikal <= 0:
+                    st.info("Omhyllingen krever vertikallast V > 0")
+                else:
+                    fig_vh, fig_vm = omhylling_figurer_mellomlagret(nokkel, jord, fundament, belastning, terreng)
+                    o1, o2 = st.columns(2)
+                    with o1:
+                        st.plotly_chart(fig_vh, use_container_width=True)
+                    with o2:
+                        st.plotly_chart(fig_vm, use_container_width=True)
+                    st.caption("Kurvene er kapasiteten q/s = 1.0 for lastkombinasjoner opp til 2× gjeldende "
+                               "last; lasttilfeller innenfor kurven er OK. Krysset er gjeldende last.")
+        
+        # === PÅLITELIGHET ===
+        form_resultat = None
+        with st.expander("🎲 Pålitelighetsanalyse (FORM)"):
+            if st.toggle("Beregn pålitelighet", key='vis_form', help="Tas også med i rapporten"):
+                from paalitelighet import Fordeling
+                
+                p1, p2 = st.columns(2)
+                with p1:
+                    cov_styrke = st.number_input("Variasjonskoeffisient styrke [%]", min_value=0.0, max_value=50.0,
+                                                 value=10.0, step=1.0, help="Lognormalfordelt φ' eller su")
+                with p2:
+                    cov_last = st.number_input("Variasjonskoeffisient laster [%]", min_value=0.0, max_value=50.0,
+                                               value=15.0, step=1.0, help="Normalfordelte V, H og M")
+                
+                fordelinger = {}
+                styrke = ('friksjonsvinkel', phi) if analysetype == 'effektiv' else ('udrenert_skjaerstyrke', su)
+                if styrke[1] > 0 and cov_styrke > 0:
+                    fordelinger[styrke[0]] = Fordeling('lognormal', styrke[1], styrke[1] * cov_styrke / 100)
+                if cov_last > 0:
+                    for felt, verdi in (('vertikal', V), ('horisontal_B', H_B), ('horisontal_L', H_L),
+                                        ('moment_B', M_B), ('moment_L', M_L)):
+                        if verdi != 0:
+                            fordelinger[felt] = Fordeling('normal', verdi, abs(verdi) * cov_last / 100)
+                
+                if fordelinger:
+                    form_resultat = form_mellomlagret(stabil_hash(nokkel, fordelinger), jord, fundament,
+                                                      belastning, terreng, fordelinger)
+                    f1, f2, f3 = st.columns(3)
+                    f1.metric("Pålitelighetsindeks β", f"{form_resultat.beta:.2f}")
+                    f2.metric("Bruddsannsynlighet P_f", f"{form_resultat.P_f:.1e}")
+                    f3.metric("Iterasjoner", form_resultat.iterasjoner)
+                    if not form_resultat.konvergert:
+                        st.warning("⚠️ FORM-iterasjonen konvergerte ikke")
+                    st.dataframe(
+                        {"Parameter": list(form_resultat.alfa),
+                         "Designpunkt x*": [round(form_resultat.designpunkt[n], 3) for n in form_resultat.alfa],
+                         "α": [round(a, 3) for a in form_resultat.alfa.values()]},
+                        hide_index=True, use_container_width=True
+                    )
+                    st.caption("Middelverdier lik inndata, γM = 1.0. α > 0 for motstand, α < 0 for last.")
+                else:
+                    st.info("ℹ️ Angi variasjonskoeffisient for minst én parameter")
         
         # === FORMLER ===
         st.markdown("---")
         st.markdown("### 📐 Anvendte formler")
-        
-        if analysetype == 'effektiv':
-            st.markdown("""
-            <div class="formula-box">
-                <div class="formula-title">Bæreevneformel (Effektivspenningsanalyse)</div>
-                <strong>s = f<sub>β</sub> · s<sub>q</sub> · N<sub>q</sub> · (γ'·D + q₀ + a) + f<sub>β</sub> · s<sub>γ</sub> · ½ · N<sub>γ</sub> · γ' · B₀ - a</strong>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            st.markdown("""
-            <div class="formula-box">
-                <div class="formula-title">Bæreevnefaktor N<sub>q</sub></div>
-                <strong>N<sub>q</sub> = ½ · (K<sub>p,ref</sub> + 1 + (K<sub>p,ref</sub> - 1) · cos(2θ<sub>m</sub>)) · e<sup>(π - 2θ<sub>m</sub>) · tan(φ'<sub>d</sub>)</sup></strong><br>
-                hvor K<sub>p,ref</sub> = tan²(45° + φ'<sub>d</sub>/2)
-            </div>
-            """, unsafe_allow_html=True)
-            
-            st.markdown("""
-            <div class="formula-box">
-                <div class="formula-title">Bæreevnefaktor N<sub>γ</sub></div>
-                Interpolert fra tabell basert på tan(φ'<sub>d</sub>) og ruhet r (Brinch Hansen, 1970)
-            </div>
-            """, unsafe_allow_html=True)
-        else:
-            st.markdown("""
-            <div class="formula-box">
-                <div class="formula-title">Bæreevneformel (Totalspenningsanalyse)</div>
-                <strong>s = f<sub>β</sub> · s<sub>c</sub> · N<sub>c</sub> · s<sub>u</sub>/γ<sub>M</sub> + (γ·D + q₀) · cos²(β)</strong>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            st.markdown("""
-            <div class="formula-box">
-                <div class="formula-title">Bæreevnefaktor N<sub>c</sub></div>
-                <strong>N<sub>c</sub> = π + 2 + √(1 - r²) - arcsin(r)</strong>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        st.markdown("""
-        <div class="formula-box">
-            <div class="formula-title">Effektiv bredde og eksentrisitet</div>
-            <strong>e<sub>B</sub> = M / V</strong><br>
-            <strong>B₀ = B - 2·|e<sub>B</sub>|</strong>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        st.markdown("""
-        <div class="formula-box">
-            <div class="formula-title">Grunntrykk</div>
-            <strong>q = V<sub>total</sub> / A<sub>eff</sub></strong><br>
-            hvor A<sub>eff</sub> = B₀ (stripefundament) eller A<sub>eff</sub> = B₀ · L₀ (rektangulært)
-        </div>
-        """, unsafe_allow_html=True)
-        
-        st.markdown("""
-        <div class="formula-box">
-            <div class="formula-title">Skråningsreduksjon f<sub>β</sub></div>
-            <strong>Effektiv: f<sub>β</sub> = (1 - 0.55·tan(β<sub>s</sub>))⁵</strong><br>
-            <strong>Udrenert: f<sub>β</sub> = 1 - 4·β<sub>s</sub>/(π + 2)</strong>
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(formel_html(analysetype), unsafe_allow_html=True)
+        
+        # Lagrede beregninger
+        if lagre_btn:
+            lager = hent_beregningslager()
+            lager.lagre(kalkulator, jord, fundament, belastning, terreng, resultat, prosjekt_info)
+            st.success("✅ Beregningen er lagret")
+        if prosjekt_info['prosjektnummer']:
+            with st.expander("🗄️ Lagrede beregninger i prosjektet"):
+                lagret = hent_beregningslager().prosjektberegninger(prosjekt_info['prosjektnummer'])
+                if len(lagret['utnyttelsesgrad']):
+                    st.dataframe({
+                        'Beregning': lagret['beregningsnavn'],
+                        'Rev.': lagret['revisjon'],
+                        'Analyse': lagret['analysetype'],
+                        'B [m]': lagret['bredde'],
+                        'V [kN]': lagret['vertikal'],
+                        'H_B [kN]': lagret['horisontal_B'],
+                        'M_B [kNm]': lagret['moment_B'],
+                        'q/s': lagret['utnyttelsesgrad'],
+                    }, hide_index=True, use_container_width=True)
+                    if st.button("📚 Lag prosjekt-PDF (én side per beregning)"):
+                        st.download_button(
+                            label="📥 Last ned prosjekt-PDF",
+                            data=prosjekt_pdf(prosjekt_info, lagret),
+                            file_name=f"baereevne_{prosjekt_info['prosjektnummer']}_prosjekt.pdf",
+                            mime="application/pdf"
+                        )
+                else:
+                    st.info("ℹ️ Ingen lagrede beregninger for prosjektnummeret ennå")
         
         # Eksport
         if export_btn:
-            html = generer_rapport_html(prosjekt_info, jord, fundament, belastning, terreng, resultat)
+            rapport_nokkel = stabil_hash(nokkel, prosjekt_info, sensitivitet, form_resultat,
+                                         datetime.now().strftime('%d.%m.%Y'))
+            html = rapport_mellomlagret(rapport_nokkel, prosjekt_info, jord, fundament, belastning,
+                                        terreng, resultat, sensitivitet, form_resultat)
+            pdf = rapport_pdf_mellomlagret(rapport_nokkel, prosjekt_info, jord, fundament, belastning,
+                                           terreng, resultat, sensitivitet, form_resultat)
             
-            filnavn = f"baereevne_{prosjekt_info.get('prosjektnummer', 'rapport')}_{datetime.now().strftime('%Y%m%d')}.html"
+            filnavn = f"baereevne_{prosjekt_info.get('prosjektnummer', 'rapport')}_{datetime.now().strftime('%Y%m%d')}"
             
-            st.download_button(
+            nedlasting_html, nedlasting_pdf = st.columns(2)
+            nedlasting_html.download_button(
                 label="📥 Last ned rapport (HTML)",
                 data=html,
-                file_name=filnavn,
+                file_name=filnavn + ".html",
                 mime="text/html"
             )
-            st.info("💡 Åpne HTML i nettleser → Skriv ut → Lagre som PDF")
+            nedlasting_pdf.download_button(
+                label="📥 Last ned rapport (PDF)",
+                data=pdf,
+                file_name=filnavn + ".pdf",
+                mime="application/pdf"
+            )
     
     # Footer
     st.markdown("---")
@@ -0,0 +1,413 @@
+"""
+Kommandolinjekjøring av bæreevneberegning for mange fundamenter
+
+Leser en tabell med ett fundament/lasttilfelle per rad, beregner i blokker
+med beregn_batch og skriver resultatene fortløpende til fil. Kolonnenavn
+er feltnavnene i JordParameter, FundamentGeometri, Belastning og
+TerrengForhold; øvrige kolonner (f.eks. id, lasttilfelle) føres videre
+uendret. Importerer verken streamlit eller plotly.
+
+    python batch_cli.py fundamenter.csv resultater.csv
+    python batch_cli.py fundamenter.parquet resultater.parquet --arbeidere 8 \\
+        --verdi materialfaktor=1.4 --verdi analysetype=effektiv
+
+Støtter CSV, og Parquet/Feather når pyarrow er installert.
+"""
+
+import argparse
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, fields, replace
+from pathlib import Path
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from models import (JordParameter, FundamentGeometri, Belastning,
+                   TerrengForhold, Resultat, INNDATAKLASSER)
+from calculator import BaereevneKalkulator
+
+
+# Felt som kan utelates i inndata, med standardverdi
+STANDARDVERDIER: Dict[str, object] = {
+    'friksjonsvinkel': 0.0,
+    'udrenert_skjaerstyrke': 0.0,
+    'romvekt_eff': 0.0,
+    'attraksjon': 0.0,
+    'lengde': np.nan,  # stripefundament
+    'vegg_bredde': 0.0,
+    'soyle_lengde': 0.0,
+    'horisontal_B': 0.0,
+    'horisontal_L': 0.0,
+    'moment_B': 0.0,
+    'moment_L': 0.0,
+    'centeravvik_B': 0.0,
+    'centeravvik_L': 0.0,
+    'overflatelast': 0.0,
+    'skraaningshelning': 0.0,
+    'terrenghelning': 0.0,
+}
+
+INNDATAFELT = [f.name for klasse in INNDATAKLASSER for f in fields(klasse)]
+RESULTATFELT = [f.name for f in fields(Resultat)]
+
+FORMATER = {'.csv': 'csv', '.txt': 'csv', '.parquet': 'parquet', '.pq': 'parquet',
+            '.feather': 'feather', '.arrow': 'feather'}
+
+
+@dataclass
+class Sammendrag:
+    """Oppsummering av en batchkjøring"""
+    antall: int  # beregnede rader
+    antall_over_1: int  # rader med q/s > 1.0
+    antall_ugyldige: int  # rader uten gyldig q/s (NaN)
+    maks_utnyttelse: float
+    maks_rad: Optional[int]  # radnummer (0-basert) med størst q/s
+    tid: float  # sekunder
+    antall_fra_lager: int = 0  # rader hentet fra beregningslageret i stedet for beregnet
+
+    def tekst(self) -> str:
+        hastighet = self.antall / self.tid if self.tid > 0 else float('inf')
+        linjer = [
+            f"Rader beregnet:     {self.antall}",
+            f"Maks utnyttelse:    {self.maks_utnyttelse:.3f} (rad {self.maks_rad})",
+            f"Rader med q/s > 1:  {self.antall_over_1}",
+        ]
+        if self.antall_ugyldige:
+            linjer.append(f"Ugyldige rader:     {self.antall_ugyldige}")
+        if self.antall_fra_lager:
+            linjer.append(f"Fra lageret:        {self.antall_fra_lager}")
+        linjer.append(f"Tid:                {self.tid:.1f} s ({hastighet:,.0f} rader/s)")
+        return "\n".join(linjer)
+
+
+def _format(sti: Path) -> str:
+    try:
+        return FORMATER[sti.suffix.lower()]
+    except KeyError:
+        raise ValueError(f"Ukjent filformat: {sti.suffix} (støtter {', '.join(FORMATER)})") from None
+
+
+def les_tabell(sti, blokkstorrelse: int) -> Iterator[pd.DataFrame]:
+    """Leser tabellen i blokker à blokkstorrelse rader"""
+    sti = Path(sti)
+    fmt = _format(sti)
+    if fmt == 'csv':
+        yield from pd.read_csv(sti, chunksize=blokkstorrelse)
+        return
+
+    try:
+        import pyarrow.parquet as pq
+        import pyarrow.ipc as ipc
+    except ImportError:
+        raise RuntimeError(f"Lesing av {fmt} krever pyarrow") from None
+
+    if fmt == 'parquet':
+        batcher = pq.ParquetFile(sti).iter_batches(batch_size=blokkstorrelse)
+    else:
+        leser = ipc.open_file(sti)
+        batcher = (leser.get_batch(i) for i in range(leser.num_record_batches))
+
+    # Record batches kan ha vilkårlig størrelse; samle/del til blokkstorrelse
+    buffer: List[pd.DataFrame] = []
+    antall = 0
+    for batch in batcher:
+        df = batch.to_pandas()
+        buffer.append(df)
+        antall += len(df)
+        while antall >= blokkstorrelse:
+            samlet = pd.concat(buffer, ignore_index=True)
+            yield samlet.iloc[:blokkstorrelse]
+            rest = samlet.iloc[blokkstorrelse:]
+            buffer = [rest]
+            antall = len(rest)
+    if antall:
+        yield pd.concat(buffer, ignore_index=True)
+
+
+class _Skriver:
+    """Skriver resultatblokker fortløpende til CSV eller Parquet/Feather"""
+
+    def __init__(self, sti):
+        self.sti = Path(sti)
+        self.fmt = _format(self.sti)
+        self._forste = True
+        self._arrow = None
+
+    def skriv(self, df: pd.DataFrame):
+        if self.fmt == 'csv':
+            df.to_csv(self.sti, mode='w' if self._forste else 'a', header=self._forste, index=False)
+        else:
+            import pyarrow as pa
+            tabell = pa.Table.from_pandas(df, preserve_index=False)
+            if self._arrow is None:
+                if self.fmt == 'parquet':
+                    import pyarrow.parquet as pq
+                    self._arrow = pq.ParquetWriter(self.sti, tabell.schema)
+                else:
+                    self._arrow = pa.ipc.new_file(self.sti, tabell.schema)
+            self._arrow.write_table(tabell)
+        self._forste = False
+
+    def lukk(self):
+        if self._arrow is not None:
+            self._arrow.close()
+
+
+def inndata_fra_tabell(tabell: pd.DataFrame, konstanter: Optional[Dict[str, object]] = None):
+    """
+    Bygger (jord, fundament, belastning, terreng) med kolonner som arrays
+
+    Verdier i konstanter gjelder alle rader og overstyrer tabellen. Ka og Kp
+    beregnes fra φ'd når de mangler.
+    """
+    kolonner = {navn: tabell[navn].to_numpy() for navn in INNDATAFELT if navn in tabell.columns}
+    return inndata_fra_kolonner(kolonner, len(tabell), konstanter)
+
+
+def inndata_fra_kolonner(kolonner: Mapping[str, object],
+                         antall: int,
+                         konstanter: Optional[Dict[str, object]] = None):
+    """Som inndata_fra_tabell, for feltnavn -> kolonne (array, liste eller skalar)"""
+    konstanter = konstanter or {}
+    verdier = {}
+    for navn in INNDATAFELT:
+        if navn in konstanter:
+            verdi = konstanter[navn]
+        elif navn in kolonner:
+            verdi = kolonner[navn]
+        elif navn in STANDARDVERDIER:
+            verdi = STANDARDVERDIER[navn]
+        elif navn in ('Ka', 'Kp'):
+            continue
+        else:
+            raise KeyError(f"Mangler kolonne: {navn}")
+
+        if navn == 'analysetype':
+            verdi = np.broadcast_to(np.asarray(verdi, dtype=str), (antall,))
+        else:
+            verdi = np.broadcast_to(np.asarray(verdi, dtype=float), (antall,))
+        verdier[navn] = verdi
+
+    if 'Ka' not in verdier or 'Kp' not in verdier:
+        phi_d = np.degrees(np.arctan(np.tan(np.radians(verdier['friksjonsvinkel'])) /
+                                     verdier['materialfaktor']))
+        phi_rad = np.radians(phi_d)
+        verdier.setdefault('Ka', (1 - np.sin(phi_rad)) / (1 + np.sin(phi_rad)))
+        verdier.setdefault('Kp', (1 + np.sin(phi_rad)) / (1 - np.sin(phi_rad)))
+
+    return tuple(klasse(**{f.name: verdier[f.name] for f in fields(klasse)})
+                 for klasse in INNDATAKLASSER)
+
+
+def ett_tilfelle(rad: Mapping[str, object], konstanter: Optional[Dict[str, object]] = None):
+    """(jord, fundament, belastning, terreng) med skalare verdier for én rad, som til beregn()"""
+    return enkelttilfeller([rad], konstanter)[0]
+
+
+def enkelttilfeller(rader: Sequence[Mapping[str, object]],
+                    konstanter: Optional[Dict[str, object]] = None) -> List[tuple]:
+    """ett_tilfelle for mange rader med de samme feltene, med én felles kringkasting"""
+    kolonner = {navn: [rad[navn] for rad in rader] for navn in INNDATAFELT if navn in rader[0]}
+    objekter = inndata_fra_kolonner(kolonner, len(rader), konstanter)
+    per_klasse = [(type(objekt), {f.name: getattr(objekt, f.name).tolist() for f in fields(objekt)})
+                  for objekt in objekter]
+    tilfeller = []
+    for i in range(len(rader)):
+        jord, fundament, belastning, terreng = (
+            klasse(**{navn: verdier[i] for navn, verdier in felt.items()}) for klasse, felt in per_klasse)
+        if math.isnan(fundament.lengde):
+            fundament = replace(fundament, lengde=None)
+        tilfeller.append((jord, fundament, belastning, terreng))
+    return tilfeller
+
+
+def beregn_tabell(kalkulator: BaereevneKalkulator,
+                  tabell: pd.DataFrame,
+                  konstanter: Optional[Dict[str, object]] = None,
+                  lager=None,
+                  prosjekt_info: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    """
+    Inndatatabell med resultatkolonnene (Resultat-feltene) lagt til
+
+    Med lager (Beregningslager) hentes rader som finnes fra før, og nye
+    resultater lagres under prosjekt_info.
+    """
+    inndata = inndata_fra_tabell(tabell, konstanter)
+    if lager is not None:
+        resultat = lager.beregn_batch(kalkulator, *inndata, prosjekt_info=prosjekt_info)
+    else:
+        resultat = kalkulator.beregn_batch(*inndata)
+    ut = tabell.reset_index(drop=True).copy()
+    for navn in RESULTATFELT:
+        ut[navn] = resultat[navn]
+    return ut
+
+
+_ARBEIDER_KALKULATOR: Optional[BaereevneKalkulator] = None
+_ARBEIDER_KONSTANTER: Optional[Dict[str, object]] = None
+
+
+def _start_arbeider(kalkulator: BaereevneKalkulator, konstanter: Dict[str, object]):
+    global _ARBEIDER_KALKULATOR, _ARBEIDER_KONSTANTER
+    _ARBEIDER_KALKULATOR = kalkulator
+    _ARBEIDER_KONSTANTER = konstanter
+
+
+def _beregn_i_arbeider(tabell: pd.DataFrame) -> pd.DataFrame:
+    return beregn_tabell(_ARBEIDER_KALKULATOR, tabell, _ARBEIDER_KONSTANTER)
+
+
+def kjor_batch(inn,
+               ut,
+               kalkulator: Optional[BaereevneKalkulator] = None,
+               konstanter: Optional[Dict[str, object]] = None,
+               blokkstorrelse: int = 50_000,
+               arbeidere: Optional[int] = None,
+               fremdrift=None,
+               lager=None,
+               prosjekt_info: Optional[Dict[str, str]] = None) -> Sammendrag:
+    """
+    Beregner alle rader i filen inn og skriver til filen ut
+
+    Blokkene beregnes i en prosesspool med høyst 2·arbeidere blokker i
+    arbeid samtidig, så minnebruken er begrenset uansett filstørrelse.
+    Resultatene skrives i samme rekkefølge som inndata. arbeidere=None
+    bruker alle kjerner; arbeidere=1 beregner i denne prosessen.
+
+    fremdrift kalles med (antall rader ferdig, sekunder) etter hver blokk.
+
+    Med lager (Beregningslager) beregnes bare rader som ikke finnes i
+    lageret, og nye resultater lagres der. Da beregnes alt i denne
+    prosessen; oppslagene i SQLite koster mer enn selve beregningen.
+    """
+    kalkulator = kalkulator or BaereevneKalkulator()
+    konstanter = konstanter or {}
+    arbeidere = 1 if lager is not None else (arbeidere or os.cpu_count() or 1)
+    treff_for = lager.treff if lager is not None else 0
+
+    start = time.perf_counter()
+    antall = 0
+    over_1 = 0
+    ugyldige = 0
+    maks_u = -math.inf
+    maks_rad = None
+
+    def registrer(df: pd.DataFrame):
+        nonlocal antall, over_1, ugyldige, maks_u, maks_rad
+        u = df['utnyttelsesgrad'].to_numpy()
+        gyldig = ~np.isnan(u)
+        over_1 += int(np.count_nonzero(u[gyldig] > 1.0))
+        ugyldige += int(np.count_nonzero(~gyldig))
+        if gyldig.any():
+            i = int(np.nanargmax(u))
+            if u[i] > maks_u:
+                maks_u = float(u[i])
+                maks_rad = antall + i
+        antall += len(df)
+        skriver.skriv(df)
+        if fremdrift is not None:
+            fremdrift(antall, time.perf_counter() - start)
+
+    skriver = _Skriver(ut)
+    try:
+        blokker = les_tabell(inn, blokkstorrelse)
+        if arbeidere <= 1:
+            for tabell in blokker:
+                registrer(beregn_tabell(kalkulator, tabell, konstanter, lager, prosjekt_info))
+        else:
+            with ProcessPoolExecutor(max_workers=arbeidere, initializer=_start_arbeider,
+                                     initargs=(kalkulator, konstanter)) as pool:
+                vindu = []
+                for tabell in blokker:
+                    vindu.append(pool.submit(_beregn_i_arbeider, tabell))
+                    if len(vindu) >= 2 * arbeidere:
+                        registrer(vindu.pop(0).result())
+                for fremtid in vindu:
+                    registrer(fremtid.result())
+    finally:
+        skriver.lukk()
+
+    return Sammendrag(
+        antall=antall,
+        antall_over_1=over_1,
+        antall_ugyldige=ugyldige,
+        maks_utnyttelse=maks_u if maks_rad is not None else math.nan,
+        maks_rad=maks_rad,
+        tid=time.perf_counter() - start,
+        antall_fra_lager=lager.treff - treff_for if lager is not None else 0
+    )
+
+
+def _tolk_verdi(tekst: str):
+    """'navn=verdi' fra kommandolinjen; tall tolkes som float"""
+    navn, sep, verdi = tekst.partition('=')
+    if not sep or navn not in INNDATAFELT:
+        raise argparse.ArgumentTypeError(f"Forventet felt=verdi med kjent felt, fikk: {tekst}")
+    if navn == 'analysetype':
+        return navn, verdi
+    return navn, float(verdi)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Bæreevneberegning for alle rader i en CSV/Parquet/Feather-fil")
+    parser.add_argument('inn', help="Inndatafil, én rad per fundament/lasttilfelle")
+    parser.add_argument('ut', help="Resultatfil (CSV, Parquet eller Feather etter filendelse)")
+    parser.add_argument('--verdi', type=_tolk_verdi, action='append', default=[],
+                        metavar='FELT=VERDI', help="Felles verdi for alle rader (kan gjentas)")
+    parser.add_argument('--blokkstorrelse', type=int, default=50_000)
+    parser.add_argument('--arbeidere', type=int, default=None,
+                        help="Antall prosesser (standard: alle kjerner)")
+    parser.add_argument('--ny-interpolasjon', choices=['lineaer', 'kubisk'], default='lineaer')
+    parser.add_argument('--stille', action='store_true', help="Ingen fremdriftslinje")
+    parser.add_argument('--feil-ved-brudd', action='store_true',
+                        help="Avslutt med kode 1 hvis noen rad har q/s > 1.0")
+    parser.add_argument('--lager', metavar='STI',
+                        help="SQLite-beregningslager: rader som finnes fra før beregnes ikke på nytt, "
+                             "nye resultater lagres (beregner i én prosess)")
+    parser.add_argument('--prosjektnummer', default='', help="Prosjekt i lageret (med --lager)")
+    parser.add_argument('--beregningsnavn', default='')
+    parser.add_argument('--revisjon', default='')
+    parser.add_argument('--profilering', action='store_true',
+                        help="Skriv tid per beregningssteg og blokk (beregner i én prosess)")
+    args = parser.parse_args(argv)
+
+    def fremdrift(antall, sekunder):
+        hastighet = antall / sekunder if sekunder > 0 else 0.0
+        print(f"\r{antall:,} rader ({hastighet:,.0f} rader/s)", end='', file=sys.stderr, flush=True)
+
+    kalkulator = BaereevneKalkulator(ny_interpolasjon=args.ny_interpolasjon)
+    if args.profilering:
+        kalkulator.aktiver_profilering()
+    lager = None
+    if args.lager:
+        from beregningslager import Beregningslager
+        lager = Beregningslager(args.lager)
+    prosjekt_info = {navn: getattr(args, navn) for navn in ('prosjektnummer', 'beregningsnavn', 'revisjon')}
+    sammendrag = kjor_batch(
+        args.inn, args.ut,
+        kalkulator=kalkulator,
+        konstanter=dict(args.verdi),
+        blokkstorrelse=args.blokkstorrelse,
+        arbeidere=1 if args.profilering else args.arbeidere,
+        fremdrift=None if args.stille else fremdrift,
+        lager=lager,
+        prosjekt_info=prosjekt_info if any(prosjekt_info.values()) else None
+    )
+    if lager is not None:
+        lager.lukk()
+    if not args.stille:
+        print(file=sys.stderr)
+    print(sammendrag.tekst())
+    if args.profilering:
+        print(kalkulator.profilering_rapport().tekst(), file=sys.stderr)
+    return 1 if args.feil_ved_brudd and sammendrag.antall_over_1 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
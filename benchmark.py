@@ -0,0 +1,560 @@
+"""
+Ytelsesmålinger for bæreevneberegning
+
+Kjøres fra kommandolinjen:
+
+    python benchmark.py figur            # byggetid og størrelse mot B
+    python benchmark.py figur --bredder 1 5 20 --gjentakelser 20
+    python benchmark.py delt --antall 10000000 --arbeidere 1 2 4 8
+    python benchmark.py rapporter --antall 500 --arbeidere 1 2 4
+    python benchmark.py suite            # hele suiten mot lagret grunnlag
+    python benchmark.py suite --lagre-grunnlag
+    python benchmark.py suite --filter beregn/ --terskel 0.1
+    python benchmark.py importtid        # importtid mot budsjett i nye prosesser
+
+Suiten lagrer hver kjøring i en JSON-historikk og sammenligner beste tid
+per måling med grunnlaget. Målinger som er mer enn terskel (andel) tregere
+flagges, og kommandoen avslutter da med kode 1.
+
+importtid kjører `python -X importtime` for hver modul i IMPORTBUDSJETT
+og for appens importer på toppnivå, og feiler hvis en modul bruker mer
+enn budsjettet eller laster en pakke den ikke skal (f.eks. plotly i
+beregningskjernen).
+"""
+
+import argparse
+import ast
+import io
+import re
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+from dataclasses import fields, replace
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import plotly.io as pio
+
+from models import JordParameter, FundamentGeometri, Belastning, TerrengForhold
+from calculator import BaereevneKalkulator
+from delt_minne import DeltMinneUtforer
+from minnekart import beregn_minnekart
+from omhylling import Kapasitetsomhylling
+from beregningsgraf import Beregningsgraf
+from beregningslager import Beregningslager
+from rapportbunt import lag_rapportarkiv
+from report import generer_rapport_html
+from pdfrapport import generer_rapport_pdf
+from visualizations import lag_fundament_figur
+
+
+HISTORIKK = 'benchmark_historikk.json'
+GRUNNLAG = 'benchmark_grunnlag.json'
+TERSKEL = 0.25  # andel tregere enn grunnlaget som regnes som regresjon
+
+# Kumulativ importtid [ms] i en ny prosess, inkludert numpy. 'app' er
+# importene på toppnivå i app.py.
+IMPORTBUDSJETT = {
+    'models': 50,
+    'calculator': 250,
+    'lastkombinasjoner': 250,
+    'sensitivitet': 250,
+    'paalitelighet': 250,
+    'minnekart': 250,
+    'tabeller': 250,
+    'omhylling': 250,
+    'beregningsgraf': 250,
+    'beregningslager': 250,
+    'app': 1000,
+}
+
+# Pakker som ikke skal lastes ved import. Figurer, rapport og tabellformater
+# lastes først når de brukes.
+KJERNE_FORBUDT = ('streamlit', 'plotly', 'pandas', 'pyarrow', 'visualizations', 'report')
+APP_FORBUDT = ('pandas', 'pyarrow', 'visualizations', 'report')
+
+
+def standard_inndata():
+    """Typisk stripefundament med eksentrisk last, brukt i alle målinger"""
+    jord = JordParameter(
+        analysetype='effektiv',
+        friksjonsvinkel=33.0,
+        udrenert_skjaerstyrke=0.0,
+        romvekt_eff=10.0,
+        attraksjon=0.0,
+        materialfaktor=1.4
+    )
+    fundament = FundamentGeometri(
+        bredde=2.0,
+        lengde=None,
+        tykkelse=0.5,
+        romvekt=25.0,
+        vegg_bredde=0.2,
+        soyle_lengde=1.0
+    )
+    belastning = Belastning(
+        vertikal=500.0,
+        horisontal_B=50.0,
+        horisontal_L=0.0,
+        moment_B=60.0,
+        moment_L=0.0,
+        centeravvik_B=0.0,
+        centeravvik_L=0.0
+    )
+    terreng = TerrengForhold(
+        fundamentdybde=1.0,
+        romvekt_over=18.0,
+        overflatelast=0.0,
+        skraaningshelning=0.0,
+        terrenghelning=0.0,
+        Ka=0.3,
+        Kp=3.4
+    )
+    return jord, fundament, belastning, terreng
+
+
+def _tidsbruk(funksjon, gjentakelser: int) -> float:
+    """Beste tid av gjentakelser [s]"""
+    beste = float('inf')
+    for _ in range(gjentakelser):
+        start = time.perf_counter()
+        funksjon()
+        beste = min(beste, time.perf_counter() - start)
+    return beste
+
+
+def benchmark_figur(bredder: Sequence[float] = (1, 2, 5, 10, 20),
+                    gjentakelser: int = 10) -> List[Dict[str, float]]:
+    """Byggetid, serialiseringstid og JSON-størrelse for tverrsnittsfiguren mot B"""
+    kalkulator = BaereevneKalkulator()
+    jord, fundament, belastning, terreng = standard_inndata()
+
+    rader = []
+    for B in bredder:
+        fund = replace(fundament, bredde=float(B))
+        resultat = kalkulator.beregn(jord, fund, belastning, terreng)
+        figur = lag_fundament_figur(fund, terreng, resultat, belastning)
+        rader.append({
+            'B': float(B),
+            'bygg_ms': 1000 * _tidsbruk(
+                lambda: lag_fundament_figur(fund, terreng, resultat, belastning), gjentakelser),
+            'json_ms': 1000 * _tidsbruk(lambda: pio.to_json(figur, validate=False), gjentakelser),
+            'json_kB': len(pio.to_json(figur, validate=False)) / 1024,
+            'annotasjoner': len(figur.layout.annotations),
+            'shapes': len(figur.layout.shapes),
+            'spor': len(figur.data),
+        })
+    return rader
+
+
+def parameterstudie(antall: int):
+    """Rutenett i B, D, φ' og V med omtrent antall kombinasjoner"""
+    jord, fundament, belastning, terreng = standard_inndata()
+    n = max(2, round(antall ** 0.25))
+    return (
+        replace(jord, friksjonsvinkel=np.linspace(25, 40, n)[:, None, None, None]),
+        replace(fundament, bredde=np.linspace(0.5, 5, n)[None, :, None, None]),
+        replace(belastning, vertikal=np.linspace(100, 1500, n)),
+        replace(terreng, fundamentdybde=np.linspace(0.2, 3, n)[None, None, :, None]),
+    )
+
+
+def benchmark_delt_minne(antall: int = 10_000_000,
+                         arbeidere: Sequence[int] = (1, 2, 4),
+                         blokkstorrelse: int = 65_536) -> List[Dict[str, float]]:
+    """Gjennomstrømning for DeltMinneUtforer mot antall arbeidere"""
+    inndata = parameterstudie(antall)
+    rader = []
+    for n in arbeidere:
+        with DeltMinneUtforer(arbeidere=n, blokkstorrelse=blokkstorrelse) as utforer:
+            utforer.beregn(*inndata, felt=['utnyttelsesgrad'])
+            rapport = utforer.rapport
+        per_arbeider = [a.antall / a.tid for a in rapport.per_arbeider if a.tid > 0]
+        rader.append({
+            'arbeidere': n,
+            'tilfeller': rapport.antall,
+            'tid_s': rapport.tid,
+            'per_s': rapport.tilfeller_per_sekund,
+            'per_s_arbeider': sum(per_arbeider) / len(per_arbeider) if per_arbeider else 0.0,
+        })
+    return rader
+
+
+def rapportrader(antall: int, seed: int = 0) -> List[Dict[str, object]]:
+    """Fundamenter rundt standard_inndata som rader for rapportbunt"""
+    jord, fundament, belastning, terreng = standard_inndata()
+    grunnlag = {f.name: getattr(objekt, f.name)
+                for objekt in (jord, fundament, belastning, terreng) for f in fields(objekt)}
+    grunnlag['lengde'] = np.nan
+    rng = np.random.default_rng(seed)
+    rader = []
+    for i in range(antall):
+        rad = dict(grunnlag, beregningsnavn=f"F{i + 1}")
+        rad['bredde'] = float(rng.uniform(1.0, 4.0))
+        rad['vertikal'] = float(rng.uniform(100.0, 800.0))
+        rad['horisontal_B'] = float(rng.uniform(0.0, 80.0))
+        rader.append(rad)
+    return rader
+
+
+def benchmark_rapporter(antall: int = 500,
+                        arbeidere: Sequence[int] = (1, 2),
+                        blokkstorrelse: int = 16) -> List[Dict[str, object]]:
+    """
+    Rapporter/s for rapportbunt: bare HTML, og med samlet prosjekt-PDF
+    uten cache, med tom cache (første revisjon) og med fylt cache (ny
+    revisjon, samme fundamenter)
+    """
+    rader = rapportrader(antall)
+    resultater = []
+    for n in arbeidere:
+        with tempfile.TemporaryDirectory() as mappe:
+            for cache, revisjon, mappe_, pdf in (('ingen', 'A', None, False), ('ingen', 'A', None, True),
+                                                 ('kald', 'A', mappe, True), ('varm', 'B', mappe, True)):
+                sammendrag = lag_rapportarkiv(rader, io.BytesIO(), {'prosjektnummer': '10000', 'revisjon': revisjon},
+                                              arbeidere=n, cache=mappe_, blokkstorrelse=blokkstorrelse,
+                                              pdf=io.BytesIO() if pdf else None)
+                resultater.append({
+                    'arbeidere': n,
+                    'cache': cache,
+                    'pdf': pdf,
+                    'rapporter': sammendrag.antall,
+                    'tid_s': sammendrag.tid,
+                    'per_s': sammendrag.rapporter_per_sekund,
+                })
+    return resultater
+
+
+def _tilfeller():
+    """Effektiv/udrenert og stripe/rektangulært, brukt i suiten"""
+    jord, fundament, belastning, terreng = standard_inndata()
+    udrenert = replace(jord, analysetype='udrenert', udrenert_skjaerstyrke=60.0)
+    rektangulaer = replace(fundament, lengde=3.0)
+    return {
+        'effektiv/stripe': (jord, fundament, belastning, terreng),
+        'effektiv/rektangulaer': (jord, rektangulaer, belastning, terreng),
+        'udrenert/stripe': (udrenert, fundament, belastning, terreng),
+        'udrenert/rektangulaer': (udrenert, rektangulaer, belastning, terreng),
+    }
+
+
+def suite(rask: bool = False) -> Dict[str, Callable[[], object]]:
+    """
+    Navngitte målinger: funksjoner uten argumenter som tas tid på
+
+    rask: mindre batcher, for en rask kontroll under utvikling (tidene
+        er da ikke sammenlignbare med et fullt grunnlag)
+    """
+    kalkulator = BaereevneKalkulator()
+    tilfeller = _tilfeller()
+    maalinger: Dict[str, Callable[[], object]] = {}
+
+    for navn, inndata in tilfeller.items():
+        maalinger[f'beregn/{navn}'] = lambda inndata=inndata: kalkulator.beregn(*inndata)
+
+    maalinger['faktor/beregn_Nq_effektiv'] = lambda: kalkulator.beregn_Nq_effektiv(0.43, 0.3)
+    maalinger['faktor/interpoler_Ny'] = lambda: kalkulator.interpoler_Ny(0.47, 0.3)
+    maalinger['faktor/beregn_Nc_udrenert'] = lambda: kalkulator.beregn_Nc_udrenert(0.3)
+    rng = np.random.default_rng(0)
+    tan_phi, r = rng.uniform(0, 1, 10_000), rng.uniform(0, 1, 10_000)
+    maalinger['faktor/interpoler_Ny_vektor'] = lambda: kalkulator.interpoler_Ny(tan_phi, r)
+
+    jord, fundament, belastning, terreng = tilfeller['effektiv/stripe']
+    for B in (1, 2, 5, 10, 20):
+        fund = replace(fundament, bredde=float(B))
+        resultat = kalkulator.beregn(jord, fund, belastning, terreng)
+        maalinger[f'figur/B={B}'] = (lambda fund=fund, resultat=resultat:
+                                     lag_fundament_figur(fund, terreng, resultat, belastning))
+
+    resultat = kalkulator.beregn(jord, fundament, belastning, terreng)
+    prosjekt_info = {'prosjektnummer': '10000', 'prosjektnavn': 'Benchmark',
+                     'beregningsnavn': 'Suite', 'utfort_av': '-', 'revisjon': '0'}
+    maalinger['rapport/html'] = lambda: generer_rapport_html(
+        prosjekt_info, jord, fundament, belastning, terreng, resultat)
+    maalinger['rapport/pdf'] = lambda: generer_rapport_pdf(
+        prosjekt_info, jord, fundament, belastning, terreng, resultat)
+    rader = rapportrader(50)
+    maalinger['rapport/arkiv_50'] = lambda: lag_rapportarkiv(rader, io.BytesIO(), prosjekt_info, arbeidere=1)
+
+    antall = 10_000 if rask else 200_000
+    studie = parameterstudie(antall)
+    maalinger['batch/beregn_batch'] = lambda: kalkulator.beregn_batch(*studie)
+    maalinger['batch/delt_minne'] = lambda: _delt_minne_en_gang(kalkulator, studie)
+    maalinger['batch/minnekart'] = _minnekart(kalkulator, studie)
+
+    grenser = {'vertikal': (100.0, 1500.0), 'horisontal_B': (0.0, 150.0), 'moment_B': (0.0, 200.0)}
+    maalinger['omhylling/bygg'] = lambda: Kapasitetsomhylling(kalkulator, jord, fundament, belastning,
+                                                              terreng, grenser)
+    omhylling = Kapasitetsomhylling(kalkulator, jord, fundament, belastning, terreng, grenser)
+    maalinger['omhylling/estimat'] = lambda: omhylling.estimat(vertikal=700.0, horisontal_B=60.0,
+                                                               moment_B=80.0)
+    laster = {a: rng.uniform(lo, hi, antall) for a, (lo, hi) in grenser.items()}
+    maalinger['omhylling/utnyttelse_batch'] = lambda: omhylling.utnyttelse(**laster)
+
+    # Samme lasttilfeller i grafen: jord og fundament beregnes én gang
+    graf = Beregningsgraf(kalkulator)
+    graf.sett_inndata(jord, fundament, belastning, terreng)
+    maalinger['graf/beregn_batch'] = lambda: kalkulator.beregn_batch(
+        jord, fundament, replace(belastning, **laster), terreng)
+    maalinger['graf/ny_last'] = lambda: _graf_ny_last(graf, laster)
+
+    # Beregningslager i minnet, fylt på forhånd: alle oppslag er treff
+    lager = Beregningslager(':memory:')
+    lagret = replace(belastning, **{a: v[:antall // 10] for a, v in laster.items()})
+    lager.beregn_batch(kalkulator, jord, fundament, lagret, terreng)
+    maalinger['lager/beregn_batch_treff'] = lambda: lager.beregn_batch(
+        kalkulator, jord, fundament, lagret, terreng)
+    maalinger['lager/beregn'] = lambda: lager.beregn(kalkulator, jord, fundament, belastning, terreng)
+    return maalinger
+
+
+def _graf_ny_last(graf: Beregningsgraf, laster: Dict[str, np.ndarray]):
+    """Endrer V (ny array) og henter resultatet; bare lastavhengige noder beregnes"""
+    graf.sett(**laster)
+    graf.sett(vertikal=laster['vertikal'] + 1.0)
+    return graf.kolonner()
+
+
+def _delt_minne_en_gang(kalkulator, studie):
+    with DeltMinneUtforer(kalkulator, arbeidere=2) as utforer:
+        return utforer.beregn(*studie, felt=['utnyttelsesgrad'])
+
+
+def _minnekart(kalkulator, studie) -> Callable[[], object]:
+    """Skriver parameterstudien til kolonnefiler én gang; målingen er selve beregningen"""
+    mappe = tempfile.TemporaryDirectory()
+    inndata = {f.name: getattr(objekt, f.name) for objekt in studie for f in fields(objekt)}
+    inndata['lengde'] = np.nan
+    varierte = ('friksjonsvinkel', 'bredde', 'vertikal', 'fundamentdybde')
+    for navn, kolonne in zip(varierte, np.broadcast_arrays(*(inndata[n] for n in varierte))):
+        inndata[navn] = Path(mappe.name) / f'{navn}.npy'
+        np.save(inndata[navn], kolonne.reshape(-1))
+
+    def beregn():
+        mappe  # holder den midlertidige mappen i live så lenge målingen finnes
+        return beregn_minnekart(kalkulator, inndata, Path(mappe.name) / 'ut',
+                                blokkstorrelse=65_536, felt=['utnyttelsesgrad'], gjenoppta=False)
+    return beregn
+
+
+def tidta(funksjon: Callable[[], object], runder: int = 5) -> Dict[str, float]:
+    """
+    Tid per kall [s]: beste og median av runder
+
+    Antall kall per runde velges slik at en runde tar minst 0,2 s
+    (timeit.autorange), og søppeltømming er slått av under målingen.
+    """
+    timer = timeit.Timer(funksjon)
+    kall, _ = timer.autorange()
+    tider = [t / kall for t in timer.repeat(repeat=runder, number=kall)]
+    return {'beste_s': min(tider), 'median_s': statistics.median(tider), 'kall': kall}
+
+
+def kjor_suite(filter: Optional[str] = None, rask: bool = False, runder: int = 5,
+               fremdrift: Optional[Callable[[str], None]] = None) -> Dict[str, object]:
+    """Kjører suiten og returnerer en kjøring klar for JSON-historikken"""
+    resultater = {}
+    for navn, funksjon in suite(rask).items():
+        if filter and filter not in navn:
+            continue
+        if fremdrift is not None:
+            fremdrift(navn)
+        resultater[navn] = tidta(funksjon, runder)
+    return {
+        'tidspunkt': datetime.now().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'rask': rask,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'plattform': platform.platform(),
+        'resultater': resultater,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True, cwd=Path(__file__).parent).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def sammenlign(kjoring: Dict[str, object], grunnlag: Dict[str, object],
+               terskel: float = TERSKEL) -> List[Dict[str, object]]:
+    """Forhold mellom beste tid og grunnlaget for målinger som finnes i begge"""
+    rader = []
+    for navn, ny in kjoring['resultater'].items():
+        gammel = grunnlag['resultater'].get(navn)
+        if gammel is None:
+            continue
+        forhold = ny['beste_s'] / gammel['beste_s']
+        rader.append({'navn': navn, 'grunnlag_s': gammel['beste_s'], 'ny_s': ny['beste_s'],
+                      'forhold': forhold, 'regresjon': forhold > 1 + terskel})
+    return rader
+
+
+def _importlogg(kode: str) -> List[re.Match]:
+    """Linjene fra python -X importtime for kode, kjørt i en ny prosess"""
+    prosess = subprocess.run([sys.executable, '-X', 'importtime', '-c', kode],
+                             capture_output=True, text=True, cwd=Path(__file__).parent)
+    if prosess.returncode != 0:
+        raise RuntimeError(f"Import feilet: {kode}\n{prosess.stderr[-2000:]}")
+    return [m for m in (re.match(r'import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)', linje)
+                        for linje in prosess.stderr.splitlines()) if m]
+
+
+def app_importer() -> str:
+    """Importsetningene på toppnivå i app.py, som én import-setning"""
+    tre = ast.parse((Path(__file__).parent / 'app.py').read_text(encoding='utf-8'))
+    moduler = [a.name for node in tre.body if isinstance(node, ast.Import) for a in node.names]
+    moduler += [node.module for node in tre.body if isinstance(node, ast.ImportFrom)]
+    return 'import ' + ', '.join(moduler)
+
+
+def maal_importtid(kode: str, runder: int = 5) -> Dict[str, object]:
+    """
+    Beste kumulative importtid [ms] over runder, og alle pakker som lastes
+
+    Moduler som allerede lastes ved oppstart av tolken (site, encodings
+    osv.) regnes ikke med.
+    """
+    oppstart = {m.group(4) for m in _importlogg('pass')}
+    beste = float('inf')
+    pakker = set()
+    for _ in range(runder):
+        logg = _importlogg(kode)
+        tid = sum(int(m.group(2)) for m in logg
+                  if len(m.group(3)) == 1 and m.group(4) not in oppstart)
+        beste = min(beste, tid / 1000)
+        pakker = {m.group(4).split('.')[0] for m in logg}
+    return {'tid_ms': beste, 'pakker': pakker}
+
+
+def kontroller_importtid(runder: int = 5, faktor: float = 1.0) -> List[Dict[str, object]]:
+    """Importtid og forbudte pakker per modul i IMPORTBUDSJETT (budsjett skaleres med faktor)"""
+    rader = []
+    for modul, budsjett in IMPORTBUDSJETT.items():
+        kode = app_importer() if modul == 'app' else f'import {modul}'
+        maaling = maal_importtid(kode, runder)
+        forbudt = APP_FORBUDT if modul == 'app' else KJERNE_FORBUDT
+        rader.append({
+            'modul': modul,
+            'tid_ms': maaling['tid_ms'],
+            'budsjett_ms': budsjett * faktor,
+            'forbudte': sorted(maaling['pakker'] & set(forbudt)),
+        })
+    return rader
+
+
+def les_json(sti: Path, standard):
+    return json.loads(sti.read_text(encoding='utf-8')) if sti.exists() else standard
+
+
+def skriv_json(sti: Path, data):
+    sti.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding='utf-8')
+
+
+def skriv_tabell(rader: List[Dict[str, object]]):
+    """Skriver målingene som en enkel tekst-tabell (tekstkolonner venstrejustert)"""
+    kolonner = list(rader[0])
+    bredde = {k: max([12, len(k)] + [len(str(r[k])) for r in rader if isinstance(r[k], str)])
+              for k in kolonner}
+
+    def celle(k, verdi):
+        return f"{verdi:<{bredde[k]}}" if isinstance(verdi, str) else f"{verdi:>{bredde[k]}.4g}"
+
+    print("  ".join(f"{k:<{bredde[k]}}" if isinstance(rader[0][k], str) else f"{k:>{bredde[k]}}"
+                    for k in kolonner))
+    for rad in rader:
+        print("  ".join(celle(k, rad[k]) for k in kolonner))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ytelsesmålinger for bæreevneberegning")
+    undergrupper = parser.add_subparsers(dest='maaling', required=True)
+
+    figur = undergrupper.add_parser('figur', help="Tverrsnittsfigur: byggetid og størrelse mot B")
+    figur.add_argument('--bredder', type=float, nargs='+', default=[1, 2, 5, 10, 20])
+    figur.add_argument('--gjentakelser', type=int, default=10)
+
+    delt = undergrupper.add_parser('delt', help="Delt-minne-utfører: tilfeller/s mot arbeidere")
+    delt.add_argument('--antall', type=int, default=10_000_000)
+    delt.add_argument('--arbeidere', type=int, nargs='+', default=[1, 2, 4])
+    delt.add_argument('--blokkstorrelse', type=int, default=65_536)
+
+    rapporter = undergrupper.add_parser('rapporter', help="Rapportbunt: rapporter/s mot arbeidere og cache")
+    rapporter.add_argument('--antall', type=int, default=500)
+    rapporter.add_argument('--arbeidere', type=int, nargs='+', default=[1, 2])
+    rapporter.add_argument('--blokkstorrelse', type=int, default=16)
+
+    alle = undergrupper.add_parser('suite', help="Hele suiten med historikk og regresjonskontroll")
+    alle.add_argument('--filter', help="Bare målinger med denne teksten i navnet")
+    alle.add_argument('--historikk', type=Path, default=Path(HISTORIKK))
+    alle.add_argument('--grunnlag', type=Path, default=Path(GRUNNLAG))
+    alle.add_argument('--terskel', type=float, default=TERSKEL,
+                      help="Tillatt økning i tid før regresjon (andel, standard 0.25)")
+    alle.add_argument('--runder', type=int, default=5)
+    alle.add_argument('--rask', action='store_true', help="Mindre batcher")
+    alle.add_argument('--lagre-grunnlag', action='store_true',
+                      help="Lagre denne kjøringen som nytt grunnlag")
+
+    importtid = undergrupper.add_parser('importtid', help="Importtid mot budsjett i nye prosesser")
+    importtid.add_argument('--runder', type=int, default=5)
+    importtid.add_argument('--faktor', type=float, default=1.0,
+                           help="Skalerer alle budsjett, f.eks. 2 på trege byggmaskiner")
+
+    args = parser.parse_args()
+    if args.maaling == 'importtid':
+        rader = kontroller_importtid(args.runder, args.faktor)
+        skriv_tabell([{k: v for k, v in r.items() if k != 'forbudte'} for r in rader])
+        feil = [f"{r['modul']}: {r['tid_ms']:.0f} ms > {r['budsjett_ms']:.0f} ms"
+                for r in rader if r['tid_ms'] > r['budsjett_ms']]
+        feil += [f"{r['modul']}: laster {', '.join(r['forbudte'])}" for r in rader if r['forbudte']]
+        if feil:
+            print("\nImportbudsjett overskredet:\n  " + "\n  ".join(feil))
+            sys.exit(1)
+        print("\nAlle importer innenfor budsjett")
+    elif args.maaling == 'figur':
+        skriv_tabell(benchmark_figur(args.bredder, args.gjentakelser))
+    elif args.maaling == 'delt':
+        skriv_tabell(benchmark_delt_minne(args.antall, args.arbeidere, args.blokkstorrelse))
+    elif args.maaling == 'rapporter':
+        skriv_tabell(benchmark_rapporter(args.antall, args.arbeidere, args.blokkstorrelse))
+    elif args.maaling == 'suite':
+        kjoring = kjor_suite(args.filter, args.rask, args.runder,
+                             fremdrift=lambda navn: print(f"  {navn}", file=sys.stderr))
+        historikk = les_json(args.historikk, [])
+        historikk.append(kjoring)
+        skriv_json(args.historikk, historikk)
+
+        grunnlag = les_json(args.grunnlag, None)
+        if grunnlag is not None and grunnlag.get('rask') != args.rask:
+            print("Grunnlaget er kjørt med annen --rask-innstilling; sammenligner ikke")
+            grunnlag = None
+        if args.lagre_grunnlag:
+            skriv_json(args.grunnlag, kjoring)
+
+        if grunnlag is None:
+            skriv_tabell([{'navn': n, 'beste_ms': 1000 * r['beste_s'], 'median_ms': 1000 * r['median_s']}
+                          for n, r in kjoring['resultater'].items()])
+            return
+        rader = sammenlign(kjoring, grunnlag, args.terskel)
+        skriv_tabell([{'navn': r['navn'], 'grunnlag_ms': 1000 * r['grunnlag_s'],
+                       'ny_ms': 1000 * r['ny_s'], 'forhold': r['forhold']} for r in rader])
+        regresjoner = [r['navn'] for r in rader if r['regresjon']]
+        if regresjoner:
+            print(f"\nRegresjon (> {args.terskel:.0%} tregere enn grunnlag "
+                  f"{grunnlag.get('commit') or grunnlag['tidspunkt']}): {', '.join(regresjoner)}")
+            sys.exit(1)
+        print(f"\nIngen regresjoner over {args.terskel:.0%}")
+
+
+if __name__ == "__main__":
+    main()
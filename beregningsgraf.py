@@ -0,0 +1,368 @@
+"""
+Bæreevneberegningen som avhengighetsgraf med mellomlagrede noder
+
+Hver mellomstørrelse (fundamentvekt, phi_d, eksentrisitet, ruhet, Nq, ...)
+er en node med navngitte avhengigheter: parameternavnene til funksjonen.
+Nodene beregnes ved behov og huskes til en inndata de avhenger av endres,
+så når bare V eller M endres, beregnes bare nodene nedstrøms for lastene;
+phi_d, f_beta, fundamentvekt osv. gjenbrukes.
+
+Nodene bruker de vektoriserte hjelpefunksjonene i BaereevneKalkulator, så
+inndata kan være skalarer eller arrays som kringkastes (f.eks. mange
+lasttilfeller på samme jord og fundament), og tallene er bit-for-bit like
+beregn() og beregn_batch().
+
+    graf = Beregningsgraf(kalkulator)
+    graf.sett_inndata(jord, fundament, belastning, terreng)
+    resultat = graf.resultat()
+    graf.sett(vertikal=650.0)       # bare lastavhengige noder beregnes på nytt
+    graf['Ka'], graf['Kp']          # jordtrykkskoeffisienter fra phi_d
+"""
+
+import inspect
+from dataclasses import dataclass, fields
+from typing import Callable, Dict, FrozenSet, Optional, Set, Tuple
+
+import numpy as np
+
+from models import JordParameter, FundamentGeometri, Belastning, TerrengForhold, Resultat
+from calculator import BaereevneKalkulator
+
+
+# Ka og Kp er noder i grafen (beregnet fra phi_d), ikke inndata
+INNDATA: Tuple[str, ...] = tuple(
+    f.name for klasse in (JordParameter, FundamentGeometri, Belastning, TerrengForhold)
+    for f in fields(klasse) if f.name not in ('Ka', 'Kp'))
+
+# Resultatfelt som er None i beregn() når de er NaN
+_VALGFRIE = ('Nq', 'Ny', 'Nc', 'eff_lengde', 'eksentrisitet_L')
+
+
+@dataclass(frozen=True)
+class Node:
+    """Én eller flere navngitte størrelser beregnet av samme funksjon"""
+    navn: Tuple[str, ...]
+    avhengigheter: Tuple[str, ...]
+    funksjon: Callable
+
+
+def _noder(*funksjoner: Tuple[Tuple[str, ...], Callable]) -> Dict[str, Node]:
+    """Størrelse -> node; avhengighetene er funksjonens parametre etter kalkulatoren"""
+    tabell = {}
+    for navn, funksjon in funksjoner:
+        avhengigheter = tuple(inspect.signature(funksjon).parameters)[1:]
+        node = Node(navn, avhengigheter, funksjon)
+        for n in navn:
+            tabell[n] = node
+    return tabell
+
+
+# --- Jord, fundament og terreng ---
+
+def _rekt(k, lengde):
+    har_L = ~np.isnan(lengde)
+    return har_L, har_L & (lengde != 0)
+
+
+def _fund_vekt(k, bredde, lengde, tykkelse, romvekt, vegg_bredde, soyle_lengde, fundamentdybde, har_L):
+    vegg_hoyde = np.maximum(0, fundamentdybde - tykkelse)
+    fund_volum = np.where(har_L, bredde * np.where(har_L, lengde, 0.0) * tykkelse, bredde * tykkelse)
+    vegg_volum = np.where(har_L, vegg_bredde * soyle_lengde * vegg_hoyde, vegg_bredde * vegg_hoyde)
+    return (fund_volum + vegg_volum) * romvekt
+
+
+def _phi_d(k, friksjonsvinkel, materialfaktor):
+    phi_d = np.degrees(np.arctan(np.tan(np.radians(friksjonsvinkel)) / materialfaktor))
+    return phi_d, np.tan(np.radians(phi_d))
+
+
+def _jordtrykk_effektiv(k, phi_d):
+    sin_phi = np.sin(np.radians(phi_d))
+    positiv = phi_d > 0
+    return (np.where(positiv, (1 - sin_phi) / (1 + sin_phi), 1.0),
+            np.where(positiv, (1 + sin_phi) / (1 - sin_phi), 1.0))
+
+
+def _jordtrykk_udrenert(k):
+    # Samme standardverdier som appen har brukt for totalspenningsanalyse
+    return np.float64(0.5), np.float64(2.0)
+
+
+def _q_overlag(k, romvekt_over, fundamentdybde, overflatelast):
+    return romvekt_over * fundamentdybde + overflatelast
+
+
+def _f_beta(analysetype):
+    def f_beta(k, skraaningshelning):
+        beta = np.asarray(skraaningshelning)
+        return k._reduksjonsfaktor_vektor(beta.ravel(), analysetype).reshape(beta.shape)
+    return f_beta
+
+
+# --- Laster ---
+
+def _V_total(k, vertikal, fund_vekt):
+    return vertikal + fund_vekt
+
+
+def _eksentrisitet(k, V_total, moment_B, moment_L, centeravvik_B, centeravvik_L, rekt):
+    return k._eksentrisitet_vektor(V_total, moment_B, moment_L, centeravvik_B, centeravvik_L, rekt)
+
+
+def _effektivt_areal(k, bredde, lengde, eksentrisitet_B, eksentrisitet_L, rekt):
+    Bo = np.maximum(bredde - 2 * np.abs(eksentrisitet_B), 0.01)
+    Lo = np.where(rekt, np.maximum(lengde - 2 * np.abs(eksentrisitet_L), 0.01), np.nan)
+    return Bo, Lo, np.where(rekt, Bo * Lo, Bo)
+
+
+def _grunntrykk(k, V_total, A_eff):
+    return V_total / A_eff
+
+
+def _tau(k, horisontal_B, horisontal_L, A_eff, rekt):
+    H_total = np.where(rekt, np.sqrt(horisontal_B * horisontal_B + horisontal_L * horisontal_L),
+                       np.abs(horisontal_B))
+    return np.where(A_eff > 0, H_total / A_eff, 0.0)
+
+
+# --- Effektivspenningsanalyse ---
+
+def _ruhet_effektiv(k, tau, grunntrykk, attraksjon, tan_phi_d):
+    q_a = grunntrykk + attraksjon
+    gyldig = (tan_phi_d > 0.0001) & (q_a > 0)
+    return np.where(gyldig, np.clip(tau / q_a / tan_phi_d, 0, 1.0), 0.0)
+
+
+def _Nq(k, phi_d, tan_phi_d, ruhet):
+    return k._Nq_effektiv_vektor(phi_d, tan_phi_d, ruhet)
+
+
+def _Ny(k, tan_phi_d, ruhet):
+    return k.interpoler_Ny(np.asarray(tan_phi_d), np.asarray(ruhet))
+
+
+def _formfaktorer_effektiv(k, eff_bredde, eff_lengde, rekt, phi_d):
+    B_over_L = np.where(rekt, eff_bredde / eff_lengde, 0.0)
+    return (np.where(rekt, 1 + B_over_L * np.sin(np.radians(phi_d)), 1.0),
+            np.where(rekt, np.maximum(1 - 0.4 * B_over_L, 0.6), 1.0))
+
+
+def _baereevne_effektiv(k, reduksjonsfaktor, sq, sy, Nq, Ny, q_overlag, attraksjon, romvekt_eff, eff_bredde):
+    f_beta = reduksjonsfaktor
+    return f_beta * sq * Nq * (q_overlag + attraksjon) + \
+        f_beta * sy * 0.5 * Ny * romvekt_eff * eff_bredde - attraksjon
+
+
+# --- Totalspenningsanalyse ---
+
+def _su_d(k, udrenert_skjaerstyrke, materialfaktor):
+    return udrenert_skjaerstyrke / materialfaktor
+
+
+def _ruhet_udrenert(k, tau, su_d):
+    return np.clip(np.where(su_d > 0, tau / su_d, 0.0), 0, 0.999)
+
+
+def _Nc(k, ruhet):
+    return np.pi + 2 + np.sqrt(1 - ruhet * ruhet) - np.arcsin(ruhet)
+
+
+def _sc(k, eff_bredde, eff_lengde, rekt):
+    return np.where(rekt, 1 + 0.2 * (eff_bredde / eff_lengde), 1.0)
+
+
+def _baereevne_udrenert(k, reduksjonsfaktor, sc, Nc, su_d, q_overlag, skraaningshelning):
+    cos_beta = np.cos(np.radians(skraaningshelning))
+    return reduksjonsfaktor * sc * Nc * su_d + q_overlag * (cos_beta * cos_beta)
+
+
+# --- Utnyttelse ---
+
+def _utnyttelse(k, grunntrykk, baereevne):
+    return np.where(baereevne > 0, grunntrykk / baereevne, np.inf)
+
+
+def _margin(k, grunntrykk, baereevne):
+    return np.where(grunntrykk > 0, baereevne / grunntrykk, np.inf)
+
+
+def _ikke_definert(k):
+    return np.float64(np.nan)
+
+
+_FELLES = (
+    (('har_L', 'rekt'), _rekt),
+    (('fund_vekt',), _fund_vekt),
+    (('phi_d', 'tan_phi_d'), _phi_d),
+    (('q_overlag',), _q_overlag),
+    (('V_total',), _V_total),
+    (('eksentrisitet_B', 'eksentrisitet_L'), _eksentrisitet),
+    (('eff_bredde', 'eff_lengde', 'A_eff'), _effektivt_areal),
+    (('grunntrykk',), _grunntrykk),
+    (('tau',), _tau),
+    (('utnyttelsesgrad',), _utnyttelse),
+    (('margin',), _margin),
+)
+
+# Én nodetabell per analysetype; bare grenen som brukes blir beregnet
+NODER: Dict[str, Dict[str, Node]] = {
+    'effektiv': _noder(
+        *_FELLES,
+        (('Ka', 'Kp'), _jordtrykk_effektiv),
+        (('reduksjonsfaktor',), _f_beta('effektiv')),
+        (('ruhet',), _ruhet_effektiv),
+        (('Nq',), _Nq),
+        (('Ny',), _Ny),
+        (('sq', 'sy'), _formfaktorer_effektiv),
+        (('baereevne',), _baereevne_effektiv),
+        (('Nc',), _ikke_definert),
+    ),
+    'udrenert': _noder(
+        *_FELLES,
+        (('Ka', 'Kp'), _jordtrykk_udrenert),
+        (('reduksjonsfaktor',), _f_beta('udrenert')),
+        (('su_d',), _su_d),
+        (('ruhet',), _ruhet_udrenert),
+        (('Nc',), _Nc),
+        (('sc',), _sc),
+        (('baereevne',), _baereevne_udrenert),
+        (('Nq',), _ikke_definert),
+        (('Ny',), _ikke_definert),
+    ),
+}
+
+
+def _nedstroms(noder: Dict[str, Node]) -> Dict[str, FrozenSet[str]]:
+    """Inndata/størrelse -> alle størrelser som avhenger av den, direkte eller indirekte"""
+    direkte: Dict[str, Set[str]] = {}
+    for node in set(noder.values()):
+        for avhengighet in node.avhengigheter:
+            direkte.setdefault(avhengighet, set()).update(node.navn)
+
+    lukket: Dict[str, FrozenSet[str]] = {}
+
+    def besok(navn: str) -> FrozenSet[str]:
+        if navn not in lukket:
+            alle = set()
+            for etterfolger in direkte.get(navn, ()):
+                alle.add(etterfolger)
+                alle |= besok(etterfolger)
+            lukket[navn] = frozenset(alle)
+        return lukket[navn]
+
+    for navn in list(direkte):
+        besok(navn)
+    return lukket
+
+
+NEDSTROMS = {analysetype: _nedstroms(noder) for analysetype, noder in NODER.items()}
+
+
+def _lik(a, b) -> bool:
+    if a is b:
+        return True
+    try:
+        return bool(np.array_equal(a, b, equal_nan=True))
+    except TypeError:
+        return bool(np.array_equal(a, b))
+
+
+class Beregningsgraf:
+    """
+    Inkrementell bæreevneberegning for ett sett inndata som endres over tid
+
+    Inndata settes med sett_inndata()/sett(); bare størrelser nedstrøms for
+    inndata som faktisk er endret, beregnes på nytt ved neste oppslag.
+    analysetype velger nodetabell og må være felles for alle tilfeller.
+    """
+
+    def __init__(self, kalkulator: Optional[BaereevneKalkulator] = None):
+        self.kalkulator = kalkulator or BaereevneKalkulator()
+        self._inndata: Dict[str, object] = {}
+        self._verdier: Dict[str, object] = {}
+        self.evalueringer: Dict[str, int] = {}  # antall beregninger per node
+
+    def sett_inndata(self,
+                     jord: Optional[JordParameter] = None,
+                     fundament: Optional[FundamentGeometri] = None,
+                     belastning: Optional[Belastning] = None,
+                     terreng: Optional[TerrengForhold] = None) -> Set[str]:
+        """Setter feltene i dataklassene som er gitt; returnerer endrede felt"""
+        felt = {}
+        for objekt in (jord, fundament, belastning, terreng):
+            if objekt is not None:
+                felt.update({f.name: getattr(objekt, f.name) for f in fields(objekt)
+                             if f.name in INNDATA})
+        return self.sett(**felt)
+
+    def sett(self, **felt) -> Set[str]:
+        """Setter inndatafelt, f.eks. sett(vertikal=V); returnerer endrede felt"""
+        ukjente = set(felt) - set(INNDATA)
+        if ukjente:
+            raise KeyError(f"Ukjente inndata: {', '.join(sorted(ukjente))}")
+        endret = set()
+        for navn, verdi in felt.items():
+            if navn == 'analysetype':
+                if np.ndim(verdi) != 0:
+                    raise ValueError("analysetype må være felles for grafen; bruk beregn_batch for blandede")
+                verdi = str(verdi)
+                if verdi not in NODER:
+                    raise ValueError(f"Ukjent analysetype: {verdi}")
+            elif navn == 'lengde' and verdi is None:
+                verdi = np.float64(np.nan)
+            else:
+                verdi = np.asarray(verdi, dtype=float)
+                verdi = verdi[()] if verdi.ndim == 0 else verdi
+            if navn in self._inndata and _lik(self._inndata[navn], verdi):
+                continue
+            self._inndata[navn] = verdi
+            endret.add(navn)
+
+        if 'analysetype' in endret:
+            self._verdier.clear()
+        elif endret:
+            nedstroms = NEDSTROMS[self._inndata.get('analysetype', 'effektiv')]
+            for navn in endret:
+                for avhengig in nedstroms.get(navn, ()):
+                    self._verdier.pop(avhengig, None)
+        return endret
+
+    def __getitem__(self, navn: str):
+        """Verdien til en inndata eller størrelse, beregnet ved behov"""
+        if navn in self._inndata:
+            return self._inndata[navn]
+        if navn in self._verdier:
+            return self._verdier[navn]
+        if navn in INNDATA:
+            raise KeyError(f"Inndata {navn} er ikke satt")
+        node = NODER[self._inndata.get('analysetype', 'effektiv')][navn]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            verdier = node.funksjon(self.kalkulator, *(self[a] for a in node.avhengigheter))
+        if len(node.navn) == 1:
+            verdier = (verdier,)
+        self._verdier.update(zip(node.navn, verdier))
+        for n in node.navn:
+            self.evalueringer[n] = self.evalueringer.get(n, 0) + 1
+        return self._verdier[navn]
+
+    @property
+    def beregnet(self) -> Set[str]:
+        """Størrelser som er beregnet og fortsatt gyldige"""
+        return set(self._verdier)
+
+    def kolonner(self) -> Dict[str, np.ndarray]:
+        """Resultatfeltene som i beregn_batch (NaN for felt som ikke gjelder)"""
+        verdier = {f.name: self[f.name] for f in fields(Resultat)}
+        form = np.broadcast_shapes(*(np.shape(v) for v in verdier.values()))
+        return {navn: np.broadcast_to(v, form) for navn, v in verdier.items()}
+
+    def resultat(self) -> Resultat:
+        """Resultat som fra beregn(), når alle inndata er skalarer"""
+        verdier = {}
+        for f in fields(Resultat):
+            verdi = self[f.name]
+            if np.ndim(verdi) != 0:
+                raise ValueError("resultat() krever skalare inndata; bruk kolonner()")
+            verdi = float(verdi)
+            verdier[f.name] = None if f.name in _VALGFRIE and verdi != verdi else verdi
+        return Resultat(**verdier)
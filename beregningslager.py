@@ -0,0 +1,396 @@
+"""
+Varig, innholdsadressert lager for beregningsresultater (SQLite)
+
+Hvert resultat lagres én gang under en nøkkel avledet av inndataene (de
+fire inndataklassene, unntatt Ka/Kp som beregningen ikke bruker) og
+kalkulatorens versjon, så like inndata gir samme rad på tvers av økter,
+brukere og kjøringer. Prosjekter (prosjektnummer, beregningsnavn,
+revisjon) peker på resultatene de har brukt; samme resultat kan høre til
+mange prosjekter.
+
+    lager = Beregningslager('beregninger.sqlite')
+    resultat = lager.beregn(kalkulator, jord, fundament, belastning, terreng,
+                            prosjekt_info=prosjekt_info)
+    kolonner = lager.beregn_batch(kalkulator, jord, fundament, belastning, terreng)
+
+beregn_batch beregner bare tilfeller som ikke finnes fra før, og like
+tilfeller innen samme batch bare én gang. Kun sqlite3 og numpy.
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from dataclasses import fields
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from models import INNDATAKLASSER, Resultat
+from calculator import BaereevneKalkulator
+
+
+INNDATAFELT = [f.name for klasse in INNDATAKLASSER for f in fields(klasse)]
+# Ka/Kp leses ikke av beregn(), og appen og batch_cli fyller dem ulikt inn;
+# de holdes utenfor nøkkel og tabell så like tilfeller får samme nøkkel
+UTELATT = ('Ka', 'Kp')
+TALLFELT = [navn for navn in INNDATAFELT if navn != 'analysetype' and navn not in UTELATT]
+RESULTATFELT = [f.name for f in fields(Resultat)]
+PROSJEKTFELT = ('prosjektnummer', 'beregningsnavn', 'revisjon')
+
+# Resultatfelt som er None i beregn() når de er NaN
+_VALGFRIE = ('Nq', 'Ny', 'Nc', 'eff_lengde', 'eksentrisitet_L')
+
+# PRAGMA user_version; 2: Ka/Kp tatt ut av nøkkel og tabell
+SKJEMAVERSJON = 2
+
+# Nøkler per SELECT ... IN (...); under SQLite-grensen for parametre
+_OPPSLAG_BLOKK = 500
+
+_SKJEMA = f"""
+CREATE TABLE IF NOT EXISTS beregninger (
+    nokkel BLOB PRIMARY KEY,
+    versjon TEXT NOT NULL,
+    lagret REAL NOT NULL,
+    analysetype TEXT NOT NULL,
+    {', '.join(f'{navn} REAL' for navn in TALLFELT + RESULTATFELT)}
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS prosjekter (
+    id INTEGER PRIMARY KEY,
+    prosjektnummer TEXT NOT NULL,
+    beregningsnavn TEXT NOT NULL,
+    revisjon TEXT NOT NULL,
+    prosjektnavn TEXT NOT NULL DEFAULT '',
+    UNIQUE (prosjektnummer, beregningsnavn, revisjon)
+);
+CREATE TABLE IF NOT EXISTS prosjektberegninger (
+    prosjekt INTEGER NOT NULL REFERENCES prosjekter (id),
+    nokkel BLOB NOT NULL REFERENCES beregninger (nokkel),
+    PRIMARY KEY (prosjekt, nokkel)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS prosjektberegninger_nokkel ON prosjektberegninger (nokkel);
+"""
+
+
+def _inndatamatrise(jord, fundament, belastning, terreng) -> Tuple[np.ndarray, np.ndarray, tuple]:
+    """
+    (analysetype (n,), tallverdier (n, len(TALLFELT)), form) for skalare
+    eller kringkastbare array-inndata; lengde None blir NaN
+    """
+    verdier = {f.name: getattr(objekt, f.name)
+               for objekt in (jord, fundament, belastning, terreng) for f in fields(objekt)}
+    if verdier['lengde'] is None:
+        verdier['lengde'] = np.nan
+    analysetype = np.asarray(verdier['analysetype'], dtype=str)
+    tall = [np.asarray(verdier[navn], dtype=float) for navn in TALLFELT]
+    form = np.broadcast_shapes(analysetype.shape, *(t.shape for t in tall))
+    antall = int(np.prod(form, dtype=np.int64))
+    matrise = np.empty((antall, len(TALLFELT)))
+    for j, kolonne in enumerate(tall):
+        matrise[:, j] = np.broadcast_to(kolonne, form).ravel()
+    return np.broadcast_to(analysetype, form).ravel(), matrise, form
+
+
+def _nokler(versjon: str, analysetype: np.ndarray, matrise: np.ndarray) -> List[bytes]:
+    """SHA-256 av versjon, analysetype og tallverdiene (little-endian float64) per rad"""
+    # Én representasjon per verdi: -0.0 -> 0.0, alle NaN like
+    kanonisk = matrise + 0.0
+    kanonisk[np.isnan(kanonisk)] = np.nan
+    data = kanonisk.astype('<f8').tobytes()
+    bredde = 8 * kanonisk.shape[1]
+
+    grunnlag = hashlib.sha256(versjon.encode('utf-8') + b'\0')
+    per_type = {}
+    nokler = []
+    for i, type_ in enumerate(analysetype.tolist()):
+        h = per_type.get(type_)
+        if h is None:
+            h = per_type[type_] = grunnlag.copy()
+            h.update(type_.encode('utf-8') + b'\0')
+        h = h.copy()
+        h.update(data[i * bredde:(i + 1) * bredde])
+        nokler.append(h.digest())
+    return nokler
+
+
+def nokler(versjon: str, jord, fundament, belastning, terreng) -> List[bytes]:
+    """Lagernøkler for (kringkastede, flatede) inndata; versjon er kalkulator.versjon"""
+    analysetype, matrise, _ = _inndatamatrise(jord, fundament, belastning, terreng)
+    return _nokler(versjon, analysetype, matrise)
+
+
+def _inndata(analysetype: np.ndarray, matrise: np.ndarray):
+    """Inndataobjekter med kolonner som arrays fra _inndatamatrise-format"""
+    verdier = dict(zip(TALLFELT, matrise.T))
+    verdier['analysetype'] = analysetype
+    verdier.update(dict.fromkeys(UTELATT, np.full(len(analysetype), np.nan)))
+    return tuple(klasse(**{f.name: verdier[f.name] for f in fields(klasse)})
+                 for klasse in INNDATAKLASSER)
+
+
+def _tekst(prosjekt_info: Dict[str, str], navn: str) -> str:
+    return str(prosjekt_info.get(navn) or '').strip()
+
+
+class Beregningslager:
+    """
+    SQLite-lager for Resultat, nøklet på inndata og kalkulatorversjon
+
+    Trygt å dele mellom tråder (én tilkobling bak en lås). Flere prosesser
+    kan bruke samme fil; databasen går i WAL-modus, og like rader settes
+    inn med INSERT OR IGNORE. treff og beregnet teller oppslag som ble
+    funnet og tilfeller som måtte beregnes i beregn/beregn_batch.
+    """
+
+    def __init__(self, sti: str = 'beregninger.sqlite', tidsavbrudd: float = 30.0):
+        self.sti = str(sti)
+        self._tilkobling = sqlite3.connect(self.sti, timeout=tidsavbrudd, check_same_thread=False)
+        self._laas = threading.Lock()
+        self.treff = 0
+        self.beregnet = 0
+        with self._laas, self._tilkobling:
+            self._tilkobling.execute("PRAGMA journal_mode=WAL")
+            self._tilkobling.execute("PRAGMA synchronous=NORMAL")
+            versjon = self._tilkobling.execute("PRAGMA user_version").fetchone()[0]
+            finnes = self._tilkobling.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'beregninger'").fetchone()
+            if finnes and versjon < SKJEMAVERSJON:
+                self._oppgrader_fra_1()
+            self._tilkobling.executescript(_SKJEMA)
+            self._tilkobling.execute(f"PRAGMA user_version = {SKJEMAVERSJON}")
+
+    def lukk(self):
+        with self._laas:
+            self._tilkobling.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.lukk()
+
+    def __len__(self) -> int:
+        with self._laas:
+            return self._tilkobling.execute("SELECT COUNT(*) FROM beregninger").fetchone()[0]
+
+    # --- Batch ---
+
+    def hent_batch(self, nokler: Sequence[bytes]) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """(funnet, kolonner) for nøklene; rader som ikke finnes er NaN"""
+        # Hver unike nøkkel slås opp én gang; invers fører svarene tilbake til radene
+        indeks = {}
+        invers = np.fromiter((indeks.setdefault(nokkel, len(indeks)) for nokkel in nokler),
+                             dtype=np.intp, count=len(nokler))
+        unike = list(indeks)
+        funnet = []
+        verdier = []
+        sql = f"SELECT nokkel, {', '.join(RESULTATFELT)} FROM beregninger WHERE nokkel IN "
+        with self._laas:
+            for start in range(0, len(unike), _OPPSLAG_BLOKK):
+                blokk = unike[start:start + _OPPSLAG_BLOKK]
+                for nokkel, *rad in self._tilkobling.execute(sql + f"({', '.join('?' * len(blokk))})", blokk):
+                    funnet.append(indeks[nokkel])
+                    verdier.append(rad)
+
+        tabell = np.full((len(unike), len(RESULTATFELT)), np.nan)
+        er_funnet = np.zeros(len(unike), dtype=bool)
+        if funnet:
+            tabell[funnet] = np.array(verdier, dtype=float)  # NULL -> NaN
+            er_funnet[funnet] = True
+        kolonner = tabell[invers].T.copy()
+        return er_funnet[invers], dict(zip(RESULTATFELT, kolonner))
+
+    def lagre_batch(self,
+                    kalkulator: BaereevneKalkulator,
+                    jord, fundament, belastning, terreng,
+                    resultat: Dict[str, np.ndarray],
+                    prosjekt_info: Optional[Dict[str, str]] = None) -> List[bytes]:
+        """Lagrer beregn_batch-kolonner for inndataene; returnerer nøklene"""
+        analysetype, matrise, _ = _inndatamatrise(jord, fundament, belastning, terreng)
+        nokler = _nokler(kalkulator.versjon, analysetype, matrise)
+        kolonner = {navn: np.asarray(resultat[navn], dtype=float).ravel() for navn in RESULTATFELT}
+        with self._laas, self._tilkobling:
+            self._sett_inn(kalkulator.versjon, nokler, analysetype, matrise, kolonner)
+            if prosjekt_info:
+                self._knytt(prosjekt_info, nokler)
+        return nokler
+
+    def beregn_batch(self,
+                     kalkulator: BaereevneKalkulator,
+                     jord, fundament, belastning, terreng,
+                     prosjekt_info: Optional[Dict[str, str]] = None) -> Dict[str, np.ndarray]:
+        """
+        Som kalkulator.beregn_batch, men tilfeller som finnes i lageret
+        hentes i stedet for å beregnes; nye resultater lagres
+
+        Like tilfeller i samme batch beregnes bare én gang. Med
+        prosjekt_info knyttes alle tilfellene (også funnede) til prosjektet.
+        """
+        analysetype, matrise, form = _inndatamatrise(jord, fundament, belastning, terreng)
+        nokler = _nokler(kalkulator.versjon, analysetype, matrise)
+        funnet, kolonner = self.hent_batch(nokler)
+
+        # Like manglende tilfeller beregnes én gang: kilde[j] er raden i nye
+        # for den j-te manglende raden
+        mangler = np.flatnonzero(~funnet)
+        unike = {}
+        kilde = np.fromiter((unike.setdefault(nokler[i], len(unike)) for i in mangler.tolist()),
+                            dtype=np.intp, count=mangler.size)
+        nye = mangler[np.unique(kilde, return_index=True)[1]]
+        if nye.size:
+            resultat = kalkulator.beregn_batch(*_inndata(analysetype[nye], matrise[nye]))
+            nye_kolonner = {navn: np.asarray(resultat[navn], dtype=float).ravel()
+                            for navn in RESULTATFELT}
+            for navn in RESULTATFELT:
+                kolonner[navn][mangler] = nye_kolonner[navn][kilde]
+        with self._laas, self._tilkobling:
+            if nye.size:
+                self._sett_inn(kalkulator.versjon, list(unike), analysetype[nye], matrise[nye],
+                               nye_kolonner)
+            if prosjekt_info:
+                self._knytt(prosjekt_info, nokler)
+        self.treff += int(np.count_nonzero(funnet))
+        self.beregnet += int(nye.size)
+        return {navn: verdier.reshape(form) for navn, verdier in kolonner.items()}
+
+    # --- Enkelttilfeller ---
+
+    def hent(self, kalkulator: BaereevneKalkulator,
+             jord, fundament, belastning, terreng) -> Optional[Resultat]:
+        """Lagret resultat for skalare inndata, eller None"""
+        funnet, kolonner = self.hent_batch(nokler(kalkulator.versjon, jord, fundament, belastning, terreng))
+        return _resultat(kolonner) if funnet[0] else None
+
+    def lagre(self, kalkulator: BaereevneKalkulator,
+              jord, fundament, belastning, terreng,
+              resultat: Resultat,
+              prosjekt_info: Optional[Dict[str, str]] = None) -> bytes:
+        """Lagrer ett resultat fra beregn(); returnerer nøkkelen"""
+        kolonner = {f.name: np.nan if getattr(resultat, f.name) is None else getattr(resultat, f.name)
+                    for f in fields(resultat)}
+        return self.lagre_batch(kalkulator, jord, fundament, belastning, terreng,
+                                kolonner, prosjekt_info)[0]
+
+    def beregn(self, kalkulator: BaereevneKalkulator,
+               jord, fundament, belastning, terreng,
+               prosjekt_info: Optional[Dict[str, str]] = None) -> Resultat:
+        """Som kalkulator.beregn, men henter fra lageret når tilfellet finnes"""
+        nokkel = nokler(kalkulator.versjon, jord, fundament, belastning, terreng)[0]
+        funnet, kolonner = self.hent_batch([nokkel])
+        if not funnet[0]:
+            resultat = kalkulator.beregn(jord, fundament, belastning, terreng)
+            self.beregnet += 1
+            self.lagre(kalkulator, jord, fundament, belastning, terreng, resultat, prosjekt_info)
+            return resultat
+        self.treff += 1
+        if prosjekt_info:
+            with self._laas, self._tilkobling:
+                self._knytt(prosjekt_info, [nokkel])
+        return _resultat(kolonner)
+
+    # --- Prosjektindeks ---
+
+    def prosjekter(self) -> List[Dict[str, object]]:
+        """Alle prosjekter med antall beregninger, sortert"""
+        with self._laas:
+            rader = self._tilkobling.execute(
+                "SELECT p.prosjektnummer, p.prosjektnavn, p.beregningsnavn, p.revisjon, COUNT(b.nokkel) "
+                "FROM prosjekter p LEFT JOIN prosjektberegninger b ON b.prosjekt = p.id "
+                "GROUP BY p.id ORDER BY p.prosjektnummer, p.beregningsnavn, p.revisjon").fetchall()
+        return [{'prosjektnummer': nummer, 'prosjektnavn': navn, 'beregningsnavn': beregning,
+                 'revisjon': revisjon, 'antall': antall}
+                for nummer, navn, beregning, revisjon, antall in rader]
+
+    def prosjektberegninger(self,
+                            prosjektnummer: str,
+                            beregningsnavn: Optional[str] = None,
+                            revisjon: Optional[str] = None) -> Dict[str, np.ndarray]:
+        """
+        Inndata- og resultatkolonner for alle beregninger i prosjektet,
+        eventuelt avgrenset til én beregning og/eller revisjon
+        """
+        vilkaar = ["p.prosjektnummer = ?"]
+        parametre = [str(prosjektnummer).strip()]
+        for navn, verdi in (('beregningsnavn', beregningsnavn), ('revisjon', revisjon)):
+            if verdi is not None:
+                vilkaar.append(f"p.{navn} = ?")
+                parametre.append(str(verdi).strip())
+        tekstfelt = ['beregningsnavn', 'revisjon', 'analysetype']
+        tallfelt = TALLFELT + RESULTATFELT
+        sql = (f"SELECT p.beregningsnavn, p.revisjon, r.analysetype, "
+               f"{', '.join('r.' + navn for navn in tallfelt)} "
+               f"FROM prosjekter p JOIN prosjektberegninger b ON b.prosjekt = p.id "
+               f"JOIN beregninger r ON r.nokkel = b.nokkel "
+               f"WHERE {' AND '.join(vilkaar)} ORDER BY p.beregningsnavn, p.revisjon, r.lagret")
+        with self._laas:
+            rader = self._tilkobling.execute(sql, parametre).fetchall()
+        kolonner = {navn: np.array([rad[j] for rad in rader], dtype=str)
+                    for j, navn in enumerate(tekstfelt)}
+        tall = np.array([rad[len(tekstfelt):] for rad in rader], dtype=float).reshape(-1, len(tallfelt))
+        kolonner.update({navn: tall[:, j] for j, navn in enumerate(tallfelt)})
+        return kolonner
+
+    # --- Intern skriving (kalles med låsen holdt, i en transaksjon) ---
+
+    def _sett_inn(self, versjon: str, nokler: List[bytes], analysetype: np.ndarray,
+                  matrise: np.ndarray, kolonner: Dict[str, np.ndarray]):
+        tidspunkt = time.time()
+        resultater = np.column_stack([kolonner[navn] for navn in RESULTATFELT]).tolist()
+        rader = ((nokkel, versjon, tidspunkt, type_, *inn, *ut)
+                 for nokkel, type_, inn, ut in zip(nokler, analysetype.tolist(), matrise.tolist(), resultater))
+        antall = 4 + len(TALLFELT) + len(RESULTATFELT)
+        self._tilkobling.executemany(
+            f"INSERT OR IGNORE INTO beregninger VALUES ({', '.join('?' * antall)})", rader)
+
+    def _oppgrader_fra_1(self):
+        """Skjema 1 hadde Ka/Kp i nøkkel og tabell: nye nøkler, prosjektkoblinger flyttes med"""
+        gamle_felt = [navn for navn in INNDATAFELT if navn != 'analysetype']
+        behold = [gamle_felt.index(navn) for navn in TALLFELT]
+        rader = self._tilkobling.execute(
+            f"SELECT nokkel, versjon, lagret, analysetype, {', '.join(gamle_felt + RESULTATFELT)} "
+            f"FROM beregninger").fetchall()
+        ny_nokkel = {}
+        nye_rader = []
+        for nokkel, versjon, lagret, type_, *verdier in rader:
+            matrise = np.array([[verdier[j] for j in behold]], dtype=float)
+            ny = _nokler(versjon, np.array([type_]), matrise)[0]
+            ny_nokkel[nokkel] = ny
+            nye_rader.append((ny, versjon, lagret, type_, *matrise[0].tolist(),
+                              *verdier[len(gamle_felt):]))
+        koblinger = self._tilkobling.execute("SELECT prosjekt, nokkel FROM prosjektberegninger").fetchall()
+
+        # Setning for setning: executescript ville ha avsluttet transaksjonen
+        self._tilkobling.execute("DROP TABLE beregninger")
+        self._tilkobling.execute("DELETE FROM prosjektberegninger")
+        for setning in _SKJEMA.split(';'):
+            if setning.strip():
+                self._tilkobling.execute(setning)
+        antall = 4 + len(TALLFELT) + len(RESULTATFELT)
+        self._tilkobling.executemany(
+            f"INSERT OR IGNORE INTO beregninger VALUES ({', '.join('?' * antall)})", nye_rader)
+        self._tilkobling.executemany(
+            "INSERT OR IGNORE INTO prosjektberegninger VALUES (?, ?)",
+            ((prosjekt, ny_nokkel[nokkel]) for prosjekt, nokkel in koblinger if nokkel in ny_nokkel))
+
+    def _knytt(self, prosjekt_info: Dict[str, str], nokler: Sequence[bytes]):
+        verdier = [_tekst(prosjekt_info, navn) for navn in PROSJEKTFELT]
+        self._tilkobling.execute(
+            "INSERT INTO prosjekter (prosjektnummer, beregningsnavn, revisjon, prosjektnavn) "
+            "VALUES (?, ?, ?, ?) ON CONFLICT (prosjektnummer, beregningsnavn, revisjon) "
+            "DO UPDATE SET prosjektnavn = excluded.prosjektnavn WHERE excluded.prosjektnavn != ''",
+            (*verdier, _tekst(prosjekt_info, 'prosjektnavn')))
+        prosjekt = self._tilkobling.execute(
+            "SELECT id FROM prosjekter WHERE prosjektnummer = ? AND beregningsnavn = ? AND revisjon = ?",
+            verdier).fetchone()[0]
+        self._tilkobling.executemany(
+            "INSERT OR IGNORE INTO prosjektberegninger VALUES (?, ?)",
+            ((prosjekt, nokkel) for nokkel in dict.fromkeys(nokler)))
+
+
+def _resultat(kolonner: Dict[str, np.ndarray]) -> Resultat:
+    """Resultat fra første rad i kolonnene; NaN i valgfrie felt blir None"""
+    verdier = {}
+    for navn in RESULTATFELT:
+        verdi = float(kolonner[navn][0])
+        verdier[navn] = None if navn in _VALGFRIE and verdi != verdi else verdi
+    return Resultat(**verdier)
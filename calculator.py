@@ -9,9 +9,54 @@ Referanser:
 """
 
 import numpy as np
-from typing import Tuple, Optional
+from bisect import bisect_right
+from dataclasses import fields, replace
+from typing import Callable, Dict, Tuple, Optional, Union
 from models import (JordParameter, FundamentGeometri, Belastning, 
-                   TerrengForhold, Resultat)
+                   TerrengForhold, Resultat, Dimensjonering)
+from faktorcache import FaktorCache, memoisert
+from profilering import Profilering, ProfilRapport, Kjoring, METODESTEG, TOPPNIVAA
+
+
+# Økes når en endring i beregningen gir andre tall. Inngår i nøklene i
+# beregningslager.py, så lagrede resultater fra eldre versjoner ikke gjenbrukes.
+BEREGNINGSVERSJON = 1
+
+
+def _bygg_ny_rutenett(tabell: Dict[float, list]) -> Tuple[np.ndarray, np.ndarray]:
+    """Gjør Ny-tabellen om til ruhetsakse og sammenhengende 2D-array [r, tan(phi)]"""
+    ruhet = sorted(tabell)
+    rutenett = np.ascontiguousarray([tabell[r] for r in ruhet], dtype=float)
+    return np.array(ruhet, dtype=float), rutenett
+
+
+def _monotone_helninger(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """
+    Helninger for monoton kubisk Hermite-interpolasjon (Fritsch-Carlson)
+    langs siste akse i y
+    """
+    h = np.diff(x)
+    delta = np.diff(y, axis=-1) / h
+    d = np.zeros_like(y)
+    
+    # Indre punkter: vektet harmonisk middel, null ved fortegnsskifte
+    w1 = 2 * h[1:] + h[:-1]
+    w2 = h[1:] + 2 * h[:-1]
+    samme_fortegn = delta[..., :-1] * delta[..., 1:] > 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        harmonisk = (w1 + w2) / (w1 / delta[..., :-1] + w2 / delta[..., 1:])
+    d[..., 1:-1] = np.where(samme_fortegn, harmonisk, 0.0)
+    
+    # Endepunkter: trepunktsformel begrenset for å bevare monotoni
+    for ende, h0, h1, d0, d1 in ((0, h[0], h[1], delta[..., 0], delta[..., 1]),
+                                 (-1, h[-1], h[-2], delta[..., -1], delta[..., -2])):
+        kant = ((2 * h0 + h1) * d0 - h0 * d1) / (h0 + h1)
+        kant = np.where(np.sign(kant) != np.sign(d0), 0.0, kant)
+        kant = np.where((np.sign(d0) != np.sign(d1)) & (np.abs(kant) > 3 * np.abs(d0)),
+                        3 * d0, kant)
+        d[..., ende] = kant
+    
+    return d
 
 
 class BaereevneKalkulator:
@@ -43,9 +88,104 @@ class BaereevneKalkulator:
         1.0: [0, 0.15, 0.175, 0.194, 0.215, 0.235, 0.255, 0.277, 0.29, 0.31, 0.33, 0.345, 0.368, 0.391, 0.415, 0.44, 0.467, 0.495, 0.525, 0.556, 0.589, 0.623, 0.66, 0.699, 0.739, 0.782, 0.827, 0.875, 0.925, 0.977, 1.03, 1.09, 1.16, 1.22, 1.29, 1.36]
     }
     
-    def __init__(self):
+    # Tabellen som rutenett: NY_RUTENETT[i_r, i_tan], bygges én gang
+    NY_RUHET, NY_RUTENETT = _bygg_ny_rutenett(NY_TABELL_VALUES)
+    NY_HELNING = _monotone_helninger(NY_TABELL_R, NY_RUTENETT)
+    
+    # Samme tabell som Python-lister for raske skalaroppslag
+    _NY_TAN = NY_TABELL_R.tolist()
+    _NY_R = NY_RUHET.tolist()
+    _NY_G = NY_RUTENETT.tolist()
+    _NY_D = NY_HELNING.tolist()
+    
+    def __init__(self,
+                 ny_interpolasjon: str = 'lineaer',
+                 faktor_cache: bool = False,
+                 cache_maks_antall: int = 4096,
+                 cache_toleranse: float = 1e-9):
+        """
+        ny_interpolasjon: 'lineaer' (bilineær) eller 'kubisk' (monoton kubisk
+        langs tan(phi_d), lineær langs r) for oppslag i Ny-tabellen
+        
+        faktor_cache: mellomlagrer Nq, Nc, f_beta og Ka/Kp for gjentatte
+        inndata (LRU med maks cache_maks_antall verdier, inndata avrundet
+        til cache_toleranse)
+        """
+        if ny_interpolasjon not in ('lineaer', 'kubisk'):
+            raise ValueError(f"Ukjent interpolasjon for Ny: {ny_interpolasjon}")
         self.resultater = None
+        self.ny_interpolasjon = ny_interpolasjon
+        self._faktor_cache = None
+        self._profilering = None
+        if faktor_cache:
+            self.aktiver_faktor_cache(cache_maks_antall, cache_toleranse)
+    
+    def __getstate__(self):
+        # Profileringen følger ikke med til andre prosesser
+        tilstand = {navn: verdi for navn, verdi in self.__dict__.items()
+                    if navn not in METODESTEG}
+        tilstand['_profilering'] = None
+        return tilstand
+    
+    @property
+    def versjon(self) -> str:
+        """Beregningsversjon og innstillinger som påvirker tallene"""
+        versjon = f"{BEREGNINGSVERSJON}/{self.ny_interpolasjon}"
+        if self._faktor_cache is not None and self._faktor_cache.toleranse > 0:
+            versjon += f"/cache{self._faktor_cache.toleranse:g}"
+        return versjon
+    
+    def aktiver_faktor_cache(self, maks_antall: int = 4096, toleranse: float = 1e-9):
+        """Slår på mellomlagring av bæreevnefaktorer (erstatter eksisterende lager)"""
+        self._faktor_cache = FaktorCache(maks_antall, toleranse)
     
+    def deaktiver_faktor_cache(self):
+        """Slår av mellomlagring, f.eks. for verifikasjonsberegninger"""
+        self._faktor_cache = None
+    
+    def tom_faktor_cache(self):
+        """Tømmer mellomlageret og nullstiller tellerne"""
+        if self._faktor_cache is not None:
+            self._faktor_cache.tom()
+    
+    def faktor_cache_statistikk(self) -> Optional[Dict[str, float]]:
+        """Treff, bom, utkastinger og treffrate, eller None hvis avslått"""
+        if self._faktor_cache is None:
+            return None
+        return self._faktor_cache.statistikk()
+    
+    def aktiver_profilering(self,
+                            callback: Optional[Callable[[Kjoring], None]] = None,
+                            maks_kjoringer: int = 1000) -> Profilering:
+        """
+        Slår på tidsmåling per steg i beregn og per blokk i beregn_batch
+        
+        callback kalles med en Kjoring etter hvert kall til beregn eller
+        beregn_batch, f.eks. for å sende tallene videre til et metrikksystem.
+        Gjelder bare denne prosessen; kalkulatorer som sendes til
+        arbeidsprosesser profileres ikke.
+        """
+        self.deaktiver_profilering()
+        profilering = Profilering(callback, maks_kjoringer)
+        for metode, steg in METODESTEG.items():
+            setattr(self, metode, profilering.maal(steg, getattr(self, metode),
+                                                   toppnivaa=metode in TOPPNIVAA))
+        self._profilering = profilering
+        return profilering
+    
+    def deaktiver_profilering(self):
+        """Slår av tidsmåling og gjenoppretter de umålte metodene"""
+        for metode in METODESTEG:
+            self.__dict__.pop(metode, None)
+        self._profilering = None
+    
+    def profilering_rapport(self) -> Optional[ProfilRapport]:
+        """Tid og antall kall per steg, eller None hvis avslått"""
+        if self._profilering is None:
+            return None
+        return self._profilering.rapport()
+    
+    @memoisert('Ka_Kp')
     def beregn_jordtrykkskoeffisienter(self, phi_d: float) -> Tuple[float, float]:
         """
         Beregner aktiv (Ka) og passiv (Kp) jordtrykkskoeffisient
@@ -130,7 +270,7 @@ class BaereevneKalkulator:
         Beregner skjærspenning og ruhet
         """
         if Lo is not None:
-            H_total = np.sqrt(H_B**2 + (H_L or 0)**2)
+            H_total = np.sqrt(H_B * H_B + (H_L or 0) * (H_L or 0))
             A_eff = Bo * Lo
         else:
             H_total = abs(H_B)
@@ -146,7 +286,7 @@ class BaereevneKalkulator:
             
         return tau, r
     
-    def interpoler_Ny(self, tan_phi_d: float, r: float) -> float:
+    def interpoler_Ny(self, tan_phi_d, r, metode: Optional[str] = None):
         """
         Interpolerer Ny fra tabell basert på tan(phi_d) og ruhet r
         
@@ -154,65 +294,80 @@ class BaereevneKalkulator:
         - Kolonnene: tan(phi) verdier (0, 0.15, 0.175, 0.2, ..., 1.0)
         - Radene: ruhet r verdier (0, 0.1, 0.2, ..., 1.0)
         - Verdiene: Ny
-        """
-        # Begrens r til gyldig område [0, 1]
-        r = min(max(r, 0), 1.0)
-        
-        # Begrens tan_phi_d til tabellens område
-        tan_phi_d = min(max(tan_phi_d, 0), 1.0)
         
-        # tan(phi) verdier i kolonneheader
-        TAN_PHI_VALUES = [0, 0.15, 0.175, 0.2, 0.225, 0.25, 0.275, 0.3, 
-                         0.325, 0.35, 0.375, 0.4, 0.425, 0.45, 0.475, 0.5,
-                         0.525, 0.55, 0.575, 0.6, 0.625, 0.65, 0.675, 0.7,
-                         0.725, 0.75, 0.775, 0.8, 0.825, 0.85, 0.875, 0.9,
-                         0.925, 0.95, 0.975, 1.0]
-        
-        # ruhet r verdier (rader)
-        R_VALUES = [0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 0.95, 0.99, 1.0]
-        
-        # Ny-tabell: NY_TABLE[r_idx][tan_phi_idx]
-        # Verdier hentet fra regnearket for tan_phi = 0.65
-        # Skaleres med tan_phi^2 for andre vinkler (tilnærming)
-        
-        # Basisverdier ved tan_phi = 0.65 (phi ≈ 33°)
-        NY_BASE_R0 = 35.0   # Ved r = 0
-        
-        # Skaleringsformler basert på klassisk teori
-        # Ny ≈ 2*(Nq+1)*tan(phi) der Nq = e^(pi*tan(phi)) * tan²(45+phi/2)
-        
-        # Finn Nq
-        if tan_phi_d > 0.001:
-            phi_d = np.degrees(np.arctan(tan_phi_d))
-            phi_rad = np.radians(phi_d)
-            Nq = np.exp(np.pi * tan_phi_d) * (np.tan(np.radians(45 + phi_d/2)))**2
-            
-            # Brinch Hansen's Ny formel (forenklet)
-            Ny_r0 = 1.5 * (Nq - 1) * tan_phi_d
-        else:
-            Ny_r0 = 0
-        
-        # Reduksjonsfaktor for ruhet
-        # Ved r=0: full Ny
-        # Ved r=1: Ny redusert til ca 1-2% av original
-        if r < 0.001:
-            reduction = 1.0
-        elif r < 0.1:
-            reduction = 1.0 - 0.22 * (r / 0.1)
-        elif r < 0.9:
-            # Lineær interpolasjon mellom kjente punkter
-            # r=0.1: ~78%, r=0.5: ~25%, r=0.9: ~3.5%
-            reduction = 0.78 - 0.83 * (r - 0.1) / 0.8
+        Fungerer for både skalarer og arrays. metode overstyrer
+        kalkulatorens ny_interpolasjon ('lineaer' eller 'kubisk').
+        """
+        metode = metode or self.ny_interpolasjon
+        
+        if not isinstance(tan_phi_d, np.ndarray) and not isinstance(r, np.ndarray):
+            return self._interpoler_Ny_skalar(float(tan_phi_d), float(r), metode)
+        
+        # Begrens til tabellens område [0, 1]
+        t = np.clip(tan_phi_d, 0, 1.0)
+        r = np.clip(r, 0, 1.0)
+        
+        x = self.NY_TABELL_R
+        i = np.clip(np.searchsorted(x, t, side='right') - 1, 0, len(x) - 2)
+        h = x[i + 1] - x[i]
+        wt = (t - x[i]) / h
+        
+        j = np.clip(np.searchsorted(self.NY_RUHET, r, side='right') - 1, 0, len(self.NY_RUHET) - 2)
+        wr = (r - self.NY_RUHET[j]) / (self.NY_RUHET[j + 1] - self.NY_RUHET[j])
+        
+        G = self.NY_RUTENETT
+        if metode == 'kubisk':
+            # Hermite-polynom langs tan(phi) med monotone helninger
+            D = self.NY_HELNING
+            wt2 = wt * wt
+            wt3 = wt2 * wt
+            h00 = 2 * wt3 - 3 * wt2 + 1
+            h10 = wt3 - 2 * wt2 + wt
+            h01 = -2 * wt3 + 3 * wt2
+            h11 = wt3 - wt2
+            nedre = h00 * G[j, i] + h10 * h * D[j, i] + h01 * G[j, i + 1] + h11 * h * D[j, i + 1]
+            ovre = h00 * G[j + 1, i] + h10 * h * D[j + 1, i] + \
+                h01 * G[j + 1, i + 1] + h11 * h * D[j + 1, i + 1]
         else:
-            # r >= 0.9: svært lav bæreevne
-            reduction = 0.035 - 0.033 * (r - 0.9) / 0.1
+            nedre = (1 - wt) * G[j, i] + wt * G[j, i + 1]
+            ovre = (1 - wt) * G[j + 1, i] + wt * G[j + 1, i + 1]
         
-        reduction = max(reduction, 0.01)
+        return np.maximum((1 - wr) * nedre + wr * ovre, 0)
+    
+    def _interpoler_Ny_skalar(self, t: float, r: float, metode: str) -> float:
+        """Skalarversjon av interpoler_Ny med samme regneoperasjoner som arrayversjonen"""
+        t = min(max(t, 0), 1.0)
+        r = min(max(r, 0), 1.0)
         
-        Ny = Ny_r0 * reduction
+        x = self._NY_TAN
+        i = min(max(bisect_right(x, t) - 1, 0), len(x) - 2)
+        h = x[i + 1] - x[i]
+        wt = (t - x[i]) / h
+        
+        R = self._NY_R
+        j = min(max(bisect_right(R, r) - 1, 0), len(R) - 2)
+        wr = (r - R[j]) / (R[j + 1] - R[j])
+        
+        G0 = self._NY_G[j]
+        G1 = self._NY_G[j + 1]
+        if metode == 'kubisk':
+            D0 = self._NY_D[j]
+            D1 = self._NY_D[j + 1]
+            wt2 = wt * wt
+            wt3 = wt2 * wt
+            h00 = 2 * wt3 - 3 * wt2 + 1
+            h10 = wt3 - 2 * wt2 + wt
+            h01 = -2 * wt3 + 3 * wt2
+            h11 = wt3 - wt2
+            nedre = h00 * G0[i] + h10 * h * D0[i] + h01 * G0[i + 1] + h11 * h * D0[i + 1]
+            ovre = h00 * G1[i] + h10 * h * D1[i] + h01 * G1[i + 1] + h11 * h * D1[i + 1]
+        else:
+            nedre = (1 - wt) * G0[i] + wt * G0[i + 1]
+            ovre = (1 - wt) * G1[i] + wt * G1[i + 1]
         
-        return max(Ny, 0)
+        return max((1 - wr) * nedre + wr * ovre, 0)
     
+    @memoisert('Nq')
     def beregn_Nq_effektiv(self, phi_d: float, r: float) -> float:
         """
         Beregner Nq for effektivspenningsanalyse
@@ -224,10 +379,10 @@ class BaereevneKalkulator:
         tan_phi_d = np.tan(phi_rad)
         
         theta_ref = np.radians(45 + phi_d / 2)
-        Kp_ref = np.tan(theta_ref)**2
+        Kp_ref = np.tan(theta_ref) * np.tan(theta_ref)
         
         if r > 0.0001:
-            m = (1 - np.sqrt(max(0, 1 - r**2))) / (r + 0.0000001)
+            m = (1 - np.sqrt(max(0, 1 - r * r))) / (r + 0.0000001)
         else:
             m = 0
         
@@ -238,10 +393,11 @@ class BaereevneKalkulator:
         
         return max(Nq, 1.0)
     
+    @memoisert('Nc')
     def beregn_Nc_udrenert(self, r: float) -> float:
         """Beregner Nc for udrenert analyse"""
         r = min(max(r, 0), 0.999)
-        Nc = np.pi + 2 + np.sqrt(1 - r**2) - np.arcsin(r)
+        Nc = np.pi + 2 + np.sqrt(1 - r * r) - np.arcsin(r)
         return Nc
     
     def beregn_formfaktorer(self, 
@@ -267,6 +423,7 @@ class BaereevneKalkulator:
             
         return sq, sy, sc
     
+    @memoisert('f_beta')
     def beregn_reduksjonsfaktor_skraaning(self, 
                                           beta_s: float,
                                           analysetype: str) -> float:
@@ -382,7 +539,7 @@ class BaereevneKalkulator:
             beta_rad = np.radians(terreng.skraaningshelning)
             
             s = f_beta * sc * Nc * su_d + \
-                (terreng.romvekt_over * terreng.fundamentdybde + terreng.overflatelast) * np.cos(beta_rad)**2
+                (terreng.romvekt_over * terreng.fundamentdybde + terreng.overflatelast) * (np.cos(beta_rad) * np.cos(beta_rad))
             
             Nq = None
             Ny = None
@@ -407,3 +564,348 @@ class BaereevneKalkulator:
             reduksjonsfaktor=f_beta,
             V_total=V_total
         )
+    
+    def beregn_batch(self,
+                     jord: JordParameter,
+                     fundament: FundamentGeometri,
+                     belastning: Belastning,
+                     terreng: TerrengForhold) -> Dict[str, np.ndarray]:
+        """
+        Vektorisert bæreevneberegning for mange lasttilfeller samtidig
+        
+        Feltene i dataklassene kan være skalarer eller NumPy-arrays som lar
+        seg kringkaste (broadcast) til felles form. analysetype kan være en
+        array av 'effektiv'/'udrenert', og lengde kan være None eller en array
+        der NaN betyr stripefundament.
+        
+        Returnerer kolonner med samme navn som feltene i Resultat. Felt som
+        er None i skalarberegningen (f.eks. Nc i effektivspenningsanalyse)
+        settes til NaN. Tallene er bit-for-bit identiske med beregn().
+        """
+        kol, form = self._batch_kolonner(jord, fundament, belastning, terreng)
+        
+        B = kol['bredde']
+        L = kol['lengde']
+        har_L = ~np.isnan(L)            # lengde is not None
+        rekt = har_L & (L != 0)         # rektangulært fundament
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Fundamentvekt
+            vegg_hoyde = np.maximum(0, kol['fundamentdybde'] - kol['tykkelse'])
+            fund_volum = np.where(har_L, B * np.where(har_L, L, 0.0) * kol['tykkelse'],
+                                  B * kol['tykkelse'])
+            vegg_volum = np.where(har_L, kol['vegg_bredde'] * kol['soyle_lengde'] * vegg_hoyde,
+                                  kol['vegg_bredde'] * vegg_hoyde)
+            fund_vekt = (fund_volum + vegg_volum) * kol['romvekt']
+            V_total = kol['vertikal'] + fund_vekt
+            
+            # Eksentrisiteter
+            e_B, e_L = self._eksentrisitet_vektor(
+                V_total, kol['moment_B'], kol['moment_L'],
+                kol['centeravvik_B'], kol['centeravvik_L'], rekt
+            )
+            
+            # Effektivt areal og grunntrykk
+            Bo = np.maximum(B - 2 * np.abs(e_B), 0.01)
+            Lo = np.where(rekt, np.maximum(L - 2 * np.abs(e_L), 0.01), np.nan)
+            A_eff = np.where(rekt, Bo * Lo, Bo)
+            q = V_total / A_eff
+            
+            # Skjærspenning
+            H_B = kol['horisontal_B']
+            H_L = kol['horisontal_L']
+            H_total = np.where(rekt, np.sqrt(H_B * H_B + H_L * H_L), np.abs(H_B))
+            tau = np.where(A_eff > 0, H_total / A_eff, 0.0)
+            
+            n = V_total.size
+            s = np.empty(n)
+            r = np.empty(n)
+            f_beta = np.empty(n)
+            Nq = np.full(n, np.nan)
+            Ny = np.full(n, np.nan)
+            Nc = np.full(n, np.nan)
+            
+            effektiv = kol['analysetype'] == 'effektiv'
+            
+            i = np.flatnonzero(effektiv)
+            if i.size:
+                s[i], r[i], f_beta[i], Nq[i], Ny[i] = self._beregn_effektiv_vektor(
+                    {navn: verdi[i] for navn, verdi in kol.items()},
+                    Bo[i], Lo[i], rekt[i], q[i], tau[i]
+                )
+            
+            i = np.flatnonzero(~effektiv)
+            if i.size:
+                s[i], r[i], f_beta[i], Nc[i] = self._beregn_udrenert_vektor(
+                    {navn: verdi[i] for navn, verdi in kol.items()},
+                    Bo[i], Lo[i], rekt[i], tau[i]
+                )
+            
+            # Utnyttelsesgrad
+            utnyttelse = np.where(s > 0, q / s, np.inf)
+            margin = np.where(q > 0, s / q, np.inf)
+        
+        kolonner = {
+            'grunntrykk': q,
+            'baereevne': s,
+            'utnyttelsesgrad': utnyttelse,
+            'margin': margin,
+            'Nq': Nq,
+            'Ny': Ny,
+            'Nc': Nc,
+            'eff_bredde': Bo,
+            'eff_lengde': Lo,
+            'eksentrisitet_B': e_B,
+            'eksentrisitet_L': e_L,
+            'ruhet': r,
+            'reduksjonsfaktor': f_beta,
+            'V_total': V_total,
+        }
+        return {navn: verdi.reshape(form) for navn, verdi in kolonner.items()}
+    
+    def dimensjoner(self,
+                    jord: JordParameter,
+                    fundament: FundamentGeometri,
+                    belastning: Belastning,
+                    terreng: TerrengForhold,
+                    maal_utnyttelse: float = 1.0,
+                    B_min: float = 0.1,
+                    B_max: float = 20.0,
+                    L_B_forhold: Union[None, float, Tuple[float, float]] = None,
+                    n_forhold: int = 9,
+                    toleranse: float = 1e-3,
+                    avrunding: Optional[float] = None,
+                    maks_iterasjoner: int = 100) -> Dimensjonering:
+        """
+        Finner minste fundamentbredde B med styrende q/s ≤ maal_utnyttelse
+        
+        Siste akse i belastningsfeltene er lasttilfeller; øvrige akser (og
+        arrays i jord, fundament og terreng) er ulike fundamenter som løses
+        samtidig. Egenvekten oppdateres med B i hver iterasjon.
+        
+        L_B_forhold:
+        - None: lengde fra fundament (fast L, eller stripefundament)
+        - tall: L = forhold · B
+        - (min, max): n_forhold forhold prøves, minste areal velges
+        
+        Løses med vektorisert halvering i [B_min, B_max], under antakelsen at
+        q/s avtar med B. avrunding runder B (og L) opp til nærmeste multiplum.
+        Fundamenter uten løsning i intervallet gir NaN og konvergert=False.
+        """
+        if not 0 < B_min < B_max:
+            raise ValueError("Krever 0 < B_min < B_max")
+        
+        # Lasttilfeller på siste akse, fundamenter på de foregående
+        laster = {f.name: np.atleast_1d(np.asarray(getattr(belastning, f.name), dtype=float))
+                  for f in fields(Belastning)}
+        
+        if L_B_forhold is None:
+            forhold = None
+        elif np.ndim(L_B_forhold) == 0:
+            forhold = np.array([float(L_B_forhold)])
+        else:
+            forhold = np.linspace(L_B_forhold[0], L_B_forhold[1], n_forhold)
+        n_r = 1 if forhold is None else len(forhold)
+        
+        # Aksene blir (fundamenter..., forhold, lasttilfeller)
+        def fundamentfelt(objekt, klasse):
+            endringer = {}
+            for f in fields(klasse):
+                verdi = getattr(objekt, f.name)
+                if verdi is not None:
+                    endringer[f.name] = np.asarray(verdi)[..., None, None]
+            return replace(objekt, **endringer)
+        
+        jord_n = fundamentfelt(jord, JordParameter)
+        fund_n = fundamentfelt(fundament, FundamentGeometri)
+        terreng_n = fundamentfelt(terreng, TerrengForhold)
+        belastning_n = Belastning(**{navn: v[..., None, :] for navn, v in laster.items()})
+        
+        former = [np.shape(getattr(o, f.name))[:-2]
+                  for o, k in ((jord_n, JordParameter), (fund_n, FundamentGeometri),
+                               (terreng_n, TerrengForhold))
+                  for f in fields(k) if getattr(o, f.name) is not None]
+        former += [v.shape[:-1] for v in laster.values()]
+        form = np.broadcast_shapes(*former) + (n_r,)
+        
+        def lengde(B):
+            if forhold is not None:
+                return forhold * B
+            return fundament.lengde
+        
+        def utnyttelse(B, L=None):
+            """Styrende q/s og lasttilfelle for bredder med form (fundamenter..., forhold)"""
+            L = lengde(B) if L is None else L
+            L = None if L is None else np.asarray(L)[..., None]
+            fund_B = replace(fund_n, bredde=B[..., None], lengde=L)
+            u = self.beregn_batch(jord_n, fund_B, belastning_n, terreng_n)['utnyttelsesgrad']
+            u = np.broadcast_to(u, form + u.shape[-1:])
+            return u.max(axis=-1), u.argmax(axis=-1)
+        
+        nedre = np.full(form, float(B_min))
+        ovre = np.full(form, float(B_max))
+        u_nedre, _ = utnyttelse(nedre)
+        u_ovre, _ = utnyttelse(ovre)
+        
+        mulig = u_ovre <= maal_utnyttelse
+        ferdig = u_nedre <= maal_utnyttelse
+        ovre = np.where(ferdig, nedre, ovre)
+        
+        # Halvering: nedre bryter kravet, ovre oppfyller det
+        aktiv = mulig & ~ferdig
+        for _ in range(maks_iterasjoner):
+            if not np.any(aktiv & (ovre - nedre > toleranse)):
+                break
+            midt = 0.5 * (nedre + ovre)
+            u_midt, _ = utnyttelse(midt)
+            ok = u_midt <= maal_utnyttelse
+            ovre = np.where(aktiv & ok, midt, ovre)
+            nedre = np.where(aktiv & ~ok, midt, nedre)
+        
+        B = ovre
+        if avrunding:
+            B = np.minimum(np.ceil(B / avrunding - 1e-9) * avrunding, B_max)
+        B = np.where(mulig, B, np.nan)
+        
+        # q/s for de dimensjonene som returneres, med L rundet opp som B
+        B_kontroll = np.where(mulig, B, B_max)
+        L = lengde(B_kontroll)
+        if forhold is not None and avrunding:
+            L = np.ceil(L / avrunding - 1e-9) * avrunding
+        u, styrende = utnyttelse(B_kontroll, L)
+        if forhold is not None:
+            L = np.where(mulig, L, np.nan)
+        
+        T = np.asarray(fundament.tykkelse)[..., None]
+        vegg_hoyde = np.maximum(0, np.asarray(terreng.fundamentdybde)[..., None] - T)
+        if L is None:
+            areal = B
+            volum = B * T + np.asarray(fundament.vegg_bredde)[..., None] * vegg_hoyde
+        else:
+            areal = B * L
+            volum = areal * T + np.asarray(fundament.vegg_bredde)[..., None] * \
+                np.asarray(fundament.soyle_lengde)[..., None] * vegg_hoyde
+        
+        # Velg forholdet L/B med minst areal
+        beste = np.argmin(np.where(mulig, areal, np.inf), axis=-1)[..., None]
+        
+        def velg(verdi):
+            verdi = np.take_along_axis(np.broadcast_to(verdi, form), beste, axis=-1)[..., 0]
+            return verdi.item() if verdi.ndim == 0 else verdi
+        
+        return Dimensjonering(
+            bredde=velg(B),
+            lengde=None if L is None else velg(L),
+            areal=velg(areal),
+            volum=velg(volum),
+            utnyttelsesgrad=velg(np.where(mulig, u, np.nan)),
+            styrende_lasttilfelle=velg(styrende),
+            konvergert=velg(mulig)
+        )
+    
+    def _batch_kolonner(self, jord, fundament, belastning, terreng):
+        """Samler alle inndatafelt som flate arrays med felles lengde"""
+        verdier = {}
+        for klasse, objekt in ((JordParameter, jord), (FundamentGeometri, fundament),
+                               (Belastning, belastning), (TerrengForhold, terreng)):
+            for felt in fields(klasse):
+                verdi = getattr(objekt, felt.name)
+                if felt.name == 'analysetype':
+                    verdier[felt.name] = np.asarray(verdi)
+                elif felt.name == 'lengde' and verdi is None:
+                    verdier[felt.name] = np.asarray(np.nan)
+                else:
+                    verdier[felt.name] = np.asarray(verdi, dtype=float)
+        
+        form = np.broadcast_shapes(*(v.shape for v in verdier.values()))
+        kolonner = {navn: np.broadcast_to(v, form).ravel() for navn, v in verdier.items()}
+        return kolonner, form
+    
+    def _eksentrisitet_vektor(self, V, M_B, M_L, centeravvik_B, centeravvik_L, rekt):
+        """Vektorisert versjon av beregn_eksentrisitet"""
+        positiv = V > 0
+        V_trygg = np.where(positiv, V, 1.0)
+        e_B = np.where(positiv, (M_B + V_trygg * centeravvik_B) / V_trygg, 0.0)
+        e_L = np.where(positiv, (M_L + V_trygg * centeravvik_L) / V_trygg, 0.0)
+        e_L = np.where(rekt, e_L, np.nan)
+        return e_B, e_L
+    
+    def _beregn_effektiv_vektor(self, kol, Bo, Lo, rekt, q, tau):
+        """Effektivspenningsgrenen av beregn_batch"""
+        a = kol['attraksjon']
+        phi_d = np.degrees(np.arctan(
+            np.tan(np.radians(kol['friksjonsvinkel'])) / kol['materialfaktor']
+        ))
+        tan_phi_d = np.tan(np.radians(phi_d))
+        
+        # Ruhet
+        gyldig = (tan_phi_d > 0.0001) & ((q + a) > 0)
+        r = np.where(gyldig, np.clip(tau / (q + a) / tan_phi_d, 0, 1.0), 0.0)
+        
+        # Bæreevnefaktorer
+        Nq = self._Nq_effektiv_vektor(phi_d, tan_phi_d, r)
+        Ny = self.interpoler_Ny(tan_phi_d, r)
+        
+        # Formfaktorer
+        B_over_L = np.where(rekt, Bo / Lo, 0.0)
+        sq = np.where(rekt, 1 + B_over_L * np.sin(np.radians(phi_d)), 1.0)
+        sy = np.where(rekt, np.maximum(1 - 0.4 * B_over_L, 0.6), 1.0)
+        
+        f_beta = self._reduksjonsfaktor_vektor(kol['skraaningshelning'], 'effektiv')
+        
+        q_overlag = kol['romvekt_over'] * kol['fundamentdybde'] + kol['overflatelast']
+        
+        s = f_beta * sq * Nq * (q_overlag + a) + \
+            f_beta * sy * 0.5 * Ny * kol['romvekt_eff'] * Bo - a
+        
+        return s, r, f_beta, Nq, Ny
+    
+    def _beregn_udrenert_vektor(self, kol, Bo, Lo, rekt, tau):
+        """Totalspenningsgrenen av beregn_batch"""
+        su_d = kol['udrenert_skjaerstyrke'] / kol['materialfaktor']
+        
+        r = np.where(su_d > 0, tau / su_d, 0.0)
+        r = np.clip(r, 0, 0.999)
+        
+        Nc = np.pi + 2 + np.sqrt(1 - r * r) - np.arcsin(r)
+        
+        sc = np.where(rekt, 1 + 0.2 * (Bo / Lo), 1.0)
+        
+        f_beta = self._reduksjonsfaktor_vektor(kol['skraaningshelning'], 'udrenert')
+        
+        beta_rad = np.radians(kol['skraaningshelning'])
+        cos_beta = np.cos(beta_rad)
+        
+        s = f_beta * sc * Nc * su_d + \
+            (kol['romvekt_over'] * kol['fundamentdybde'] + kol['overflatelast']) * (cos_beta * cos_beta)
+        
+        return s, r, f_beta, Nc
+    
+    def _Nq_effektiv_vektor(self, phi_d, tan_phi_d, r):
+        """Vektorisert versjon av beregn_Nq_effektiv"""
+        tan_ref = np.tan(np.radians(45 + phi_d / 2))
+        Kp_ref = tan_ref * tan_ref
+        
+        m = np.where(r > 0.0001,
+                     (1 - np.sqrt(np.maximum(0, 1 - r * r))) / (r + 0.0000001),
+                     0.0)
+        
+        theta_m = np.arctan(m * tan_ref)
+        
+        Nq = 0.5 * (Kp_ref + 1 + (Kp_ref - 1) * np.cos(2 * theta_m)) * \
+             np.exp((np.pi - 2 * theta_m) * tan_phi_d)
+        
+        return np.where(phi_d > 0, np.maximum(Nq, 1.0), 1.0)
+    
+    def _reduksjonsfaktor_vektor(self, beta_s, analysetype):
+        """
+        Reduksjonsfaktor for skråning per unik helning
+        
+        f_beta avhenger kun av beta_s, som har få unike verdier i en batch.
+        Skalarfunksjonen brukes per unik verdi slik at potensfunksjonen gir
+        nøyaktig samme avrunding som beregn().
+        """
+        unike, invers = np.unique(beta_s, return_inverse=True)
+        f_beta = np.array([self.beregn_reduksjonsfaktor_skraaning(b, analysetype)
+                           for b in unike], dtype=float)
+        return f_beta[invers]
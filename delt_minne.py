@@ -0,0 +1,294 @@
+"""
+Parallell beregning med delt minne for svært store parameterstudier
+
+Inndatakolonnene legges i multiprocessing.shared_memory én gang, uten å
+kringkastes til full lengde, og arbeidsprosessene henter blokker av
+indekser fra en felles teller (dynamisk fordeling: prosesser som blir
+ferdige tidlig tar neste ledige blokk). Resultatene skrives direkte i
+delte utdatakolonner, og returneres som NumPy-views uten kopiering.
+
+    with DeltMinneUtforer(arbeidere=8) as utforer:
+        res = utforer.beregn(jord, fundament, belastning, terreng,
+                             felt=['utnyttelsesgrad'])
+        print(utforer.rapport.tekst())
+"""
+
+import math
+import os
+import multiprocessing as mp
+import threading
+import time
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, fields
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from models import (JordParameter, FundamentGeometri, Belastning,
+                   TerrengForhold, Resultat, INNDATAKLASSER)
+from calculator import BaereevneKalkulator
+
+
+RESULTATFELT = [f.name for f in fields(Resultat)]
+
+
+@dataclass
+class ArbeiderStatistikk:
+    """Arbeid utført av én prosess i én beregning"""
+    pid: int
+    antall: int  # beregnede tilfeller
+    blokker: int
+    tid: float  # sekunder i beregning
+
+
+@dataclass
+class Gjennomstromning:
+    """Ytelsesrapport for siste beregning"""
+    antall: int
+    tid: float  # veggtid inkl. oppsett av delt minne [s]
+    arbeidere: int
+    blokkstorrelse: int
+    per_arbeider: List[ArbeiderStatistikk]
+
+    @property
+    def tilfeller_per_sekund(self) -> float:
+        return self.antall / self.tid if self.tid > 0 else math.inf
+
+    def tekst(self) -> str:
+        linjer = [f"{self.antall:,} tilfeller på {self.tid:.2f} s "
+                  f"({self.tilfeller_per_sekund:,.0f}/s, {self.arbeidere} arbeidere, "
+                  f"blokker à {self.blokkstorrelse:,})"]
+        for a in self.per_arbeider:
+            hastighet = a.antall / a.tid if a.tid > 0 else 0.0
+            linjer.append(f"  pid {a.pid}: {a.antall:,} tilfeller i {a.blokker} blokker, "
+                          f"{hastighet:,.0f}/s")
+        return "\n".join(linjer)
+
+
+@dataclass
+class _Kolonne:
+    """Beskrivelse av en inndatakolonne: delt minne (navn) eller skalar"""
+    form: Tuple[int, ...]
+    dtype: str
+    minne: Optional[str] = None
+    skalar: object = None
+
+
+@dataclass
+class _Jobb:
+    """Alt en arbeider trenger for å finne sine data i delt minne"""
+    kolonner: Dict[str, _Kolonne]
+    form: Tuple[int, ...]
+    antall: int
+    blokkstorrelse: int
+    utdata: Dict[str, str]  # resultatfelt -> navn på delt minne
+
+
+_ARBEIDER_KALKULATOR: Optional[BaereevneKalkulator] = None
+_ARBEIDER_TELLER = None
+
+
+def _start_arbeider(kalkulator: BaereevneKalkulator, teller):
+    global _ARBEIDER_KALKULATOR, _ARBEIDER_TELLER
+    _ARBEIDER_KALKULATOR = kalkulator
+    _ARBEIDER_TELLER = teller
+
+
+def _arbeid(jobb: _Jobb) -> ArbeiderStatistikk:
+    """Henter og beregner blokker til telleren har passert siste tilfelle"""
+    minne = []
+    inn = {}
+    for navn, kol in jobb.kolonner.items():
+        if kol.minne is None:
+            inn[navn] = kol.skalar
+            continue
+        shm = shared_memory.SharedMemory(name=kol.minne)
+        minne.append(shm)
+        inn[navn] = np.ndarray(kol.form, dtype=kol.dtype, buffer=shm.buf)
+    ut = {}
+    for navn, minnenavn in jobb.utdata.items():
+        shm = shared_memory.SharedMemory(name=minnenavn)
+        minne.append(shm)
+        ut[navn] = np.ndarray((jobb.antall,), dtype=float, buffer=shm.buf)
+
+    antall = 0
+    blokker = 0
+    tid = 0.0
+    try:
+        while True:
+            with _ARBEIDER_TELLER.get_lock():
+                blokk = _ARBEIDER_TELLER.value
+                _ARBEIDER_TELLER.value += 1
+            start = blokk * jobb.blokkstorrelse
+            if start >= jobb.antall:
+                break
+            stopp = min(start + jobb.blokkstorrelse, jobb.antall)
+            t0 = time.perf_counter()
+
+            # Kringkaster bare den aktuelle indeksblokken
+            verdier = {}
+            for navn, verdi in inn.items():
+                if isinstance(verdi, np.ndarray):
+                    verdi = np.broadcast_to(verdi, jobb.form).flat[start:stopp]
+                verdier[navn] = verdi
+            verdier['analysetype'] = np.where(verdier['analysetype'], 'effektiv', 'udrenert')
+
+            res = _ARBEIDER_KALKULATOR.beregn_batch(
+                *(klasse(**{f.name: verdier[f.name] for f in fields(klasse)})
+                  for klasse in INNDATAKLASSER))
+            for navn, kolonne in ut.items():
+                kolonne[start:stopp] = np.broadcast_to(res[navn], (stopp - start,))
+
+            tid += time.perf_counter() - t0
+            antall += stopp - start
+            blokker += 1
+    finally:
+        inn.clear()
+        ut.clear()
+        for shm in minne:
+            shm.close()
+    return ArbeiderStatistikk(pid=os.getpid(), antall=antall, blokker=blokker, tid=tid)
+
+
+class _MinneEier(np.ndarray):
+    """Egen arraytype som base for resultatkolonner i delt minne
+
+    numpy slår sammen base-kjeden for views av samme type, så uten et eget
+    ledd ville views pekt rett på bufferen og ikke holdt eieren i live.
+    """
+
+
+def _overta_minne(shm: shared_memory.SharedMemory, form: Tuple[int, ...]) -> np.ndarray:
+    """
+    Gjør delt minne om til en vanlig array som holder minnet i live
+
+    Navnet fjernes med en gang, så ingen andre prosesser kan åpne minnet.
+    SharedMemory lukkes først når arrayen og alle views av den er slettet.
+    """
+    eier = _MinneEier(form, dtype=float, buffer=shm.buf)
+    weakref.finalize(eier, shm.close)
+    shm.unlink()
+    return eier.view(np.ndarray)
+
+
+class DeltMinneUtforer:
+    """
+    Prosesspool for beregn_batch med inn- og utdata i delt minne
+
+    arbeidere: antall prosesser (standard: alle kjerner)
+    blokkstorrelse: tilfeller per blokk; mindre blokker gir jevnere fordeling,
+        større blokker mindre overhead
+    """
+
+    def __init__(self,
+                 kalkulator: Optional[BaereevneKalkulator] = None,
+                 arbeidere: Optional[int] = None,
+                 blokkstorrelse: int = 65_536,
+                 kontekst: Optional[str] = None):
+        if blokkstorrelse < 1:
+            raise ValueError("blokkstorrelse må være minst 1")
+        self.kalkulator = kalkulator or BaereevneKalkulator()
+        self.arbeidere = arbeidere or mp.cpu_count()
+        self.blokkstorrelse = blokkstorrelse
+        self.rapport: Optional[Gjennomstromning] = None
+
+        ctx = mp.get_context(kontekst)
+        self._teller = ctx.Value('q', 0)
+        self._laas = threading.Lock()
+        self._pool = ProcessPoolExecutor(max_workers=self.arbeidere, mp_context=ctx,
+                                         initializer=_start_arbeider,
+                                         initargs=(self.kalkulator, self._teller))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.lukk()
+
+    def lukk(self):
+        """Stopper arbeidsprosessene"""
+        self._pool.shutdown()
+
+    @staticmethod
+    def _legg_i_minne(verdi: np.ndarray, minne: list) -> _Kolonne:
+        verdi = np.ascontiguousarray(verdi)
+        shm = shared_memory.SharedMemory(create=True, size=max(verdi.nbytes, 1))
+        minne.append(shm)
+        np.ndarray(verdi.shape, dtype=verdi.dtype, buffer=shm.buf)[...] = verdi
+        return _Kolonne(form=verdi.shape, dtype=verdi.dtype.str, minne=shm.name)
+
+    def beregn(self,
+               jord: JordParameter,
+               fundament: FundamentGeometri,
+               belastning: Belastning,
+               terreng: TerrengForhold,
+               felt: Optional[Sequence[str]] = None) -> Dict[str, np.ndarray]:
+        """
+        Som beregn_batch, men fordelt på arbeidsprosessene
+
+        felt begrenser hvilke resultatkolonner som lagres (standard: alle).
+        Kolonnene har den kringkastede formen til inndata og er arrays
+        direkte over det delte minnet arbeiderne skrev i (ingen kopiering).
+        """
+        felt = list(felt) if felt is not None else RESULTATFELT
+        ukjente = set(felt) - set(RESULTATFELT)
+        if ukjente:
+            raise KeyError(f"Ukjente resultatfelt: {', '.join(sorted(ukjente))}")
+
+        start = time.perf_counter()
+        inndata_minne: List[shared_memory.SharedMemory] = []
+        utdata_minne: List[shared_memory.SharedMemory] = []
+
+        with self._laas:
+            try:
+                kolonner = {}
+                for klasse, objekt in zip(INNDATAKLASSER, (jord, fundament, belastning, terreng)):
+                    for f in fields(klasse):
+                        verdi = getattr(objekt, f.name)
+                        if f.name == 'analysetype':
+                            verdi = np.asarray(verdi) == 'effektiv'
+                        elif f.name == 'lengde' and verdi is None:
+                            verdi = np.nan
+                        verdi = np.asarray(verdi, dtype=bool if f.name == 'analysetype' else float)
+                        if verdi.size == 1:
+                            kolonner[f.name] = _Kolonne(form=verdi.shape, dtype=verdi.dtype.str,
+                                                        skalar=verdi.reshape(-1)[0].item())
+                        else:
+                            kolonner[f.name] = self._legg_i_minne(verdi, inndata_minne)
+
+                form = np.broadcast_shapes(*(k.form for k in kolonner.values()))
+                antall = math.prod(form)
+
+                utdata = {}
+                for navn in felt:
+                    shm = shared_memory.SharedMemory(create=True, size=max(antall * 8, 1))
+                    utdata_minne.append(shm)
+                    utdata[navn] = shm.name
+
+                jobb = _Jobb(kolonner=kolonner, form=form, antall=antall,
+                             blokkstorrelse=self.blokkstorrelse, utdata=utdata)
+                self._teller.value = 0
+                oppgaver = [self._pool.submit(_arbeid, jobb) for _ in range(self.arbeidere)]
+                statistikk = [o.result() for o in oppgaver]
+            except BaseException:
+                for shm in utdata_minne:
+                    shm.close()
+                    shm.unlink()
+                raise
+            finally:
+                for shm in inndata_minne:
+                    shm.close()
+                    shm.unlink()
+
+        resultat = {navn: _overta_minne(shm, form) for navn, shm in zip(felt, utdata_minne)}
+
+        self.rapport = Gjennomstromning(
+            antall=antall,
+            tid=time.perf_counter() - start,
+            arbeidere=self.arbeidere,
+            blokkstorrelse=self.blokkstorrelse,
+            per_arbeider=[s for s in statistikk if s.antall]
+        )
+        return resultat
@@ -0,0 +1,122 @@
+"""
+Begrenset mellomlager (LRU) for bæreevnefaktorer
+
+Nq, Nc, skråningsreduksjon og jordtrykkskoeffisienter er rene funksjoner av
+noen få inndata (phi_d, r, beta_s). I et prosjekt går de samme verdiene
+igjen i tusenvis av lasttilfeller, så resultatene kan gjenbrukes.
+"""
+
+import threading
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Callable, Dict, Tuple
+
+class FaktorCache:
+    """
+    LRU-mellomlager med nøkler på kvantiserte inndata
+
+    Tallverdier avrundes til nærmeste multiplum av toleranse før oppslag, slik
+    at inndata som skiller seg mindre enn toleransen deler resultat. Med
+    toleranse=0 brukes eksakte verdier som nøkkel.
+    """
+
+    def __init__(self, maks_antall: int = 4096, toleranse: float = 1e-9):
+        if maks_antall < 1:
+            raise ValueError("maks_antall må være minst 1")
+        if toleranse < 0:
+            raise ValueError("toleranse kan ikke være negativ")
+        self.maks_antall = maks_antall
+        self.toleranse = toleranse
+        self._data: "OrderedDict[Tuple, Any]" = OrderedDict()
+        self._laas = threading.Lock()
+        self.treff = 0
+        self.bom = 0
+        self.utkastinger = 0
+
+    def __getstate__(self):
+        tilstand = self.__dict__.copy()
+        del tilstand['_laas']
+        return tilstand
+
+    def __setstate__(self, tilstand):
+        self.__dict__.update(tilstand)
+        self._laas = threading.Lock()
+
+    def hent(self, navn: str, beregn: Callable[..., Any], args: tuple) -> Any:
+        """
+        Returnerer mellomlagret verdi for (navn, args), eller beregner og lagrer den
+        
+        Inndata som ikke kan brukes som nøkkel (arrays, NaN, uendelig) går
+        direkte til beregningen uten å telle som treff eller bom.
+        """
+        data = self._data
+        toleranse = self.toleranse
+        try:
+            if toleranse > 0:
+                nokkel = (navn, *[a if isinstance(a, str) else round(a / toleranse)
+                                  for a in args])
+            else:
+                nokkel = (navn, *args)
+            verdi = data[nokkel]
+        except KeyError:
+            pass
+        except (TypeError, ValueError, OverflowError):
+            return beregn(*args)
+        else:
+            # Treffveien er uten lås; tellerne er omtrentlige ved samtidige tråder
+            try:
+                data.move_to_end(nokkel)
+            except KeyError:
+                pass
+            self.treff += 1
+            return verdi
+        
+        verdi = beregn(*args)
+        
+        with self._laas:
+            self.bom += 1
+            data[nokkel] = verdi
+            data.move_to_end(nokkel)
+            while len(data) > self.maks_antall:
+                data.popitem(last=False)
+                self.utkastinger += 1
+        return verdi
+
+    def tom(self):
+        """Tømmer mellomlageret og nullstiller tellerne"""
+        with self._laas:
+            self._data.clear()
+            self.treff = 0
+            self.bom = 0
+            self.utkastinger = 0
+
+    def statistikk(self) -> Dict[str, float]:
+        """Treff, bom, utkastinger, antall lagrede verdier og treffrate"""
+        with self._laas:
+            oppslag = self.treff + self.bom
+            return {
+                'treff': self.treff,
+                'bom': self.bom,
+                'utkastinger': self.utkastinger,
+                'antall': len(self._data),
+                'maks_antall': self.maks_antall,
+                'treffrate': self.treff / oppslag if oppslag else 0.0,
+            }
+
+
+def memoisert(navn: str):
+    """
+    Dekoratør for kalkulatormetoder med skalare inndata
+
+    Slår opp i self._faktor_cache når mellomlageret er aktivert. Kall med
+    arrays eller nøkkelordargumenter går direkte til beregningen.
+    """
+    def dekorator(metode):
+        @wraps(metode)
+        def innpakket(self, *args, **kwargs):
+            cache = self._faktor_cache
+            if cache is None or kwargs:
+                return metode(self, *args, **kwargs)
+            return cache.hent(navn, metode.__get__(self), args)
+        return innpakket
+    return dekorator
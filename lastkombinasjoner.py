@@ -0,0 +1,404 @@
+"""
+Lastkombinering iht. NS-EN 1990 / NS-EN 1997-1 (Eurokode 0 og 7)
+
+Genererer dimensjonerende lastkombinasjoner fra karakteristiske laster,
+evaluerer dem i blokker med BaereevneKalkulator.beregn_batch og finner den
+styrende kombinasjonen (største q/s) samt en topp-N rangering.
+
+Kombinasjonene materialiseres aldri samlet. Søket går dybde-først gjennom
+valgene (gunstig/ugunstig permanent last, ledende og medvirkende variable
+laster) og evaluerer alle kombinasjonene i blokker. Beskjæring av grener
+finnes som opt-in, men er ikke konservativ og skal ikke brukes i kontroll.
+
+Referanser:
+- NS-EN 1990:2002+NA:2016, tabell NA.A1(2)
+- NS-EN 1997-1:2004+NA:2008, pkt. 2.4.7.3
+"""
+
+import heapq
+import itertools
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from calculator import BaereevneKalkulator
+from models import (JordParameter, FundamentGeometri, Belastning,
+                   TerrengForhold, Resultat, KarakteristiskLast)
+
+
+# Lastkomponentene i samme rekkefølge som kolonnene i lastvektorene
+KOMPONENTER = ('vertikal', 'horisontal_B', 'horisontal_L', 'moment_B', 'moment_L')
+
+
+@dataclass(frozen=True)
+class Faktorsett:
+    """Partialfaktorer for én kombinasjonsregel"""
+    navn: str
+    gamma_G_sup: float  # ugunstig permanent last
+    gamma_G_inf: float  # gunstig permanent last
+    gamma_Q: float  # variabel last
+    ledende: bool  # True: én ledende variabel last (6.10b), False: alle med psi0 (6.10a)
+    ulykke: bool = False  # ulykkeskombinasjon (6.11)
+
+
+FAKTORSETT = {
+    '6.10a': Faktorsett('STR/GEO (6.10a)', 1.35, 1.0, 1.5, ledende=False),
+    '6.10b': Faktorsett('STR/GEO (6.10b)', 1.2, 1.0, 1.5, ledende=True),
+    'C': Faktorsett('GEO sett C', 1.0, 1.0, 1.3, ledende=True),
+    'ulykke': Faktorsett('Ulykke (6.11)', 1.0, 1.0, 1.0, ledende=True, ulykke=True),
+}
+
+
+@dataclass
+class Lastkombinasjon:
+    """Én dimensjonerende lastkombinasjon med resultat"""
+    navn: str
+    faktorsett: str
+    ledende: Optional[str]
+    faktorer: Dict[str, float]
+    belastning: Belastning
+    resultat: Resultat
+
+
+@dataclass
+class KombinasjonsAnalyse:
+    """Resultat av søket etter styrende lastkombinasjon"""
+    styrende: Lastkombinasjon
+    rangering: List[Lastkombinasjon]
+    antall_mulige: int  # kombinasjoner uten beskjæring
+    antall_evaluert: int  # fullstendige kombinasjoner beregnet
+    antall_beskaaret: int  # grener forkastet før full evaluering
+
+
+@dataclass
+class _Blokk:
+    """Kombinasjoner for ett faktorsett og én ledende last"""
+    faktorsett: str
+    ledende: Optional[str]
+    ulykke: Optional[str]
+    base: np.ndarray  # lastvirkning fra faste bidrag
+    base_faktorer: Dict[str, float]
+    virkning: List[np.ndarray] = field(default_factory=list)  # per enhet: (tilstander, 5)
+    faktorer: List[List[Dict[str, float]]] = field(default_factory=list)
+    lav: Optional[np.ndarray] = None  # restboks, nedre grense fra dybde d
+    hoy: Optional[np.ndarray] = None  # restboks, øvre grense fra dybde d
+    rest: Optional[List[int]] = None  # antall kombinasjoner under en node på dybde d
+
+    def ferdigstill(self):
+        """Sorterer enhetene etter spredning og bygger restboksene"""
+        spredning = [np.abs(v.max(axis=0) - v.min(axis=0)).sum() for v in self.virkning]
+        rekkefolge = np.argsort(spredning)[::-1]
+        self.virkning = [self.virkning[i] for i in rekkefolge]
+        self.faktorer = [self.faktorer[i] for i in rekkefolge]
+
+        n = len(self.virkning)
+        self.lav = np.zeros((n + 1, len(KOMPONENTER)))
+        self.hoy = np.zeros((n + 1, len(KOMPONENTER)))
+        self.rest = [1] * (n + 1)
+        for d in range(n - 1, -1, -1):
+            self.lav[d] = self.lav[d + 1] + self.virkning[d].min(axis=0)
+            self.hoy[d] = self.hoy[d + 1] + self.virkning[d].max(axis=0)
+            self.rest[d] = self.rest[d + 1] * len(self.virkning[d])
+
+    def antall(self) -> int:
+        return self.rest[0]
+
+
+def _komponenter(last: KarakteristiskLast) -> np.ndarray:
+    return np.array([getattr(last, k) for k in KOMPONENTER], dtype=float)
+
+
+def _grupper(laster: Sequence[KarakteristiskLast]) -> List[List[KarakteristiskLast]]:
+    """Grupperer laster etter gruppe-feltet; laster uten gruppe står alene"""
+    grupper: Dict[str, List[KarakteristiskLast]] = {}
+    resultat = []
+    for last in laster:
+        if last.gruppe is None:
+            resultat.append([last])
+        elif last.gruppe in grupper:
+            grupper[last.gruppe].append(last)
+        else:
+            grupper[last.gruppe] = [last]
+            resultat.append(grupper[last.gruppe])
+    return resultat
+
+
+class KombinasjonsGenerator:
+    """
+    Bygger dimensjonerende lastkombinasjoner fra karakteristiske laster
+
+    - Permanente laster med samme gruppe regnes fra samme kilde og får
+      felles faktor (gunstig eller ugunstig).
+    - Variable laster med samme gruppe er gjensidig utelukkende
+      (f.eks. vind fra ulike retninger).
+    - Ulykkeslaster tas med én om gangen i ulykkeskombinasjonen.
+
+    Medvirkende laster med psi = 0 gir samme kombinasjon som fravær og
+    genereres ikke.
+    """
+
+    def __init__(self,
+                 laster: Sequence[KarakteristiskLast],
+                 faktorsett: Optional[Sequence[str]] = None):
+        ukjente = {l.kategori for l in laster} - {'permanent', 'variabel', 'ulykke'}
+        if ukjente:
+            raise ValueError(f"Ukjent lastkategori: {', '.join(sorted(ukjente))}")
+
+        self.laster = list(laster)
+        self._etter_navn = {l.navn: l for l in self.laster}
+        if len(self._etter_navn) != len(self.laster):
+            raise ValueError("Lastnavn må være unike")
+        permanente = [l for l in laster if l.kategori == 'permanent']
+        variable = [l for l in laster if l.kategori == 'variabel']
+        ulykker = [l for l in laster if l.kategori == 'ulykke']
+
+        if faktorsett is None:
+            faktorsett = ['6.10a', '6.10b'] + (['ulykke'] if ulykker else [])
+
+        self.blokker: List[_Blokk] = []
+        for nokkel in faktorsett:
+            sett = FAKTORSETT[nokkel]
+            if sett.ulykke:
+                for ulykke in ulykker:
+                    for ledende in variable + [None]:
+                        self._legg_til_blokk(nokkel, sett, permanente, variable, ledende, ulykke)
+            elif sett.ledende and variable:
+                for ledende in variable:
+                    self._legg_til_blokk(nokkel, sett, permanente, variable, ledende, None)
+            else:
+                self._legg_til_blokk(nokkel, sett, permanente, variable, None, None)
+
+    def _legg_til_blokk(self, nokkel, sett, permanente, variable, ledende, ulykke):
+        blokk = _Blokk(
+            faktorsett=nokkel,
+            ledende=ledende.navn if ledende is not None else None,
+            ulykke=ulykke.navn if ulykke is not None else None,
+            base=np.zeros(len(KOMPONENTER)),
+            base_faktorer={}
+        )
+
+        def legg_til(tilstander: List[Dict[str, float]]):
+            """Legger til en valgenhet, eller et fast bidrag hvis bare ett valg"""
+            virkning = np.array([
+                sum((f * _komponenter(self._last(n)) for n, f in t.items()),
+                    np.zeros(len(KOMPONENTER)))
+                for t in tilstander
+            ])
+            if len(tilstander) == 1:
+                blokk.base += virkning[0]
+                blokk.base_faktorer.update(tilstander[0])
+            else:
+                blokk.virkning.append(virkning)
+                blokk.faktorer.append(tilstander)
+
+        # Permanente laster: ugunstig eller gunstig per kilde
+        for gruppe in _grupper(permanente):
+            faktorer = sorted({sett.gamma_G_sup, sett.gamma_G_inf}, reverse=True)
+            legg_til([{l.navn: f for l in gruppe} for f in faktorer])
+
+        # Ulykkeslast med faktor 1.0
+        if ulykke is not None:
+            legg_til([{ulykke.navn: 1.0}])
+
+        # Variable laster: ledende, medvirkende eller fraværende
+        for gruppe in _grupper(variable):
+            if ledende is not None and ledende in gruppe:
+                psi = ledende.psi1 if sett.ulykke else 1.0
+                legg_til([{ledende.navn: sett.gamma_Q * psi}])
+                continue
+            tilstander = [{}]
+            for last in gruppe:
+                if sett.ulykke:
+                    psi = last.psi2
+                else:
+                    psi = last.psi0
+                if psi > 0:
+                    tilstander.append({last.navn: sett.gamma_Q * psi})
+            legg_til(tilstander)
+
+        blokk.ferdigstill()
+        self.blokker.append(blokk)
+
+    def _last(self, navn: str) -> KarakteristiskLast:
+        return self._etter_navn[navn]
+
+    def antall(self) -> int:
+        """Antall kombinasjoner uten beskjæring"""
+        return sum(b.antall() for b in self.blokker)
+
+    def __iter__(self) -> Iterator[Tuple[str, Optional[str], Dict[str, float]]]:
+        """Itererer lat over alle kombinasjoner som (faktorsett, ledende, faktorer)"""
+        for blokk in self.blokker:
+            for valg in itertools.product(*blokk.faktorer):
+                faktorer = dict(blokk.base_faktorer)
+                for tilstand in valg:
+                    faktorer.update(tilstand)
+                yield blokk.faktorsett, blokk.ledende, faktorer
+
+
+def kombinasjonsnavn(faktorsett: str, faktorer: Dict[str, float], ledende: Optional[str]) -> str:
+    """Lesbar beskrivelse, f.eks. '6.10b: 1.20·G + 1.50·Q_snø (ledende)'"""
+    ledd = []
+    for navn, faktor in faktorer.items():
+        if faktor == 0:
+            continue
+        tekst = f"{faktor:.2f}·{navn}"
+        if navn == ledende:
+            tekst += " (ledende)"
+        ledd.append(tekst)
+    return f"{faktorsett}: " + (" + ".join(ledd) if ledd else "0")
+
+
+def finn_styrende_kombinasjon(kalkulator: BaereevneKalkulator,
+                              jord: JordParameter,
+                              fundament: FundamentGeometri,
+                              terreng: TerrengForhold,
+                              laster: Sequence[KarakteristiskLast],
+                              centeravvik_B: float = 0.0,
+                              centeravvik_L: float = 0.0,
+                              faktorsett: Optional[Sequence[str]] = None,
+                              topp_n: int = 10,
+                              beskjaering: bool = False,
+                              blokkstorrelse: int = 4096) -> KombinasjonsAnalyse:
+    """
+    Finner lastkombinasjonen med størst utnyttelsesgrad q/s
+
+    Søket går dybde-først gjennom valgene i hver kombinasjonsblokk og er
+    som standard uttømmende. For en delvis fastlagt kombinasjon spenner de
+    gjenstående valgene ut en boks i (V, H_B, H_L, M_B, M_L); med
+    beskjaering=True beregnes q/s i boksens 32 hjørner som skranke, og
+    grenen forkastes hvis skranken er lavere enn den N-te beste fullstendige
+    kombinasjonen. Det er ingen sikker skranke: q/s kan ha maksimum inne i
+    boksen (f.eks. langs V ved eksentrisk eller skrå last), og da kan den
+    styrende kombinasjonen forkastes uten varsel. Bruk den bare til grov
+    sortering, aldri til kontroll av bæreevne.
+    """
+    if topp_n < 1:
+        raise ValueError("topp_n må være minst 1")
+
+    generator = KombinasjonsGenerator(laster, faktorsett)
+    if not generator.blokker:
+        raise ValueError("Ingen lastkombinasjoner å evaluere")
+
+    def utnyttelse(laster_: np.ndarray) -> np.ndarray:
+        kolonner = [laster_[..., i] for i in range(len(KOMPONENTER))]
+        belastning = Belastning(*kolonner, centeravvik_B, centeravvik_L)
+        return kalkulator.beregn_batch(jord, fundament, belastning, terreng)['utnyttelsesgrad']
+
+    # Hjørnene i en 5D-boks som 0/1-valg mellom nedre og øvre grense
+    hjorner = np.array(list(itertools.product((0, 1), repeat=len(KOMPONENTER))), dtype=bool)
+    # H_L og M_L påvirker ikke stripefundamenter
+    relevante = np.array([True, True, fundament.lengde is not None,
+                          True, fundament.lengde is not None])
+
+    # Stakkelement: (skranke, blokk-indeks, dybde, lastsum, sti)
+    # Stien er en lenket liste (tilstand, forelder) for billig forlengelse
+    stakk = [(np.inf, b, 0, blokk.base.copy(), None) for b, blokk in enumerate(generator.blokker)]
+    beste: List[Tuple[float, int, int, object, np.ndarray]] = []
+    teller = itertools.count()
+    antall_evaluert = 0
+    antall_beskaaret = 0
+
+    def terskel() -> float:
+        return beste[0][0] if len(beste) >= topp_n else -np.inf
+
+    while stakk:
+        # Hent noder fra toppen til barna fyller omtrent én beregningsblokk
+        noder = []
+        antall_barn = 0
+        while stakk and antall_barn < blokkstorrelse:
+            node = stakk.pop()
+            if node[0] < terskel():
+                antall_beskaaret += 1
+                continue
+            blokk = generator.blokker[node[1]]
+            antall_barn += len(blokk.virkning[node[2]]) if node[2] < len(blokk.virkning) else 1
+            noder.append(node)
+        if not noder:
+            continue
+
+        blader = []  # (blokk-indeks, sti, lastsum)
+        indre = []  # (blokk-indeks, dybde, lastsum, sti)
+        for _, b, d, lastsum, sti in noder:
+            blokk = generator.blokker[b]
+            if d == len(blokk.virkning):
+                blader.append((b, sti, lastsum))
+                continue
+            for tilstand, virkning in enumerate(blokk.virkning[d]):
+                barn = (b, d + 1, lastsum + virkning, (tilstand, sti))
+                if d + 1 == len(blokk.virkning):
+                    blader.append((barn[0], barn[3], barn[2]))
+                else:
+                    indre.append(barn)
+
+        # Fullstendige kombinasjoner beregnes eksakt
+        if blader:
+            verdier = utnyttelse(np.array([lastsum for _, _, lastsum in blader]))
+            antall_evaluert += len(blader)
+            for (b, sti, lastsum), u in zip(blader, verdier):
+                element = (float(u), next(teller), b, sti, lastsum)
+                if len(beste) < topp_n:
+                    heapq.heappush(beste, element)
+                elif element[0] > beste[0][0]:
+                    heapq.heapreplace(beste, element)
+
+        if not indre:
+            continue
+
+        if beskjaering:
+            lav = np.array([generator.blokker[b].lav[d] + s for b, d, s, _ in indre])
+            hoy = np.array([generator.blokker[b].hoy[d] + s for b, d, s, _ in indre])
+            # Bare komponenter som faktisk varierer gir ulike hjørner
+            aktive = np.any(hoy > lav, axis=0) & relevante
+            valgte = hjorner[:2 ** int(aktive.sum())]
+            valg = np.zeros((len(valgte), len(KOMPONENTER)), dtype=bool)
+            valg[:, aktive] = valgte[:, len(KOMPONENTER) - int(aktive.sum()):]
+            # Små undertrær er billigere å regne ut fullt enn å begrense
+            store = np.array([generator.blokker[b].rest[d] > len(valg) for b, d, _, _ in indre])
+            skranker = np.full(len(indre), np.inf)
+            if store.any():
+                boks = np.where(valg[None, :, :], hoy[store, None, :], lav[store, None, :])
+                skranker[store] = utnyttelse(boks).max(axis=1)
+        else:
+            skranker = np.full(len(indre), np.inf)
+
+        # Lavest skranke nederst slik at lovende grener utforskes først
+        for i in np.argsort(skranker, kind='stable'):
+            if skranker[i] < terskel():
+                antall_beskaaret += 1
+                continue
+            b, d, lastsum, sti = indre[i]
+            stakk.append((skranker[i], b, d, lastsum, sti))
+
+    rangering = []
+    for _, _, b, sti, lastsum in sorted(beste, reverse=True):
+        blokk = generator.blokker[b]
+        valg = []
+        while sti is not None:
+            valg.append(sti[0])
+            sti = sti[1]
+        valg.reverse()
+
+        faktorer = dict(blokk.base_faktorer)
+        for enhet, tilstand in enumerate(valg):
+            faktorer.update(blokk.faktorer[enhet][tilstand])
+        faktorer = {l.navn: faktorer[l.navn] for l in generator.laster if l.navn in faktorer}
+
+        belastning = Belastning(*(float(v) for v in lastsum), centeravvik_B, centeravvik_L)
+        rangering.append(Lastkombinasjon(
+            navn=kombinasjonsnavn(blokk.faktorsett, faktorer, blokk.ledende),
+            faktorsett=blokk.faktorsett,
+            ledende=blokk.ledende,
+            faktorer=faktorer,
+            belastning=belastning,
+            resultat=kalkulator.beregn(jord, fundament, belastning, terreng)
+        ))
+
+    return KombinasjonsAnalyse(
+        styrende=rangering[0],
+        rangering=rangering,
+        antall_mulige=generator.antall(),
+        antall_evaluert=antall_evaluert,
+        antall_beskaaret=antall_beskaaret
+    )
@@ -0,0 +1,234 @@
+"""
+Lasttest for tjeneste.py
+
+Sender forespørsler fra et antall samtidige klienter (én keep-alive-
+forbindelse hver) og rapporterer p50/p99-svartid, forespørsler per
+sekund og gjennomsnittlig mikrobatch-størrelse fra /helse. Svar 503
+(tjenesten er full) prøves på nytt etter Retry-After og telles for seg,
+utenom svartidene.
+
+    python lasttest.py --start --samtidige 64 --antall 5000
+    python lasttest.py --url http://127.0.0.1:8765 --endepunkt batch --rader 1000
+
+Kun standardbiblioteket. Tilfellene varieres tilfeldig rundt et
+eksempelfundament, så hvert svar er en reell beregning.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+
+EKSEMPEL = {
+    'analysetype': 'effektiv',
+    'friksjonsvinkel': 33.0,
+    'materialfaktor': 1.4,
+    'romvekt_eff': 9.0,
+    'attraksjon': 5.0,
+    'bredde': 2.0,
+    'tykkelse': 0.5,
+    'romvekt': 25.0,
+    'vertikal': 300.0,
+    'horisontal_B': 40.0,
+    'moment_B': 20.0,
+    'fundamentdybde': 1.0,
+    'romvekt_over': 18.0,
+}
+
+
+def tilfeldig_tilfelle(rng: random.Random) -> Dict[str, object]:
+    rad = dict(EKSEMPEL)
+    rad['friksjonsvinkel'] = rng.uniform(25.0, 40.0)
+    rad['bredde'] = rng.uniform(1.0, 4.0)
+    rad['vertikal'] = rng.uniform(100.0, 800.0)
+    rad['horisontal_B'] = rng.uniform(0.0, 80.0)
+    return rad
+
+
+class Klient:
+    """Minimal HTTP/1.1-klient over én keep-alive-forbindelse"""
+
+    def __init__(self, vert: str, port: int):
+        self.vert = vert
+        self.port = port
+        self._leser: Optional[asyncio.StreamReader] = None
+        self._skriver: Optional[asyncio.StreamWriter] = None
+        self.vent_for_nytt_forsok: Optional[float] = None  # Retry-After i siste svar [s]
+
+    async def koble_til(self):
+        self._leser, self._skriver = await asyncio.open_connection(self.vert, self.port)
+
+    async def lukk(self):
+        if self._skriver is not None:
+            self._skriver.close()
+
+    async def send(self, metode: str, sti: str, data=None) -> Tuple[int, bytes]:
+        if self._skriver is None:
+            await self.koble_til()
+        kropp = json.dumps(data).encode('utf-8') if data is not None else b''
+        self._skriver.write((f"{metode} {sti} HTTP/1.1\r\nHost: {self.vert}\r\n"
+                             f"Content-Type: application/json\r\nContent-Length: {len(kropp)}\r\n\r\n"
+                             ).encode('latin-1') + kropp)
+        await self._skriver.drain()
+
+        status = int((await self._leser.readline()).split()[1])
+        lengde, lukkes = 0, False
+        self.vent_for_nytt_forsok = None
+        while True:
+            linje = await self._leser.readline()
+            if linje in (b'\r\n', b''):
+                break
+            navn, _, verdi = linje.decode('latin-1').partition(':')
+            navn = navn.strip().lower()
+            if navn == 'content-length':
+                lengde = int(verdi)
+            elif navn == 'connection' and verdi.strip().lower() == 'close':
+                lukkes = True
+            elif navn == 'retry-after':
+                try:
+                    self.vent_for_nytt_forsok = float(verdi)
+                except ValueError:  # HTTP-dato; behandles som uten verdi
+                    pass
+        svar = await self._leser.readexactly(lengde)
+        if lukkes:
+            await self.lukk()
+            self._skriver = None
+        return status, svar
+
+
+def persentil(sortert: List[float], p: float) -> float:
+    if not sortert:
+        return float('nan')
+    return sortert[min(len(sortert) - 1, int(round(p / 100 * (len(sortert) - 1))))]
+
+
+async def last(vert: str, port: int, endepunkt: str, samtidige: int, antall: int,
+               rader: int, seed: int, maks_forsok: int = 20) -> Dict[str, object]:
+    rng = random.Random(seed)
+    spredning = random.Random(seed + 1)  # egen strøm, så tilfellene ikke avhenger av 503-ene
+    if endepunkt == 'beregn':
+        lag = lambda: tilfeldig_tilfelle(rng)
+    elif endepunkt == 'batch':
+        lag = lambda: {'rader': [tilfeldig_tilfelle(rng) for _ in range(rader)]}
+    else:
+        lag = lambda: {'prosjekt': {'prosjektnavn': 'Lasttest'}, 'inndata': tilfeldig_tilfelle(rng)}
+
+    svartider: List[float] = []
+    statuser: Dict[int, int] = {}
+    avvist = [0]
+    igjen = [antall]
+
+    async def klient():
+        forbindelse = Klient(vert, port)
+        try:
+            while igjen[0] > 0:
+                igjen[0] -= 1
+                data = lag()
+                for forsok in range(1, maks_forsok + 1):
+                    t0 = time.perf_counter()
+                    status, _ = await forbindelse.send('POST', '/' + endepunkt, data)
+                    svartid = time.perf_counter() - t0
+                    if status != 503 or forsok == maks_forsok:
+                        break
+                    # Tjenesten er full: vent minst Retry-After, med spredning så
+                    # de avviste klientene ikke kommer tilbake samtidig
+                    avvist[0] += 1
+                    vent = forbindelse.vent_for_nytt_forsok or 1.0
+                    await asyncio.sleep(vent * (1.0 + 0.5 * spredning.random()))
+                if status != 503:
+                    svartider.append(svartid)
+                statuser[status] = statuser.get(status, 0) + 1
+        finally:
+            await forbindelse.lukk()
+
+    helse = Klient(vert, port)
+    _, for_ = await helse.send('GET', '/helse')
+    t0 = time.perf_counter()
+    await asyncio.gather(*(klient() for _ in range(samtidige)))
+    tid = time.perf_counter() - t0
+    _, etter = await helse.send('GET', '/helse')
+    await helse.lukk()
+
+    for_, etter = json.loads(for_)['statistikk'], json.loads(etter)['statistikk']
+    batcher = etter['mikrobatcher'] - for_['mikrobatcher']
+    enkelt = etter['enkeltberegninger'] - for_['enkeltberegninger']
+    svartider.sort()
+    return {
+        'antall': len(svartider),
+        'tid': tid,
+        'per_sekund': len(svartider) / tid if tid > 0 else float('inf'),
+        'avvist': avvist[0],
+        'p50': persentil(svartider, 50),
+        'p99': persentil(svartider, 99),
+        'maks': svartider[-1] if svartider else float('nan'),
+        'statuser': statuser,
+        'snitt_batch': enkelt / batcher if batcher else float('nan'),
+    }
+
+
+async def vent_paa_tjeneste(vert: str, port: int, tidsavbrudd: float = 30.0):
+    frist = time.monotonic() + tidsavbrudd
+    while True:
+        try:
+            _, skriver = await asyncio.open_connection(vert, port)
+            skriver.close()
+            return
+        except OSError:
+            if time.monotonic() > frist:
+                raise
+            await asyncio.sleep(0.1)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Lasttest for bæreevnetjenesten")
+    parser.add_argument('--url', default='http://127.0.0.1:8765')
+    parser.add_argument('--endepunkt', choices=['beregn', 'batch', 'rapport'], default='beregn')
+    parser.add_argument('--samtidige', type=int, default=64, help="Samtidige klienter")
+    parser.add_argument('--antall', type=int, default=5000, help="Forespørsler totalt")
+    parser.add_argument('--rader', type=int, default=1000, help="Rader per /batch-forespørsel")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--maks-forsok', type=int, default=20,
+                        help="Forsøk per forespørsel når tjenesten svarer 503")
+    parser.add_argument('--start', action='store_true',
+                        help="Start tjeneste.py som underprosess på porten i --url")
+    parser.add_argument('--vindu-ms', type=float, default=2.0, help="Sendes til tjenesten med --start")
+    args = parser.parse_args(argv)
+
+    deler = urlsplit(args.url)
+    vert, port = deler.hostname or '127.0.0.1', deler.port or 8765
+
+    prosess = None
+    if args.start:
+        prosess = subprocess.Popen([sys.executable, str(Path(__file__).with_name('tjeneste.py')),
+                                    '--vert', vert, '--port', str(port), '--vindu-ms', str(args.vindu_ms)])
+    try:
+        asyncio.run(vent_paa_tjeneste(vert, port))
+        svar = asyncio.run(last(vert, port, args.endepunkt, args.samtidige, args.antall,
+                                args.rader, args.seed, args.maks_forsok))
+    finally:
+        if prosess is not None:
+            prosess.terminate()
+            prosess.wait()
+
+    print(f"Endepunkt:          /{args.endepunkt} ({args.samtidige} samtidige)")
+    print(f"Forespørsler:       {svar['antall']} på {svar['tid']:.2f} s")
+    print(f"Forespørsler/s:     {svar['per_sekund']:,.0f}")
+    print(f"Svartid p50:        {svar['p50'] * 1000:.2f} ms")
+    print(f"Svartid p99:        {svar['p99'] * 1000:.2f} ms")
+    print(f"Svartid maks:       {svar['maks'] * 1000:.2f} ms")
+    print(f"Statuskoder:        {', '.join(f'{k}: {v}' for k, v in sorted(svar['statuser'].items()))}")
+    print(f"Avvist (503):       {svar['avvist']} forsøk, prøvd på nytt etter Retry-After")
+    if args.endepunkt == 'beregn':
+        print(f"Snitt mikrobatch:   {svar['snitt_batch']:.1f} tilfeller")
+    return 0 if set(svar['statuser']) <= {200} else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
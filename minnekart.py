@@ -0,0 +1,207 @@
+"""
+Beregning med minnekartlagte (memory-mapped) kolonnefiler
+
+For parameterstudier der inn- eller utdata er større enn minnet. Hver
+inndatakolonne er en .npy-fil eller en rå binærfil (float64), og hvert
+resultatfelt skrives til en egen .npy-fil i utmappen. Beregningen går
+blokk for blokk, og bare blokken som beregnes er kartlagt i minnet, så
+minnebruken er den samme uansett antall tilfeller.
+
+Fullførte blokker registreres i utmappen. Etter et avbrudd fortsetter en
+ny kjøring med gjenoppta=True der den slapp.
+
+    resultat = beregn_minnekart(kalkulator, {
+        'bredde': 'sweep/B.npy',
+        'friksjonsvinkel': 'sweep/phi.npy',
+        'vertikal': 'sweep/V.f64',
+        'analysetype': 'effektiv',
+        ...
+    }, 'resultater/')
+"""
+
+import json
+from dataclasses import fields
+from pathlib import Path
+from typing import Callable, Dict, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from models import Resultat, INNDATAKLASSER
+from calculator import BaereevneKalkulator
+
+
+RESULTATFELT = [f.name for f in fields(Resultat)]
+INNDATAFELT = [f.name for klasse in INNDATAKLASSER for f in fields(klasse)]
+
+MANIFEST = 'manifest.json'
+FULLFORT = 'fullfort.npy'
+
+
+def _npy_hode(sti: Path) -> Tuple[Tuple[int, ...], np.dtype, int]:
+    """Form, dtype og dataoffset fra hodet i en .npy-fil"""
+    with open(sti, 'rb') as f:
+        versjon = np.lib.format.read_magic(f)
+        if versjon == (1, 0):
+            form, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            form, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+        return form, dtype, f.tell()
+
+
+class _Kolonnefil:
+    """Kolonne i en .npy- eller rå binærfil som kartlegges blokkvis"""
+
+    def __init__(self, sti: Path, raa_dtype: str):
+        self.sti = sti
+        if sti.suffix.lower() == '.npy':
+            form, dtype, self.offset = _npy_hode(sti)
+            if len(form) != 1:
+                raise ValueError(f"{sti}: forventet 1-dimensjonal kolonne, fikk form {form}")
+            self.dtype = dtype
+            self.antall = form[0]
+        else:
+            self.dtype = np.dtype(raa_dtype)
+            self.offset = 0
+            self.antall = sti.stat().st_size // self.dtype.itemsize
+
+    def les(self, start: int, stopp: int) -> np.ndarray:
+        """Kopi av elementene [start, stopp)"""
+        kart = np.memmap(self.sti, dtype=self.dtype, mode='r',
+                         offset=self.offset + start * self.dtype.itemsize, shape=(stopp - start,))
+        verdier = np.array(kart)
+        del kart
+        return verdier
+
+    def beskrivelse(self) -> Dict[str, object]:
+        """Identifiserer filen, for å oppdage endrede inndata ved gjenopptak"""
+        status = self.sti.stat()
+        return {'sti': str(self.sti.resolve()), 'storrelse': status.st_size,
+                'endret': status.st_mtime_ns}
+
+
+def _opprett_utfil(sti: Path, antall: int) -> int:
+    """Lager en .npy-fil med plass til antall float64 og returnerer dataoffset"""
+    kart = np.lib.format.open_memmap(sti, mode='w+', dtype=np.float64, shape=(antall,))
+    offset = kart.offset
+    del kart
+    return offset
+
+
+def beregn_minnekart(kalkulator: BaereevneKalkulator,
+                     inndata: Dict[str, Union[str, Path, float, np.ndarray]],
+                     utmappe: Union[str, Path],
+                     blokkstorrelse: int = 1_000_000,
+                     felt: Optional[Sequence[str]] = None,
+                     gjenoppta: bool = True,
+                     raa_dtype: str = '<f8',
+                     fremdrift: Optional[Callable[[int, int], None]] = None
+                     ) -> Dict[str, np.memmap]:
+    """
+    Beregner alle tilfeller i kolonnefilene blokk for blokk
+
+    inndata: feltnavn -> filsti (.npy eller rå binær med raa_dtype) eller
+        fast verdi for alle tilfeller. analysetype kan være tekst, eller en
+        fil med tekst eller bool/heltall (sann = 'effektiv'). lengde = NaN
+        betyr stripefundament.
+    felt: resultatfelt som skal lagres (standard: alle i Resultat)
+    gjenoppta: hopper over blokker som er fullført i utmappen fra en
+        tidligere kjøring med samme inndata; ellers startes på nytt
+
+    fremdrift kalles med (fullførte blokker, antall blokker).
+    Returnerer resultatkolonnene som skrivebeskyttede np.memmap.
+    """
+    if blokkstorrelse < 1:
+        raise ValueError("blokkstorrelse må være minst 1")
+    felt = list(felt) if felt is not None else RESULTATFELT
+    ukjente = (set(felt) - set(RESULTATFELT)) | (set(inndata) - set(INNDATAFELT))
+    if ukjente:
+        raise KeyError(f"Ukjente felt: {', '.join(sorted(ukjente))}")
+    mangler = set(INNDATAFELT) - set(inndata)
+    if mangler:
+        raise KeyError(f"Mangler inndata for: {', '.join(sorted(mangler))}")
+
+    filer: Dict[str, _Kolonnefil] = {}
+    faste: Dict[str, object] = {}
+    for navn, verdi in inndata.items():
+        if isinstance(verdi, (str, Path)) and not (navn == 'analysetype' and
+                                                   verdi in ('effektiv', 'udrenert')):
+            filer[navn] = _Kolonnefil(Path(verdi), raa_dtype)
+        else:
+            faste[navn] = verdi
+
+    lengder = {kol.antall for kol in filer.values()}
+    if len(lengder) > 1:
+        raise ValueError("Kolonnefilene har ulik lengde: " +
+                         ", ".join(f"{n}={k.antall}" for n, k in filer.items()))
+    antall = lengder.pop() if lengder else 1
+    n_blokker = -(-antall // blokkstorrelse)
+
+    utmappe = Path(utmappe)
+    utmappe.mkdir(parents=True, exist_ok=True)
+    manifest = json.dumps({
+        'antall': antall,
+        'blokkstorrelse': blokkstorrelse,
+        'felt': felt,
+        'filer': {navn: kol.beskrivelse() for navn, kol in filer.items()},
+        'faste': {navn: np.asarray(v).tolist() for navn, v in faste.items()},
+    }, indent=2)
+
+    manifest_sti = utmappe / MANIFEST
+    fullfort_sti = utmappe / FULLFORT
+    kan_gjenoppta = (gjenoppta and manifest_sti.exists() and fullfort_sti.exists()
+                     and manifest_sti.read_text(encoding='utf-8') == manifest
+                     and all((utmappe / f"{navn}.npy").exists() for navn in felt))
+
+    if kan_gjenoppta:
+        offset = {navn: _npy_hode(utmappe / f"{navn}.npy")[2] for navn in felt}
+        fullfort = np.lib.format.open_memmap(fullfort_sti, mode='r+')
+    else:
+        offset = {navn: _opprett_utfil(utmappe / f"{navn}.npy", antall) for navn in felt}
+        fullfort = np.lib.format.open_memmap(fullfort_sti, mode='w+', dtype=np.uint8,
+                                             shape=(n_blokker,))
+        fullfort.flush()
+        manifest_sti.write_text(manifest, encoding='utf-8')
+
+    try:
+        for blokk in range(n_blokker):
+            if fullfort[blokk]:
+                continue
+            start = blokk * blokkstorrelse
+            stopp = min(start + blokkstorrelse, antall)
+
+            verdier = dict(faste)
+            for navn, kol in filer.items():
+                verdier[navn] = kol.les(start, stopp)
+            type_ = np.asarray(verdier['analysetype'])
+            if type_.dtype.kind in 'biuf':
+                verdier['analysetype'] = np.where(type_ != 0, 'effektiv', 'udrenert')
+            if np.ndim(verdier['lengde']) == 0 and verdier['lengde'] is not None \
+                    and np.isnan(verdier['lengde']):
+                verdier['lengde'] = None
+
+            res = kalkulator.beregn_batch(
+                *(klasse(**{f.name: verdier[f.name] for f in fields(klasse)})
+                  for klasse in INNDATAKLASSER))
+
+            # Resultatene skrives og synkes før blokken merkes som fullført
+            for navn in felt:
+                kart = np.memmap(utmappe / f"{navn}.npy", dtype=np.float64, mode='r+',
+                                 offset=offset[navn] + start * 8, shape=(stopp - start,))
+                kart[:] = np.broadcast_to(res[navn], (stopp - start,))
+                kart.flush()
+                del kart
+            fullfort[blokk] = 1
+            fullfort.flush()
+
+            if fremdrift is not None:
+                fremdrift(int(np.count_nonzero(fullfort)), n_blokker)
+    finally:
+        del fullfort
+
+    return {navn: np.load(utmappe / f"{navn}.npy", mmap_mode='r') for navn in felt}
+
+
+def er_fullfort(utmappe: Union[str, Path]) -> Tuple[int, int]:
+    """(fullførte blokker, antall blokker) for en utmappe"""
+    fullfort = np.load(Path(utmappe) / FULLFORT, mmap_mode='r')
+    return int(np.count_nonzero(fullfort)), fullfort.size
@@ -1,13 +1,18 @@
 """
 Datamodeller for bæreevneberegning
 """
-from dataclasses import dataclass
-from typing import Optional
+import hashlib
+import json
+from dataclasses import dataclass, fields, is_dataclass, replace
+from typing import Dict, Optional, Tuple
 
 
 @dataclass
 class JordParameter:
     """Jordparametre for geoteknisk beregning"""
+    __slots__ = ('analysetype', 'friksjonsvinkel', 'udrenert_skjaerstyrke',
+                 'romvekt_eff', 'attraksjon', 'materialfaktor')
+
     analysetype: str  # 'effektiv' eller 'udrenert'
     friksjonsvinkel: float  # phi' [°]
     udrenert_skjaerstyrke: float  # su [kN/m²]
@@ -19,6 +24,9 @@ class JordParameter:
 @dataclass
 class FundamentGeometri:
     """Fundamentets geometriske egenskaper"""
+    __slots__ = ('bredde', 'lengde', 'tykkelse', 'romvekt', 'vegg_bredde',
+                 'soyle_lengde')
+
     bredde: float  # B [m]
     lengde: Optional[float]  # L [m], None = stripefundament
     tykkelse: float  # T [m]
@@ -30,6 +38,9 @@ class FundamentGeometri:
 @dataclass 
 class Belastning:
     """Belastning på fundamentet"""
+    __slots__ = ('vertikal', 'horisontal_B', 'horisontal_L', 'moment_B', 'moment_L',
+                 'centeravvik_B', 'centeravvik_L')
+
     vertikal: float  # V [kN eller kN/m]
     horisontal_B: float  # H_B [kN eller kN/m]
     horisontal_L: float  # H_L [kN] (kun rektangulære)
@@ -42,6 +53,9 @@ class Belastning:
 @dataclass
 class TerrengForhold:
     """Terrengforhold rundt fundamentet"""
+    __slots__ = ('fundamentdybde', 'romvekt_over', 'overflatelast', 'skraaningshelning',
+                 'terrenghelning', 'Ka', 'Kp')
+
     fundamentdybde: float  # D [m]
     romvekt_over: float  # gamma_jord [kN/m³]
     overflatelast: float  # q_0 [kN/m²]
@@ -54,6 +68,10 @@ class TerrengForhold:
 @dataclass
 class Resultat:
     """Beregningsresultater"""
+    __slots__ = ('grunntrykk', 'baereevne', 'utnyttelsesgrad', 'margin', 'Nq', 'Ny',
+                 'Nc', 'eff_bredde', 'eff_lengde', 'eksentrisitet_B', 'eksentrisitet_L',
+                 'ruhet', 'reduksjonsfaktor', 'V_total')
+
     grunntrykk: float  # q [kN/m²]
     baereevne: float  # s [kN/m²]
     utnyttelsesgrad: float  # q/s
@@ -68,3 +86,79 @@ class Resultat:
     ruhet: float  # r
     reduksjonsfaktor: float  # f_beta
     V_total: float  # Total vertikallast inkl. egenvekt
+
+
+@dataclass
+class KarakteristiskLast:
+    """Karakteristisk last (påvirkning) for lastkombinering iht. NS-EN 1990"""
+    navn: str
+    kategori: str  # 'permanent', 'variabel' eller 'ulykke'
+    vertikal: float = 0.0  # V [kN eller kN/m]
+    horisontal_B: float = 0.0  # H_B [kN eller kN/m]
+    horisontal_L: float = 0.0  # H_L [kN]
+    moment_B: float = 0.0  # M_B [kNm eller kNm/m]
+    moment_L: float = 0.0  # M_L [kNm]
+    psi0: float = 0.7  # kombinasjonsfaktor
+    psi1: float = 0.5  # ofte forekommende verdi
+    psi2: float = 0.3  # tilnærmet permanent verdi
+    gruppe: Optional[str] = None  # felles kilde (permanent) / gjensidig utelukkende (variabel)
+
+
+@dataclass
+class Dimensjonering:
+    """Resultat av dimensjonering (minste fundamentstørrelse)"""
+    __slots__ = ('bredde', 'lengde', 'areal', 'volum', 'utnyttelsesgrad',
+                 'styrende_lasttilfelle', 'konvergert')
+
+    bredde: float  # B [m]
+    lengde: Optional[float]  # L [m], None = stripefundament
+    areal: float  # B·L [m²] eller B [m²/m]
+    volum: float  # betongvolum inkl. vegg/søyle [m³ eller m³/m]
+    utnyttelsesgrad: float  # styrende q/s ved løsningen
+    styrende_lasttilfelle: int  # indeks langs lasttilfelle-aksen
+    konvergert: bool  # False = ingen bredde i [B_min, B_max] oppfyller kravet
+
+
+INNDATAKLASSER = (JordParameter, FundamentGeometri, Belastning, TerrengForhold)
+
+
+def med_endringer(jord: JordParameter,
+                  fundament: FundamentGeometri,
+                  belastning: Belastning,
+                  terreng: TerrengForhold,
+                  endringer: Dict[str, object]
+                  ) -> Tuple[JordParameter, FundamentGeometri, Belastning, TerrengForhold]:
+    """
+    Returnerer kopier av de fire inndataobjektene med feltene i endringer
+    erstattet. Feltnavnene er unike på tvers av klassene, f.eks.
+    {'friksjonsvinkel': 30.0, 'bredde': np.array([...])}.
+    """
+    objekter = (jord, fundament, belastning, terreng)
+    gjenstaende = dict(endringer)
+    nye = []
+    for klasse, objekt in zip(INNDATAKLASSER, objekter):
+        egne = {f.name: gjenstaende.pop(f.name) for f in fields(klasse) if f.name in gjenstaende}
+        nye.append(replace(objekt, **egne) if egne else objekt)
+    if gjenstaende:
+        raise KeyError(f"Ukjente felt: {', '.join(sorted(gjenstaende))}")
+    return tuple(nye)
+
+
+def _til_json(verdi):
+    """Gjør dataklasser og numpy-verdier om til JSON-kompatible verdier"""
+    if is_dataclass(verdi) and not isinstance(verdi, type):
+        return [type(verdi).__name__, {f.name: getattr(verdi, f.name) for f in fields(verdi)}]
+    if hasattr(verdi, 'tolist'):
+        return verdi.tolist()
+    raise TypeError(f"Kan ikke hashe {type(verdi).__name__}")
+
+
+def stabil_hash(*objekter) -> str:
+    """
+    Stabil SHA-256 av inndataobjekter, f.eks. som nøkkel for mellomlagring
+
+    Lik for like verdier på tvers av prosesser og kjøringer (i motsetning
+    til hash()). Tar dataklasser, tall, tekst, lister, dict og numpy-arrays.
+    """
+    tekst = json.dumps(objekter, default=_til_json, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(tekst.encode('utf-8')).hexdigest()
@@ -0,0 +1,359 @@
+"""
+Kapasitetsomhylling i lastrommet (V, H, M) for raske lasttilfelle-sjekker
+
+For gitt jord, fundament og terreng avhenger q/s bare av lastvektoren.
+Omhyllingen beregner q/s på et grovt rutenett over de valgte lastfeltene
+og forfiner cellene nær q/s = 1 (og celler der interpolasjonen er dårlig)
+med et finere rutenett. Oppslag er multilineær interpolasjon, vektorisert
+over mange lasttilfeller.
+
+Hver celle har en feilgrense: største avvik mellom interpolert og eksakt
+q/s i cellens midtpunkt og sideflatenes midtpunkter, ganget med en
+sikkerhetsfaktor. Grensen er kontrollert i disse punktene, ikke bevist for
+hele cellen. Der grensen ikke avgjør om q/s ≤ 1, eller er større enn
+toleransen, beregnes tilfellet eksakt.
+
+    omhylling = Kapasitetsomhylling(kalkulator, jord, fundament, belastning, terreng,
+                                    grenser={'vertikal': (100, 1500),
+                                             'horisontal_B': (0, 150),
+                                             'moment_B': (0, 200)})
+    svar = omhylling.utnyttelse(vertikal=V, horisontal_B=H, moment_B=M)
+"""
+
+import itertools
+from dataclasses import dataclass, replace
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from models import JordParameter, FundamentGeometri, Belastning, TerrengForhold
+from calculator import BaereevneKalkulator
+
+
+# Lastfelt som kan være akser i omhyllingen
+LASTFELT = ('vertikal', 'horisontal_B', 'horisontal_L', 'moment_B', 'moment_L')
+
+# q/s lagres avkuttet her; celler som når taket beregnes alltid eksakt
+U_TAK = 5.0
+
+
+@dataclass
+class Omhyllingssvar:
+    """Utnyttelse for en samling lasttilfeller (float/bool for ett tilfelle)"""
+    utnyttelsesgrad: np.ndarray
+    feilgrense: np.ndarray  # |q/s - eksakt| ≤ feilgrense; 0 der eksakt
+    eksakt: np.ndarray  # True der kalkulatoren er brukt
+
+
+def _multilineaer(tabell: np.ndarray, skritt: np.ndarray, basis: np.ndarray,
+                  indeks: np.ndarray, brok: np.ndarray) -> np.ndarray:
+    """
+    Multilineær interpolasjon i en flat tabell
+
+    Hjørne c av cellen ligger i tabell[basis + (indeks + c) @ skritt];
+    brok er posisjonen i cellen (0–1) per akse.
+    """
+    n, d = indeks.shape
+    # Vekter for alle 2^d hjørner som tensorprodukt, siste akse raskest
+    vekt = np.ones((n, 1))
+    for a in range(d):
+        akse = np.stack([1.0 - brok[:, a], brok[:, a]], axis=1)
+        vekt = (vekt[:, :, None] * akse[:, None, :]).reshape(n, 2 ** (a + 1))
+    hjorner = np.array(list(itertools.product((0, 1), repeat=d))) @ skritt
+    verdier = tabell[(basis + indeks @ skritt)[:, None] + hjorner[None]]
+    return np.einsum('ij,ij->i', vekt, verdier)
+
+
+def _kontrollpunkter(d: int) -> np.ndarray:
+    """Midtpunktet og sideflatenes midtpunkter i enhetscellen, (2d+1, d)"""
+    punkter = [np.full(d, 0.5)]
+    for akse in range(d):
+        for side in (0.0, 1.0):
+            p = np.full(d, 0.5)
+            p[akse] = side
+            punkter.append(p)
+    return np.array(punkter)
+
+
+def _rutenett(antall: int, d: int) -> np.ndarray:
+    """Alle heltallspunkter i {0..antall-1}^d i C-rekkefølge, (antall^d, d)"""
+    return np.indices((antall,) * d).reshape(d, -1).T
+
+
+class Kapasitetsomhylling:
+    """
+    Interpolert q/s over lastfeltene i grenser, øvrige inndata faste
+
+    grenser: lastfelt -> (nedre, øvre); f.eks. V, H_B og M_B for stripe-
+        fundament, og i tillegg H_L og M_L for rektangulære
+    belastning: verdier for lastfelt som ikke er akser (standard 0)
+    punkter: noder per akse i grovnettet (standard 9 for ≤ 3 akser, ellers 7)
+    forfining: underdeling per akse i forfinede celler (standard 4 / 2)
+    toleranse: største feilgrense som godtas uten eksakt beregning
+    """
+
+    def __init__(self,
+                 kalkulator: BaereevneKalkulator,
+                 jord: JordParameter,
+                 fundament: FundamentGeometri,
+                 belastning: Optional[Belastning],
+                 terreng: TerrengForhold,
+                 grenser: Dict[str, Tuple[float, float]],
+                 punkter: Optional[int] = None,
+                 forfining: Optional[int] = None,
+                 toleranse: float = 0.01,
+                 sikkerhetsfaktor: float = 3.0):
+        ukjente = set(grenser) - set(LASTFELT)
+        if ukjente:
+            raise KeyError(f"Ukjente lastfelt: {', '.join(sorted(ukjente))}")
+        self.akser = tuple(f for f in LASTFELT if f in grenser)
+        self._aksesett = set(self.akser)
+        if not self.akser:
+            raise ValueError("grenser må ha minst ett lastfelt")
+        d = len(self.akser)
+        self.nedre = np.array([grenser[a][0] for a in self.akser], dtype=float)
+        self.ovre = np.array([grenser[a][1] for a in self.akser], dtype=float)
+        if np.any(self.ovre <= self.nedre):
+            raise ValueError("Øvre grense må være større enn nedre for alle akser")
+
+        self.kalkulator = kalkulator
+        self._inndata = (jord, fundament,
+                         belastning or Belastning(0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0), terreng)
+        self.punkter = punkter or (9 if d <= 3 else 7)
+        self.forfining = forfining or (4 if d <= 3 else 2)
+        self.toleranse = toleranse
+        self.sikkerhetsfaktor = sikkerhetsfaktor
+        self.antall_beregninger = 0
+        self._bygg()
+
+    # --- Bygging ---
+
+    def _eksakt(self, punkter: np.ndarray) -> np.ndarray:
+        """q/s fra beregn_batch for lastpunkter (n, d)"""
+        jord, fundament, belastning, terreng = self._inndata
+        laster = replace(belastning, **{a: punkter[:, i] for i, a in enumerate(self.akser)})
+        self.antall_beregninger += len(punkter)
+        return self.kalkulator.beregn_batch(jord, fundament, laster, terreng)['utnyttelsesgrad']
+
+    def _bygg(self):
+        d = len(self.akser)
+        N, k = self.punkter, self.forfining
+        celle = (self.ovre - self.nedre) / (N - 1)
+        kontroll = _kontrollpunkter(d)
+
+        # Grovnett
+        noder = _rutenett(N, d)
+        u = self._eksakt(self.nedre + noder * celle)
+        self._grov = np.clip(np.nan_to_num(u, nan=U_TAK), 0, U_TAK)
+        self._grov_skritt = np.array([N ** (d - 1 - a) for a in range(d)])
+
+        celler = _rutenett(N - 1, d)
+        hjorner = np.array(list(itertools.product((0, 1), repeat=d)))
+        hjorneverdier = self._grov[(celler[:, None, :] + hjorner[None]) @ self._grov_skritt]
+        u_min, u_maks = hjorneverdier.min(axis=1), hjorneverdier.max(axis=1)
+        tak = u_maks >= U_TAK
+
+        feil = self._kontroller(self._grov, self._grov_skritt, np.zeros(len(celler), dtype=np.intp),
+                                celler, self.nedre + celler * celle, celle, kontroll)
+        feil[tak] = np.inf
+
+        # Forfining nær q/s = 1 og der interpolasjonen er for grov
+        forfin = ~tak & ((feil > self.toleranse) | ((u_min - feil <= 1) & (u_maks + feil >= 1)))
+        self._finindeks = np.full(len(celler), -1, dtype=np.int32)
+        self._finindeks[forfin] = np.arange(np.count_nonzero(forfin))
+        self._grov_feil = np.where(forfin, np.nan, feil).astype(np.float32)
+
+        fincelle = celle / k
+        finnoder = _rutenett(k + 1, d)
+        self._fin_skritt = np.array([(k + 1) ** (d - 1 - a) for a in range(d)])
+        self._fin_storrelse = (k + 1) ** d
+        opphav = self.nedre + celler[forfin] * celle  # nedre hjørne per forfinet celle
+        m = len(opphav)
+        if m:
+            u = self._eksakt((opphav[:, None, :] + finnoder[None] * fincelle).reshape(-1, d))
+            self._fin = np.clip(np.nan_to_num(u, nan=U_TAK), 0, U_TAK)
+            underceller = _rutenett(k, d)
+            n_under = len(underceller)
+            basis = np.repeat(np.arange(m) * self._fin_storrelse, n_under)
+            indeks = np.tile(underceller, (m, 1))
+            hjorneverdier = self._fin[basis[:, None] + (indeks[:, None, :] + hjorner[None]) @ self._fin_skritt]
+            feil = self._kontroller(self._fin, self._fin_skritt, basis, indeks,
+                                    np.repeat(opphav, n_under, axis=0) + indeks * fincelle,
+                                    fincelle, kontroll)
+            feil[hjorneverdier.max(axis=1) >= U_TAK] = np.inf
+            self._fin_feil = feil.astype(np.float32).reshape(m, n_under)
+        else:
+            self._fin = np.empty(0)
+            self._fin_feil = np.empty((0, k ** d), dtype=np.float32)
+
+        # Konstanter for oppslag av ett tilfelle i ren Python
+        self._nedre_liste = self.nedre.tolist()
+        self._skala = ((N - 1) / (self.ovre - self.nedre)).tolist()
+        self._celleskritt = [(N - 1) ** (d - 1 - a) for a in range(d)]
+        self._underskritt = [k ** (d - 1 - a) for a in range(d)]
+        self._antall_under = k ** d
+        self._grov_skritt_liste = self._grov_skritt.tolist()
+        self._fin_skritt_liste = self._fin_skritt.tolist()
+        self._grov_hjorner = (hjorner @ self._grov_skritt).tolist()
+        self._fin_hjorner = (hjorner @ self._fin_skritt).tolist()
+        self._lag_visninger()
+
+    def _lag_visninger(self):
+        # memoryview-indeksering gir Python-tall uten å gå via NumPy-skalarer
+        self._visninger = tuple(memoryview(a).cast('B').cast(a.dtype.char) for a in
+                                (self._grov, self._grov_feil, self._finindeks, self._fin, self._fin_feil.reshape(-1)))
+
+    def __getstate__(self):
+        tilstand = dict(self.__dict__)
+        del tilstand['_visninger']
+        return tilstand
+
+    def __setstate__(self, tilstand):
+        self.__dict__.update(tilstand)
+        self._lag_visninger()
+
+    def _kontroller(self, tabell, skritt, basis, indeks, nedre_hjorne, storrelse, kontroll):
+        """Feilgrense per celle fra eksakt q/s i kontrollpunktene"""
+        n, d = indeks.shape
+        c = len(kontroll)
+        punkter = (nedre_hjorne[:, None, :] + kontroll[None] * storrelse).reshape(-1, d)
+        eksakt = np.clip(np.nan_to_num(self._eksakt(punkter), nan=U_TAK), 0, U_TAK)
+        interpolert = _multilineaer(tabell, skritt, np.repeat(basis, c),
+                                    np.repeat(indeks, c, axis=0), np.tile(kontroll, (n, 1)))
+        avvik = np.abs(interpolert - eksakt).reshape(n, c).max(axis=1)
+        # float32-lagring skal ikke runde grensen ned
+        return self.sikkerhetsfaktor * avvik * (1 + 1e-6) + 1e-9
+
+    # --- Oppslag ---
+
+    def _punkter(self, laster: Dict[str, object]) -> Tuple[np.ndarray, Tuple[int, ...]]:
+        verdier = np.broadcast_arrays(*(np.asarray(laster[a], dtype=float) for a in self.akser))
+        form = verdier[0].shape
+        return np.stack([v.reshape(-1) for v in verdier], axis=1), form
+
+    def _ett_tilfelle(self, laster: Dict[str, object]) -> Optional[Tuple[float, ...]]:
+        """Lastvektoren hvis alle lastene er tall, ellers None"""
+        if laster.keys() != self._aksesett:
+            raise KeyError(f"Forventet lastfeltene {', '.join(self.akser)}")
+        punkt = tuple(laster[a] for a in self.akser)
+        if all(isinstance(p, (int, float)) for p in punkt):
+            return punkt
+        return None
+
+    def _estimat(self, punkter: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        d = len(self.akser)
+        N, k = self.punkter, self.forfining
+        t = (punkter - self.nedre) / (self.ovre - self.nedre) * (N - 1)
+        utenfor = np.any((t < 0) | (t > N - 1) | np.isnan(t), axis=1)
+        i = np.clip(np.floor(np.nan_to_num(t)), 0, N - 2).astype(np.intp)
+        f = np.clip(np.nan_to_num(t) - i, 0.0, 1.0)
+        celle = i @ np.array([(N - 1) ** (d - 1 - a) for a in range(d)])
+        fin = self._finindeks[celle]
+
+        u = np.empty(len(punkter))
+        feil = np.empty(len(punkter))
+
+        grov = fin < 0
+        u[grov] = _multilineaer(self._grov, self._grov_skritt, np.zeros(np.count_nonzero(grov), np.intp),
+                                i[grov], f[grov])
+        feil[grov] = self._grov_feil[celle[grov]]
+
+        m = fin[~grov]
+        tf = f[~grov] * k
+        j = np.clip(np.floor(tf), 0, k - 1).astype(np.intp)
+        u[~grov] = _multilineaer(self._fin, self._fin_skritt, m * self._fin_storrelse, j, tf - j)
+        feil[~grov] = self._fin_feil[m, j @ np.array([k ** (d - 1 - a) for a in range(d)])]
+
+        u[utenfor] = np.nan
+        feil[utenfor] = np.inf
+        return u, feil
+
+    def _estimat_en(self, punkt: Tuple[float, ...]) -> Tuple[float, float]:
+        """Som _estimat for ett tilfelle, uten NumPy-overhead"""
+        N1 = self.punkter - 1
+        celle = start = 0
+        brok = []
+        for p, nedre, skala, cs, gs in zip(punkt, self._nedre_liste, self._skala,
+                                           self._celleskritt, self._grov_skritt_liste):
+            t = (p - nedre) * skala
+            if not 0.0 <= t <= N1:
+                return float('nan'), float('inf')
+            i = int(t) if t < N1 else N1 - 1
+            celle += i * cs
+            start += i * gs
+            brok.append(t - i)
+        grov, grov_feil, finindeks, fin, fin_feil = self._visninger
+        m = finindeks[celle]
+        if m < 0:
+            tabell, hjorner = grov, self._grov_hjorner
+            feil = grov_feil[celle]
+        else:
+            k = self.forfining
+            start, under = m * self._fin_storrelse, 0
+            for a, (fs, us) in enumerate(zip(self._fin_skritt_liste, self._underskritt)):
+                t = brok[a] * k
+                j = int(t) if t < k else k - 1
+                start += j * fs
+                under += j * us
+                brok[a] = t - j
+            tabell, hjorner = fin, self._fin_hjorner
+            feil = fin_feil[m * self._antall_under + under]
+        vekt = [1.0]
+        for f in brok:
+            g = 1.0 - f
+            vekt = [w for v in vekt for w in (v * g, v * f)]
+        u = 0.0
+        for v, h in zip(vekt, hjorner):
+            u += v * tabell[start + h]
+        return u, feil
+
+    def estimat(self, **laster) -> Tuple[np.ndarray, np.ndarray]:
+        """Interpolert q/s og feilgrense (uendelig utenfor omhyllingen), uten eksakt reserve"""
+        punkt = self._ett_tilfelle(laster)
+        if punkt is not None:
+            return self._estimat_en(punkt)
+        punkter, form = self._punkter(laster)
+        u, feil = self._estimat(punkter)
+        return u.reshape(form), feil.reshape(form)
+
+    def utnyttelse(self, toleranse: Optional[float] = None, **laster) -> Omhyllingssvar:
+        """
+        q/s for lasttilfellene, f.eks. utnyttelse(vertikal=V, horisontal_B=H, moment_B=M)
+
+        Interpolert der feilgrensen er innenfor toleransen og avgjør om
+        q/s ≤ 1; ellers (og utenfor omhyllingen) eksakt fra kalkulatoren.
+        Skalare laster gir float-felt i svaret.
+        """
+        toleranse = self.toleranse if toleranse is None else toleranse
+        punkt = self._ett_tilfelle(laster)
+        if punkt is not None:
+            u, feil = self._estimat_en(punkt)
+            if feil <= toleranse and abs(u - 1.0) > feil:
+                return Omhyllingssvar(utnyttelsesgrad=u, feilgrense=feil, eksakt=False)
+            jord, fundament, belastning, terreng = self._inndata
+            resultat = self.kalkulator.beregn(jord, fundament, replace(belastning, **dict(zip(self.akser, punkt))),
+                                              terreng)
+            return Omhyllingssvar(utnyttelsesgrad=resultat.utnyttelsesgrad, feilgrense=0.0, eksakt=True)
+
+        punkter, form = self._punkter(laster)
+        u, feil = self._estimat(punkter)
+        eksakt = ~(feil <= toleranse) | (np.abs(u - 1.0) <= feil)
+        if eksakt.any():
+            u[eksakt] = self._eksakt(punkter[eksakt])
+            feil[eksakt] = 0.0
+        return Omhyllingssvar(utnyttelsesgrad=u.reshape(form), feilgrense=feil.reshape(form),
+                              eksakt=eksakt.reshape(form))
+
+    @property
+    def grenser(self) -> Dict[str, Tuple[float, float]]:
+        return {a: (lo, hi) for a, lo, hi in zip(self.akser, self.nedre.tolist(), self.ovre.tolist())}
+
+    @property
+    def antall_forfinet(self) -> int:
+        return len(self._fin_feil)
+
+    @property
+    def nbytes(self) -> int:
+        """Minnebruk for oppslagstabellene"""
+        return sum(a.nbytes for a in (self._grov, self._grov_feil, self._finindeks,
+                                      self._fin, self._fin_feil))
@@ -0,0 +1,586 @@
+"""
+Pålitelighetsanalyse for bæreevne (geoteknisk kategori 3)
+
+Monte Carlo-simulering og FORM-analyse av bruddsannsynligheten
+P_f = P(q/s > 1) med usikre jordparametre og laster. Utvalget trekkes i blokker av fast
+størrelse som beregnes med BaereevneKalkulator.beregn_batch, og løpende
+estimater av P_f, pålitelighetsindeks β og konfidensintervall strømmes
+ut uten at utvalget holdes i minnet.
+
+Hver blokk har sin egen deterministiske tilfeldighetsstrøm avledet av
+seed og blokknummer, slik at resultatet er det samme uansett antall
+arbeidsprosesser.
+
+Referanser:
+- NS-EN 1990:2002, tillegg C (pålitelighetsindeks β)
+- Zhang, Y. og Der Kiureghian, A. (1995): Two improved algorithms for
+  reliability analysis (forbedret HL-RF)
+- Wichura, M.J. (1988): Algorithm AS241, The Percentage Points of the
+  Normal Distribution
+"""
+
+import math
+from dataclasses import dataclass, fields, replace
+from statistics import NormalDist
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from calculator import BaereevneKalkulator
+from models import (JordParameter, FundamentGeometri, Belastning,
+                   TerrengForhold, med_endringer)
+
+
+FORDELINGSTYPER = ('normal', 'lognormal', 'trunkert_normal')
+
+
+def normal_cdf(z):
+    """
+    Standard normalfordeling Φ(z), vektorisert
+
+    Chebyshev-tilpasning av erfc (Numerical Recipes), relativ feil < 1.2e-7
+    også langt ute i halene.
+    """
+    x = np.abs(np.asarray(z, dtype=float)) / math.sqrt(2)
+    t = 1.0 / (1.0 + 0.5 * x)
+    erfc = t * np.exp(-x * x - 1.26551223 + t * (1.00002368 + t * (0.37409196 + t * (
+        0.09678418 + t * (-0.18628806 + t * (0.27886807 + t * (-1.13520398 + t * (
+            1.48851587 + t * (-0.82215223 + t * 0.17087277)))))))))
+    return np.where(np.asarray(z) >= 0, 1.0 - 0.5 * erfc, 0.5 * erfc)
+
+
+def normal_ppf(p):
+    """Invers standard normalfordeling Φ⁻¹(p), vektorisert (AS241)"""
+    p = np.asarray(p, dtype=float)
+    q = p - 0.5
+    sentral = np.abs(q) <= 0.425
+
+    # Sentralt område
+    r = 0.180625 - q * q
+    num = (((((((2.5090809287301226727e+3 * r +
+                 3.3430575583588128105e+4) * r +
+                 6.7265770927008700853e+4) * r +
+                 4.5921953931549871457e+4) * r +
+                 1.3731693765509461125e+4) * r +
+                 1.9715909503065514427e+3) * r +
+                 1.3314166789178437745e+2) * r +
+                 3.3871328727963666080e+0) * q
+    den = (((((((5.2264952788528545610e+3 * r +
+                 2.8729085735721942674e+4) * r +
+                 3.9307895800092710610e+4) * r +
+                 2.1213794301586595867e+4) * r +
+                 5.3941960214247511077e+3) * r +
+                 6.8718700749205790830e+2) * r +
+                 4.2313330701600911252e+1) * r +
+                 1.0)
+    x_sentral = num / den
+
+    # Halene
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r = np.sqrt(-np.log(np.where(q <= 0, p, 1.0 - p)))
+    r1 = r - 1.6
+    num1 = (((((((7.74545014278341407640e-4 * r1 +
+                  2.27238449892691845833e-2) * r1 +
+                  2.41780725177450611770e-1) * r1 +
+                  1.27045825245236838258e+0) * r1 +
+                  3.64784832476320460504e+0) * r1 +
+                  5.76949722146069140550e+0) * r1 +
+                  4.63033784615654529590e+0) * r1 +
+                  1.42343711074968357734e+0)
+    den1 = (((((((1.05075007164441684324e-9 * r1 +
+                  5.47593808499534494600e-4) * r1 +
+                  1.51986665636164571966e-2) * r1 +
+                  1.48103976427480074590e-1) * r1 +
+                  6.89767334985100004550e-1) * r1 +
+                  1.67638483018380384940e+0) * r1 +
+                  2.05319162663775882187e+0) * r1 +
+                  1.0)
+    r2 = r - 5.0
+    num2 = (((((((2.01033439929228813265e-7 * r2 +
+                  2.71155556874348757815e-5) * r2 +
+                  1.24266094738807843860e-3) * r2 +
+                  2.65321895265761230930e-2) * r2 +
+                  2.96560571828504891230e-1) * r2 +
+                  1.78482653991729133580e+0) * r2 +
+                  5.46378491116411436990e+0) * r2 +
+                  6.65790464350110377720e+0)
+    den2 = (((((((2.04426310338993978564e-15 * r2 +
+                  1.42151175831644588870e-7) * r2 +
+                  1.84631831751005468180e-5) * r2 +
+                  7.86869131145613259100e-4) * r2 +
+                  1.48753612908506148525e-2) * r2 +
+                  1.36929880922735805310e-1) * r2 +
+                  5.99832206555887937690e-1) * r2 +
+                  1.0)
+    x_hale = np.where(r <= 5.0, num1 / den1, num2 / den2)
+    x_hale = np.where(q < 0, -x_hale, x_hale)
+
+    return np.where(sentral, x_sentral, x_hale)
+
+
+@dataclass(frozen=True)
+class Fordeling:
+    """
+    Sannsynlighetsfordeling for én usikker parameter
+
+    type:
+    - 'normal': middel og standardavvik
+    - 'lognormal': middel og standardavvik for selve parameteren
+    - 'trunkert_normal': normalfordeling begrenset til [nedre, ovre]
+      (middel og standardavvik gjelder den ubegrensede fordelingen)
+
+    Parametrene kan være arrays (ett element per fundament) i form_analyse().
+    """
+    type: str
+    middel: float
+    standardavvik: float
+    nedre: float = -math.inf
+    ovre: float = math.inf
+
+    def __post_init__(self):
+        if self.type not in FORDELINGSTYPER:
+            raise ValueError(f"Ukjent fordelingstype: {self.type}")
+        if np.any(np.asarray(self.standardavvik) < 0):
+            raise ValueError("Standardavvik kan ikke være negativt")
+        if self.type == 'lognormal' and np.any(np.asarray(self.middel) <= 0):
+            raise ValueError("Lognormal fordeling krever positivt middel")
+        if self.type == 'trunkert_normal' and not np.all(np.asarray(self.nedre) < self.ovre):
+            raise ValueError("Trunkert normalfordeling krever nedre < ovre")
+
+    def _lognormal_parametre(self):
+        zeta = np.sqrt(np.log(1 + (np.asarray(self.standardavvik) / self.middel) ** 2))
+        return np.log(self.middel) - 0.5 * zeta * zeta, zeta
+
+    def _trunkering(self):
+        """Φ ved nedre og øvre grense for den trunkerte fordelingen"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            a = (self.nedre - np.asarray(self.middel)) / self.standardavvik
+            b = (self.ovre - np.asarray(self.middel)) / self.standardavvik
+        return normal_cdf(np.nan_to_num(a, nan=-np.inf)), normal_cdf(np.nan_to_num(b, nan=np.inf))
+
+    def fra_standardnormal(self, z):
+        """Transformerer standard normalfordelte verdier til parameterverdier"""
+        z = np.asarray(z, dtype=float)
+        if self.type == 'normal':
+            return self.middel + self.standardavvik * z
+        if self.type == 'lognormal':
+            lam, zeta = self._lognormal_parametre()
+            return np.exp(lam + zeta * z)
+        F_a, F_b = self._trunkering()
+        u = F_a + normal_cdf(z) * (F_b - F_a)
+        u = np.clip(u, 1e-300, 1 - 1e-16)
+        x = self.middel + self.standardavvik * normal_ppf(u)
+        return np.clip(x, self.nedre, self.ovre)
+
+    def til_standardnormal(self, x):
+        """Inverse av fra_standardnormal"""
+        x = np.asarray(x, dtype=float)
+        if self.type == 'normal':
+            return (x - self.middel) / self.standardavvik
+        if self.type == 'lognormal':
+            lam, zeta = self._lognormal_parametre()
+            return (np.log(x) - lam) / zeta
+        F_a, F_b = self._trunkering()
+        u = (normal_cdf((x - self.middel) / self.standardavvik) - F_a) / (F_b - F_a)
+        return normal_ppf(np.clip(u, 1e-300, 1 - 1e-16))
+
+
+def korrelasjonsmatrise(navn: Sequence[str],
+                        korrelasjon: Optional[Dict[Tuple[str, str], float]] = None) -> np.ndarray:
+    """Bygger symmetrisk korrelasjonsmatrise fra par, f.eks. {('vertikal', 'moment_B'): 0.5}"""
+    indeks = {n: i for i, n in enumerate(navn)}
+    R = np.eye(len(navn))
+    for (a, b), rho in (korrelasjon or {}).items():
+        if a not in indeks or b not in indeks:
+            raise KeyError(f"Korrelasjon for parameter uten fordeling: {a}, {b}")
+        if not -1 < rho < 1 and a != b:
+            raise ValueError(f"Korrelasjon må ligge i (-1, 1): {a}, {b}")
+        R[indeks[a], indeks[b]] = R[indeks[b], indeks[a]] = rho
+    return R
+
+
+def cholesky(R: np.ndarray) -> np.ndarray:
+    """Nedre Cholesky-faktor av korrelasjonsmatrisen"""
+    try:
+        return np.linalg.cholesky(R)
+    except np.linalg.LinAlgError:
+        raise ValueError("Korrelasjonsmatrisen er ikke positivt definitt") from None
+
+
+def beta_fra_pf(P_f: float) -> float:
+    """Pålitelighetsindeks β = -Φ⁻¹(P_f)"""
+    if P_f <= 0:
+        return math.inf
+    if P_f >= 1:
+        return -math.inf
+    return -NormalDist().inv_cdf(P_f)
+
+
+@dataclass
+class MonteCarloStatus:
+    """Løpende estimat fra Monte Carlo-simuleringen"""
+    antall: int  # trukne utfall så langt
+    antall_brudd: int  # utfall med q/s > 1
+    P_f: float  # estimert bruddsannsynlighet
+    beta: float  # pålitelighetsindeks
+    ki_lav: float  # nedre grense, konfidensintervall for P_f (Wilson)
+    ki_hoy: float  # øvre grense
+    cov: float  # variasjonskoeffisient for P_f-estimatet
+    blokker: int  # fullførte blokker
+
+
+@dataclass
+class _MonteCarloOppsett:
+    """Alt en arbeidsprosess trenger for å beregne en blokk"""
+    kalkulator: BaereevneKalkulator
+    jord: JordParameter
+    fundament: FundamentGeometri
+    belastning: Belastning
+    terreng: TerrengForhold
+    navn: List[str]
+    fordelinger: List[Fordeling]
+    L: np.ndarray
+    antall: int
+    blokkstorrelse: int
+    seed: int
+
+
+def _trekk_blokk(oppsett: _MonteCarloOppsett, indeks: int) -> Dict[str, np.ndarray]:
+    """Trekker parameterverdier for blokk nummer indeks"""
+    start = indeks * oppsett.blokkstorrelse
+    n = min(oppsett.blokkstorrelse, oppsett.antall - start)
+    rng = np.random.default_rng(np.random.SeedSequence(oppsett.seed, spawn_key=(indeks,)))
+    z = rng.standard_normal((n, len(oppsett.navn))) @ oppsett.L.T
+    return {navn: ford.fra_standardnormal(z[:, j])
+            for j, (navn, ford) in enumerate(zip(oppsett.navn, oppsett.fordelinger))}
+
+
+def _beregn_blokk(oppsett: _MonteCarloOppsett, indeks: int) -> Tuple[int, int]:
+    """Returnerer (antall, antall brudd) for én blokk"""
+    verdier = _trekk_blokk(oppsett, indeks)
+    inndata = med_endringer(oppsett.jord, oppsett.fundament, oppsett.belastning,
+                            oppsett.terreng, verdier)
+    u = oppsett.kalkulator.beregn_batch(*inndata)['utnyttelsesgrad']
+    return u.size, int(np.count_nonzero(u > 1.0))
+
+
+_ARBEIDER_OPPSETT: Optional[_MonteCarloOppsett] = None
+
+
+def _start_arbeider(oppsett: _MonteCarloOppsett):
+    global _ARBEIDER_OPPSETT
+    _ARBEIDER_OPPSETT = oppsett
+
+
+def _beregn_blokk_i_arbeider(indeks: int) -> Tuple[int, int]:
+    return _beregn_blokk(_ARBEIDER_OPPSETT, indeks)
+
+
+def _status(antall: int, brudd: int, blokker: int, z: float) -> MonteCarloStatus:
+    p = brudd / antall
+    # Wilson-intervall, fornuftig også når brudd er 0 eller få
+    nevner = 1 + z * z / antall
+    senter = (p + z * z / (2 * antall)) / nevner
+    halv = z * math.sqrt(p * (1 - p) / antall + z * z / (4 * antall * antall)) / nevner
+    return MonteCarloStatus(
+        antall=antall,
+        antall_brudd=brudd,
+        P_f=p,
+        beta=beta_fra_pf(p),
+        ki_lav=max(senter - halv, 0.0),
+        ki_hoy=min(senter + halv, 1.0),
+        cov=math.sqrt((1 - p) / (antall * p)) if brudd else math.inf,
+        blokker=blokker
+    )
+
+
+def monte_carlo(kalkulator: BaereevneKalkulator,
+                jord: JordParameter,
+                fundament: FundamentGeometri,
+                belastning: Belastning,
+                terreng: TerrengForhold,
+                fordelinger: Dict[str, Fordeling],
+                korrelasjon: Optional[Dict[Tuple[str, str], float]] = None,
+                antall: int = 1_000_000,
+                blokkstorrelse: int = 100_000,
+                seed: int = 0,
+                arbeidere: int = 1,
+                konfidens: float = 0.95,
+                maal_cov: Optional[float] = None,
+                materialfaktor: Optional[float] = 1.0) -> Iterator[MonteCarloStatus]:
+    """
+    Monte Carlo-simulering av bruddsannsynligheten, som løpende estimater
+
+    fordelinger angir usikre inndatafelt etter navn, f.eks.
+    {'friksjonsvinkel': Fordeling('lognormal', 35, 2.5), 'vertikal': ...}.
+    Øvrige felt holdes på verdiene i inndataobjektene. Korrelasjoner
+    innføres i standard normalrommet.
+
+    Gir ett MonteCarloStatus per fullførte blokk, i blokkrekkefølge.
+    Simuleringen stopper etter antall utfall, eller tidligere når
+    variasjonskoeffisienten til P_f er under maal_cov.
+
+    materialfaktor erstatter γM i jord (standard 1.0, siden usikkerheten
+    beskrives av fordelingene); None beholder verdien.
+    """
+    if antall < 1 or blokkstorrelse < 1:
+        raise ValueError("antall og blokkstorrelse må være positive")
+    if materialfaktor is not None:
+        jord = replace(jord, materialfaktor=materialfaktor)
+
+    navn = list(fordelinger)
+    oppsett = _MonteCarloOppsett(
+        kalkulator=kalkulator,
+        jord=jord,
+        fundament=fundament,
+        belastning=belastning,
+        terreng=terreng,
+        navn=navn,
+        fordelinger=[fordelinger[n] for n in navn],
+        L=cholesky(korrelasjonsmatrise(navn, korrelasjon)),
+        antall=antall,
+        blokkstorrelse=blokkstorrelse,
+        seed=seed
+    )
+    n_blokker = -(-antall // blokkstorrelse)
+    z = NormalDist().inv_cdf(0.5 + konfidens / 2)
+
+    totalt = 0
+    brudd = 0
+
+    if arbeidere <= 1:
+        for indeks in range(n_blokker):
+            n, b = _beregn_blokk(oppsett, indeks)
+            totalt += n
+            brudd += b
+            status = _status(totalt, brudd, indeks + 1, z)
+            yield status
+            if maal_cov is not None and status.cov <= maal_cov:
+                return
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    # Begrenset antall blokker i arbeid; resultater leses i blokkrekkefølge
+    with ProcessPoolExecutor(max_workers=arbeidere, initializer=_start_arbeider,
+                             initargs=(oppsett,)) as pool:
+        vindu = []
+        neste = 0
+        ferdige = 0
+        try:
+            while ferdige < n_blokker:
+                while neste < n_blokker and len(vindu) < 2 * arbeidere:
+                    vindu.append(pool.submit(_beregn_blokk_i_arbeider, neste))
+                    neste += 1
+                n, b = vindu.pop(0).result()
+                totalt += n
+                brudd += b
+                ferdige += 1
+                status = _status(totalt, brudd, ferdige, z)
+                yield status
+                if maal_cov is not None and status.cov <= maal_cov:
+                    return
+        finally:
+            for fremtid in vindu:
+                fremtid.cancel()
+
+
+def kjor_monte_carlo(*args,
+                     callback: Optional[Callable[[MonteCarloStatus], None]] = None,
+                     **kwargs) -> MonteCarloStatus:
+    """
+    Kjører monte_carlo() til ende og returnerer siste estimat
+
+    callback kalles med hvert løpende estimat (f.eks. for fremdriftsvisning).
+    """
+    status = None
+    for status in monte_carlo(*args, **kwargs):
+        if callback is not None:
+            callback(status)
+    return status
+
+
+@dataclass
+class FORMResultat:
+    """
+    Resultat av FORM-analyse (første ordens pålitelighetsmetode)
+
+    For flere fundamenter er tallverdiene arrays med fundamentenes form.
+    """
+    beta: float  # pålitelighetsindeks
+    P_f: float  # Φ(-β)
+    designpunkt: Dict[str, float]  # mest sannsynlige bruddpunkt x*
+    alfa: Dict[str, float]  # sensitivitetsfaktorer, Σα² = 1 (u* = -β·α)
+    g_median: float  # g = s - q i medianpunktet (u = 0) [kN/m²]
+    konvergert: bool
+    iterasjoner: int
+    evalueringer: int  # antall beregninger av grensetilstanden per fundament
+
+
+def _flate_felt(objekt, form: Tuple[int, ...]):
+    """Kopi av inndataobjekt med alle felt som kolonner (M, 1)"""
+    endringer = {}
+    for f in fields(objekt):
+        verdi = getattr(objekt, f.name)
+        if verdi is not None and not isinstance(verdi, str):
+            endringer[f.name] = np.broadcast_to(np.asarray(verdi), form).reshape(-1, 1)
+    return replace(objekt, **endringer)
+
+
+def _utvalg(objekt, indekser: np.ndarray):
+    """Velger ut radene indekser fra et objekt laget av _flate_felt"""
+    endringer = {}
+    for f in fields(objekt):
+        verdi = getattr(objekt, f.name)
+        if verdi is not None and not isinstance(verdi, str):
+            endringer[f.name] = verdi[indekser]
+    return replace(objekt, **endringer)
+
+
+def form_analyse(kalkulator: BaereevneKalkulator,
+                 jord: JordParameter,
+                 fundament: FundamentGeometri,
+                 belastning: Belastning,
+                 terreng: TerrengForhold,
+                 fordelinger: Dict[str, Fordeling],
+                 korrelasjon: Optional[Dict[Tuple[str, str], float]] = None,
+                 materialfaktor: Optional[float] = 1.0,
+                 steg: float = 1e-4,
+                 toleranse: float = 1e-4,
+                 maks_iterasjoner: int = 100,
+                 linjesok: bool = True) -> FORMResultat:
+    """
+    FORM-analyse av grensetilstanden g = s - q
+
+    Bruker HL-RF-iterasjonen (Hasofer-Lind/Rackwitz-Fiessler) i standard
+    normalrommet u, med x = T(L·u) der T er marginalfordelingenes
+    transformasjon og L Cholesky-faktoren for korrelasjonen. Gradienten
+    finnes med foroverdifferanser, og alle N+1 punktene beregnes i ett kall
+    til beregn_batch. Gjelder både effektiv- og totalspenningsanalyse.
+
+    Arrays i inndata eller i fordelingsparametrene gir flere fundamenter,
+    som løses samtidig; hvert fundament itererer til det har konvergert.
+    Konvergens: |g| < toleranse·|g(0)| og enten |u_k+1 - u_k| eller endringen
+    i |u_k| er under toleranse·(1 + |u_k|). Det siste fanger designpunkter i
+    knekkpunkter for lineær Nγ-interpolasjon; ny_interpolasjon='kubisk' gir
+    glattere g og færre iterasjoner.
+
+    Med linjesok=True brukes forbedret HL-RF (Zhang og Der Kiureghian):
+    steget halveres til meritfunksjonen ½|u|² + c|g| avtar, noe som hindrer
+    at iterasjonen svinger mellom to punkter. Steglengdene prøves i ett kall.
+
+    alfa = ∇g/|∇g| i designpunktet, med fortegn som i NS-EN 1990 tillegg C
+    (positiv for motstand, negativ for last). alfa gjelder de ukorrelerte
+    variablene i u-rommet; med korrelasjon er de knyttet til parametrene i
+    rekkefølgen i fordelinger.
+    """
+    if materialfaktor is not None:
+        jord = replace(jord, materialfaktor=materialfaktor)
+
+    navn = list(fordelinger)
+    n = len(navn)
+    if n == 0:
+        raise ValueError("Minst én parameter må ha en fordeling")
+    L = cholesky(korrelasjonsmatrise(navn, korrelasjon))
+
+    objekter = (jord, fundament, belastning, terreng)
+    former = [np.shape(getattr(o, f.name)) for o in objekter for f in fields(o)
+              if getattr(o, f.name) is not None]
+    former += [np.shape(getattr(ford, f.name)) for ford in fordelinger.values()
+               for f in fields(ford) if f.name != 'type']
+    fundamentform = np.broadcast_shapes(*former)
+    M = int(np.prod(fundamentform))
+
+    flate = [_flate_felt(o, fundamentform) for o in objekter]
+    flate_ford = [_flate_felt(fordelinger[nv], fundamentform) for nv in navn]
+
+    def grensetilstand(indekser, punkter):
+        """g = s - q for punkter (m, K, N) i u-rommet, én rad per fundament"""
+        Z = punkter @ L.T
+        verdier = {nv: _utvalg(ford, indekser).fra_standardnormal(Z[..., j])
+                   for j, (nv, ford) in enumerate(zip(navn, flate_ford))}
+        inndata = med_endringer(*(_utvalg(o, indekser) for o in flate), verdier)
+        res = kalkulator.beregn_batch(*inndata)
+        return np.broadcast_to(res['baereevne'] - res['grunntrykk'], punkter.shape[:2])
+
+    u = np.zeros((M, n))
+    alfa = np.full((M, n), np.nan)
+    g_median = np.full(M, np.nan)
+    g_ref = np.ones(M)
+    konvergert = np.zeros(M, dtype=bool)
+    iterasjoner = np.zeros(M, dtype=int)
+    evalueringer = np.zeros(M, dtype=int)
+    forrige_norm = np.full(M, np.inf)
+    aktiv = np.arange(M)
+    forskyvning = np.vstack([np.zeros(n), steg * np.eye(n)])  # (N+1, N)
+    skritt = 0.5 ** np.arange(6)  # prøvde steglengder i linjesøket
+
+    for k in range(maks_iterasjoner):
+        if aktiv.size == 0:
+            break
+        U = u[aktiv]
+        g = grensetilstand(aktiv, U[:, None, :] + forskyvning)
+        evalueringer[aktiv] += n + 1
+        iterasjoner[aktiv] = k + 1
+
+        g0 = g[:, 0]
+        gradient = (g[:, 1:] - g0[:, None]) / steg
+        lengde = np.sqrt(np.sum(gradient * gradient, axis=1))
+        if k == 0:
+            g_median[aktiv] = g0
+            g_ref[aktiv] = np.where(g0 != 0, np.abs(g0), 1.0)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            alfa[aktiv] = gradient / lengde[:, None]
+            U_ny = ((np.sum(gradient * U, axis=1) - g0) / lengde ** 2)[:, None] * gradient
+
+        # Uten gradient (g uavhengig av variablene) kan ikke iterasjonen fortsette
+        flat = ~(lengde > 0)
+        norm_U = np.sqrt(np.sum(U * U, axis=1))
+        ferdig = ~flat & (np.abs(g0) <= toleranse * g_ref[aktiv]) & (
+            (np.sqrt(np.sum((U_ny - U) ** 2, axis=1)) <= toleranse * (1 + norm_U))
+            | (np.abs(norm_U - forrige_norm[aktiv]) <= toleranse * (1 + norm_U)))
+        forrige_norm[aktiv] = norm_U
+        konvergert[aktiv[ferdig]] = True
+
+        videre = ~ferdig & ~flat
+        aktiv, U, U_ny, g0, lengde = aktiv[videre], U[videre], U_ny[videre], g0[videre], lengde[videre]
+        if aktiv.size == 0:
+            break
+
+        if linjesok:
+            # Forbedret HL-RF: største steg som reduserer ½|u|² + c|g|
+            retning = U_ny - U
+            c = 2 * np.maximum(np.sqrt(np.sum(U * U, axis=1)),
+                               np.sqrt(np.sum(U_ny * U_ny, axis=1))) / lengde
+            proever = U[:, None, :] + skritt[:, None] * retning[:, None, :]
+            g_proeve = grensetilstand(aktiv, proever)
+            evalueringer[aktiv] += skritt.size
+            merit = 0.5 * np.sum(proever * proever, axis=2) + c[:, None] * np.abs(g_proeve)
+            merit0 = 0.5 * np.sum(U * U, axis=1) + c * np.abs(g0)
+            bedre = merit < merit0[:, None]
+            valgt = np.where(bedre.any(axis=1), bedre.argmax(axis=1), skritt.size - 1)
+            U_ny = proever[np.arange(aktiv.size), valgt]
+
+        u[aktiv] = U_ny
+
+    # β = -α·u* (negativ når medianpunktet ligger i bruddområdet)
+    beta = -np.sum(alfa * u, axis=1)
+    x_design = u @ L.T
+    designpunkt = {nv: ford.fra_standardnormal(x_design[:, j:j + 1])[:, 0]
+                   for j, (nv, ford) in enumerate(zip(navn, flate_ford))}
+
+    def ut(verdi):
+        verdi = np.asarray(verdi).reshape(fundamentform)
+        return verdi.item() if verdi.ndim == 0 else verdi
+
+    return FORMResultat(
+        beta=ut(beta),
+        P_f=ut(normal_cdf(-beta)),
+        designpunkt={nv: ut(v) for nv, v in designpunkt.items()},
+        alfa={nv: ut(alfa[:, j]) for j, nv in enumerate(navn)},
+        g_median=ut(g_median),
+        konvergert=ut(konvergert),
+        iterasjoner=ut(iterasjoner),
+        evalueringer=ut(evalueringer)
+    )
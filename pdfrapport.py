@@ -0,0 +1,795 @@
+"""
+PDF-rapport for Bæreevneberegning, uten nettleser
+
+Skriver samme innhold som generer_rapport_html (resultater, figur, tabeller
+og formler) rett til PDF med en liten PDF-skriver i ren Python. Teksten
+bruker standardfontene Helvetica, Courier og Symbol (gresk), som alle
+PDF-lesere har, så ingenting bygges inn. Figuren fra
+generer_fundament_svg tolkes og tegnes som vektorgrafikk.
+
+    pdf = generer_rapport_pdf(prosjekt_info, jord, fundament, belastning, terreng, resultat)
+
+    with PdfSkriver('prosjekt.pdf', tittel="E39 Rogfast") as skriver:
+        for side in rapportsider(prosjekt_info, jord, fundament, belastning, terreng, resultat):
+            skriver.legg_til_side(side)
+
+Bare standardbiblioteket (zlib for komprimering).
+"""
+
+import io
+import math
+import re
+import xml.etree.ElementTree as ET
+import zlib
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from report import generer_fundament_svg
+from sensitivitet import FELTNAVN
+
+
+A4 = (595.28, 841.89)  # punkter (1/72 tomme)
+MARG = 42.52  # 15 mm
+
+GRONN = '#006341'
+ROD = '#c62828'
+
+# Økes når sideoppsettet endres; inngår i nøklene til mellomlagrede sider
+PDFVERSJON = 1
+
+
+# --- Fonter ---
+
+# Ressursnavn for standardfontene; tekst kodes som WinAnsi (cp1252),
+# bortsett fra Symbol som har egen koding
+_FONTER = {'Helvetica': 'F1', 'Helvetica-Bold': 'F2', 'Symbol': 'F3', 'Courier': 'F4'}
+
+# Tegnbredder i 1/1000 em for tegn 32-126 (Adobe AFM)
+_HELVETICA = (
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+)
+_HELVETICA_FET = (
+    278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 333, 333, 584, 584, 584, 611,
+    975, 722, 722, 722, 722, 667, 611, 778, 722, 278, 556, 722, 611, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 333, 278, 333, 584, 556,
+    333, 556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889, 611, 611,
+    611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500, 389, 280, 389, 584,
+)
+_LATIN = {'æ': 889, 'ø': 611, 'å': 556, 'Æ': 1000, 'Ø': 778, 'Å': 667, 'é': 556,
+          '°': 400, '²': 333, '³': 333, '½': 834, '·': 278, 'µ': 556, '±': 584,
+          '×': 584, '–': 556, '—': 1000}
+_LATIN_FET = dict(_LATIN, **{'Å': 722, 'µ': 611})
+
+# Gresk og matematiske tegn: (kode i Symbol-fonten, bredde)
+_SYMBOL = {
+    'α': (0x61, 631), 'β': (0x62, 549), 'γ': (0x67, 411), 'δ': (0x64, 494), 'ε': (0x65, 439),
+    'ζ': (0x7A, 494), 'η': (0x68, 603), 'θ': (0x71, 521), 'κ': (0x6B, 549), 'λ': (0x6C, 549),
+    'μ': (0x6D, 576), 'ν': (0x6E, 521), 'ξ': (0x78, 493), 'π': (0x70, 549), 'ρ': (0x72, 549),
+    'σ': (0x73, 603), 'τ': (0x74, 439), 'φ': (0x66, 521), 'χ': (0x63, 549), 'ψ': (0x79, 686),
+    'ω': (0x77, 686), 'Γ': (0x47, 603), 'Δ': (0x44, 612), 'Θ': (0x51, 741), 'Λ': (0x4C, 686),
+    'Π': (0x50, 768), 'Σ': (0x53, 592), 'Φ': (0x46, 763), 'Ψ': (0x59, 795), 'Ω': (0x57, 768),
+    '∂': (0xB6, 494), '√': (0xD6, 549), '∞': (0xA5, 713), '≤': (0xA3, 549), '≥': (0xB3, 549),
+    '≈': (0xBB, 549), '∑': (0xE5, 713), '−': (0x2D, 549),
+}
+
+# Senket skrift finnes ikke i fontene; q₀ skrives som q0
+_SENKET = str.maketrans('₀₁₂₃₄₅₆₇₈₉', '0123456789')
+
+
+# Bredde per tegn for hver tekstfont (Courier: 600 for alle)
+_BREDDER = {
+    'Helvetica': dict({chr(32 + i): b for i, b in enumerate(_HELVETICA)}, **_LATIN),
+    'Helvetica-Bold': dict({chr(32 + i): b for i, b in enumerate(_HELVETICA_FET)}, **_LATIN_FET),
+    'Courier': {},
+}
+_SYMBOLDELER = re.compile('([' + re.escape(''.join(_SYMBOL)) + ']+)')
+
+
+def _kjoringer(tekst: str, font: str) -> List[Tuple[str, bytes, int]]:
+    """Deler teksten i (font, kodede tegn, bredde i 1/1000 em); gresk går til Symbol"""
+    bredder, standard = _BREDDER[font], 600 if font == 'Courier' else 556
+    kjoringer = []
+    for i, del_ in enumerate(_SYMBOLDELER.split(tekst.translate(_SENKET))):
+        if not del_:
+            continue
+        if i % 2:
+            kjoringer.append(('Symbol', bytes(_SYMBOL[t][0] for t in del_),
+                              sum(_SYMBOL[t][1] for t in del_)))
+        else:
+            # tegn utenfor WinAnsi blir '?'
+            kjoringer.append((font, del_.encode('cp1252', 'replace'),
+                              sum(bredder.get(t, standard) for t in del_)))
+    return kjoringer
+
+
+def tekstbredde(tekst: str, storrelse: float, font: str = 'Helvetica') -> float:
+    """Bredde i punkter for tekst skrevet med PdfSide.tekst"""
+    return sum(b for _, _, b in _kjoringer(tekst, font)) * storrelse / 1000
+
+
+# --- Side og fil ---
+
+def _tall(x: float) -> str:
+    tekst = f"{x:.3f}".rstrip('0').rstrip('.')
+    return '0' if tekst in ('-0', '') else tekst
+
+
+_ESCAPE = [('\\' + chr(b)) if b in (0x28, 0x29, 0x5C) else chr(b) if 32 <= b < 127 else f'\\{b:03o}'
+           for b in range(256)]
+
+
+def _streng(data: bytes) -> str:
+    """PDF-strengliteral med escaping; resultatet er ren ASCII"""
+    return '(' + ''.join(map(_ESCAPE.__getitem__, data)) + ')'
+
+
+@lru_cache(maxsize=256)
+def _farge(verdi: Optional[str], opasitet: float = 1.0) -> Optional[str]:
+    """
+    '#rgb', '#rrggbb', 'white', 'black' eller 'none' som PDF-fargetall ('r g b', 0-1)
+
+    Ved opasitet < 1 blandes fargen mot hvitt.
+    """
+    if verdi is None or verdi == 'none':
+        return None
+    verdi = {'white': '#ffffff', 'black': '#000000'}.get(verdi, verdi)
+    if len(verdi) == 4:
+        verdi = '#' + ''.join(2 * c for c in verdi[1:])
+    return ' '.join(_tall(1 - opasitet * (1 - int(verdi[i:i + 2], 16) / 255)) for i in (1, 3, 5))
+
+
+class PdfSide:
+    """
+    Innholdet på én side som PDF-operatorer
+
+    Koordinater i punkter med origo nede til venstre. Farger som i CSS
+    ('#006341'); None betyr ingen fyll/strek.
+    """
+
+    def __init__(self, bredde: float = A4[0], hoyde: float = A4[1]):
+        self.bredde = bredde
+        self.hoyde = hoyde
+        self.operatorer: List[str] = []
+
+    def lagre(self):
+        self.operatorer.append('q')
+
+    def gjenopprett(self):
+        self.operatorer.append('Q')
+
+    def transformer(self, a: float, b: float, c: float, d: float, e: float, f: float):
+        self.operatorer.append(f"{_tall(a)} {_tall(b)} {_tall(c)} {_tall(d)} {_tall(e)} {_tall(f)} cm")
+
+    def sti(self, sti: str, fyll: Optional[str] = None, strek: Optional[str] = None,
+            strekbredde: float = 1.0, stiplet: Sequence[float] = (), opasitet: float = 1.0):
+        """Tegner en ferdig sti ('x y m x y l ... h') med fyll og/eller strek"""
+        fyllfarge, strekfarge = _farge(fyll, opasitet), _farge(strek)
+        if fyllfarge is None and strekfarge is None:
+            return
+        ops = ['q']
+        if fyllfarge is not None:
+            ops.append(fyllfarge + ' rg')
+        if strekfarge is not None:
+            ops.append(strekfarge + ' RG')
+            ops.append(f"{_tall(strekbredde)} w")
+            if stiplet:
+                ops.append(f"[{' '.join(_tall(s) for s in stiplet)}] 0 d")
+        ops.append(sti)
+        ops.append('B' if fyllfarge is not None and strekfarge is not None
+                   else 'f' if fyllfarge is not None else 'S')
+        ops.append('Q')
+        self.operatorer.append('\n'.join(ops))
+
+    def rektangel(self, x: float, y: float, bredde: float, hoyde: float, **stil):
+        self.sti(f"{_tall(x)} {_tall(y)} {_tall(bredde)} {_tall(hoyde)} re", **stil)
+
+    def linje(self, x1: float, y1: float, x2: float, y2: float, strek: str = '#000000', **stil):
+        self.sti(f"{_tall(x1)} {_tall(y1)} m {_tall(x2)} {_tall(y2)} l", strek=strek, **stil)
+
+    def tekst(self, x: float, y: float, tekst: str, storrelse: float = 10.0,
+              font: str = 'Helvetica', farge: str = '#000000', justering: str = 'venstre',
+              matrise: Tuple[float, float, float, float] = (1.0, 0.0, 0.0, 1.0)) -> float:
+        """
+        Skriver én linje med grunnlinje i (x, y) og gir bredden tilbake
+
+        justering: 'venstre', 'midt' eller 'hoyre' om x. matrise: (a, b, c, d)
+        for rotert eller speilet tekst, langs grunnlinjen (a, b).
+        """
+        kjoringer = _kjoringer(tekst, font)
+        bredde = sum(b for _, _, b in kjoringer) * storrelse / 1000
+        forskyvning = {'venstre': 0.0, 'midt': bredde / 2, 'hoyre': bredde}[justering]
+        a, b, c, d = matrise
+        ops = ['BT', _farge(farge) + ' rg',
+               f"{_tall(a)} {_tall(b)} {_tall(c)} {_tall(d)} "
+               f"{_tall(x - a * forskyvning)} {_tall(y - b * forskyvning)} Tm"]
+        for denne, kodet, _ in kjoringer:
+            ops.append(f"/{_FONTER[denne]} {_tall(storrelse)} Tf {_streng(kodet)} Tj")
+        ops.append('ET')
+        self.operatorer.append('\n'.join(ops))
+        return bredde
+
+    def innhold(self) -> bytes:
+        return '\n'.join(self.operatorer).encode('ascii')
+
+
+def _tekststreng(tekst: str) -> bytes:
+    """Tekst i dokumentinformasjonen (UTF-16 med BOM, som heksstreng)"""
+    return b'<FEFF' + tekst.encode('utf-16-be').hex().upper().encode('ascii') + b'>'
+
+
+class PdfSkriver:
+    """
+    Skriver en PDF fortløpende, side for side
+
+    Hver side skrives ut når den legges til; sidetreet og
+    kryssreferansetabellen kommer til slutt i avslutt(). Et prosjekt med
+    tusenvis av sider ligger derfor aldri i minnet samtidig.
+
+    ut: filsti eller binært filobjekt (trenger ikke støtte seek).
+    """
+
+    _KATALOG, _SIDETRE, _INFO, _RESSURSER = 1, 2, 3, 4
+
+    def __init__(self, ut, tittel: Optional[str] = None, komprimer: bool = True):
+        if isinstance(ut, (str, Path)):
+            self._fil = open(ut, 'wb')
+            self._eier_fil = True
+        else:
+            self._fil = ut
+            self._eier_fil = False
+        self.tittel = tittel
+        self.komprimer = komprimer
+        self._posisjon = 0
+        self._forskyvninger: Dict[int, int] = {}
+        self._sider: List[int] = []
+        self._neste = self._RESSURSER + 1 + len(_FONTER)
+        self._avsluttet = False
+
+        self._skriv(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        fonter = []
+        for nr, (navn, ressurs) in enumerate(_FONTER.items(), self._RESSURSER + 1):
+            koding = b'' if navn == 'Symbol' else b' /Encoding /WinAnsiEncoding'
+            self._objekt(nr, b'<< /Type /Font /Subtype /Type1 /BaseFont /' + navn.encode('ascii') + koding + b' >>')
+            fonter.append(f"/{ressurs} {nr} 0 R".encode('ascii'))
+        self._objekt(self._RESSURSER, b'<< /Font << ' + b' '.join(fonter) + b' >> >>')
+
+    @property
+    def antall_sider(self) -> int:
+        return len(self._sider)
+
+    def _skriv(self, data: bytes):
+        self._fil.write(data)
+        self._posisjon += len(data)
+
+    def _objekt(self, nr: int, innhold: bytes):
+        self._forskyvninger[nr] = self._posisjon
+        self._skriv(f"{nr} 0 obj\n".encode('ascii') + innhold + b'\nendobj\n')
+
+    def legg_til_side(self, side: PdfSide):
+        innhold = side.innhold()
+        filter_ = b''
+        if self.komprimer:
+            innhold = zlib.compress(innhold, 6)
+            filter_ = b' /Filter /FlateDecode'
+        strom, nr = self._neste, self._neste + 1
+        self._neste += 2
+        self._objekt(strom, f"<< /Length {len(innhold)}".encode('ascii') + filter_ +
+                     b' >>\nstream\n' + innhold + b'\nendstream')
+        self._objekt(nr, (f"<< /Type /Page /Parent {self._SIDETRE} 0 R "
+                          f"/MediaBox [0 0 {_tall(side.bredde)} {_tall(side.hoyde)}] "
+                          f"/Resources {self._RESSURSER} 0 R /Contents {strom} 0 R >>").encode('ascii'))
+        self._sider.append(nr)
+
+    def avslutt(self):
+        """Skriver sidetre, katalog og kryssreferanser; lukker filen hvis den ble åpnet her"""
+        if self._avsluttet:
+            return
+        self._avsluttet = True
+        barn = ' '.join(f"{nr} 0 R" for nr in self._sider)
+        self._objekt(self._SIDETRE, f"<< /Type /Pages /Kids [{barn}] /Count {len(self._sider)} >>".encode('ascii'))
+        self._objekt(self._KATALOG, f"<< /Type /Catalog /Pages {self._SIDETRE} 0 R >>".encode('ascii'))
+        info = b'<< /Producer ' + _tekststreng("Norconsult Bæreevneberegning")
+        if self.tittel:
+            info += b' /Title ' + _tekststreng(self.tittel)
+        self._objekt(self._INFO, info + b' >>')
+
+        xref = self._posisjon
+        linjer = [f"xref\n0 {self._neste}\n", "0000000000 65535 f \n"]
+        linjer += [f"{self._forskyvninger[nr]:010d} 00000 n \n" for nr in range(1, self._neste)]
+        linjer.append(f"trailer\n<< /Size {self._neste} /Root {self._KATALOG} 0 R /Info {self._INFO} 0 R >>\n"
+                      f"startxref\n{xref}\n%%EOF\n")
+        self._skriv(''.join(linjer).encode('ascii'))
+        if self._eier_fil:
+            self._fil.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, unntak_type, unntak, spor):
+        if unntak_type is None:
+            self.avslutt()
+        elif self._eier_fil:
+            self._fil.close()
+
+
+# --- SVG ---
+
+_STITOKEN = re.compile(r'[A-Za-z]|[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+
+
+def _bue(x1: float, y1: float, rx: float, ry: float, rotasjon: float, stor: bool, sveip: bool,
+         x2: float, y2: float) -> List[Tuple[float, ...]]:
+    """Elliptisk bue (SVG 'A') som kubiske Bézier-kurver (x1, y1, x2, y2, x, y), høyst 90° hver"""
+    if (x1, y1) == (x2, y2):
+        return []
+    rx, ry = abs(rx), abs(ry)
+    if rx == 0 or ry == 0:
+        return [(x1, y1, x2, y2, x2, y2)]
+    cos_r, sin_r = math.cos(math.radians(rotasjon)), math.sin(math.radians(rotasjon))
+    dx, dy = (x1 - x2) / 2, (y1 - y2) / 2
+    x1p, y1p = cos_r * dx + sin_r * dy, -sin_r * dx + cos_r * dy
+    skala = x1p**2 / rx**2 + y1p**2 / ry**2
+    if skala > 1:
+        rx, ry = rx * math.sqrt(skala), ry * math.sqrt(skala)
+    teller = rx**2 * ry**2 - rx**2 * y1p**2 - ry**2 * x1p**2
+    nevner = rx**2 * y1p**2 + ry**2 * x1p**2
+    k = math.sqrt(max(0.0, teller / nevner)) * (-1 if stor == sveip else 1)
+    cxp, cyp = k * rx * y1p / ry, -k * ry * x1p / rx
+    cx = cos_r * cxp - sin_r * cyp + (x1 + x2) / 2
+    cy = sin_r * cxp + cos_r * cyp + (y1 + y2) / 2
+
+    def vinkel(ux, uy, vx, vy):
+        return math.atan2(ux * vy - uy * vx, ux * vx + uy * vy)
+
+    ux, uy = (x1p - cxp) / rx, (y1p - cyp) / ry
+    t1 = vinkel(1.0, 0.0, ux, uy)
+    dt = vinkel(ux, uy, (-x1p - cxp) / rx, (-y1p - cyp) / ry)
+    if not sveip and dt > 0:
+        dt -= 2 * math.pi
+    elif sveip and dt < 0:
+        dt += 2 * math.pi
+
+    def punkt(u, v):
+        return cx + rx * u * cos_r - ry * v * sin_r, cy + rx * u * sin_r + ry * v * cos_r
+
+    antall = max(1, math.ceil(abs(dt) / (math.pi / 2) - 1e-9))
+    steg = dt / antall
+    alfa = 4 / 3 * math.tan(steg / 4)
+    kurver = []
+    for i in range(antall):
+        a1, a2 = t1 + i * steg, t1 + (i + 1) * steg
+        c1 = punkt(math.cos(a1) - alfa * math.sin(a1), math.sin(a1) + alfa * math.cos(a1))
+        c2 = punkt(math.cos(a2) + alfa * math.sin(a2), math.sin(a2) - alfa * math.cos(a2))
+        kurver.append((*c1, *c2, *punkt(math.cos(a2), math.sin(a2))))
+    return kurver
+
+
+def _svg_sti(d: str) -> str:
+    """SVG-stidata med absolutte kommandoer (M, L, H, V, C, A, Z) som PDF-sti"""
+    tokens = _STITOKEN.findall(d)
+    ops = []
+    x = y = 0.0
+    i = 0
+    kommando = None
+    while i < len(tokens):
+        if tokens[i].isalpha():
+            kommando = tokens[i]
+            i += 1
+            if kommando in 'Zz':
+                ops.append('h')
+                continue
+        if kommando is None or kommando not in 'MLHVCA':
+            raise ValueError(f"SVG-stikommando støttes ikke: {kommando!r}")
+        antall = {'M': 2, 'L': 2, 'H': 1, 'V': 1, 'C': 6, 'A': 7}[kommando]
+        tall = [float(t) for t in tokens[i:i + antall]]
+        i += antall
+        if kommando == 'M':
+            x, y = tall
+            ops.append(f"{_tall(x)} {_tall(y)} m")
+            kommando = 'L'  # flere koordinatpar etter M er linjer
+        elif kommando in 'LHV':
+            if kommando == 'L':
+                x, y = tall
+            elif kommando == 'H':
+                x = tall[0]
+            else:
+                y = tall[0]
+            ops.append(f"{_tall(x)} {_tall(y)} l")
+        elif kommando == 'C':
+            ops.append(' '.join(_tall(v) for v in tall) + ' c')
+            x, y = tall[4], tall[5]
+        else:
+            rx, ry, rotasjon, stor, sveip, x2, y2 = tall
+            for kurve in _bue(x, y, rx, ry, rotasjon, bool(stor), bool(sveip), x2, y2):
+                ops.append(' '.join(_tall(v) for v in kurve) + ' c')
+            x, y = x2, y2
+    return ' '.join(ops)
+
+
+def _svg_rotasjon(transform: Optional[str], x: float, y: float) -> Tuple[float, float, float]:
+    """Vinkel og nytt ankerpunkt for transform="rotate(a [cx cy])" (eneste transform som støttes)"""
+    if not transform:
+        return 0.0, x, y
+    treff = re.fullmatch(r'\s*rotate\(\s*([^)]*)\)\s*', transform)
+    if treff is None:
+        raise ValueError(f"SVG-transform støttes ikke: {transform!r}")
+    tall = [float(t) for t in re.split(r'[\s,]+', treff.group(1).strip())]
+    vinkel = math.radians(tall[0])
+    sx, sy = (tall[1], tall[2]) if len(tall) == 3 else (0.0, 0.0)
+    cos_v, sin_v = math.cos(vinkel), math.sin(vinkel)
+    return vinkel, sx + cos_v * (x - sx) - sin_v * (y - sy), sy + sin_v * (x - sx) + cos_v * (y - sy)
+
+
+def tegn_svg(side: PdfSide, svg: str, x: float, y: float, skala: float = 1.0):
+    """
+    Tegner SVG-en fra generer_fundament_svg som vektorgrafikk
+
+    (x, y) er øvre venstre hjørne på siden, og skala punkter per SVG-enhet.
+    Støtter elementene rect, line, polygon, path og text med attributtene
+    figuren bruker. Gjennomsiktighet (opacity) blandes mot hvit bakgrunn.
+    """
+    rot = ET.fromstring(svg)
+    side.lagre()
+    # SVG har y nedover; speil om toppkanten
+    side.transformer(skala, 0, 0, -skala, x, y)
+    for element in rot.iter():
+        tag = element.tag.rsplit('}', 1)[-1]
+        a = element.attrib
+        stil = {'fyll': a.get('fill', '#000000'), 'strek': a.get('stroke'),
+                'strekbredde': float(a.get('stroke-width', 1)),
+                'stiplet': [float(s) for s in re.split(r'[\s,]+', a['stroke-dasharray'].strip())]
+                           if 'stroke-dasharray' in a else (),
+                'opasitet': float(a.get('opacity', 1))}
+        if tag == 'rect':
+            side.rektangel(float(a.get('x', 0)), float(a.get('y', 0)),
+                           float(a['width']), float(a['height']), **stil)
+        elif tag == 'line':
+            stil['fyll'] = None
+            side.sti(f"{_tall(float(a['x1']))} {_tall(float(a['y1']))} m "
+                     f"{_tall(float(a['x2']))} {_tall(float(a['y2']))} l", **stil)
+        elif tag == 'polygon':
+            tall = [float(t) for t in re.split(r'[\s,]+', a['points'].strip())]
+            punkter = [f"{_tall(px)} {_tall(py)}" for px, py in zip(tall[::2], tall[1::2])]
+            side.sti(punkter[0] + ' m ' + ' '.join(p + ' l' for p in punkter[1:]) + ' h', **stil)
+        elif tag == 'path':
+            side.sti(_svg_sti(a['d']), **stil)
+        elif tag == 'text':
+            vinkel, tx, ty = _svg_rotasjon(a.get('transform'), float(a.get('x', 0)), float(a.get('y', 0)))
+            cos_v, sin_v = math.cos(vinkel), math.sin(vinkel)
+            side.tekst(tx, ty, ''.join(element.itertext()).strip(),
+                       storrelse=float(a.get('font-size', 16)),
+                       font='Helvetica-Bold' if a.get('font-weight') == 'bold' else 'Helvetica',
+                       farge=a.get('fill', '#000000'),
+                       justering={'middle': 'midt', 'end': 'hoyre'}.get(a.get('text-anchor'), 'venstre'),
+                       # glyfene må speiles tilbake mot transformasjonen over
+                       matrise=(cos_v, sin_v, sin_v, -cos_v))
+    side.gjenopprett()
+
+
+# --- Rapportoppsett ---
+
+_BREDDE = A4[0] - 2 * MARG
+_RAD = 13.0  # radhøyde i tabellene
+
+# Formelbokser som i HTML-rapporten: linjer av (font, tekst)
+_FET, _KODE, _VANLIG = 'Helvetica-Bold', 'Courier', 'Helvetica'
+_FORMLER_FELLES = [
+    [(_FET, "Eksentrisitet:"), (_KODE, "e = M/V")],
+    [(_FET, "Effektiv bredde:"), (_KODE, "Bo = B - 2|e|")],
+    [(_FET, "Grunntrykk:"), (_KODE, "q = V/Aeff")],
+]
+_FORMLER = {
+    'effektiv': [
+        [[(_FET, "Bæreevneformel (Effektiv):")],
+         [(_KODE, "s = fβ·sq·Nq·(γ'D + q₀ + a) + fβ·sγ·½·Nγ·γ'·Bo - a")]],
+        [[(_FET, "Nq:"), (_KODE, "Nq = ½(Kp+1+(Kp-1)cos2θm)·e^((π-2θm)tanφ'd)")],
+         [(_FET, "Nγ:"), (_VANLIG, "Interpolert fra tabell (Brinch Hansen)")]],
+        _FORMLER_FELLES,
+    ],
+    'udrenert': [
+        [[(_FET, "Bæreevneformel (Udrenert):")],
+         [(_KODE, "s = fβ·sc·Nc·su/γM + (γD + q₀)·cos²β")]],
+        [[(_FET, "Nc:"), (_KODE, "Nc = π + 2 + √(1-r²) - arcsin(r)")]],
+        _FORMLER_FELLES,
+    ],
+}
+
+
+class _Sidefyller:
+    """Fyller sider ovenfra og ned; ny side når neste blokk ikke får plass"""
+
+    def __init__(self):
+        self.sider: List[PdfSide] = []
+        self.ny_side()
+
+    def ny_side(self):
+        self.side = PdfSide()
+        self.sider.append(self.side)
+        self.y = A4[1] - MARG
+
+    def plass(self, hoyde: float):
+        if self.y - hoyde < MARG and self.y < A4[1] - MARG:
+            self.ny_side()
+
+
+# Plassen prosjekthodet tar øverst på første side
+_HODE_HOYDE = 85
+
+
+def _hode(side: PdfSide, prosjekt_info):
+    y, x0 = A4[1] - MARG, MARG
+    side.tekst(x0, y - 16, "Bæreevneberegning", 16, _FET, GRONN)
+    side.tekst(x0, y - 28, "NS-EN 1997-1 (EC7)", 8, farge='#333333')
+    x1 = x0 + _BREDDE
+    side.tekst(x1, y - 10, "NORCONSULT", 10, _FET, justering='hoyre')
+    side.tekst(x1, y - 22, datetime.now().strftime('%d.%m.%Y'), 9, justering='hoyre')
+    side.tekst(x1, y - 33, f"Rev. {prosjekt_info.get('revisjon','0')}", 9, justering='hoyre')
+    side.rektangel(x0, y - 45, _BREDDE, 3, fyll=GRONN)
+
+    y -= 55
+    side.rektangel(x0, y - 20, _BREDDE, 20, fyll='#f5f5f5')
+    prosjekt = f"{prosjekt_info.get('prosjektnummer','-')} - {prosjekt_info.get('prosjektnavn','-')}"
+    for kx, etikett, verdi in (
+            (x0 + 6, "Prosjekt:", prosjekt),
+            (x0 + 0.45 * _BREDDE, "Beregning:", f"{prosjekt_info.get('beregningsnavn','-')}"),
+            (x0 + 0.75 * _BREDDE, "Utført:", f"{prosjekt_info.get('utfort_av','-')}")):
+        bredde = side.tekst(kx, y - 13.5, etikett, 9, _FET)
+        side.tekst(kx + bredde + 3, y - 13.5, verdi, 9)
+
+
+def _resultatboks(fyller: _Sidefyller, resultat, form):
+    hoyde = 84 + (44 if form is not None else 0)
+    fyller.plass(hoyde)
+    side, y, x0 = fyller.side, fyller.y, MARG
+    side.rektangel(x0, y - hoyde, _BREDDE, hoyde, fyll=GRONN)
+
+    def kolonne(i, ytopp, etikett, verdi, enhet=None):
+        xm = x0 + _BREDDE * (2 * i + 1) / 6
+        side.tekst(xm, ytopp - 14, etikett, 7, farge='#ffffff', justering='midt')
+        side.tekst(xm, ytopp - 34, verdi, 18, _FET, '#ffffff', 'midt')
+        if enhet:
+            side.tekst(xm, ytopp - 44, enhet, 7, farge='#ffffff', justering='midt')
+
+    kolonne(0, y, "GRUNNTRYKK", f"{resultat.grunntrykk:.1f}", "kN/m²")
+    kolonne(1, y, "BÆREEVNE", f"{resultat.baereevne:.1f}", "kN/m²")
+    kolonne(2, y, "UTNYTTELSE", f"{resultat.utnyttelsesgrad*100:.1f}%")
+    if form is not None:
+        kolonne(1, y - 50, "PÅLITELIGHETSINDEKS β", f"{form.beta:.2f}")
+        kolonne(2, y - 50, "BRUDDSANNSYNLIGHET P_f", f"{form.P_f:.1e}")
+
+    ok = resultat.utnyttelsesgrad <= 1.0
+    # rgba over grønn bakgrunn, som i CSS-en
+    bakgrunn = '#338266' if ok else '#3b5139'
+    side.rektangel(x0 + 10, y - hoyde + 8, _BREDDE - 20, 20, fyll=bakgrunn)
+    side.tekst(x0 + _BREDDE / 2, y - hoyde + 14.5,
+               "OK - Bæreevnen er tilstrekkelig" if ok else "IKKE OK", 10, _FET, '#ffffff', 'midt')
+    fyller.y = y - hoyde - 12
+
+
+def _figur(fyller: _Sidefyller, svg: str, skala: float = 0.6):
+    hoyde = 20 + 300 * skala + 8
+    fyller.plass(hoyde)
+    side, y = fyller.side, fyller.y
+    side.rektangel(MARG, y - hoyde, _BREDDE, hoyde, fyll='#fafafa', strek='#dddddd', strekbredde=0.75)
+    side.tekst(MARG + _BREDDE / 2, y - 13, "Fundamenttverrsnitt", 9, _FET, justering='midt')
+    tegn_svg(side, svg, MARG + (_BREDDE - 400 * skala) / 2, y - 18, skala)
+    fyller.y = y - hoyde - 12
+
+
+def _verditabell(side: PdfSide, x: float, y: float, bredde: float, overskrift: str,
+                 rader: List[Tuple[str, str]]) -> float:
+    """Overskrift og tabell med etikett og fet verdi; gir y under tabellen"""
+    side.tekst(x, y - 13, overskrift, 11, _FET, GRONN)
+    y -= 20
+    for etikett, verdi in rader:
+        side.tekst(x + 4, y - 9.5, etikett, 8.5)
+        side.tekst(x + 0.55 * bredde, y - 9.5, verdi, 8.5, _FET)
+        side.linje(x, y - _RAD, x + bredde, y - _RAD, strek='#eeeeee', strekbredde=0.75)
+        y -= _RAD
+    return y - 8
+
+
+def _inndatatabeller(fyller: _Sidefyller, jord, fundament, belastning, terreng, resultat):
+    effektiv = jord.analysetype == 'effektiv'
+    enhet = "kN/m" if fundament.lengde is None else "kN"
+    if effektiv:
+        jordrader = [("Friksjonsvinkel φ'", str(jord.friksjonsvinkel) + "°"),
+                     ("Effektiv romvekt γ'", str(jord.romvekt_eff) + " kN/m³")]
+    else:
+        jordrader = [("Udrenert skjærstyrke su", str(jord.udrenert_skjaerstyrke) + " kN/m²")]
+    jordrader.append(("Materialfaktor γM", f"{jord.materialfaktor}"))
+    fundamentrader = [("Bredde B", f"{fundament.bredde} m")]
+    if fundament.lengde:
+        fundamentrader.append(("Lengde L", str(fundament.lengde) + " m"))
+    fundamentrader += [("Tykkelse T", f"{fundament.tykkelse} m"),
+                       ("Dybde D", f"{terreng.fundamentdybde} m")]
+    lastrader = [("Vertikallast V", f"{belastning.vertikal} {enhet}"),
+                 ("Total V (m/egenvekt)", f"{resultat.V_total:.1f} {enhet}"),
+                 ("Horisontallast H", f"{belastning.horisontal_B} {enhet}"),
+                 ("Moment M", f"{belastning.moment_B} {'kNm/m' if fundament.lengde is None else 'kNm'}")]
+    beregnet = [("Eksentrisitet e", f"{resultat.eksentrisitet_B:.3f} m"),
+                ("Effektiv bredde Bo", f"{resultat.eff_bredde:.3f} m")]
+    if resultat.Nq:
+        beregnet += [("Nq", f"{resultat.Nq:.2f}"), ("Nγ", f"{resultat.Ny:.2f}")]
+    else:
+        beregnet.append(("Nc", f"{resultat.Nc:.2f}"))
+    beregnet.append(("Ruhet r", f"{resultat.ruhet:.3f}"))
+
+    hoyde = 2 * 28 + _RAD * max(len(jordrader) + len(fundamentrader), len(lastrader) + len(beregnet))
+    fyller.plass(hoyde)
+    side, y = fyller.side, fyller.y
+    bredde = (_BREDDE - 15) / 2
+    venstre, hoyre = MARG, MARG + bredde + 15
+    analyse = "Effektivspenningsanalyse" if effektiv else "Totalspenningsanalyse"
+    fund_type = "Stripefundament" if fundament.lengde is None else "Rektangulært"
+    yv = _verditabell(side, venstre, y, bredde, f"Jordparametre ({analyse})", jordrader)
+    yv = _verditabell(side, venstre, yv, bredde, f"Fundament ({fund_type})", fundamentrader)
+    yh = _verditabell(side, hoyre, y, bredde, "Belastning", lastrader)
+    yh = _verditabell(side, hoyre, yh, bredde, "Beregnede størrelser", beregnet)
+    fyller.y = min(yv, yh) - 4
+
+
+def _rutenett(fyller: _Sidefyller, overskrift: str, kolonner: List[str], rader: List[List[str]],
+              bredder: List[float], merknad: Optional[List[Tuple[str, str, str]]] = None):
+    """Tabell med grønn kolonnerad; merknad: (font, farge, tekst)-biter under tabellen"""
+    fyller.plass(20 + _RAD * (len(rader) + 1) + (14 if merknad else 0))
+    side, y = fyller.side, fyller.y
+    side.tekst(MARG, y - 13, overskrift, 11, _FET, GRONN)
+    y -= 20
+    posisjoner = [MARG + sum(bredder[:i]) * _BREDDE for i in range(len(bredder))]
+    side.rektangel(MARG, y - _RAD, _BREDDE, _RAD, fyll=GRONN)
+    for x, tekst in zip(posisjoner, kolonner):
+        side.tekst(x + 4, y - 9.5, tekst, 8.5, _FET, '#ffffff')
+    y -= _RAD
+    for rad in rader:
+        for x, tekst in zip(posisjoner, rad):
+            side.tekst(x + 4, y - 9.5, tekst, 8.5)
+        side.linje(MARG, y - _RAD, MARG + _BREDDE, y - _RAD, strek='#eeeeee', strekbredde=0.75)
+        y -= _RAD
+    if merknad:
+        x = MARG
+        for font, farge, tekst in merknad:
+            x += side.tekst(x, y - 10, tekst, 7.5, font, farge)
+        y -= 14
+    fyller.y = y - 10
+
+
+def _sensitivitet(fyller: _Sidefyller, analyse, maks_antall: int = 10):
+    pst = f"{analyse.variasjon * 100:.0f}"
+    rader = [[r.beskrivelse, f"{r.verdi:g}", f"{r.u_lav*100:.1f}%", f"{r.u_hoy*100:.1f}%",
+              f"{r.elastisitet_u:.2f}"] for r in analyse.rader[:maks_antall]]
+    _rutenett(fyller, f"Sensitivitetsanalyse (±{pst} %)",
+              ["Parameter", "Verdi", f"q/s ved -{pst} %", f"q/s ved +{pst} %", "Elastisitet"],
+              rader, [0.36, 0.14, 0.17, 0.17, 0.16],
+              [(_VANLIG, '#333333', "Elastisitet = ∂ln(q/s)/∂ln(x). Rangert etter spenn i q/s.")])
+
+
+def _form(fyller: _Sidefyller, form):
+    rader = [[FELTNAVN.get(navn, navn), f"{form.designpunkt[navn]:.4g}", f"{alfa:+.3f}"]
+             for navn, alfa in sorted(form.alfa.items(), key=lambda p: -abs(p[1]))]
+    merknad = [(_VANLIG, '#333333', f"β = {form.beta:.2f}, P_f = {form.P_f:.2e}. "
+                                    "α > 0 for motstand, α < 0 for last (NS-EN 1990 tillegg C).")]
+    if not form.konvergert:
+        merknad.append((_FET, ROD, " Ikke konvergert."))
+    _rutenett(fyller, "Pålitelighet (FORM)", ["Parameter", "Designpunkt x*", "α"],
+              rader, [0.5, 0.25, 0.25], merknad)
+
+
+def _formler(fyller: _Sidefyller, analysetype: str):
+    bokser = _FORMLER['effektiv' if analysetype == 'effektiv' else 'udrenert']
+    fyller.plass(20 + sum(len(linjer) * 11 + 8 + 5 for linjer in bokser))
+    side, y = fyller.side, fyller.y
+    side.tekst(MARG, y - 13, "Anvendte formler", 11, _FET, GRONN)
+    y -= 20
+    for linjer in bokser:
+        hoyde = len(linjer) * 11 + 8
+        side.rektangel(MARG, y - hoyde, _BREDDE, hoyde, fyll='#f5f5f5')
+        side.rektangel(MARG, y - hoyde, 2.25, hoyde, fyll=GRONN)
+        for i, linje in enumerate(linjer):
+            x = MARG + 9
+            for font, tekst in linje:
+                x += side.tekst(x, y - 12 - 11 * i, tekst, 8.5, font) + 4
+        y -= hoyde + 5
+    fyller.y = y - 6
+
+
+def _bunntekst(sider: List[PdfSide], beregningsnavn: str):
+    for nr, side in enumerate(sider, 1):
+        side.linje(MARG, MARG - 8, MARG + _BREDDE, MARG - 8, strek='#dddddd', strekbredde=0.75)
+        side.tekst(MARG, MARG - 18, "Norconsult Bæreevneberegning v1.0 | NS-EN 1997-1 | Brinch Hansen's metode",
+                   7, farge='#999999')
+        hoyre = beregningsnavn + (f" ({nr}/{len(sider)})" if len(sider) > 1 else "")
+        side.tekst(MARG + _BREDDE, MARG - 18, hoyre, 7, farge='#999999', justering='hoyre')
+
+
+def rapportkropp(jord, fundament, belastning, terreng, resultat,
+                 sensitivitet=None, form=None, svg_figur=None) -> List[PdfSide]:
+    """
+    Sidene under prosjekthodet, uten bunntekst
+
+    Avhenger bare av inndata og resultat, ikke av prosjekt, revisjon eller
+    dato, og kan derfor gjenbrukes mellom revisjoner (rapportbunt.py).
+    svg_figur: ferdig tegnet generer_fundament_svg.
+    """
+    if svg_figur is None:
+        svg_figur = generer_fundament_svg(fundament, terreng, resultat, belastning)
+    fyller = _Sidefyller()
+    fyller.y -= _HODE_HOYDE
+    _resultatboks(fyller, resultat, form)
+    _figur(fyller, svg_figur)
+    _inndatatabeller(fyller, jord, fundament, belastning, terreng, resultat)
+    if sensitivitet is not None:
+        _sensitivitet(fyller, sensitivitet)
+    if form is not None:
+        _form(fyller, form)
+    _formler(fyller, jord.analysetype)
+    return fyller.sider
+
+
+def rapportsider(prosjekt_info, jord, fundament, belastning, terreng, resultat,
+                 sensitivitet=None, form=None, svg_figur=None,
+                 kropp: Optional[Sequence[PdfSide]] = None) -> List[PdfSide]:
+    """
+    Rapporten for én beregning som PDF-sider (normalt én side)
+
+    Samme innhold og rekkefølge som generer_rapport_html. Blokker som ikke
+    får plass (typisk formlene når både sensitivitet og FORM er med)
+    fortsetter på en ny side. kropp: ferdige sider fra rapportkropp for
+    de samme dataene; de endres ikke.
+    """
+    if kropp is None:
+        kropp = rapportkropp(jord, fundament, belastning, terreng, resultat,
+                             sensitivitet, form, svg_figur)
+    hode = PdfSide()
+    _hode(hode, prosjekt_info)
+    sider = []
+    for nr, del_ in enumerate(kropp):
+        side = PdfSide(del_.bredde, del_.hoyde)
+        side.operatorer = (hode.operatorer if nr == 0 else []) + del_.operatorer
+        sider.append(side)
+    _bunntekst(sider, f"{prosjekt_info.get('beregningsnavn','-')}")
+    return sider
+
+
+def dokumenttittel(prosjekt_info) -> str:
+    """Tittel i PDF-ens dokumentinformasjon: prosjektnummer og -navn"""
+    return " - ".join(str(prosjekt_info[n]) for n in ('prosjektnummer', 'prosjektnavn')
+                      if prosjekt_info.get(n)) or "Bæreevneberegning"
+
+
+def generer_rapport_pdf(prosjekt_info, jord, fundament, belastning, terreng, resultat,
+                        sensitivitet=None, form=None) -> bytes:
+    """Genererer PDF-rapport, eventuelt med sensitivitetsanalyse og FORM-resultat"""
+    ut = io.BytesIO()
+    with PdfSkriver(ut, tittel=dokumenttittel(prosjekt_info)) as skriver:
+        for side in rapportsider(prosjekt_info, jord, fundament, belastning, terreng, resultat,
+                                 sensitivitet, form):
+            skriver.legg_til_side(side)
+    return ut.getvalue()
+
+
+def generer_prosjekt_pdf(prosjekt_info, beregninger, ut=None) -> Optional[bytes]:
+    """
+    Én PDF for hele prosjektet, én beregning per side
+
+    beregninger: (navn, jord, fundament, belastning, terreng, resultat)
+    for hver beregning, i ønsket rekkefølge. navn er beregningsnavnet, eller
+    en dict som oppdaterer prosjekt_info for siden (f.eks. beregningsnavn og
+    revisjon). ut: filsti eller binært filobjekt; uten ut returneres PDF-en
+    som bytes.
+    """
+    fil = io.BytesIO() if ut is None else ut
+    with PdfSkriver(fil, tittel=dokumenttittel(prosjekt_info)) as skriver:
+        for navn, jord, fundament, belastning, terreng, resultat in beregninger:
+            info = dict(prosjekt_info, **navn) if isinstance(navn, dict) else dict(prosjekt_info, beregningsnavn=navn)
+            for side in rapportsider(info, jord, fundament, belastning, terreng, resultat):
+                skriver.legg_til_side(side)
+    return fil.getvalue() if ut is None else None
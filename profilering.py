@@ -0,0 +1,179 @@
+"""
+Tidsmåling per beregningssteg i BaereevneKalkulator
+
+Når profilering er aktivert, erstattes stegmetodene på kalkulatorobjektet
+(ikke klassen) av innpakninger som måler veggtid og antall kall. Avslått
+profilering endrer ingenting i beregningen, så den koster ingenting.
+
+Tid registreres både inklusiv og som egen tid (uten tid i andre målte
+steg som kalles innenfra). Hvert kall til beregn eller beregn_batch fra
+utsiden blir en kjøring (ett tilfelle eller én blokk) med egen tid per
+steg, og sendes til en eventuell callback.
+
+    profil = kalkulator.aktiver_profilering(callback=lambda k: metrikk.send(k.som_dict()))
+    kalkulator.beregn_batch(...)
+    print(profil.rapport().tekst())
+"""
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, List, Optional
+
+
+# Kalkulatormetode -> stegnavn. Skalar- og vektorversjoner av samme steg
+# deler navn; beregn og beregn_batch er toppnivå.
+METODESTEG = {
+    'beregn': 'beregn',
+    'beregn_batch': 'beregn_batch',
+    'beregn_eksentrisitet': 'eksentrisitet',
+    '_eksentrisitet_vektor': 'eksentrisitet',
+    'beregn_effektivt_areal': 'effektivt_areal',
+    'beregn_grunntrykk': 'grunntrykk',
+    'beregn_skjaerspenning_og_ruhet': 'ruhet',
+    'beregn_Nq_effektiv': 'Nq',
+    '_Nq_effektiv_vektor': 'Nq',
+    'interpoler_Ny': 'Ny',
+    'beregn_Nc_udrenert': 'Nc',
+    'beregn_formfaktorer': 'formfaktorer',
+    'beregn_reduksjonsfaktor_skraaning': 'reduksjonsfaktor',
+    '_reduksjonsfaktor_vektor': 'reduksjonsfaktor',
+    '_batch_kolonner': 'kolonner',
+    '_beregn_effektiv_vektor': 'effektiv',
+    '_beregn_udrenert_vektor': 'udrenert',
+}
+
+TOPPNIVAA = ('beregn', 'beregn_batch')
+
+
+@dataclass
+class StegStatistikk:
+    """Samlet tid og antall kall for ett steg"""
+    kall: int = 0
+    tid: float = 0.0  # inklusiv [s]
+    egen_tid: float = 0.0  # uten tid i andre målte steg [s]
+
+
+@dataclass
+class Kjoring:
+    """Ett kall til beregn (ett tilfelle) eller beregn_batch (én blokk)"""
+    metode: str
+    antall: int  # beregnede tilfeller
+    tid: float  # [s]
+    steg: Dict[str, float]  # egen tid per steg [s]; toppnivået er resten
+
+    def som_dict(self) -> Dict[str, object]:
+        return {'metode': self.metode, 'antall': self.antall, 'tid': self.tid,
+                'steg': dict(self.steg)}
+
+
+@dataclass
+class ProfilRapport:
+    """Øyeblikksbilde av profileringen"""
+    steg: Dict[str, StegStatistikk]
+    kjoringer: List[Kjoring] = field(default_factory=list)
+
+    def som_dict(self) -> Dict[str, object]:
+        return {
+            'steg': {navn: {'kall': s.kall, 'tid': s.tid, 'egen_tid': s.egen_tid}
+                     for navn, s in self.steg.items()},
+            'kjoringer': [k.som_dict() for k in self.kjoringer],
+        }
+
+    def tekst(self) -> str:
+        """Steg sortert etter egen tid, med andel av total"""
+        total = sum(s.egen_tid for s in self.steg.values())
+        linjer = [f"{'steg':<18}{'kall':>10}{'tid [ms]':>12}{'egen [ms]':>12}{'andel':>8}"]
+        for navn, s in sorted(self.steg.items(), key=lambda x: -x[1].egen_tid):
+            andel = s.egen_tid / total if total > 0 else 0.0
+            linjer.append(f"{navn:<18}{s.kall:>10}{1000 * s.tid:>12.3f}"
+                          f"{1000 * s.egen_tid:>12.3f}{andel:>8.1%}")
+        blokker = [k for k in self.kjoringer if k.metode == 'beregn_batch']
+        if blokker:
+            tider = [k.tid / k.antall for k in blokker if k.antall]
+            linjer.append(f"{len(blokker)} blokker, {sum(k.antall for k in blokker):,} tilfeller, "
+                          f"{1e6 * min(tider):.2f}–{1e6 * max(tider):.2f} µs per tilfelle")
+        return "\n".join(linjer)
+
+
+class Profilering:
+    """
+    Samler tid per steg og per kjøring
+
+    callback: kalles med en Kjoring etter hvert kall til beregn/beregn_batch
+    maks_kjoringer: antall siste kjøringer som tas vare på i rapporten
+    """
+
+    def __init__(self,
+                 callback: Optional[Callable[[Kjoring], None]] = None,
+                 maks_kjoringer: int = 1000):
+        self.callback = callback
+        self.steg: Dict[str, StegStatistikk] = {}
+        self.kjoringer: Deque[Kjoring] = deque(maxlen=maks_kjoringer)
+        self._laas = threading.Lock()
+        self._lokal = threading.local()
+
+    def maal(self, navn: str, funksjon: Callable, toppnivaa: bool = False) -> Callable:
+        """Pakker inn funksjon slik at hvert kall registreres under navn"""
+        statistikk = self.steg.setdefault(navn, StegStatistikk())
+        lokal = self._lokal
+        laas = self._laas
+
+        def maalt(*args, **kwargs):
+            stakk = getattr(lokal, 'stakk', None)
+            if stakk is None:
+                stakk = lokal.stakk = []
+            ytterst = toppnivaa and not stakk
+            if ytterst:
+                lokal.kjoring = {}
+            stakk.append(0.0)
+            resultat = None
+            start = time.perf_counter()
+            try:
+                resultat = funksjon(*args, **kwargs)
+                return resultat
+            finally:
+                tid = time.perf_counter() - start
+                egen = tid - stakk.pop()
+                if stakk:
+                    stakk[-1] += tid
+                with laas:
+                    statistikk.kall += 1
+                    statistikk.tid += tid
+                    statistikk.egen_tid += egen
+                kjoring = getattr(lokal, 'kjoring', None)
+                if kjoring is not None:
+                    kjoring[navn] = kjoring.get(navn, 0.0) + egen
+                if ytterst:
+                    lokal.kjoring = None
+                    self._avslutt(navn, tid, kjoring, resultat)
+
+        maalt.__wrapped__ = funksjon
+        return maalt
+
+    def _avslutt(self, metode: str, tid: float, steg: Dict[str, float], resultat):
+        if isinstance(resultat, dict):
+            antall = next(iter(resultat.values())).size if resultat else 0
+        else:
+            antall = 1
+        kjoring = Kjoring(metode=metode, antall=antall, tid=tid, steg=steg)
+        with self._laas:
+            self.kjoringer.append(kjoring)
+        if self.callback is not None:
+            self.callback(kjoring)
+
+    def nullstill(self):
+        """Nullstiller all statistikk"""
+        with self._laas:
+            for s in self.steg.values():
+                s.kall, s.tid, s.egen_tid = 0, 0.0, 0.0
+            self.kjoringer.clear()
+
+    def rapport(self) -> ProfilRapport:
+        with self._laas:
+            return ProfilRapport(
+                steg={navn: StegStatistikk(s.kall, s.tid, s.egen_tid)
+                      for navn, s in self.steg.items() if s.kall},
+                kjoringer=list(self.kjoringer)
+            )
@@ -0,0 +1,320 @@
+"""
+Rapporter for mange fundamenter, samlet i ett zip-arkiv
+
+Leser samme tabellformat som batch_cli.py (én rad per fundament/
+lasttilfelle, valgfri kolonne beregningsnavn), lager én HTML-rapport per
+rad i en prosesspool og skriver dem fortløpende til arkivet sammen med
+oversikt.csv. Bare et begrenset antall rapporter er i minnet samtidig.
+Med --pdf skrives i tillegg én samlet prosjekt-PDF med en side per
+beregning (pdfrapport.py, ingen nettleser).
+
+PDF-sidene under prosjekthodet avhenger bare av inndata og resultat. Med
+--cache mellomlagres de i en mappe, nøklet på stabil_hash, så en ny
+revisjon bare lager sidene for fundamentene som faktisk er endret. HTML-en
+lages alltid på nytt; den er billigere enn nøkkel og filoppslag.
+
+    python rapportbunt.py fundamenter.csv rapporter.zip --prosjektnummer 5200001 \\
+        --prosjektnavn "E39 Rogfast" --revisjon B --pdf prosjekt.pdf --cache rapportcache
+"""
+
+import argparse
+import csv
+import io
+import os
+import re
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+from models import stabil_hash
+from calculator import BaereevneKalkulator
+from batch_cli import enkelttilfeller, les_tabell, _tolk_verdi
+from report import RAPPORTVERSJON, generer_rapport_html
+from pdfrapport import PDFVERSJON, PdfSide, PdfSkriver, dokumenttittel, rapportkropp, rapportsider
+
+
+class Fragmentcache:
+    """
+    Ferdige PDF-sider som filer i en mappe, én fil per nøkkel
+
+    Kan deles av flere prosesser: filene skrives under et midlertidig navn
+    og flyttes på plass, så en leser ser aldri en halvskrevet fil.
+    """
+
+    def __init__(self, mappe):
+        self.mappe = Path(mappe)
+        self.mappe.mkdir(parents=True, exist_ok=True)
+        self.treff = 0
+        self.bom = 0
+
+    def _sti(self, nokkel: str) -> Path:
+        return self.mappe / nokkel[:2] / f"{nokkel}.txt"
+
+    def hent(self, nokkel: str) -> Optional[str]:
+        try:
+            tekst = self._sti(nokkel).read_bytes().decode('utf-8')
+        except FileNotFoundError:
+            self.bom += 1
+            return None
+        self.treff += 1
+        return tekst
+
+    def lagre(self, nokkel: str, tekst: str):
+        sti = self._sti(nokkel)
+        sti.parent.mkdir(exist_ok=True)
+        midlertidig = sti.with_name(f"{sti.name}.{os.getpid()}.tmp")
+        midlertidig.write_bytes(tekst.encode('utf-8'))
+        os.replace(midlertidig, sti)
+
+    def hent_eller_lag(self, nokkel: str, lag: Callable[[], str]) -> str:
+        tekst = self.hent(nokkel)
+        if tekst is None:
+            tekst = lag()
+            self.lagre(nokkel, tekst)
+        return tekst
+
+
+def pdfkropp(jord, fundament, belastning, terreng, resultat,
+             cache: Optional[Fragmentcache] = None) -> List[PdfSide]:
+    """Som pdfrapport.rapportkropp; sidene hentes fra cache når de finnes"""
+    if cache is None:
+        return rapportkropp(jord, fundament, belastning, terreng, resultat)
+
+    # Én fil per rapport: innholdet side for side, skilt med \f (sideinnholdet
+    # er ren ASCII der kontrolltegn alltid er escapet)
+    nokkel = stabil_hash('pdfkropp', RAPPORTVERSJON, PDFVERSJON, jord, fundament, belastning, terreng, resultat)
+    tekst = cache.hent_eller_lag(nokkel, lambda: '\f'.join(
+        side.innhold().decode('ascii')
+        for side in rapportkropp(jord, fundament, belastning, terreng, resultat)))
+    sider = []
+    for innhold in tekst.split('\f'):
+        side = PdfSide()
+        side.operatorer.append(innhold)
+        sider.append(side)
+    return sider
+
+
+@dataclass
+class Rapportfil:
+    """Én ferdig rapport, klar for arkivet"""
+    filnavn: str
+    html: bytes
+    beregningsnavn: str
+    utnyttelsesgrad: float
+    pdfsider: Optional[List[PdfSide]] = None
+
+
+@dataclass
+class Rapportsammendrag:
+    """Oppsummering av en rapportkjøring"""
+    antall: int
+    antall_over_1: int
+    fra_cache: int  # PDF-kropper hentet fra mellomlageret
+    tegnet: int  # PDF-kropper som måtte lages
+    tid: float  # sekunder
+    pdf_sider: int = 0
+
+    @property
+    def rapporter_per_sekund(self) -> float:
+        return self.antall / self.tid if self.tid > 0 else float('inf')
+
+    def tekst(self) -> str:
+        linjer = [
+            f"Rapporter:          {self.antall}",
+            f"Med q/s > 1:        {self.antall_over_1}",
+        ]
+        if self.fra_cache or self.tegnet:
+            linjer.append(f"PDF fra cache:      {self.fra_cache} (laget {self.tegnet})")
+        if self.pdf_sider:
+            linjer.append(f"PDF-sider:          {self.pdf_sider}")
+        linjer.append(f"Tid:                {self.tid:.1f} s ({self.rapporter_per_sekund:,.1f} rapporter/s)")
+        return "\n".join(linjer)
+
+
+def _filnavn(tekst: str) -> str:
+    return re.sub(r'[^\w.-]+', '_', tekst).strip('_') or 'rapport'
+
+
+def _rapportblokk(kalkulator: BaereevneKalkulator,
+                  prosjekt_info: Dict[str, str],
+                  konstanter: Dict[str, object],
+                  cache_mappe: Optional[str],
+                  start: int,
+                  rader: List[Mapping[str, object]],
+                  pdf: bool = False) -> Tuple[List[Rapportfil], int, int]:
+    """Rapporter for radene (nummerert fra start + 1), med treff og bom i cachen"""
+    cache = Fragmentcache(cache_mappe) if cache_mappe else None
+    filer = []
+    tilfeller = enkelttilfeller(rader, konstanter)
+    for nr, (rad, (jord, fundament, belastning, terreng)) in enumerate(zip(rader, tilfeller), start + 1):
+        navn = rad.get('beregningsnavn')
+        navn = f"Rad {nr}" if navn is None or navn != navn or str(navn).strip() == '' else str(navn)
+        resultat = kalkulator.beregn(jord, fundament, belastning, terreng)
+        info = dict(prosjekt_info, beregningsnavn=navn)
+        html = generer_rapport_html(info, jord, fundament, belastning, terreng, resultat)
+        sider = None
+        if pdf:
+            sider = rapportsider(info, jord, fundament, belastning, terreng, resultat,
+                                 kropp=pdfkropp(jord, fundament, belastning, terreng, resultat, cache))
+        filer.append(Rapportfil(f"{nr:04d}_{_filnavn(navn)}.html", html.encode('utf-8'),
+                                navn, resultat.utnyttelsesgrad, sider))
+    return filer, (cache.treff if cache else 0), (cache.bom if cache else 0)
+
+
+def _rader(inn) -> Iterator[Mapping[str, object]]:
+    if isinstance(inn, (str, Path)):
+        for tabell in les_tabell(inn, 10_000):
+            yield from tabell.to_dict('records')
+    else:
+        yield from inn
+
+
+def _blokker(rader: Iterable[Mapping[str, object]], storrelse: int) -> Iterator[List[Mapping[str, object]]]:
+    blokk = []
+    for rad in rader:
+        blokk.append(rad)
+        if len(blokk) >= storrelse:
+            yield blokk
+            blokk = []
+    if blokk:
+        yield blokk
+
+
+def lag_rapportarkiv(inn,
+                     ut,
+                     prosjekt_info: Optional[Dict[str, str]] = None,
+                     konstanter: Optional[Dict[str, object]] = None,
+                     kalkulator: Optional[BaereevneKalkulator] = None,
+                     arbeidere: Optional[int] = None,
+                     cache=None,
+                     blokkstorrelse: int = 16,
+                     fremdrift=None,
+                     pdf=None) -> Rapportsammendrag:
+    """
+    Skriver én HTML-rapport per rad i inn til zip-arkivet ut
+
+    inn: tabellfil (som batch_cli.py) eller rader som dict med de samme feltene
+    ut: filsti eller binær filobjekt (f.eks. BytesIO)
+    cache: mappe for mellomlagrede PDF-sider, eller None (brukes bare med pdf)
+    pdf: filsti eller binært filobjekt for én samlet prosjekt-PDF med
+    rapportene i samme rekkefølge, eller None
+
+    Høyst 2·arbeidere blokker er i arbeid samtidig, og rapportene skrives
+    til arkivet i samme rekkefølge som radene. arbeidere=1 lager alt i
+    denne prosessen. fremdrift kalles med (antall ferdige, sekunder).
+    """
+    kalkulator = kalkulator or BaereevneKalkulator()
+    prosjekt_info = dict(prosjekt_info or {})
+    konstanter = konstanter or {}
+    arbeidere = arbeidere or os.cpu_count() or 1
+    cache_mappe = str(cache) if cache is not None else None
+
+    start = time.perf_counter()
+    oversikt = []
+    treff = bom = 0
+
+    lag_pdf = pdf is not None
+    with zipfile.ZipFile(ut, 'w', compression=zipfile.ZIP_DEFLATED) as arkiv, \
+            (PdfSkriver(pdf, tittel=dokumenttittel(prosjekt_info)) if lag_pdf else nullcontext()) as pdfskriver:
+        def skriv(svar):
+            nonlocal treff, bom
+            filer, blokk_treff, blokk_bom = svar
+            treff += blokk_treff
+            bom += blokk_bom
+            for fil in filer:
+                arkiv.writestr(fil.filnavn, fil.html)
+                oversikt.append((fil.filnavn, fil.beregningsnavn, fil.utnyttelsesgrad))
+                for side in fil.pdfsider or ():
+                    pdfskriver.legg_til_side(side)
+            if fremdrift is not None:
+                fremdrift(len(oversikt), time.perf_counter() - start)
+
+        blokker = _blokker(_rader(inn), blokkstorrelse)
+        nummer = 0
+        if arbeidere <= 1:
+            for blokk in blokker:
+                skriv(_rapportblokk(kalkulator, prosjekt_info, konstanter, cache_mappe, nummer, blokk,
+                                    lag_pdf))
+                nummer += len(blokk)
+        else:
+            with ProcessPoolExecutor(max_workers=arbeidere) as pool:
+                vindu = []
+                for blokk in blokker:
+                    vindu.append(pool.submit(_rapportblokk, kalkulator, prosjekt_info, konstanter,
+                                             cache_mappe, nummer, blokk, lag_pdf))
+                    nummer += len(blokk)
+                    if len(vindu) >= 2 * arbeidere:
+                        skriv(vindu.pop(0).result())
+                for fremtid in vindu:
+                    skriv(fremtid.result())
+
+        tekst = io.StringIO()
+        skriver = csv.writer(tekst, delimiter=';', lineterminator='\n')
+        skriver.writerow(['fil', 'beregningsnavn', 'utnyttelsesgrad', 'status'])
+        for filnavn, navn, u in oversikt:
+            skriver.writerow([filnavn, navn, f"{u:.4f}", 'OK' if u <= 1.0 else 'IKKE OK'])
+        arkiv.writestr('oversikt.csv', tekst.getvalue().encode('utf-8'))
+
+    return Rapportsammendrag(
+        antall=len(oversikt),
+        antall_over_1=sum(1 for _, _, u in oversikt if u > 1.0),
+        fra_cache=treff,
+        tegnet=bom,
+        tid=time.perf_counter() - start,
+        pdf_sider=pdfskriver.antall_sider if lag_pdf else 0
+    )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="HTML-rapporter for alle rader i en CSV/Parquet/Feather-fil, samlet i et zip-arkiv")
+    parser.add_argument('inn', help="Inndatafil, én rad per fundament/lasttilfelle")
+    parser.add_argument('ut', help="Zip-arkiv for rapportene")
+    parser.add_argument('--verdi', type=_tolk_verdi, action='append', default=[],
+                        metavar='FELT=VERDI', help="Felles verdi for alle rader (kan gjentas)")
+    parser.add_argument('--prosjektnummer', default='')
+    parser.add_argument('--prosjektnavn', default='')
+    parser.add_argument('--utfort-av', default='')
+    parser.add_argument('--revisjon', default='0')
+    parser.add_argument('--cache', metavar='MAPPE',
+                        help="Mappe for mellomlagrede PDF-sider (med --pdf; gjenbrukes mellom kjøringer)")
+    parser.add_argument('--arbeidere', type=int, default=None,
+                        help="Antall prosesser (standard: alle kjerner)")
+    parser.add_argument('--pdf', metavar='FIL',
+                        help="Skriv også én prosjekt-PDF med alle beregningene, én per side")
+    parser.add_argument('--blokkstorrelse', type=int, default=16, help="Rapporter per oppgave i poolen")
+    parser.add_argument('--ny-interpolasjon', choices=['lineaer', 'kubisk'], default='lineaer')
+    parser.add_argument('--stille', action='store_true', help="Ingen fremdriftslinje")
+    args = parser.parse_args(argv)
+    if args.cache and not args.pdf:
+        parser.error("--cache gjelder PDF-sidene og krever --pdf")
+
+    def fremdrift(antall, sekunder):
+        hastighet = antall / sekunder if sekunder > 0 else 0.0
+        print(f"\r{antall:,} rapporter ({hastighet:,.1f}/s)", end='', file=sys.stderr, flush=True)
+
+    sammendrag = lag_rapportarkiv(
+        args.inn, args.ut,
+        prosjekt_info={'prosjektnummer': args.prosjektnummer, 'prosjektnavn': args.prosjektnavn,
+                       'utfort_av': args.utfort_av, 'revisjon': args.revisjon},
+        konstanter=dict(args.verdi),
+        kalkulator=BaereevneKalkulator(ny_interpolasjon=args.ny_interpolasjon),
+        arbeidere=args.arbeidere,
+        cache=args.cache,
+        blokkstorrelse=args.blokkstorrelse,
+        fremdrift=None if args.stille else fremdrift,
+        pdf=args.pdf
+    )
+    if not args.stille:
+        print(file=sys.stderr)
+    print(sammendrag.tekst())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,119 +1,279 @@
 """
 PDF/HTML Rapport Generator for Bæreevneberegning
+
+Rapporten bygges av forhåndskompilerte maler: de faste delene (CSS, topp,
+formelbokser, tegneflaten i figuren) settes sammen én gang ved import, og
+hver rapport fylles inn med én join.
 """
 
+import re
 from datetime import datetime
 from models import (JordParameter, FundamentGeometri, Belastning,
                    TerrengForhold, Resultat)
+from sensitivitet import FELTNAVN
 
 
-def generer_fundament_svg(fundament, terreng, resultat, belastning):
-    """Genererer SVG-figur av fundamentet"""
-    B = fundament.bredde
-    T = fundament.tykkelse
-    D = terreng.fundamentdybde
-    Bo = resultat.eff_bredde
-    e_B = resultat.eksentrisitet_B
-    
-    # SVG dimensjoner og skalering
-    width = 400
-    height = 300
-    scale = 80 / max(B, D + T + 0.5)
-    cx = width / 2
-    cy = 100
-    
-    svg = f'''<svg width="{width}" height="{height}" xmlns="http://www.w3.org/2000/svg">
+# Økes når rapportens utseende endres. Inngår i nøklene til mellomlagrede
+# rapportdeler (rapportbunt.py), så gamle deler ikke gjenbrukes.
+RAPPORTVERSJON = 1
+
+
+class Mal:
+    """
+    Tekstmal med navngitte plasser ($navn), kompilert én gang
+
+    Teksten deles opp i faste biter og plasser ved opprettelse og gjøres om
+    til en funksjon, så fyll(navn=verdi, ...) bare er ett kall og én
+    ''.join over ferdige biter. Verdiene må være ferdig formaterte str.
+    delvis() fyller inn noen av plassene på forhånd og gir en ny mal.
+    """
+
+    _PLASS = re.compile(r'\$(\w+)')
+
+    def __init__(self, tekst: str):
+        self.deler = self._PLASS.split(tekst)
+        self.plasser = list(dict.fromkeys(self.deler[1::2]))
+        biter = [repr(d) if i % 2 == 0 else d for i, d in enumerate(self.deler) if d]
+        kilde = (f"def fyll({'*, ' if self.plasser else ''}{', '.join(self.plasser)}):\n"
+                 f"    return ''.join(({', '.join(biter)},))\n")
+        navnerom = {}
+        exec(kilde, navnerom)
+        self.fyll = navnerom['fyll']
+
+    def delvis(self, **verdier: str) -> 'Mal':
+        deler = self.deler[:]
+        deler[1::2] = [verdier.get(navn, '$' + navn) for navn in self.deler[1::2]]
+        return Mal(''.join(deler))
+
+
+# Figuren tegnes på en fast flate (400 x 300, terreng i y = 100); de faste
+# koordinatene står rett i malene under.
+_SVG_CX = 400 / 2
+_SVG_CY = 100
+
+_SVG_START = Mal('''<svg width="400" height="300" xmlns="http://www.w3.org/2000/svg">
         <!-- Bakgrunn jord -->
-        <rect x="0" y="{cy}" width="{width}" height="{height-cy}" fill="#d4c4b0" opacity="0.4"/>
+        <rect x="0" y="100" width="400" height="200" fill="#d4c4b0" opacity="0.4"/>
         
         <!-- Terrengoverflate -->
-        <line x1="0" y1="{cy}" x2="{width}" y2="{cy}" stroke="#2d5016" stroke-width="3"/>
+        <line x1="0" y1="100" x2="400" y2="100" stroke="#2d5016" stroke-width="3"/>
         
         <!-- Fundament -->
-        <rect x="{cx - B*scale/2}" y="{cy + D*scale - T*scale}" 
-              width="{B*scale}" height="{T*scale}" 
+        <rect x="$x_fund" y="$y_fund" 
+              width="$b_fund" height="$t_fund" 
               fill="#b0b0b0" stroke="#404040" stroke-width="2"/>
         
         <!-- Vegg/søyle -->
-        <rect x="{cx - fundament.vegg_bredde*scale/2}" y="{cy}" 
-              width="{fundament.vegg_bredde*scale}" height="{D*scale - T*scale}" 
+        <rect x="$x_vegg" y="100" 
+              width="$b_vegg" height="$h_vegg" 
               fill="#a0a0a0" stroke="#404040" stroke-width="2"/>
         
         <!-- Effektiv bredde markering -->
-        <rect x="{cx - Bo*scale/2}" y="{cy + D*scale}" 
-              width="{Bo*scale}" height="4" 
+        <rect x="$x_eff" y="$y_bunn" 
+              width="$b_eff" height="4" 
               fill="#006341"/>
         
         <!-- Vertikallast pil -->
-        <line x1="{cx + e_B*scale}" y1="{cy - 60}" x2="{cx + e_B*scale}" y2="{cy - 10}" 
+        <line x1="$x_last" y1="40" x2="$x_last" y2="90" 
               stroke="#c62828" stroke-width="3"/>
-        <polygon points="{cx + e_B*scale},{cy - 5} {cx + e_B*scale - 8},{cy - 15} {cx + e_B*scale + 8},{cy - 15}" 
+        <polygon points="$x_last,95 $x_last_v,85 $x_last_h,85" 
                  fill="#c62828"/>
-        <text x="{cx + e_B*scale}" y="{cy - 70}" text-anchor="middle" 
-              font-size="12" fill="#c62828">V = {belastning.vertikal:.0f} kN</text>
-        '''
-    
-    # Horisontallast
-    if abs(belastning.horisontal_B) > 0.1:
-        H_dir = 1 if belastning.horisontal_B > 0 else -1
-        svg += f'''
-        <line x1="{cx}" y1="{cy - 30}" x2="{cx + H_dir*40}" y2="{cy - 30}" 
+        <text x="$x_last" y="30" text-anchor="middle" 
+              font-size="12" fill="#c62828">V = $V kN</text>
+        ''')
+
+# Horisontallast, ferdig tegnet for begge retninger
+_SVG_HORISONTAL = {
+    H_dir: Mal('''
+        <line x1="200.0" y1="70" x2="$x_H_pil" y2="70" 
               stroke="#1565c0" stroke-width="3"/>
-        <polygon points="{cx + H_dir*45},{cy - 30} {cx + H_dir*35},{cy - 35} {cx + H_dir*35},{cy - 25}" 
+        <polygon points="$x_H_spiss,70 $x_H_bakre,65 $x_H_bakre,75" 
                  fill="#1565c0"/>
-        <text x="{cx + H_dir*60}" y="{cy - 25}" text-anchor="middle" 
-              font-size="11" fill="#1565c0">H = {abs(belastning.horisontal_B):.0f}</text>
-        '''
-    
-    # Moment
-    if abs(belastning.moment_B) > 0.1:
-        svg += f'''
-        <path d="M {cx-20} {cy-40} A 20 20 0 0 1 {cx+20} {cy-40}" 
+        <text x="$x_H_tekst" y="75" text-anchor="middle" 
+              font-size="11" fill="#1565c0">H = $H</text>
+        ''').delvis(
+        x_H_pil=f"{_SVG_CX + H_dir*40}", x_H_spiss=f"{_SVG_CX + H_dir*45}",
+        x_H_bakre=f"{_SVG_CX + H_dir*35}", x_H_tekst=f"{_SVG_CX + H_dir*60}")
+    for H_dir in (1, -1)
+}
+
+_SVG_MOMENT = Mal('''
+        <path d="M 180.0 60 A 20 20 0 0 1 220.0 60" 
               fill="none" stroke="#7b1fa2" stroke-width="2"/>
-        <text x="{cx}" y="{cy - 50}" text-anchor="middle" 
-              font-size="11" fill="#7b1fa2">M = {abs(belastning.moment_B):.0f} kNm</text>
-        '''
-    
-    # Dimensjoner
-    svg += f'''
+        <text x="200.0" y="50" text-anchor="middle" 
+              font-size="11" fill="#7b1fa2">M = $M kNm</text>
+        ''')
+
+_SVG_MAAL = Mal('''
         <!-- Bredde B -->
-        <line x1="{cx - B*scale/2}" y1="{cy + D*scale + 20}" x2="{cx + B*scale/2}" y2="{cy + D*scale + 20}" 
+        <line x1="$x_fund" y1="$y_maal" x2="$x_fund_h" y2="$y_maal" 
               stroke="#666" stroke-width="1" stroke-dasharray="4"/>
-        <text x="{cx}" y="{cy + D*scale + 35}" text-anchor="middle" 
-              font-size="10" fill="#666">B = {B:.2f} m</text>
+        <text x="200.0" y="$y_B" text-anchor="middle" 
+              font-size="10" fill="#666">B = $B m</text>
         
         <!-- Effektiv bredde Bo -->
-        <text x="{cx}" y="{cy + D*scale + 15}" text-anchor="middle" 
-              font-size="10" fill="#006341" font-weight="bold">Bo = {Bo:.2f} m</text>
+        <text x="200.0" y="$y_Bo" text-anchor="middle" 
+              font-size="10" fill="#006341" font-weight="bold">Bo = $Bo m</text>
         
         <!-- Grunntrykk -->
-        <text x="{cx}" y="{cy + D*scale + 55}" text-anchor="middle" 
-              font-size="11" fill="#ff6b35" font-weight="bold">q = {resultat.grunntrykk:.1f} kN/m²</text>
+        <text x="200.0" y="$y_q" text-anchor="middle" 
+              font-size="11" fill="#ff6b35" font-weight="bold">q = $q kN/m²</text>
         
         <!-- Dybde D -->
-        <line x1="{cx + B*scale/2 + 15}" y1="{cy}" x2="{cx + B*scale/2 + 15}" y2="{cy + D*scale}" 
+        <line x1="$x_D" y1="100" x2="$x_D" y2="$y_bunn" 
               stroke="#666" stroke-width="1" stroke-dasharray="4"/>
-        <text x="{cx + B*scale/2 + 25}" y="{cy + D*scale/2}" 
-              font-size="10" fill="#666" transform="rotate(90 {cx + B*scale/2 + 25} {cy + D*scale/2})">D = {D:.2f} m</text>
-    </svg>'''
-    
-    return svg
+        <text x="$x_D_tekst" y="$y_D_tekst" 
+              font-size="10" fill="#666" transform="rotate(90 $x_D_tekst $y_D_tekst)">D = $D m</text>
+    </svg>''')
 
 
-def generer_rapport_html(prosjekt_info, jord, fundament, belastning, terreng, resultat):
-    """Genererer HTML-rapport"""
+def generer_fundament_svg(fundament, terreng, resultat, belastning):
+    """Genererer SVG-figur av fundamentet"""
+    B = fundament.bredde
+    T = fundament.tykkelse
+    D = terreng.fundamentdybde
+    Bo = resultat.eff_bredde
+    e_B = resultat.eksentrisitet_B
+    
+    # Skalering til tegneflaten
+    scale = 80 / max(B, D + T + 0.5)
+    cx = _SVG_CX
+    cy = _SVG_CY
+    
+    x_last = f"{cx + e_B*scale}"
+    svg = [_SVG_START.fyll(
+        x_fund=f"{cx - B*scale/2}", y_fund=f"{cy + D*scale - T*scale}",
+        b_fund=f"{B*scale}", t_fund=f"{T*scale}",
+        x_vegg=f"{cx - fundament.vegg_bredde*scale/2}", b_vegg=f"{fundament.vegg_bredde*scale}",
+        h_vegg=f"{D*scale - T*scale}",
+        x_eff=f"{cx - Bo*scale/2}", y_bunn=f"{cy + D*scale}", b_eff=f"{Bo*scale}",
+        x_last=x_last, x_last_v=f"{cx + e_B*scale - 8}", x_last_h=f"{cx + e_B*scale + 8}",
+        V=f"{belastning.vertikal:.0f}")]
     
-    status = "OK - Bæreevnen er tilstrekkelig" if resultat.utnyttelsesgrad <= 1.0 else "IKKE OK"
-    status_class = "success" if resultat.utnyttelsesgrad <= 1.0 else "danger"
-    analyse_tekst = "Effektivspenningsanalyse" if jord.analysetype == 'effektiv' else "Totalspenningsanalyse"
-    fund_type = "Stripefundament" if fundament.lengde is None else "Rektangulært"
-    enhet = "kN/m" if fundament.lengde is None else "kN"
+    # Horisontallast
+    if abs(belastning.horisontal_B) > 0.1:
+        H_dir = 1 if belastning.horisontal_B > 0 else -1
+        svg.append(_SVG_HORISONTAL[H_dir].fyll(H=f"{abs(belastning.horisontal_B):.0f}"))
     
-    svg_figur = generer_fundament_svg(fundament, terreng, resultat, belastning)
+    # Moment
+    if abs(belastning.moment_B) > 0.1:
+        svg.append(_SVG_MOMENT.fyll(M=f"{abs(belastning.moment_B):.0f}"))
+    
+    # Dimensjoner
+    x_D_tekst = f"{cx + B*scale/2 + 25}"
+    y_D_tekst = f"{cy + D*scale/2}"
+    svg.append(_SVG_MAAL.fyll(
+        x_fund=f"{cx - B*scale/2}", x_fund_h=f"{cx + B*scale/2}", y_maal=f"{cy + D*scale + 20}",
+        y_B=f"{cy + D*scale + 35}", B=f"{B:.2f}",
+        y_Bo=f"{cy + D*scale + 15}", Bo=f"{Bo:.2f}",
+        y_q=f"{cy + D*scale + 55}", q=f"{resultat.grunntrykk:.1f}",
+        x_D=f"{cx + B*scale/2 + 15}", y_bunn=f"{cy + D*scale}",
+        x_D_tekst=x_D_tekst, y_D_tekst=y_D_tekst, D=f"{D:.2f}"))
     
-    # Formler basert på analysetype
-    if jord.analysetype == 'effektiv':
-        formler_html = '''
+    return ''.join(svg)
+
+
+_SENSITIVITET = Mal('''<h3 style="color:#006341;margin-top:20px;">Sensitivitetsanalyse (±$pst %)</h3>
+<table>
+    <tr><th>Parameter</th><th>Verdi</th><th>q/s ved -$pst %</th><th>q/s ved +$pst %</th><th>Elastisitet</th></tr>$rader
+</table>
+<small>Elastisitet = ∂ln(q/s)/∂ln(x). Rangert etter spenn i q/s.</small>
+''')
+
+
+def generer_sensitivitet_html(analyse, maks_antall=10):
+    """Genererer tabell med sensitivitetsanalyse"""
+    pst = f"{analyse.variasjon * 100:.0f}"
+    rader = ''.join(f'''
+        <tr><td>{r.beskrivelse}</td><td>{r.verdi:g}</td><td>{r.u_lav*100:.1f}%</td><td>{r.u_hoy*100:.1f}%</td><td>{r.elastisitet_u:.2f}</td></tr>'''
+                    for r in analyse.rader[:maks_antall])
+    return _SENSITIVITET.fyll(pst=pst, rader=rader)
+
+
+_FORM = Mal('''<h3 style="color:#006341;margin-top:20px;">Pålitelighet (FORM)</h3>
+<table>
+    <tr><th>Parameter</th><th>Designpunkt x*</th><th>α</th></tr>$rader
+</table>
+<small>β = $beta, P<sub>f</sub> = $P_f. α &gt; 0 for motstand, α &lt; 0 for last (NS-EN 1990 tillegg C).$merknad</small>
+''')
+
+
+def generer_form_html(form):
+    """Genererer tabell med designpunkt og sensitivitetsfaktorer fra FORM"""
+    rader = ''.join(f'''
+        <tr><td>{FELTNAVN.get(navn, navn)}</td><td>{form.designpunkt[navn]:.4g}</td><td>{alfa:+.3f}</td></tr>'''
+                    for navn, alfa in sorted(form.alfa.items(), key=lambda p: -abs(p[1])))
+    
+    merknad = "" if form.konvergert else " <b style=\"color:#c62828;\">Ikke konvergert.</b>"
+    return _FORM.fyll(rader=rader, beta=f"{form.beta:.2f}", P_f=f"{form.P_f:.2e}", merknad=merknad)
+
+
+def generer_rapport_html(prosjekt_info, jord, fundament, belastning, terreng, resultat,
+                         sensitivitet=None, form=None):
+    """Genererer HTML-rapport, eventuelt med sensitivitetsanalyse og FORM-resultat"""
+    return (generer_rapport_hode(prosjekt_info, resultat.utnyttelsesgrad <= 1.0) +
+            generer_rapport_kropp(jord, fundament, belastning, terreng, resultat, sensitivitet, form))
+
+
+# Topp med CSS, ferdig for begge statusfarger
+_HODE = {
+    ok: Mal('''<!DOCTYPE html>
+<html><head><meta charset="UTF-8"><title>Bæreevne</title>
+<style>
+body{font-family:Arial,sans-serif;font-size:10pt;padding:15mm;color:#333;}
+.header{border-bottom:3px solid #006341;padding-bottom:10px;margin-bottom:15px;}
+.header h1{color:#006341;margin:0;font-size:16pt;}
+table{width:100%;border-collapse:collapse;margin:10px 0;}
+td,th{padding:5px 8px;border-bottom:1px solid #eee;}
+th{background:#006341;color:white;text-align:left;}
+.result{background:#006341;color:white;padding:15px;border-radius:6px;margin:15px 0;}
+.result-grid{display:grid;grid-template-columns:repeat(3,1fr);gap:10px;text-align:center;}
+.result-value{font-size:20pt;font-weight:bold;}
+.status{padding:10px;border-radius:4px;text-align:center;font-weight:bold;margin-top:10px;
+         background:$status_bakgrunn;}
+.figure{border:1px solid #ddd;padding:15px;margin:15px 0;text-align:center;background:#fafafa;}
+.two-col{display:grid;grid-template-columns:1fr 1fr;gap:15px;}
+@media print{.result{-webkit-print-color-adjust:exact;print-color-adjust:exact;}}
+</style></head><body>
+
+<div class="header">
+    <table><tr>
+        <td><h1>Bæreevneberegning</h1><small>NS-EN 1997-1 (EC7)</small></td>
+        <td style="text-align:right"><b>NORCONSULT</b><br>$dato<br>Rev. $revisjon</td>
+    </tr></table>
+</div>
+
+<table style="background:#f5f5f5;">
+    <tr><td><b>Prosjekt:</b> $prosjektnummer - $prosjektnavn</td>
+        <td><b>Beregning:</b> $beregningsnavn</td>
+        <td><b>Utført:</b> $utfort_av</td></tr>
+</table>''').delvis(
+        status_bakgrunn="rgba(255,255,255,0.2)" if ok else "rgba(198,40,40,0.3)")
+    for ok in (True, False)
+}
+
+
+def generer_rapport_hode(prosjekt_info, ok):
+    """Rapportens start til og med prosjekttabellen (dato, prosjekt og revisjon)"""
+    return _HODE[bool(ok)].fyll(
+        dato=datetime.now().strftime('%d.%m.%Y'),
+        revisjon=f"{prosjekt_info.get('revisjon','0')}",
+        prosjektnummer=f"{prosjekt_info.get('prosjektnummer','-')}",
+        prosjektnavn=f"{prosjekt_info.get('prosjektnavn','-')}",
+        beregningsnavn=f"{prosjekt_info.get('beregningsnavn','-')}",
+        utfort_av=f"{prosjekt_info.get('utfort_av','-')}")
+
+
+# Formler basert på analysetype, med felles blokk for eksentrisitet og grunntrykk
+_FORMLER_FELLES = '''
+    <div style="background:#f5f5f5;padding:10px;margin:10px 0;border-left:3px solid #006341;">
+        <b>Eksentrisitet:</b> <code>e = M/V</code><br>
+        <b>Effektiv bredde:</b> <code>Bo = B - 2|e|</code><br>
+        <b>Grunntrykk:</b> <code>q = V/Aeff</code>
+    </div>'''
+
+_FORMLER = {
+    'effektiv': '''
         <div style="background:#f5f5f5;padding:10px;margin:10px 0;border-left:3px solid #006341;">
             <b>Bæreevneformel (Effektiv):</b><br>
             <code>s = fβ·sq·Nq·(γ'D + q₀ + a) + fβ·sγ·½·Nγ·γ'·Bo - a</code>
@@ -121,112 +281,144 @@ def generer_rapport_html(prosjekt_info, jord, fundament, belastning, terreng, re
         <div style="background:#f5f5f5;padding:10px;margin:10px 0;border-left:3px solid #006341;">
             <b>Nq:</b> <code>Nq = ½(Kp+1+(Kp-1)cos2θm)·e^((π-2θm)tanφ'd)</code><br>
             <b>Nγ:</b> Interpolert fra tabell (Brinch Hansen)
-        </div>'''
-    else:
-        formler_html = '''
+        </div>''' + _FORMLER_FELLES,
+    'udrenert': '''
         <div style="background:#f5f5f5;padding:10px;margin:10px 0;border-left:3px solid #006341;">
             <b>Bæreevneformel (Udrenert):</b><br>
             <code>s = fβ·sc·Nc·su/γM + (γD + q₀)·cos²β</code>
         </div>
         <div style="background:#f5f5f5;padding:10px;margin:10px 0;border-left:3px solid #006341;">
             <b>Nc:</b> <code>Nc = π + 2 + √(1-r²) - arcsin(r)</code>
-        </div>'''
-    
-    formler_html += '''
-    <div style="background:#f5f5f5;padding:10px;margin:10px 0;border-left:3px solid #006341;">
-        <b>Eksentrisitet:</b> <code>e = M/V</code><br>
-        <b>Effektiv bredde:</b> <code>Bo = B - 2|e|</code><br>
-        <b>Grunntrykk:</b> <code>q = V/Aeff</code>
-    </div>'''
-    
-    html = f'''<!DOCTYPE html>
-<html><head><meta charset="UTF-8"><title>Bæreevne</title>
-<style>
-body{{font-family:Arial,sans-serif;font-size:10pt;padding:15mm;color:#333;}}
-.header{{border-bottom:3px solid #006341;padding-bottom:10px;margin-bottom:15px;}}
-.header h1{{color:#006341;margin:0;font-size:16pt;}}
-table{{width:100%;border-collapse:collapse;margin:10px 0;}}
-td,th{{padding:5px 8px;border-bottom:1px solid #eee;}}
-th{{background:#006341;color:white;text-align:left;}}
-.result{{background:#006341;color:white;padding:15px;border-radius:6px;margin:15px 0;}}
-.result-grid{{display:grid;grid-template-columns:repeat(3,1fr);gap:10px;text-align:center;}}
-.result-value{{font-size:20pt;font-weight:bold;}}
-.status{{padding:10px;border-radius:4px;text-align:center;font-weight:bold;margin-top:10px;
-         background:{"rgba(255,255,255,0.2)" if status_class=="success" else "rgba(198,40,40,0.3)"};}}
-.figure{{border:1px solid #ddd;padding:15px;margin:15px 0;text-align:center;background:#fafafa;}}
-.two-col{{display:grid;grid-template-columns:1fr 1fr;gap:15px;}}
-@media print{{.result{{-webkit-print-color-adjust:exact;print-color-adjust:exact;}}}}
-</style></head><body>
+        </div>''' + _FORMLER_FELLES,
+}
 
-<div class="header">
-    <table><tr>
-        <td><h1>Bæreevneberegning</h1><small>NS-EN 1997-1 (EC7)</small></td>
-        <td style="text-align:right"><b>NORCONSULT</b><br>{datetime.now().strftime('%d.%m.%Y')}<br>Rev. {prosjekt_info.get('revisjon','0')}</td>
-    </tr></table>
-</div>
+_FORM_RESULTAT = Mal('''
+    <div class="result-grid" style="margin-top:10px;">
+        <div></div>
+        <div><small>PÅLITELIGHETSINDEKS β</small><div class="result-value">$beta</div></div>
+        <div><small>BRUDDSANNSYNLIGHET P<sub>f</sub></small><div class="result-value">$P_f</div></div>
+    </div>''')
 
-<table style="background:#f5f5f5;">
-    <tr><td><b>Prosjekt:</b> {prosjekt_info.get('prosjektnummer','-')} - {prosjekt_info.get('prosjektnavn','-')}</td>
-        <td><b>Beregning:</b> {prosjekt_info.get('beregningsnavn','-')}</td>
-        <td><b>Utført:</b> {prosjekt_info.get('utfort_av','-')}</td></tr>
-</table>
+_KROPP = Mal('''
 
 <div class="result">
     <div class="result-grid">
-        <div><small>GRUNNTRYKK</small><div class="result-value">{resultat.grunntrykk:.1f}</div><small>kN/m²</small></div>
-        <div><small>BÆREEVNE</small><div class="result-value">{resultat.baereevne:.1f}</div><small>kN/m²</small></div>
-        <div><small>UTNYTTELSE</small><div class="result-value">{resultat.utnyttelsesgrad*100:.1f}%</div></div>
-    </div>
-    <div class="status">{status}</div>
+        <div><small>GRUNNTRYKK</small><div class="result-value">$q</div><small>kN/m²</small></div>
+        <div><small>BÆREEVNE</small><div class="result-value">$baereevne</div><small>kN/m²</small></div>
+        <div><small>UTNYTTELSE</small><div class="result-value">$utnyttelse%</div></div>
+    </div>$form_resultat
+    <div class="status">$status</div>
 </div>
 
 <div class="figure">
     <b>Fundamenttverrsnitt</b><br>
-    {svg_figur}
+    $svg_figur
 </div>
 
 <div class="two-col">
 <div>
-    <h3 style="color:#006341;">Jordparametre ({analyse_tekst})</h3>
+    <h3 style="color:#006341;">Jordparametre ($analyse_tekst)</h3>
     <table>
-        {"<tr><td>Friksjonsvinkel φ'</td><td><b>"+str(jord.friksjonsvinkel)+"°</b></td></tr>" if jord.analysetype=='effektiv' else "<tr><td>Udrenert skjærstyrke su</td><td><b>"+str(jord.udrenert_skjaerstyrke)+" kN/m²</b></td></tr>"}
-        {"<tr><td>Effektiv romvekt γ'</td><td><b>"+str(jord.romvekt_eff)+" kN/m³</b></td></tr>" if jord.analysetype=='effektiv' else ""}
-        <tr><td>Materialfaktor γM</td><td><b>{jord.materialfaktor}</b></td></tr>
+        $styrke_rad
+        $romvekt_rad
+        <tr><td>Materialfaktor γM</td><td><b>$materialfaktor</b></td></tr>
     </table>
     
-    <h3 style="color:#006341;">Fundament ({fund_type})</h3>
+    <h3 style="color:#006341;">Fundament ($fund_type)</h3>
     <table>
-        <tr><td>Bredde B</td><td><b>{fundament.bredde} m</b></td></tr>
-        {"<tr><td>Lengde L</td><td><b>"+str(fundament.lengde)+" m</b></td></tr>" if fundament.lengde else ""}
-        <tr><td>Tykkelse T</td><td><b>{fundament.tykkelse} m</b></td></tr>
-        <tr><td>Dybde D</td><td><b>{terreng.fundamentdybde} m</b></td></tr>
+        <tr><td>Bredde B</td><td><b>$bredde m</b></td></tr>
+        $lengde_rad
+        <tr><td>Tykkelse T</td><td><b>$tykkelse m</b></td></tr>
+        <tr><td>Dybde D</td><td><b>$dybde m</b></td></tr>
     </table>
 </div>
 <div>
     <h3 style="color:#006341;">Belastning</h3>
     <table>
-        <tr><td>Vertikallast V</td><td><b>{belastning.vertikal} {enhet}</b></td></tr>
-        <tr><td>Total V (m/egenvekt)</td><td><b>{resultat.V_total:.1f} {enhet}</b></td></tr>
-        <tr><td>Horisontallast H</td><td><b>{belastning.horisontal_B} {enhet}</b></td></tr>
-        <tr><td>Moment M</td><td><b>{belastning.moment_B} {"kNm/m" if fundament.lengde is None else "kNm"}</b></td></tr>
+        <tr><td>Vertikallast V</td><td><b>$vertikal $enhet</b></td></tr>
+        <tr><td>Total V (m/egenvekt)</td><td><b>$V_total $enhet</b></td></tr>
+        <tr><td>Horisontallast H</td><td><b>$horisontal $enhet</b></td></tr>
+        <tr><td>Moment M</td><td><b>$moment $momentenhet</b></td></tr>
     </table>
     
     <h3 style="color:#006341;">Beregnede størrelser</h3>
     <table>
-        <tr><td>Eksentrisitet e</td><td><b>{resultat.eksentrisitet_B:.3f} m</b></td></tr>
-        <tr><td>Effektiv bredde Bo</td><td><b>{resultat.eff_bredde:.3f} m</b></td></tr>
-        {"<tr><td>Nq</td><td><b>"+f"{resultat.Nq:.2f}"+"</b></td></tr><tr><td>Nγ</td><td><b>"+f"{resultat.Ny:.2f}"+"</b></td></tr>" if resultat.Nq else "<tr><td>Nc</td><td><b>"+f"{resultat.Nc:.2f}"+"</b></td></tr>"}
-        <tr><td>Ruhet r</td><td><b>{resultat.ruhet:.3f}</b></td></tr>
+        <tr><td>Eksentrisitet e</td><td><b>$e_B m</b></td></tr>
+        <tr><td>Effektiv bredde Bo</td><td><b>$eff_bredde m</b></td></tr>
+        $faktor_rader
+        <tr><td>Ruhet r</td><td><b>$ruhet</b></td></tr>
     </table>
 </div>
 </div>
 
-<h3 style="color:#006341;margin-top:20px;">Anvendte formler</h3>
-{formler_html}
+$sensitivitet$form<h3 style="color:#006341;margin-top:20px;">Anvendte formler</h3>
+$formler
 
 <div style="margin-top:20px;padding-top:10px;border-top:1px solid #ddd;font-size:8pt;color:#999;">
     Norconsult Bæreevneberegning v1.0 | NS-EN 1997-1 | Brinch Hansen's metode
 </div>
-</body></html>'''
+</body></html>''')
+
+
+def generer_rapport_kropp(jord, fundament, belastning, terreng, resultat,
+                          sensitivitet=None, form=None, svg_figur=None):
+    """
+    Resten av rapporten: resultater, figur, tabeller og formler
+
+    Avhenger bare av inndata og resultat (ikke prosjekt eller dato), så den
+    kan mellomlagres på tvers av revisjoner. svg_figur: ferdig tegnet
+    generer_fundament_svg, hvis den allerede finnes.
+    """
+    effektiv = jord.analysetype == 'effektiv'
+    stripe = fundament.lengde is None
+    enhet = "kN/m" if stripe else "kN"
+    
+    if svg_figur is None:
+        svg_figur = generer_fundament_svg(fundament, terreng, resultat, belastning)
+    
+    # β og P_f ved siden av deterministisk utnyttelse
+    form_resultat = ""
+    if form is not None:
+        form_resultat = _FORM_RESULTAT.fyll(beta=f"{form.beta:.2f}", P_f=f"{form.P_f:.1e}")
+    
+    if effektiv:
+        styrke_rad = "<tr><td>Friksjonsvinkel φ'</td><td><b>"+str(jord.friksjonsvinkel)+"°</b></td></tr>"
+        romvekt_rad = "<tr><td>Effektiv romvekt γ'</td><td><b>"+str(jord.romvekt_eff)+" kN/m³</b></td></tr>"
+    else:
+        styrke_rad = "<tr><td>Udrenert skjærstyrke su</td><td><b>"+str(jord.udrenert_skjaerstyrke)+" kN/m²</b></td></tr>"
+        romvekt_rad = ""
+    
+    if resultat.Nq:
+        faktor_rader = "<tr><td>Nq</td><td><b>"+f"{resultat.Nq:.2f}"+"</b></td></tr><tr><td>Nγ</td><td><b>"+f"{resultat.Ny:.2f}"+"</b></td></tr>"
+    else:
+        faktor_rader = "<tr><td>Nc</td><td><b>"+f"{resultat.Nc:.2f}"+"</b></td></tr>"
     
-    return html
+    return _KROPP.fyll(
+        q=f"{resultat.grunntrykk:.1f}",
+        baereevne=f"{resultat.baereevne:.1f}",
+        utnyttelse=f"{resultat.utnyttelsesgrad*100:.1f}",
+        form_resultat=form_resultat,
+        status="OK - Bæreevnen er tilstrekkelig" if resultat.utnyttelsesgrad <= 1.0 else "IKKE OK",
+        svg_figur=svg_figur,
+        analyse_tekst="Effektivspenningsanalyse" if effektiv else "Totalspenningsanalyse",
+        styrke_rad=styrke_rad,
+        romvekt_rad=romvekt_rad,
+        materialfaktor=f"{jord.materialfaktor}",
+        fund_type="Stripefundament" if stripe else "Rektangulært",
+        bredde=f"{fundament.bredde}",
+        lengde_rad="<tr><td>Lengde L</td><td><b>"+str(fundament.lengde)+" m</b></td></tr>" if fundament.lengde else "",
+        tykkelse=f"{fundament.tykkelse}",
+        dybde=f"{terreng.fundamentdybde}",
+        vertikal=f"{belastning.vertikal}",
+        enhet=enhet,
+        V_total=f"{resultat.V_total:.1f}",
+        horisontal=f"{belastning.horisontal_B}",
+        moment=f"{belastning.moment_B}",
+        momentenhet="kNm/m" if stripe else "kNm",
+        e_B=f"{resultat.eksentrisitet_B:.3f}",
+        eff_bredde=f"{resultat.eff_bredde:.3f}",
+        faktor_rader=faktor_rader,
+        ruhet=f"{resultat.ruhet:.3f}",
+        sensitivitet=generer_sensitivitet_html(sensitivitet) if sensitivitet is not None else "",
+        form=generer_form_html(form) if form is not None else "",
+        formler=_FORMLER['effektiv' if effektiv else 'udrenert'])
@@ -0,0 +1,209 @@
+"""
+Sensitivitetsanalyse for bæreevneberegning
+
+Perturberer alle numeriske inndatafelt i én vektorisert beregning:
+sentraldifferanser gir elastisiteter, og ±X % endring gir spennet i q/s
+som brukes til tornado-rangering. Utnyttelseskartet beregner q/s over et
+rutenett i to inndatafelt, også i én vektorisert beregning.
+"""
+
+from dataclasses import dataclass, fields
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from calculator import BaereevneKalkulator
+from models import (JordParameter, FundamentGeometri, Belastning,
+                   TerrengForhold, INNDATAKLASSER, med_endringer)
+
+
+# Lesbare navn på inndatafeltene
+FELTNAVN: Dict[str, str] = {
+    'friksjonsvinkel': "Friksjonsvinkel φ' [°]",
+    'udrenert_skjaerstyrke': "Udrenert skjærstyrke su [kN/m²]",
+    'romvekt_eff': "Effektiv romvekt γ' [kN/m³]",
+    'attraksjon': "Attraksjon a [kN/m²]",
+    'materialfaktor': "Materialfaktor γM [-]",
+    'bredde': "Bredde B [m]",
+    'lengde': "Lengde L [m]",
+    'tykkelse': "Tykkelse T [m]",
+    'romvekt': "Romvekt betong [kN/m³]",
+    'vegg_bredde': "Vegg-/søylebredde [m]",
+    'soyle_lengde': "Søylelengde [m]",
+    'vertikal': "Vertikallast V",
+    'horisontal_B': "Horisontallast H_B",
+    'horisontal_L': "Horisontallast H_L",
+    'moment_B': "Moment M_B",
+    'moment_L': "Moment M_L",
+    'centeravvik_B': "Centeravvik e_B [m]",
+    'centeravvik_L': "Centeravvik e_L [m]",
+    'fundamentdybde': "Fundamentdybde D [m]",
+    'romvekt_over': "Romvekt over fund. [kN/m³]",
+    'overflatelast': "Overflatelast q₀ [kN/m²]",
+    'skraaningshelning': "Skråningshelning βs [°]",
+    'terrenghelning': "Terrenghelning βt [°]",
+    'Ka': "Ka [-]",
+    'Kp': "Kp [-]",
+}
+
+
+@dataclass
+class SensitivitetsRad:
+    """Sensitivitet for ett inndatafelt"""
+    felt: str
+    beskrivelse: str
+    verdi: float
+    derivert_u: float  # ∂(q/s)/∂x
+    elastisitet_u: float  # ∂ln(q/s)/∂ln x
+    elastisitet_s: float  # ∂ln(s)/∂ln x
+    u_lav: float  # q/s ved x - |x|·variasjon
+    u_hoy: float  # q/s ved x + |x|·variasjon
+    spenn: float  # |u_hoy - u_lav|
+
+
+@dataclass
+class Sensitivitetsanalyse:
+    """Sensitiviteter for én beregning, rangert etter spenn i q/s"""
+    utnyttelsesgrad: float
+    baereevne: float
+    variasjon: float  # relativ endring brukt for spennet, f.eks. 0.1
+    rader: List[SensitivitetsRad]
+
+
+def sensitivitetsanalyse(kalkulator: BaereevneKalkulator,
+                         jord: JordParameter,
+                         fundament: FundamentGeometri,
+                         belastning: Belastning,
+                         terreng: TerrengForhold,
+                         variasjon: float = 0.1,
+                         relativt_steg: float = 1e-4,
+                         ta_med_null: bool = False) -> Sensitivitetsanalyse:
+    """
+    Sensitivitet av q/s og s for alle numeriske inndatafelt
+
+    Alle 1 + 4·N tilfeller (grunntilfelle, ±steg og ±variasjon per felt)
+    beregnes i ett kall til beregn_batch. Felt med verdi 0 får absolutt
+    steg for den deriverte og null spenn. Felt uten virkning på q/s og s
+    utelates med mindre ta_med_null=True.
+    """
+    objekter = (jord, fundament, belastning, terreng)
+    grunnverdier = {}
+    for klasse, objekt in zip(INNDATAKLASSER, objekter):
+        for f in fields(klasse):
+            verdi = getattr(objekt, f.name)
+            if f.name == 'analysetype' or verdi is None:
+                continue
+            grunnverdier[f.name] = float(verdi)
+
+    navn = list(grunnverdier)
+    x0 = np.array([grunnverdier[n] for n in navn])
+    n = len(navn)
+
+    # Steg for sentraldifferanser og faktorer for ±variasjon
+    steg = np.where(x0 != 0, np.abs(x0) * relativt_steg, relativt_steg)
+    endring = np.concatenate([-steg, steg, -np.abs(x0) * variasjon, np.abs(x0) * variasjon])
+
+    # Rad 0 er grunntilfellet, deretter fire blokker à N rader
+    kolonner = np.tile(x0, (1 + 4 * n, 1))
+    rader = 1 + np.arange(4 * n)
+    kolonner[rader, np.tile(np.arange(n), 4)] += endring
+
+    batch = med_endringer(*objekter, {nv: kolonner[:, i] for i, nv in enumerate(navn)})
+    res = kalkulator.beregn_batch(*batch)
+    u = res['utnyttelsesgrad']
+    s = res['baereevne']
+
+    u0, s0 = u[0], s[0]
+    u_minus, u_pluss, u_lav, u_hoy = u[1:].reshape(4, n)
+    s_minus, s_pluss = s[1:2 * n + 1].reshape(2, n)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        du = (u_pluss - u_minus) / (2 * steg)
+        ds = (s_pluss - s_minus) / (2 * steg)
+        el_u = np.where(x0 != 0, du * x0 / u0, 0.0)
+        el_s = np.where(x0 != 0, ds * x0 / s0, 0.0)
+
+    resultat = []
+    for i, nv in enumerate(navn):
+        if not ta_med_null and du[i] == 0 and ds[i] == 0:
+            continue
+        resultat.append(SensitivitetsRad(
+            felt=nv,
+            beskrivelse=FELTNAVN.get(nv, nv),
+            verdi=float(x0[i]),
+            derivert_u=float(du[i]),
+            elastisitet_u=float(el_u[i]),
+            elastisitet_s=float(el_s[i]),
+            u_lav=float(u_lav[i]),
+            u_hoy=float(u_hoy[i]),
+            spenn=float(abs(u_hoy[i] - u_lav[i]))
+        ))
+
+    resultat.sort(key=lambda r: (r.spenn, abs(r.elastisitet_u)), reverse=True)
+
+    return Sensitivitetsanalyse(
+        utnyttelsesgrad=float(u0),
+        baereevne=float(s0),
+        variasjon=variasjon,
+        rader=resultat
+    )
+
+
+@dataclass
+class Utnyttelseskart:
+    """q/s over et rutenett i to inndatafelt, øvrige inndata uendret"""
+    felt_x: str
+    felt_y: str
+    x: np.ndarray  # (nx,)
+    y: np.ndarray  # (ny,)
+    utnyttelsesgrad: np.ndarray  # (ny, nx), rad i svarer til y[i]
+    x0: float  # gjeldende verdi av felt_x
+    y0: float
+    u0: float  # q/s for gjeldende inndata
+
+
+def utnyttelseskart(kalkulator: BaereevneKalkulator,
+                    jord: JordParameter,
+                    fundament: FundamentGeometri,
+                    belastning: Belastning,
+                    terreng: TerrengForhold,
+                    felt_x: str,
+                    x: Sequence[float],
+                    felt_y: str,
+                    y: Sequence[float]) -> Utnyttelseskart:
+    """
+    q/s for alle kombinasjoner av verdiene x (felt_x) og y (felt_y)
+
+    Rutenettet beregnes i ett kall til beregn_batch ved kringkasting
+    (x langs siste akse, y langs første), så 400×400 punkter tar en
+    brøkdel av et sekund.
+    """
+    if felt_x == felt_y:
+        raise ValueError("felt_x og felt_y må være forskjellige")
+    for felt in (felt_x, felt_y):
+        if felt not in FELTNAVN:
+            raise KeyError(f"Ukjent eller ikke-numerisk felt: {felt}")
+
+    objekter = (jord, fundament, belastning, terreng)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    res = kalkulator.beregn_batch(*med_endringer(*objekter, {felt_x: x[None, :],
+                                                             felt_y: y[:, None]}))
+    grunn = kalkulator.beregn(*objekter)
+
+    def gjeldende(felt):
+        for objekt in objekter:
+            if hasattr(objekt, felt):
+                verdi = getattr(objekt, felt)
+                return float('nan') if verdi is None else float(verdi)
+
+    return Utnyttelseskart(
+        felt_x=felt_x,
+        felt_y=felt_y,
+        x=x,
+        y=y,
+        utnyttelsesgrad=np.broadcast_to(res['utnyttelsesgrad'], (y.size, x.size)),
+        x0=gjeldende(felt_x),
+        y0=gjeldende(felt_y),
+        u0=grunn.utnyttelsesgrad
+    )
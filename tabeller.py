@@ -0,0 +1,197 @@
+"""
+Kolonnebaserte tabeller for mange lasttilfeller og resultater
+
+En tabell lagrer hvert felt i dataklassen som én typet NumPy-kolonne i
+stedet for ett objekt per tilfelle. Indeksering med heltall gir en
+radvisning som oppfører seg som dataklassen (attributter, fields(),
+replace(), isinstance) uten å kopiere data; endringer i visningen skrives
+til kolonnen.
+
+    laster = BelastningTabell.fra_dataframe(df)
+    res = ResultatTabell.fra_batch(
+        kalkulator.beregn_batch(jord, fundament, laster.som_dataklasse(), terreng))
+    res[17].utnyttelsesgrad        # radvisning
+    res['utnyttelsesgrad']         # kolonne
+    res.til_dataframe()
+"""
+
+from dataclasses import fields
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, Mapping, Tuple, Union
+
+import numpy as np
+
+from models import Belastning, Resultat
+
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+_DTYPE = {float: np.float64, int: np.int64, bool: np.bool_, str: np.str_}
+
+
+def _er_valgfri(felt) -> bool:
+    """Optional[...]-felt lagres som NaN når verdien er None"""
+    return type(None) in getattr(felt.type, '__args__', ())
+
+
+def _dtype(felt) -> type:
+    typ = felt.type
+    if _er_valgfri(felt):
+        typ = next(a for a in typ.__args__ if a is not type(None))
+    return _DTYPE.get(typ, np.float64)
+
+
+def _lag_visning(rad: type) -> type:
+    """Subklasse av dataklassen rad der feltene leses fra og skrives til tabellen"""
+    valgfrie = {f.name for f in fields(rad) if _er_valgfri(f)}
+
+    def egenskap(navn: str) -> property:
+        valgfri = navn in valgfrie
+
+        def hent(self):
+            verdi = self._tabell._kolonner[navn][self._indeks].item()
+            return None if valgfri and verdi != verdi else verdi
+
+        def sett(self, verdi):
+            self._tabell._kolonner[navn][self._indeks] = np.nan if verdi is None else verdi
+
+        return property(hent, sett)
+
+    def __new__(cls, *args, **kwargs):
+        # replace() og kopiering lager en vanlig, frittstående dataklasse
+        return rad(*args, **kwargs)
+
+    def __reduce__(self):
+        return rad, tuple(getattr(self, f.name) for f in fields(rad))
+
+    def __eq__(self, annen):
+        if not isinstance(annen, rad):
+            return NotImplemented
+        return all(getattr(self, f.name) == getattr(annen, f.name) for f in fields(rad))
+
+    def kopi(self):
+        """Frittstående dataklasse med radens verdier"""
+        return rad(*(getattr(self, f.name) for f in fields(rad)))
+
+    navnerom = {f.name: egenskap(f.name) for f in fields(rad)}
+    navnerom.update(__slots__=('_tabell', '_indeks'), __new__=__new__, __reduce__=__reduce__,
+                    __eq__=__eq__, __hash__=None, kopi=kopi, __doc__=f"Radvisning av {rad.__name__}")
+    return type(f"{rad.__name__}Rad", (rad,), navnerom)
+
+
+class _Tabell:
+    """
+    Felles grunnlag for tabellene: én kolonne per felt i RAD
+
+    Kolonnene kringkastes til felles lengde ved oppretting. Arrays med
+    riktig dtype brukes uten kopiering.
+    """
+    RAD: type
+    _VISNING: type
+
+    __slots__ = ('_kolonner', '_antall')
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._VISNING = _lag_visning(cls.RAD)
+
+    def __init__(self, **kolonner):
+        felt = fields(self.RAD)
+        navn = {f.name for f in felt}
+        ukjente = set(kolonner) - navn
+        if ukjente:
+            raise KeyError(f"Ukjente felt: {', '.join(sorted(ukjente))}")
+        mangler = navn - set(kolonner)
+        if mangler:
+            raise KeyError(f"Mangler kolonner for: {', '.join(sorted(mangler))}")
+
+        verdier = {}
+        for f in felt:
+            verdi = kolonner[f.name]
+            if _er_valgfri(f):
+                if verdi is None:
+                    verdi = np.nan
+                elif isinstance(verdi, (list, tuple)):
+                    verdi = [np.nan if v is None else v for v in verdi]
+            verdier[f.name] = np.asarray(verdi, dtype=_dtype(f))
+
+        form = np.broadcast_shapes(*(v.shape for v in verdier.values()))
+        if len(form) > 1:
+            raise ValueError(f"Kolonnene må være 1-dimensjonale, fikk form {form}")
+        self._antall = form[0] if form else 1
+        self._kolonner = {n: v if v.shape == (self._antall,)
+                          else np.broadcast_to(v, (self._antall,)).copy()
+                          for n, v in verdier.items()}
+
+    @classmethod
+    def fra_rader(cls, rader: Iterable) -> '_Tabell':
+        """Tabell fra en samling dataklasse-objekter"""
+        rader = list(rader)
+        return cls(**{f.name: [getattr(r, f.name) for r in rader] for f in fields(cls.RAD)})
+
+    @classmethod
+    def fra_dataframe(cls, df: 'pd.DataFrame') -> '_Tabell':
+        """Tabell fra en DataFrame med én kolonne per felt (andre kolonner ignoreres)"""
+        return cls(**{f.name: df[f.name].to_numpy() for f in fields(cls.RAD)})
+
+    def til_dataframe(self) -> 'pd.DataFrame':
+        import pandas as pd
+        return pd.DataFrame(self._kolonner)
+
+    def som_dataklasse(self):
+        """Én dataklasse med kolonnene som felt, f.eks. som inndata til beregn_batch"""
+        return self.RAD(**self._kolonner)
+
+    @property
+    def felt(self) -> Tuple[str, ...]:
+        return tuple(self._kolonner)
+
+    @property
+    def kolonner(self) -> Mapping[str, np.ndarray]:
+        """Feltnavn -> kolonne (samme arrays som tabellen, ikke kopier)"""
+        return dict(self._kolonner)
+
+    def _rad(self, indeks: int):
+        if not -self._antall <= indeks < self._antall:
+            raise IndexError(f"Rad {indeks} utenfor tabell med {self._antall} rader")
+        visning = object.__new__(self._VISNING)
+        visning._tabell = self
+        visning._indeks = indeks % self._antall
+        return visning
+
+    def __len__(self) -> int:
+        return self._antall
+
+    def __iter__(self) -> Iterator:
+        for i in range(self._antall):
+            yield self._rad(i)
+
+    def __getitem__(self, nokkel: Union[str, int, slice, np.ndarray]):
+        """Kolonne (str), radvisning (int) eller deltabell (slice/indekser/maske)"""
+        if isinstance(nokkel, str):
+            return self._kolonner[nokkel]
+        if isinstance(nokkel, (int, np.integer)):
+            return self._rad(int(nokkel))
+        return type(self)(**{n: v[nokkel] for n, v in self._kolonner.items()})
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self._antall} rader: {', '.join(self._kolonner)})"
+
+
+class BelastningTabell(_Tabell):
+    """Mange lasttilfeller, én float64-kolonne per felt i Belastning"""
+    RAD = Belastning
+    __slots__ = ()
+
+
+class ResultatTabell(_Tabell):
+    """Beregningsresultater, én float64-kolonne per felt i Resultat (None = NaN)"""
+    RAD = Resultat
+    __slots__ = ()
+
+    @classmethod
+    def fra_batch(cls, resultat: Dict[str, np.ndarray]) -> 'ResultatTabell':
+        """Tabell fra beregn_batch; kolonnene flates ut i C-rekkefølge"""
+        form = np.broadcast_shapes(*(np.shape(v) for v in resultat.values()))
+        return cls(**{n: np.broadcast_to(v, form).reshape(-1) for n, v in resultat.items()})
@@ -0,0 +1,66 @@
+"""
+Felles oppsett for testene: modulene ligger flatt i roten av repoet, og
+tilfeldige (men seedede) tilfeller lages som rader med INNDATAFELT.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from calculator import BaereevneKalkulator  # noqa: E402
+
+
+def tilfeldige_rader(seed: int, antall: int, analysetype=None):
+    """
+    Rader (dict per tilfelle) som dekker begge analysetyper, stripe- og
+    rektangulære fundamenter, eksentrisitet, horisontallast, helning og
+    overflatelast; Ka/Kp utelates og regnes ut av batch_cli
+    """
+    rng = np.random.default_rng(seed)
+    rader = []
+    for _ in range(antall):
+        type_ = analysetype or ('effektiv' if rng.random() < 0.6 else 'udrenert')
+        rektangulaer = rng.random() < 0.5
+        rader.append({
+            'analysetype': type_,
+            'friksjonsvinkel': float(rng.uniform(22.0, 42.0)) if type_ == 'effektiv' else 0.0,
+            'udrenert_skjaerstyrke': float(rng.uniform(15.0, 120.0)) if type_ == 'udrenert' else 0.0,
+            'romvekt_eff': float(rng.choice([9.0, 10.5, 11.0])),
+            'attraksjon': float(rng.choice([0.0, 0.0, rng.uniform(0.0, 10.0)])),
+            'materialfaktor': float(rng.choice([1.25, 1.4, 1.5])),
+            'bredde': float(rng.uniform(0.6, 5.0)),
+            'lengde': float(rng.uniform(1.0, 8.0)) if rektangulaer else np.nan,
+            'tykkelse': float(rng.choice([0.3, 0.4, 0.5, 0.8])),
+            'romvekt': 25.0,
+            'vegg_bredde': float(rng.choice([0.0, 0.25, 0.4])),
+            'soyle_lengde': float(rng.choice([0.0, 0.4])) if rektangulaer else 0.0,
+            'vertikal': float(rng.uniform(20.0, 2500.0)),
+            'horisontal_B': float(rng.choice([0.0, rng.uniform(-120.0, 120.0)])),
+            'horisontal_L': float(rng.uniform(-60.0, 60.0)) if rektangulaer else 0.0,
+            'moment_B': float(rng.choice([0.0, rng.uniform(-200.0, 200.0)])),
+            'moment_L': float(rng.uniform(-100.0, 100.0)) if rektangulaer else 0.0,
+            'centeravvik_B': float(rng.choice([0.0, rng.uniform(-0.3, 0.3)])),
+            'centeravvik_L': float(rng.uniform(-0.3, 0.3)) if rektangulaer else 0.0,
+            'fundamentdybde': float(rng.uniform(0.0, 3.0)),
+            'romvekt_over': float(rng.choice([18.0, 19.0, 20.0])),
+            'overflatelast': float(rng.choice([0.0, 10.0, rng.uniform(0.0, 30.0)])),
+            'skraaningshelning': float(rng.choice([0.0, 0.0, rng.uniform(0.0, 20.0)])),
+            'terrenghelning': float(rng.choice([0.0, 0.0, rng.uniform(0.0, 10.0)])),
+        })
+    return rader
+
+
+def samme_bits(a, b) -> bool:
+    """Bit-lik sammenligning av to tall der None og NaN regnes som like"""
+    a = np.nan if a is None else a
+    b = np.nan if b is None else b
+    return np.float64(a).tobytes() == np.float64(b).tobytes() or (a != a and b != b)
+
+
+@pytest.fixture
+def kalkulator():
+    return BaereevneKalkulator()
@@ -0,0 +1,33 @@
+"""beregn_batch mot beregn: samme tall, bit for bit, for tilfeldige tilfeller"""
+
+from dataclasses import fields
+
+import numpy as np
+import pytest
+
+from batch_cli import enkelttilfeller, inndata_fra_kolonner
+from models import Resultat
+from conftest import samme_bits, tilfeldige_rader
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_beregn_batch_er_bitlik_beregn(kalkulator, seed):
+    rader = tilfeldige_rader(seed, 300)
+    kolonner = {navn: [rad[navn] for rad in rader] for navn in rader[0]}
+    batch = kalkulator.beregn_batch(*inndata_fra_kolonner(kolonner, len(rader)))
+
+    for i, tilfelle in enumerate(enkelttilfeller(rader)):
+        resultat = kalkulator.beregn(*tilfelle)
+        avvik = [f.name for f in fields(Resultat)
+                 if not samme_bits(getattr(resultat, f.name), batch[f.name][i])]
+        assert not avvik, f"rad {i}: {avvik}"
+
+
+def test_beregn_batch_kringkaster_skalarer(kalkulator):
+    rad = tilfeldige_rader(4, 1, analysetype='effektiv')[0]
+    laster = np.linspace(100.0, 1500.0, 50)
+    kolonner = dict(rad, vertikal=laster)
+    batch = kalkulator.beregn_batch(*inndata_fra_kolonner(kolonner, len(laster)))
+
+    for i, tilfelle in enumerate(enkelttilfeller([dict(rad, vertikal=v) for v in laster.tolist()])):
+        assert samme_bits(kalkulator.beregn(*tilfelle).utnyttelsesgrad, batch['utnyttelsesgrad'][i])
@@ -0,0 +1,57 @@
+"""Beregningsgraf mot beregn: samme tall etter første beregning og etter endringer"""
+
+from dataclasses import fields
+
+import numpy as np
+import pytest
+
+from batch_cli import enkelttilfeller
+from beregningsgraf import Beregningsgraf
+from models import Resultat
+from conftest import samme_bits, tilfeldige_rader
+
+
+def avvik(resultat: Resultat, fasit: Resultat):
+    return [f.name for f in fields(Resultat)
+            if not samme_bits(getattr(resultat, f.name), getattr(fasit, f.name))]
+
+
+@pytest.mark.parametrize('seed', [11, 12])
+def test_graf_er_bitlik_beregn(kalkulator, seed):
+    for i, tilfelle in enumerate(enkelttilfeller(tilfeldige_rader(seed, 150))):
+        graf = Beregningsgraf(kalkulator)
+        graf.sett_inndata(*tilfelle)
+        assert not avvik(graf.resultat(), kalkulator.beregn(*tilfelle)), f"rad {i}"
+
+
+@pytest.mark.parametrize('seed', [13, 14])
+def test_graf_etter_endringer_er_bitlik_beregn(kalkulator, seed):
+    """Én graf gjennom en sekvens av tilfeller, så bare endrede noder beregnes på nytt"""
+    rng = np.random.default_rng(seed)
+    graf = Beregningsgraf(kalkulator)
+    tilfeller = enkelttilfeller(tilfeldige_rader(seed, 60))
+    for i, (jord, fundament, belastning, terreng) in enumerate(tilfeller):
+        graf.sett_inndata(jord, fundament, belastning, terreng)
+        assert not avvik(graf.resultat(), kalkulator.beregn(jord, fundament, belastning, terreng)), f"rad {i}"
+
+        # Bare lastene endres: nodene oppstrøms (phi_d, fundamentvekt, ...) gjenbrukes
+        belastning.vertikal = float(rng.uniform(20.0, 2500.0))
+        belastning.moment_B = float(rng.uniform(-200.0, 200.0))
+        graf.sett(vertikal=belastning.vertikal, moment_B=belastning.moment_B)
+        assert not avvik(graf.resultat(), kalkulator.beregn(jord, fundament, belastning, terreng)), f"rad {i}"
+
+
+def test_graf_med_lastarrayer_er_bitlik_beregn(kalkulator):
+    rad = tilfeldige_rader(15, 1, analysetype='effektiv')[0]
+    jord, fundament, belastning, terreng = enkelttilfeller([rad])[0]
+    laster = np.linspace(50.0, 2000.0, 40)
+    graf = Beregningsgraf(kalkulator)
+    graf.sett_inndata(jord, fundament, belastning, terreng)
+    graf.sett(vertikal=laster)
+    kolonner = graf.kolonner()
+
+    for i, v in enumerate(laster.tolist()):
+        belastning.vertikal = v
+        fasit = kalkulator.beregn(jord, fundament, belastning, terreng)
+        for f in fields(Resultat):
+            assert samme_bits(kolonner[f.name][i], getattr(fasit, f.name)), (i, f.name)
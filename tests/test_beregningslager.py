@@ -0,0 +1,57 @@
+"""Beregningslager: resultater kommer tilbake uendret, også etter ny åpning av filen"""
+
+from dataclasses import fields, replace
+
+import numpy as np
+
+from batch_cli import enkelttilfeller, inndata_fra_kolonner
+from beregningslager import Beregningslager, RESULTATFELT, nokler
+from models import Resultat
+from conftest import samme_bits, tilfeldige_rader
+
+PROSJEKT = {'prosjektnummer': '5200001', 'prosjektnavn': 'Test', 'beregningsnavn': 'F1', 'revisjon': 'A'}
+
+
+def test_enkelttilfeller_tur_retur(kalkulator, tmp_path):
+    sti = tmp_path / 'lager.sqlite'
+    tilfeller = enkelttilfeller(tilfeldige_rader(21, 80))
+    with Beregningslager(sti) as lager:
+        for tilfelle in tilfeller:
+            lager.beregn(kalkulator, *tilfelle, prosjekt_info=PROSJEKT)
+        assert (lager.beregnet, lager.treff, len(lager)) == (80, 0, 80)
+
+    with Beregningslager(sti) as lager:
+        for i, tilfelle in enumerate(tilfeller):
+            lagret = lager.beregn(kalkulator, *tilfelle)
+            fasit = kalkulator.beregn(*tilfelle)
+            assert all(samme_bits(getattr(lagret, f.name), getattr(fasit, f.name))
+                       for f in fields(Resultat)), f"rad {i}"
+        assert (lager.beregnet, lager.treff) == (0, 80)
+        assert lager.prosjekter()[0]['antall'] == 80
+
+
+def test_batch_tur_retur_med_like_tilfeller(kalkulator, tmp_path):
+    rader = tilfeldige_rader(22, 200)
+    rader += rader[:50]
+    kolonner = {navn: [rad[navn] for rad in rader] for navn in rader[0]}
+    inndata = inndata_fra_kolonner(kolonner, len(rader))
+    fasit = kalkulator.beregn_batch(*inndata)
+
+    with Beregningslager(tmp_path / 'lager.sqlite') as lager:
+        forste = lager.beregn_batch(kalkulator, *inndata, prosjekt_info=PROSJEKT)
+        andre = lager.beregn_batch(kalkulator, *inndata)
+        assert (lager.beregnet, lager.treff) == (200, 250)
+        for navn in RESULTATFELT:
+            assert np.array_equal(forste[navn], fasit[navn], equal_nan=True), navn
+            assert np.array_equal(andre[navn], fasit[navn], equal_nan=True), navn
+
+        prosjekt = lager.prosjektberegninger('5200001', 'F1')
+        assert len(prosjekt['utnyttelsesgrad']) == 200
+        assert sorted(prosjekt['vertikal'].tolist()) == sorted(kolonner['vertikal'][:200])
+
+
+def test_ka_kp_inngaar_ikke_i_nokkelen(kalkulator):
+    jord, fundament, belastning, terreng = enkelttilfeller(tilfeldige_rader(23, 1))[0]
+    annet = replace(terreng, Ka=0.123, Kp=9.87)
+    assert (nokler(kalkulator.versjon, jord, fundament, belastning, terreng)
+            == nokler(kalkulator.versjon, jord, fundament, belastning, annet))
@@ -0,0 +1,25 @@
+"""dimensjoner: oppgitt q/s gjelder de returnerte (avrundede) dimensjonene"""
+
+import pytest
+
+from batch_cli import enkelttilfeller
+from models import FundamentGeometri
+from conftest import tilfeldige_rader
+
+
+@pytest.mark.parametrize('L_B_forhold', [1.7, (1.0, 3.0)])
+@pytest.mark.parametrize('seed', [41, 42, 43])
+def test_utnyttelse_gjelder_avrundet_bredde_og_lengde(kalkulator, seed, L_B_forhold):
+    rad = dict(tilfeldige_rader(seed, 1)[0], lengde=1.0)
+    jord, fundament, belastning, terreng = enkelttilfeller([rad])[0]
+    dim = kalkulator.dimensjoner(jord, fundament, belastning, terreng,
+                                 maal_utnyttelse=0.8, L_B_forhold=L_B_forhold, avrunding=0.1)
+    if not dim.konvergert:
+        pytest.skip("ingen løsning i intervallet")
+
+    assert round(dim.lengde / 0.1, 6) == round(dim.lengde / 0.1)
+    kontroll = FundamentGeometri(dim.bredde, dim.lengde, fundament.tykkelse, fundament.romvekt,
+                                 fundament.vegg_bredde, fundament.soyle_lengde)
+    fasit = kalkulator.beregn(jord, kontroll, belastning, terreng).utnyttelsesgrad
+    assert dim.utnyttelsesgrad == pytest.approx(fasit, rel=1e-12)
+    assert dim.utnyttelsesgrad <= 0.8
@@ -0,0 +1,97 @@
+"""Søk etter styrende lastkombinasjon mot uttømmende gjennomgang med beregn()"""
+
+import numpy as np
+import pytest
+
+from batch_cli import enkelttilfeller
+from lastkombinasjoner import KOMPONENTER, KombinasjonsGenerator, finn_styrende_kombinasjon
+from models import Belastning, KarakteristiskLast
+from conftest import tilfeldige_rader
+
+
+def tilfeldige_laster(rng: np.random.Generator, rektangulaer: bool):
+    def last(navn, kategori, v, h, m, **andre):
+        return KarakteristiskLast(
+            navn, kategori,
+            vertikal=float(rng.uniform(*v)),
+            horisontal_B=float(rng.uniform(*h)),
+            horisontal_L=float(rng.uniform(*h)) if rektangulaer else 0.0,
+            moment_B=float(rng.uniform(*m)),
+            moment_L=float(rng.uniform(*m)) if rektangulaer else 0.0,
+            **andre)
+
+    return [
+        last('G_egen', 'permanent', (200, 800), (-10, 10), (-20, 20)),
+        last('G_jord', 'permanent', (50, 300), (0, 40), (-40, 40), gruppe='jord'),
+        last('G_jord_mot', 'permanent', (0, 50), (-40, 0), (-20, 20), gruppe='jord'),
+        last('Q_nytte', 'variabel', (50, 400), (-5, 5), (-30, 30), psi0=0.7),
+        last('Q_sno', 'variabel', (0, 200), (0, 0), (-10, 10), psi0=float(rng.choice([0.0, 0.7]))),
+        last('Q_trafikk', 'variabel', (0, 300), (-20, 20), (-60, 60), psi0=0.7),
+        last('Q_temp', 'variabel', (-20, 20), (-30, 30), (-40, 40), psi0=0.6),
+        last('Q_vind_x', 'variabel', (-50, 50), (10, 60), (20, 120), psi0=0.6, gruppe='vind'),
+        last('Q_vind_y', 'variabel', (-50, 50), (-60, -10), (-120, -20), psi0=0.6, gruppe='vind'),
+        last('A_paakjorsel', 'ulykke', (0, 100), (50, 200), (0, 150)),
+    ]
+
+
+def uttommende(kalkulator, jord, fundament, terreng, laster, belastning, faktorsett=None):
+    """q/s for hver kombinasjon, regnet enkeltvis med beregn()"""
+    vektorer = {l.navn: np.array([getattr(l, k) for k in KOMPONENTER]) for l in laster}
+    verdier = []
+    for _, _, faktorer in KombinasjonsGenerator(laster, faktorsett):
+        lastsum = sum(f * vektorer[navn] for navn, f in faktorer.items())
+        kombinasjon = Belastning(*(float(v) for v in lastsum),
+                                 belastning.centeravvik_B, belastning.centeravvik_L)
+        verdier.append(kalkulator.beregn(jord, fundament, kombinasjon, terreng).utnyttelsesgrad)
+    return np.sort(verdier)[::-1]
+
+
+@pytest.mark.parametrize('beskjaering', [False, True])
+@pytest.mark.parametrize('blokkstorrelse', [16, 4096])
+@pytest.mark.parametrize('seed', range(8))
+def test_sok_gir_samme_topp_som_uttommende(kalkulator, seed, blokkstorrelse, beskjaering):
+    rng = np.random.default_rng(100 + seed)
+    rad = tilfeldige_rader(seed, 1)[0]
+    jord, fundament, belastning, terreng = enkelttilfeller([rad])[0]
+    laster = tilfeldige_laster(rng, fundament.lengde is not None)
+    topp_n = 3
+
+    analyse = finn_styrende_kombinasjon(kalkulator, jord, fundament, terreng, laster,
+                                        belastning.centeravvik_B, belastning.centeravvik_L,
+                                        topp_n=topp_n, blokkstorrelse=blokkstorrelse,
+                                        beskjaering=beskjaering)
+    fasit = uttommende(kalkulator, jord, fundament, terreng, laster, belastning)
+
+    assert analyse.antall_mulige == len(fasit)
+    funnet = [k.resultat.utnyttelsesgrad for k in analyse.rangering]
+    assert funnet == pytest.approx(fasit[:topp_n].tolist(), rel=1e-12, nan_ok=True)
+    assert analyse.styrende.resultat.utnyttelsesgrad == pytest.approx(fasit[0], rel=1e-12)
+
+
+def test_standard_finner_maksimum_inne_i_v_intervallet(kalkulator):
+    """
+    Her har q/s maksimum inne i V-intervallet til en gren, så hjørnene i
+    lastboksen undervurderer grenen. Standardsøket skal likevel finne den
+    styrende kombinasjonen.
+    """
+    rad = tilfeldige_rader(44, 1)[0]
+    jord, fundament, belastning, terreng = enkelttilfeller([rad])[0]
+    # Sett C har lik faktor på gunstig og ugunstig permanent last, så bare V varierer
+    laster = [KarakteristiskLast('G', 'permanent', vertikal=4.0,
+                                 horisontal_B=belastning.horisontal_B, horisontal_L=belastning.horisontal_L,
+                                 moment_B=belastning.moment_B, moment_L=belastning.moment_L)]
+    laster += [KarakteristiskLast(f'Q{i}', 'variabel', vertikal=v, psi0=0.7)
+               for i, v in enumerate([67.0, 16.5, 10.5, 138.0, 46.0], 1)]
+    argumenter = (kalkulator, jord, fundament, terreng, laster,
+                  belastning.centeravvik_B, belastning.centeravvik_L)
+    fasit = uttommende(kalkulator, jord, fundament, terreng, laster, belastning, ['C'])
+
+    beskaaret = finn_styrende_kombinasjon(*argumenter, faktorsett=['C'], topp_n=1,
+                                          blokkstorrelse=1, beskjaering=True)
+    assert beskaaret.styrende.resultat.utnyttelsesgrad < fasit[0] - 0.01
+
+    for blokkstorrelse in (1, 4096):
+        analyse = finn_styrende_kombinasjon(*argumenter, faktorsett=['C'], topp_n=1,
+                                            blokkstorrelse=blokkstorrelse)
+        assert analyse.antall_evaluert == analyse.antall_mulige
+        assert analyse.styrende.resultat.utnyttelsesgrad == pytest.approx(fasit[0], rel=1e-12)
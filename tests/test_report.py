@@ -0,0 +1,103 @@
+"""
+Rapport-HTML fra de forhåndskompilerte malene mot fasit
+
+Fasiten er SHA-256 av utdata fra f-streng-versjonen av report.py (før
+malene), for de samme seedede tilfellene og fast dato. Endres rapporten
+med vilje, lages fasiten på nytt og RAPPORTVERSJON økes.
+"""
+
+import hashlib
+from datetime import datetime
+
+import pytest
+
+import report
+from batch_cli import enkelttilfeller
+from sensitivitet import sensitivitetsanalyse
+from conftest import tilfeldige_rader
+
+PROSJEKTER = [
+    {},
+    {'prosjektnummer': '5200001', 'prosjektnavn': 'E39 <Rogfast>', 'beregningsnavn': 'Fund. F1',
+     'utfort_av': 'ABC', 'revisjon': 'B'},
+    {'prosjektnummer': '5200002', 'prosjektnavn': 'Ø & å "sitat"', 'beregningsnavn': '',
+     'utfort_av': '', 'revisjon': '0'},
+]
+
+FASIT = {
+    # (seed, rad): (sha256 av HTML, sha256 av SVG)
+    (31, 0): ('85f658387f0167ab73e8ba8b42de1cb3c31deb1562867e8dbac102b73bcfceb8',
+              'abc66751f584d06bde607a84de7a76ae79b107e5cc887e2d544aaa2b5696a0e6'),
+    (31, 1): ('fe4462cb79ad8d1882442a552c257ede5f168d47d00abf248aa73a852a183557',
+              'ac2c362141f663fc77cd11e29bc1deaa54a42f1e07fc537b53f4e05051992cfd'),
+    (31, 2): ('aa2699834a45ceecfcf9c9acbdff9e64427aea845a1d6b1c61e99388980050f4',
+              '22fd9684f65afcbcd45e6b6ddc17f20746e100078cb553555e7f99f6f887fab6'),
+    (31, 3): ('560d5e7439546991f4d3b4f4823b2569f6395fcbe49870a67c291aff5791a2cd',
+              '3db5267fb5234adcfa590b517f2a93ad15e386e86897d30fca0478bc8a49b417'),
+    (31, 4): ('713aa3a1289abe9cec8c05e7b87d875dcc2fb3dc1647c61d629cd6c5b6d8a0cf',
+              '93f28d20bf918ec8f3f01735ab2fa0ea22c7f92b9638ca69546898e3482984b8'),
+    (31, 5): ('7be09f8426211de90026803293e4fbc8be0b48a31c5c3ecf128b8b3ec593c2dc',
+              'a6ea09e06c8f7773153d770df4b5c8c678e98f638799953f9ea09e9db65e66fc'),
+    (31, 6): ('fd458131a5fdf70b82ebc1d3ed369cf8a8987c2444fcc52074c16611fd234be7',
+              'db1d3ad3c194195aa98d418d4d3e2e9c37331cef6bfca62a83a0ff4f0286b128'),
+    (31, 7): ('b154b212b4c6a0a59726f2c1962fe3325a83ec5e76e3006dac643744334d5c05',
+              '37e0fe51c16a8710e0ec701f5199477f34a4a04ac2d1417421aba555df1d89b8'),
+    (32, 0): ('8c06d8751ddd9caf8721aba47ca08bb18111a5cbbf16f24fad55084c01c0485f',
+              '608fcc799302ba8a2b9fdb0f12477bf15d1f58475670ba2958850f4b8c4d2537'),
+    (32, 1): ('222e522a21127030c1f2a7afd211740e9634f4c5fb1536452acad58aa6782581',
+              'd7ee6982678e6f4b55cd833287b218ae9a1ab255581decf461a25b13c89848bd'),
+    (32, 2): ('086a1427aac47682fe14761331a309a4b3f89c0dac2269e3d7064f4d381ebd70',
+              'da2ab62e62628c58b1e4d08841fbbb4255a5e0bb33105276912d2a06c0fd7129'),
+    (32, 3): ('02bbd4daf010a96f5ffec1f210943754bbe7416d47d98c6b265003b72449c7c7',
+              'c3277bdf52f9c3f361ec21d6e223df02c94ad4c2f69431b98d5e7adcdaa04370'),
+    (32, 4): ('0718b10983fe12fbad1ee04ce82a0bf1056a61c8984d6d3cfe12051ef1e9a8e6',
+              '940172c21381de9058a76d698ffd2f70ccd38a9763fd75a7dd01691c1f3dcd44'),
+    (32, 5): ('9401c6769905a0473fea415b4f25319a099f01ae26f328e26a429f2c45c36220',
+              'fe4333daef552ca11eb300ae8c950e9aeea5b5d5b908b5344c50fb5678a61dc5'),
+    (32, 6): ('bb182274c91ee103ff8559f09833d90c5151838f4446eb574e8c727bad109035',
+              '191058dcde7d5f69b800607e174f1c0c774bff5aa01e4e072ad9f1eaf68d77c4'),
+    (32, 7): ('544c2d5263017579d1ad9b663bfd2f977527f7df12af3b0ef1367d34943a9d91',
+              '3cb1f006abb9a826f6b67446f74334cd4f3b7e65816a3c1e8968a379dcf13549'),
+    (33, 0): ('6bab1f65cad96f385dd42de8d7ff2a3129cc43deeb592a8827ab0b76651f4b42',
+              '00e122f135105647f1a6baf80db5391353871eab3aa710ad2eee8d836f144c5a'),
+    (33, 1): ('93eacb498e47b619fcb69fb4f296d412d6d0e1a77af4a58d06d17c68f7718790',
+              '4ba2207360db9c3424aab9f19c94fbb070d435149f831a12e2fa5f4c2d7f33fd'),
+    (33, 2): ('cc3d671622d534b2b364f2a74a031f53ce0cc5af97b1bcb06effbf7ded677608',
+              '3d942b8a689e9bc1038a3c3c8bf7560dd71ba680cb8040f5bf50481908efc328'),
+    (33, 3): ('bc13c61d4e2b796d10778ec9d411fc04558b10a3bca9c895ff7dc8f205eac1c8',
+              'b10f40ffefacfb01163c938e565bd8ed17bc901fe866a814e2eeba6fd13a2a92'),
+    (33, 4): ('60992efda933e2d1e81be0465be30560b26542a4f1c237767c10db774cc5b77b',
+              '7df792a84c4ac3695660368f9349f2c762539621d789ea02078adebc36b8e427'),
+    (33, 5): ('1261e7881251e7c9ab4a3c33f49fb6180ae7538f9d56a07ac263649b5b8e4371',
+              '83d30f7bb035aa33f7529f6b12e4d301e19c3859eefb24288fdb92aac28015ba'),
+    (33, 6): ('37f5793ed8400e4eafd0c62e2b1b6fb002ca4a50746ba8593302eeae86fea574',
+              'b71611a6fadfb672e9cfbd39ed414083c67f574a48d4ea2bcf33104d07921c30'),
+    (33, 7): ('f32907a2ad9823d84afb727264a43c0ab18e33ceb041fa5b4c7bc58509f8a75d',
+              '6f782686cff2868031ee478a994730fd0c2debc4abde517a4d6682b6333639c6'),
+}
+
+
+class FastDato(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return cls(2026, 10, 16, 12, 0, 0)
+
+
+def rapporter(kalkulator, seed: int):
+    """(rad, html, svg) for 8 tilfeller; hvert fjerde med sensitivitetsanalyse"""
+    for i, tilfelle in enumerate(enkelttilfeller(tilfeldige_rader(seed, 8))):
+        jord, fundament, belastning, terreng = tilfelle
+        resultat = kalkulator.beregn(*tilfelle)
+        sensitivitet = sensitivitetsanalyse(kalkulator, *tilfelle) if i % 4 == 0 else None
+        html = report.generer_rapport_html(PROSJEKTER[i % len(PROSJEKTER)], jord, fundament,
+                                           belastning, terreng, resultat, sensitivitet)
+        svg = report.generer_fundament_svg(fundament, terreng, resultat, belastning)
+        yield i, html, svg
+
+
+@pytest.mark.parametrize('seed', [31, 32, 33])
+def test_rapport_er_bytelik_fasit(kalkulator, monkeypatch, seed):
+    monkeypatch.setattr(report, 'datetime', FastDato)
+    for i, html, svg in rapporter(kalkulator, seed):
+        assert (hashlib.sha256(html.encode('utf-8')).hexdigest(),
+                hashlib.sha256(svg.encode('utf-8')).hexdigest()) == FASIT[seed, i], f"rad {i}"
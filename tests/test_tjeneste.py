@@ -0,0 +1,72 @@
+"""Tjenesten: tilfeller med og uten Ka/Kp i samme batch, og rapporter med tjenestens kalkulator"""
+
+import asyncio
+from datetime import datetime
+
+import report
+from batch_cli import ett_tilfelle
+from calculator import BaereevneKalkulator
+from tjeneste import Mikrobatcher, Statistikk, Tjeneste, normaliser_rad
+from conftest import tilfeldige_rader
+
+
+def rader_med_og_uten_ka_kp(seed: int, antall: int):
+    """Annenhver rad, fra den første, med Ka/Kp fra klienten; lengde utelatt for stripefundament"""
+    rader = []
+    for i, rad in enumerate(tilfeldige_rader(seed, antall)):
+        rad = {navn: verdi for navn, verdi in rad.items() if verdi == verdi}
+        if i % 2 == 0:
+            rad.update(Ka=0.3, Kp=3.0)
+        rader.append(rad)
+    return rader
+
+
+def fasit(kalkulator, rad):
+    return kalkulator.beregn(*ett_tilfelle(normaliser_rad(rad))).utnyttelsesgrad
+
+
+def test_mikrobatch_med_og_uten_ka_kp(kalkulator):
+    rader = rader_med_og_uten_ka_kp(41, 6)
+
+    async def kjor():
+        # Langt vindu, så alle tilfellene havner i samme beregn_batch-kall
+        batcher = Mikrobatcher(kalkulator, Statistikk(), vindu=0.5)
+        batcher.start()
+        try:
+            return await asyncio.gather(*(batcher.beregn(normaliser_rad(rad)) for rad in rader))
+        finally:
+            await batcher.stopp()
+
+    svar = asyncio.run(kjor())
+    assert [s['utnyttelsesgrad'] for s in svar] == [fasit(kalkulator, rad) for rad in rader]
+
+
+def test_batch_rader_med_og_uten_ka_kp(kalkulator):
+    rader = rader_med_og_uten_ka_kp(42, 6)
+    svar = asyncio.run(Tjeneste(kalkulator)._batch({'rader': rader}))
+    assert svar['kolonner']['utnyttelsesgrad'] == [fasit(kalkulator, rad) for rad in rader]
+
+
+def test_rapport_bruker_tjenestens_kalkulator():
+    rad = dict(tilfeldige_rader(50, 1, analysetype='effektiv')[0], lengde=None)
+    prosjekt = {'prosjektnummer': '5200001'}
+    kubisk = BaereevneKalkulator(ny_interpolasjon='kubisk')
+
+    async def kjor():
+        tjeneste = Tjeneste(kubisk)
+        await tjeneste.start('127.0.0.1', 0)
+        try:
+            return await tjeneste._rapport({'prosjekt': prosjekt, 'inndata': rad})
+        finally:
+            await tjeneste.stopp()
+
+    def lokal(kalkulator):
+        jord, fundament, belastning, terreng = ett_tilfelle(normaliser_rad(rad))
+        resultat = kalkulator.beregn(jord, fundament, belastning, terreng)
+        return report.generer_rapport_html(prosjekt, jord, fundament, belastning, terreng, resultat)
+
+    dag = datetime.now().date()
+    html = asyncio.run(kjor())
+    if datetime.now().date() == dag:  # rapporten er datert
+        assert lokal(BaereevneKalkulator()) != lokal(kubisk)
+        assert html == lokal(kubisk)
@@ -0,0 +1,501 @@
+"""
+Lokal HTTP/JSON-tjeneste for bæreevneberegning
+
+Kun standardbiblioteket (asyncio) og prosjektets egne moduler. Inndata er
+feltnavnene i JordParameter, FundamentGeometri, Belastning og
+TerrengForhold som ett flatt JSON-objekt, med samme standardverdier som
+batch_cli.py (f.eks. lengde utelatt = stripefundament).
+
+    POST /beregn    {"friksjonsvinkel": 33, "materialfaktor": 1.4, ...}
+                    -> {"resultat": {"utnyttelsesgrad": ..., ...}}
+    POST /batch     {"rader": [{...}, ...]} eller {"kolonner": {"vertikal": [...], ...}},
+                    valgfritt "konstanter": {...} -> {"kolonner": {...}}
+    POST /rapport   {"prosjekt": {...}, "inndata": {...}} -> HTML-rapport
+    GET  /helse     status, kølengde og statistikk
+
+Enkeltberegninger som kommer innenfor et kort tidsvindu samles og beregnes
+i ett kall til beregn_batch (samme tall som beregn()). Køen er begrenset:
+når den er full, svarer tjenesten 503 med Retry-After i stedet for å
+hope opp forespørsler. Rapporter lages i en prosesspool, også den med et
+øvre tak på antall samtidige.
+
+Tall som ikke er endelige sendes som null (q/s er uendelig når s ≤ 0).
+
+    python tjeneste.py --port 8765 --vindu-ms 2 --maks-batch 256
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import multiprocessing
+import signal
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from http import HTTPStatus
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from calculator import BaereevneKalkulator
+from batch_cli import INNDATAFELT, RESULTATFELT, STANDARDVERDIER, ett_tilfelle, inndata_fra_kolonner
+
+
+MAKS_KROPP = 64 * 1024 * 1024  # største forespørsel [byte]
+ANALYSETYPER = ('effektiv', 'udrenert')
+
+
+class Ugyldig(ValueError):
+    """Feil i forespørselen; gir 400"""
+
+
+class Overbelastet(RuntimeError):
+    """Køen er full; gir 503"""
+
+
+def _json_tall(verdi: float) -> Optional[float]:
+    return verdi if math.isfinite(verdi) else None
+
+
+def _json(data) -> bytes:
+    return json.dumps(data, ensure_ascii=False, allow_nan=False).encode('utf-8')
+
+
+# Ka og Kp godtas, men brukes ikke av beregningen; de regnes ut fra φ'd som i
+# batch_cli. Slik har alle normaliserte tilfeller de samme feltene og kan
+# samles i én batch.
+UTELATT = ('Ka', 'Kp')
+
+
+def normaliser_rad(rad: Dict[str, object]) -> Dict[str, object]:
+    """Kontrollerer ett tilfelle og fyller inn standardverdier; Ka og Kp utelates"""
+    if not isinstance(rad, dict):
+        raise Ugyldig("Et tilfelle må være et JSON-objekt")
+    ukjente = set(rad) - set(INNDATAFELT)
+    if ukjente:
+        raise Ugyldig(f"Ukjente felt: {', '.join(sorted(ukjente))}")
+    ut = {}
+    for navn in INNDATAFELT:
+        if navn in UTELATT:
+            continue
+        if navn in rad and rad[navn] is not None:
+            verdi = rad[navn]
+        elif navn in STANDARDVERDIER:
+            verdi = STANDARDVERDIER[navn]
+        else:
+            raise Ugyldig(f"Mangler felt: {navn}")
+        if navn == 'analysetype':
+            if verdi not in ANALYSETYPER:
+                raise Ugyldig(f"analysetype må være {' eller '.join(ANALYSETYPER)}")
+        else:
+            try:
+                verdi = float(verdi)
+            except (TypeError, ValueError):
+                raise Ugyldig(f"{navn} må være et tall") from None
+        ut[navn] = verdi
+    return ut
+
+
+def normaliser_kolonner(kolonner: Dict[str, object],
+                        konstanter: Dict[str, object]) -> Tuple[Dict[str, object], int]:
+    """
+    Kontrollerer kolonneformen av /batch etter de samme reglene som normaliser_rad
+
+    Hver kolonne er en liste eller en skalar. Konstanter går foran kolonner med
+    samme navn, som i inndata_fra_kolonner. Ka og Kp utelates. Gir
+    (kolonner, antall tilfeller).
+    """
+    if not isinstance(kolonner, dict):
+        raise Ugyldig("kolonner må være et JSON-objekt")
+    felles = dict(kolonner, **konstanter)
+    ukjente = set(felles) - set(INNDATAFELT)
+    if ukjente:
+        raise Ugyldig(f"Ukjente felt: {', '.join(sorted(ukjente))}")
+    lengder = {len(v) for v in felles.values() if isinstance(v, list)}
+    if len(lengder) > 1:
+        raise Ugyldig("Kolonnene må ha samme lengde")
+
+    ut = {}
+    for navn, kolonne in felles.items():
+        if kolonne is None or navn in UTELATT:
+            continue
+        verdier = kolonne if isinstance(kolonne, list) else [kolonne]
+        if navn == 'analysetype':
+            if any(verdi not in ANALYSETYPER for verdi in verdier):
+                raise Ugyldig(f"analysetype må være {' eller '.join(ANALYSETYPER)}")
+        else:
+            try:
+                verdier = [float(verdi) for verdi in verdier]
+            except (TypeError, ValueError):
+                raise Ugyldig(f"{navn} må være et tall") from None
+        ut[navn] = verdier if isinstance(kolonne, list) else verdier[0]
+    return ut, (lengder.pop() if lengder else 1)
+
+
+def _kolonner(rader: List[Dict[str, object]]) -> Dict[str, list]:
+    """Normaliserte tilfeller (fra normaliser_rad) som kolonner"""
+    return {navn: [rad[navn] for rad in rader] for navn in INNDATAFELT if navn not in UTELATT}
+
+
+def _resultater(resultat: Dict[str, np.ndarray]) -> Dict[str, List[Optional[float]]]:
+    """beregn_batch-kolonner som JSON-lister"""
+    return {navn: [_json_tall(v) for v in resultat[navn].tolist()] for navn in RESULTATFELT}
+
+
+@dataclass
+class Statistikk:
+    foresporsler: int = 0
+    enkeltberegninger: int = 0
+    mikrobatcher: int = 0
+    avvist: int = 0
+    rapporter: int = 0
+
+    def som_dict(self) -> Dict[str, object]:
+        snitt = self.enkeltberegninger / self.mikrobatcher if self.mikrobatcher else 0.0
+        return {'foresporsler': self.foresporsler, 'enkeltberegninger': self.enkeltberegninger,
+                'mikrobatcher': self.mikrobatcher, 'snitt_batchstorrelse': snitt,
+                'avvist': self.avvist, 'rapporter': self.rapporter}
+
+
+class Mikrobatcher:
+    """
+    Samler enkeltberegninger fra samtidige forespørsler til ett beregn_batch-kall
+
+    Første tilfelle i køen starter et vindu på vindu sekunder; alt som kommer
+    innen vinduet (høyst maks_batch) beregnes sammen. vindu=0 gir ingen
+    venting, bare det som allerede ligger i køen.
+    """
+
+    def __init__(self,
+                 kalkulator: BaereevneKalkulator,
+                 statistikk: Statistikk,
+                 vindu: float = 0.002,
+                 maks_batch: int = 256,
+                 maks_ko: int = 1024):
+        self.kalkulator = kalkulator
+        self.statistikk = statistikk
+        self.vindu = vindu
+        self.maks_batch = maks_batch
+        self.ko: asyncio.Queue = asyncio.Queue(maxsize=maks_ko)
+        self._oppgave: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._oppgave = asyncio.get_running_loop().create_task(self._kjor())
+
+    async def stopp(self):
+        if self._oppgave is not None:
+            self._oppgave.cancel()
+            try:
+                await self._oppgave
+            except asyncio.CancelledError:
+                pass
+
+    async def beregn(self, rad: Dict[str, object]) -> Dict[str, Optional[float]]:
+        """Resultat for ett normalisert tilfelle; Overbelastet hvis køen er full"""
+        fremtid = asyncio.get_running_loop().create_future()
+        try:
+            self.ko.put_nowait((rad, fremtid))
+        except asyncio.QueueFull:
+            self.statistikk.avvist += 1
+            raise Overbelastet("Beregningskøen er full") from None
+        return await fremtid
+
+    async def _kjor(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.ko.get()]
+            frist = loop.time() + self.vindu
+            while len(batch) < self.maks_batch:
+                try:
+                    batch.append(self.ko.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                igjen = frist - loop.time()
+                if igjen <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.ko.get(), igjen))
+                except asyncio.TimeoutError:
+                    break
+            self._beregn(batch)
+
+    def _beregn(self, batch):
+        # Små, vektoriserte blokker: beregnes direkte i hendelsesløkken
+        rader = [rad for rad, _ in batch]
+        try:
+            kolonner = _kolonner(rader)
+            resultat = _resultater(self.kalkulator.beregn_batch(*inndata_fra_kolonner(kolonner, len(rader))))
+        except Exception as feil:
+            for _, fremtid in batch:
+                if not fremtid.done():
+                    fremtid.set_exception(feil)
+            return
+        self.statistikk.mikrobatcher += 1
+        self.statistikk.enkeltberegninger += len(batch)
+        for i, (_, fremtid) in enumerate(batch):
+            if not fremtid.done():  # klienten kan ha koblet fra
+                fremtid.set_result({navn: verdier[i] for navn, verdier in resultat.items()})
+
+
+_ARBEIDER_KALKULATOR: Optional[BaereevneKalkulator] = None
+
+
+def _start_arbeider(kalkulator: BaereevneKalkulator):
+    """Rapportarbeiderne regner med tjenestens kalkulator (samme innstillinger som /beregn)"""
+    global _ARBEIDER_KALKULATOR
+    _ARBEIDER_KALKULATOR = kalkulator
+
+
+def _varm_opp() -> None:
+    """Kjøres i hver rapportarbeider ved oppstart, så første rapport slipper importen"""
+    import report  # noqa: F401
+
+
+def _lag_rapport(prosjekt_info: Dict[str, str], rad: Dict[str, object]) -> str:
+    """Kjøres i rapportpoolen: beregning og HTML-rapport for ett tilfelle"""
+    from report import generer_rapport_html
+    jord, fundament, belastning, terreng = ett_tilfelle(rad)
+    resultat = _ARBEIDER_KALKULATOR.beregn(jord, fundament, belastning, terreng)
+    return generer_rapport_html(prosjekt_info, jord, fundament, belastning, terreng, resultat)
+
+
+class Tjeneste:
+    """
+    HTTP/1.1-tjener med keep-alive over asyncio-strømmer
+
+    maks_rapporter: rapporter i arbeid eller i kø i poolen før 503
+    """
+
+    def __init__(self,
+                 kalkulator: Optional[BaereevneKalkulator] = None,
+                 vindu: float = 0.002,
+                 maks_batch: int = 256,
+                 maks_ko: int = 1024,
+                 rapportarbeidere: int = 1,
+                 maks_rapporter: int = 16):
+        self.kalkulator = kalkulator or BaereevneKalkulator()
+        self.statistikk = Statistikk()
+        self._innstillinger = (vindu, maks_batch, maks_ko)
+        self.rapportarbeidere = rapportarbeidere
+        self.maks_rapporter = maks_rapporter
+        self._rapporter_i_arbeid = 0
+        self.batcher: Optional[Mikrobatcher] = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._tjener: Optional[asyncio.AbstractServer] = None
+        self._forbindelser = set()
+
+    async def start(self, vert: str = '127.0.0.1', port: int = 8765) -> asyncio.AbstractServer:
+        vindu, maks_batch, maks_ko = self._innstillinger
+        self.batcher = Mikrobatcher(self.kalkulator, self.statistikk, vindu, maks_batch, maks_ko)
+        self.batcher.start()
+        # Arbeiderne må ikke arve lytte- eller klientsokler (fork gjør det, og en
+        # foreldreløs arbeider holder da porten og forbindelsene åpne). De startes
+        # derfor fra en forkserver, og før start_server åpner porten.
+        metode = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        self._pool = ProcessPoolExecutor(max_workers=self.rapportarbeidere,
+                                         mp_context=multiprocessing.get_context(metode),
+                                         initializer=_start_arbeider, initargs=(self.kalkulator,))
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self._pool, _varm_opp)
+                               for _ in range(self.rapportarbeidere)))
+        self._tjener = await asyncio.start_server(self._forbindelse, vert, port)
+        return self._tjener
+
+    async def stopp(self):
+        if self._tjener is not None:
+            self._tjener.close()
+            await self._tjener.wait_closed()
+        # Åpne keep-alive-forbindelser lukkes her; wait_closed venter ikke på dem i 3.9–3.11
+        for oppgave in list(self._forbindelser):
+            oppgave.cancel()
+        await asyncio.gather(*self._forbindelser, return_exceptions=True)
+        if self.batcher is not None:
+            await self.batcher.stopp()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+    @property
+    def adresse(self) -> Tuple[str, int]:
+        return self._tjener.sockets[0].getsockname()[:2]
+
+    # --- HTTP ---
+
+    async def _forbindelse(self, leser: asyncio.StreamReader, skriver: asyncio.StreamWriter):
+        oppgave = asyncio.current_task()
+        self._forbindelser.add(oppgave)
+        try:
+            while True:
+                linje = await leser.readline()
+                if not linje:
+                    break
+                deler = linje.decode('latin-1').split()
+                if len(deler) != 3:
+                    await self._svar(skriver, HTTPStatus.BAD_REQUEST, {'feil': "Ugyldig forespørselslinje"},
+                                     hold_aapen=False)
+                    break
+                metode, sti, versjon = deler
+                hoder = {}
+                while True:
+                    hode = await leser.readline()
+                    if hode in (b'\r\n', b'\n', b''):
+                        break
+                    navn, _, verdi = hode.decode('latin-1').partition(':')
+                    hoder[navn.strip().lower()] = verdi.strip()
+                hold_aapen = versjon == 'HTTP/1.1' and hoder.get('connection', '').lower() != 'close'
+
+                lengde = int(hoder.get('content-length') or 0)
+                if lengde > MAKS_KROPP:
+                    await self._svar(skriver, HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                                     {'feil': f"Forespørselen er større enn {MAKS_KROPP} byte"},
+                                     hold_aapen=False)
+                    break
+                kropp = await leser.readexactly(lengde) if lengde else b''
+
+                self.statistikk.foresporsler += 1
+                status, innhold, ekstra = await self._rut(metode, sti.split('?', 1)[0], kropp)
+                await self._svar(skriver, status, innhold, hold_aapen, ekstra)
+                if not hold_aapen:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError, asyncio.CancelledError):
+            pass
+        finally:
+            self._forbindelser.discard(oppgave)
+            skriver.close()
+
+    async def _svar(self, skriver, status: HTTPStatus, innhold, hold_aapen: bool = True,
+                    ekstra: Optional[Dict[str, str]] = None):
+        if isinstance(innhold, str):
+            data, type_ = innhold.encode('utf-8'), 'text/html; charset=utf-8'
+        else:
+            data, type_ = _json(innhold), 'application/json'
+        hoder = [f"HTTP/1.1 {status.value} {status.phrase}",
+                 f"Content-Type: {type_}",
+                 f"Content-Length: {len(data)}",
+                 f"Connection: {'keep-alive' if hold_aapen else 'close'}"]
+        hoder += [f"{navn}: {verdi}" for navn, verdi in (ekstra or {}).items()]
+        skriver.write(("\r\n".join(hoder) + "\r\n\r\n").encode('latin-1') + data)
+        await skriver.drain()
+
+    async def _rut(self, metode: str, sti: str, kropp: bytes):
+        endepunkter = {
+            ('POST', '/beregn'): self._beregn,
+            ('POST', '/batch'): self._batch,
+            ('POST', '/rapport'): self._rapport,
+            ('GET', '/helse'): self._helse,
+        }
+        behandler = endepunkter.get((metode, sti))
+        if behandler is None:
+            if any(s == sti for _, s in endepunkter):
+                return HTTPStatus.METHOD_NOT_ALLOWED, {'feil': f"{metode} støttes ikke for {sti}"}, None
+            return HTTPStatus.NOT_FOUND, {'feil': f"Ukjent endepunkt: {sti}"}, None
+        try:
+            data = json.loads(kropp) if kropp else {}
+            return HTTPStatus.OK, await behandler(data), None
+        except json.JSONDecodeError as feil:
+            return HTTPStatus.BAD_REQUEST, {'feil': f"Ugyldig JSON: {feil}"}, None
+        except Ugyldig as feil:
+            return HTTPStatus.BAD_REQUEST, {'feil': str(feil)}, None
+        except Overbelastet as feil:
+            return HTTPStatus.SERVICE_UNAVAILABLE, {'feil': str(feil)}, {'Retry-After': '1'}
+        except Exception as feil:
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {'feil': f"{type(feil).__name__}: {feil}"}, None
+
+    # --- Endepunkter ---
+
+    async def _beregn(self, data):
+        return {'resultat': await self.batcher.beregn(normaliser_rad(data))}
+
+    async def _batch(self, data):
+        if not isinstance(data, dict):
+            raise Ugyldig("Forventet et JSON-objekt med rader eller kolonner")
+        konstanter = data.get('konstanter') or {}
+        if not isinstance(konstanter, dict):
+            raise Ugyldig("konstanter må være et JSON-objekt")
+        if 'rader' in data:
+            if not isinstance(data['rader'], list):
+                raise Ugyldig("rader må være en liste")
+            rader = [normaliser_rad(dict(konstanter, **rad) if isinstance(rad, dict) else rad)
+                     for rad in data['rader']]
+            if not rader:
+                return {'kolonner': {navn: [] for navn in RESULTATFELT}}
+            kolonner = _kolonner(rader)
+            antall = len(rader)
+        elif 'kolonner' in data:
+            kolonner, antall = normaliser_kolonner(data['kolonner'], konstanter)
+        else:
+            raise Ugyldig("Forventet rader eller kolonner")
+
+        def beregn():
+            try:
+                inndata = inndata_fra_kolonner(kolonner, antall)
+            except (KeyError, ValueError) as feil:
+                raise Ugyldig(feil.args[0]) from None
+            return _resultater(self.kalkulator.beregn_batch(*inndata))
+
+        # Store batcher i en tråd så hendelsesløkken kan svare andre imens
+        return {'kolonner': await asyncio.get_running_loop().run_in_executor(None, beregn)}
+
+    async def _rapport(self, data):
+        if not isinstance(data, dict):
+            raise Ugyldig("Forventet et JSON-objekt med prosjekt og inndata")
+        rad = normaliser_rad(data.get('inndata') or {})
+        prosjekt = {navn: str(verdi) for navn, verdi in (data.get('prosjekt') or {}).items()}
+        if self._rapporter_i_arbeid >= self.maks_rapporter:
+            self.statistikk.avvist += 1
+            raise Overbelastet("For mange rapporter i arbeid")
+        self._rapporter_i_arbeid += 1
+        try:
+            html = await asyncio.get_running_loop().run_in_executor(self._pool, _lag_rapport, prosjekt, rad)
+        finally:
+            self._rapporter_i_arbeid -= 1
+        self.statistikk.rapporter += 1
+        return html
+
+    async def _helse(self, data):
+        return {'status': 'ok', 'ko': self.batcher.ko.qsize(), 'rapporter_i_arbeid': self._rapporter_i_arbeid,
+                'statistikk': self.statistikk.som_dict()}
+
+
+async def kjor(vert: str, port: int, **innstillinger):
+    tjeneste = Tjeneste(**innstillinger)
+    await tjeneste.start(vert, port)
+    vert, port = tjeneste.adresse
+    print(f"Lytter på http://{vert}:{port}", file=sys.stderr, flush=True)
+    stopp = asyncio.Event()
+    try:
+        # SIGTERM (f.eks. terminate() fra lasttest.py) stopper tjenesten og poolen ryddig
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stopp.set)
+    except NotImplementedError:  # Windows
+        pass
+    try:
+        await stopp.wait()
+    finally:
+        await tjeneste.stopp()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="HTTP/JSON-tjeneste for bæreevneberegning")
+    parser.add_argument('--vert', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--vindu-ms', type=float, default=2.0,
+                        help="Tidsvindu for å samle enkeltberegninger (0 = ingen venting)")
+    parser.add_argument('--maks-batch', type=int, default=256)
+    parser.add_argument('--maks-ko', type=int, default=1024, help="Plasser i beregningskøen før 503")
+    parser.add_argument('--rapportarbeidere', type=int, default=1)
+    parser.add_argument('--maks-rapporter', type=int, default=16)
+    parser.add_argument('--ny-interpolasjon', choices=['lineaer', 'kubisk'], default='lineaer')
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(kjor(args.vert, args.port,
+                         kalkulator=BaereevneKalkulator(ny_interpolasjon=args.ny_interpolasjon),
+                         vindu=args.vindu_ms / 1000, maks_batch=args.maks_batch, maks_ko=args.maks_ko,
+                         rapportarbeidere=args.rapportarbeidere, maks_rapporter=args.maks_rapporter))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
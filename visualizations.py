@@ -3,80 +3,133 @@ Visualiseringer for bæreevneberegning
 Profesjonelle Plotly-figurer med moment-visning
 """
 
+from functools import lru_cache
+from typing import Dict, Optional, Sequence
+
 import numpy as np
 import plotly.graph_objects as go
 from models import FundamentGeometri, TerrengForhold, Resultat, Belastning
+from sensitivitet import FELTNAVN, Utnyttelseskart
+from omhylling import Kapasitetsomhylling
+
+
+# Øvre grense for antall gressmerker i tverrsnittet
+GRESS_MAKS_ANTALL = 120
+
+# Fargeskala for q/s fra 0 til UTNYTTELSE_MAKS; rødt fra 1.0
+UTNYTTELSE_MAKS = 1.5
+UTNYTTELSE_FARGER = [
+    [0.0, "#1b5e20"],
+    [0.6 / UTNYTTELSE_MAKS, "#66bb6a"],
+    [0.9 / UTNYTTELSE_MAKS, "#f57c00"],
+    [1.0 / UTNYTTELSE_MAKS, "#c62828"],
+    [1.0, "#6d0f0f"],
+]
+
+# Snittene i kapasitetsomhyllingen, fra lyst (laveste snittverdi) til mørkt
+OMHYLLING_FARGER = ["#95d5b2", "#52b788", "#2d9b6a", "#006341", "#004d32", "#1b2e25"]
+
+
+def _segmenter(*linjer) -> tuple:
+    """Slår sammen linjestykker [(x0, y0), (x1, y1), ...] til én NaN-separert x/y-serie"""
+    x, y = [], []
+    for linje in linjer:
+        for px, py in linje:
+            x.append(px)
+            y.append(py)
+        x.append(None)
+        y.append(None)
+    return x, y
+
+
+def _pil_opp(x: float, y0: float, y1: float, hode: float) -> list:
+    """Skaft fra y0 til y1 og pilspiss i y1, som linjestykker"""
+    return [[(x, y0), (x, y1)],
+            [(x - 0.5 * hode, y1 - hode), (x, y1), (x + 0.5 * hode, y1 - hode)]]
+
+
+@lru_cache(maxsize=64)
+def _bakgrunnslag(B: float, D: float, T: float) -> tuple:
+    """
+    Statisk bakgrunn (jord, terreng og gress) som gjenbrukes mellom reruns
+
+    Gresset er ett Scatter-spor med markører i stedet for én annotasjon per
+    merke; antall merker er begrenset slik at brede fundamenter ikke gir
+    hundrevis av punkter.
+    """
+    shapes = (
+        # Bakgrunn - jord
+        dict(type="rect", x0=-B*1.5, y0=-D-T-0.5, x1=B*1.5, y1=0,
+             fillcolor="rgba(139, 119, 101, 0.3)", line=dict(width=0), layer="below"),
+        # Terrengoverflate
+        dict(type="line", x0=-B*1.5, y0=0, x1=B*1.5, y1=0,
+             line=dict(color="#2d5016", width=3)),
+    )
+    
+    # Gress
+    avstand = max(0.15, 2.8 * B / GRESS_MAKS_ANTALL)
+    x_gress = np.arange(-B*1.4, B*1.4, avstand)
+    gress = go.Scatter(
+        x=x_gress, y=np.full(x_gress.shape, 0.05),
+        mode='markers',
+        marker=dict(symbol='triangle-down', size=7, color="#2d5016"),
+        showlegend=False,
+        hoverinfo='skip'
+    )
+    return shapes, gress
 
 
 def lag_fundament_figur(fundament: FundamentGeometri,
                         terreng: TerrengForhold,
                         resultat: Resultat,
                         belastning: Belastning) -> go.Figure:
-    """Lager tverrsnittsfigur av fundamentet med alle laster inkludert moment"""
+    """
+    Lager tverrsnittsfigur av fundamentet med alle laster inkludert moment
+    
+    Figuren bygges i ett kall til go.Figure; gress og spenningspiler er
+    samlet i Scatter-spor, så størrelsen er uavhengig av B.
+    """
     B = fundament.bredde
     T = fundament.tykkelse
     D = terreng.fundamentdybde
     Bo = resultat.eff_bredde
     e_B = resultat.eksentrisitet_B
     
-    fig = go.Figure()
-    
-    # Bakgrunn - jord
-    fig.add_shape(
-        type="rect",
-        x0=-B*1.5, y0=-D-T-0.5, x1=B*1.5, y1=0,
-        fillcolor="rgba(139, 119, 101, 0.3)",
-        line=dict(width=0),
-        layer="below"
-    )
-    
-    # Terrengoverflate
-    fig.add_shape(
-        type="line",
-        x0=-B*1.5, y0=0, x1=B*1.5, y1=0,
-        line=dict(color="#2d5016", width=3)
-    )
-    
-    # Gress
-    for x in np.arange(-B*1.4, B*1.4, 0.15):
-        fig.add_annotation(
-            x=x, y=0.05,
-            text="▼",
-            showarrow=False,
-            font=dict(size=8, color="#2d5016"),
-            yanchor="bottom"
-        )
+    bakgrunn, gress = _bakgrunnslag(float(B), float(D), float(T))
+    shapes = list(bakgrunn)
+    annotasjoner = []
+    spor = [gress]
     
     # Fundament
-    fig.add_shape(
+    shapes.append(dict(
         type="rect",
         x0=-B/2, y0=-D, x1=B/2, y1=-D+T,
         fillcolor="rgba(180, 180, 180, 0.8)",
         line=dict(color="#404040", width=2)
-    )
+    ))
     
     # Vegg/søyle
     vegg_b = fundament.vegg_bredde
     if D > T:
-        fig.add_shape(
+        shapes.append(dict(
             type="rect",
             x0=-vegg_b/2, y0=-D+T, x1=vegg_b/2, y1=0,
             fillcolor="rgba(160, 160, 160, 0.8)",
             line=dict(color="#404040", width=2)
-        )
+        ))
     
     # Effektiv bredde markering
-    fig.add_shape(
+    shapes.append(dict(
         type="rect",
         x0=-B/2 + abs(e_B), y0=-D-0.05, x1=B/2 - abs(e_B), y1=-D,
         fillcolor="rgba(0, 99, 65, 0.6)",
         line=dict(color="#006341", width=2)
-    )
+    ))
     
     # === LASTER ===
     
     # Vertikallast (rød pil ned)
-    fig.add_annotation(
+    annotasjoner.append(dict(
         x=e_B, y=0.15,
         ax=e_B, ay=0.55,
         xref="x", yref="y",
@@ -86,18 +139,18 @@ def lag_fundament_figur(fundament: FundamentGeometri,
         arrowsize=1.5,
         arrowwidth=3,
         arrowcolor="#c62828"
-    )
-    fig.add_annotation(
+    ))
+    annotasjoner.append(dict(
         x=e_B, y=0.62,
         text=f"V = {belastning.vertikal:.0f} kN",
         showarrow=False,
         font=dict(size=11, color="#c62828")
-    )
+    ))
     
     # Horisontallast (blå pil)
     if abs(belastning.horisontal_B) > 0.1:
         H_dir = 1 if belastning.horisontal_B > 0 else -1
-        fig.add_annotation(
+        annotasjoner.append(dict(
             x=H_dir * 0.35, y=0.15,
             ax=0, ay=0.15,
             xref="x", yref="y",
@@ -107,14 +160,14 @@ def lag_fundament_figur(fundament: FundamentGeometri,
             arrowsize=1.5,
             arrowwidth=3,
             arrowcolor="#1565c0"
-        )
-        fig.add_annotation(
+        ))
+        annotasjoner.append(dict(
             x=H_dir * 0.5, y=0.15,
             text=f"H = {abs(belastning.horisontal_B):.0f} kN",
             showarrow=False,
             font=dict(size=10, color="#1565c0"),
             xanchor="left" if H_dir > 0 else "right"
-        )
+        ))
     
     # === MOMENT (lilla buet pil) ===
     if abs(belastning.moment_B) > 0.1:
@@ -128,7 +181,7 @@ def lag_fundament_figur(fundament: FundamentGeometri,
         y_arc = r * np.sin(theta) + 0.15
         
         # Tegn buen
-        fig.add_trace(go.Scatter(
+        spor.append(go.Scatter(
             x=x_arc,
             y=y_arc,
             mode='lines',
@@ -138,12 +191,8 @@ def lag_fundament_figur(fundament: FundamentGeometri,
         ))
         
         # Pilspiss på enden av buen
-        end_x = x_arc[-1]
-        end_y = y_arc[-1]
-        
-        # Legg til pilspiss som annotation
-        fig.add_annotation(
-            x=end_x, y=end_y,
+        annotasjoner.append(dict(
+            x=x_arc[-1], y=y_arc[-1],
             ax=x_arc[-3], ay=y_arc[-3],
             xref="x", yref="y",
             axref="x", ayref="y",
@@ -152,99 +201,106 @@ def lag_fundament_figur(fundament: FundamentGeometri,
             arrowsize=1.2,
             arrowwidth=3,
             arrowcolor="#7b1fa2"
-        )
+        ))
         
         # Moment-tekst
-        fig.add_annotation(
+        annotasjoner.append(dict(
             x=0, y=0.5,
             text=f"M = {abs(belastning.moment_B):.0f} kNm",
             showarrow=False,
             font=dict(size=10, color="#7b1fa2")
-        )
+        ))
     
     # === DIMENSJONER ===
     
     # Bredde B
-    fig.add_shape(type="line", x0=-B/2, y0=-D-0.3, x1=B/2, y1=-D-0.3,
-                  line=dict(color="#666", width=1, dash="dot"))
-    fig.add_shape(type="line", x0=-B/2, y0=-D-0.25, x1=-B/2, y1=-D-0.35,
-                  line=dict(color="#666", width=1))
-    fig.add_shape(type="line", x0=B/2, y0=-D-0.25, x1=B/2, y1=-D-0.35,
-                  line=dict(color="#666", width=1))
-    fig.add_annotation(x=0, y=-D-0.38, text=f"B = {B:.2f} m",
-                      showarrow=False, font=dict(size=10, color="#666"))
+    shapes += [
+        dict(type="line", x0=-B/2, y0=-D-0.3, x1=B/2, y1=-D-0.3,
+             line=dict(color="#666", width=1, dash="dot")),
+        dict(type="line", x0=-B/2, y0=-D-0.25, x1=-B/2, y1=-D-0.35,
+             line=dict(color="#666", width=1)),
+        dict(type="line", x0=B/2, y0=-D-0.25, x1=B/2, y1=-D-0.35,
+             line=dict(color="#666", width=1)),
+    ]
+    annotasjoner.append(dict(x=0, y=-D-0.38, text=f"B = {B:.2f} m",
+                             showarrow=False, font=dict(size=10, color="#666")))
     
     # Effektiv bredde Bo
-    fig.add_annotation(x=0, y=-D-0.12, text=f"Bo = {Bo:.2f} m",
-                      showarrow=False, font=dict(size=10, color="#006341", weight="bold"))
+    annotasjoner.append(dict(x=0, y=-D-0.12, text=f"Bo = {Bo:.2f} m",
+                             showarrow=False, font=dict(size=10, color="#006341", weight="bold")))
     
     # Fundamentdybde D
     if D > 0:
-        fig.add_shape(type="line", x0=B/2+0.15, y0=0, x1=B/2+0.15, y1=-D,
-                      line=dict(color="#666", width=1, dash="dot"))
-        fig.add_shape(type="line", x0=B/2+0.1, y0=0, x1=B/2+0.2, y1=0,
-                      line=dict(color="#666", width=1))
-        fig.add_shape(type="line", x0=B/2+0.1, y0=-D, x1=B/2+0.2, y1=-D,
-                      line=dict(color="#666", width=1))
-        fig.add_annotation(x=B/2+0.28, y=-D/2, text=f"D = {D:.2f} m",
-                          showarrow=False, font=dict(size=10, color="#666"),
-                          textangle=-90)
+        shapes += [
+            dict(type="line", x0=B/2+0.15, y0=0, x1=B/2+0.15, y1=-D,
+                 line=dict(color="#666", width=1, dash="dot")),
+            dict(type="line", x0=B/2+0.1, y0=0, x1=B/2+0.2, y1=0,
+                 line=dict(color="#666", width=1)),
+            dict(type="line", x0=B/2+0.1, y0=-D, x1=B/2+0.2, y1=-D,
+                 line=dict(color="#666", width=1)),
+        ]
+        annotasjoner.append(dict(x=B/2+0.28, y=-D/2, text=f"D = {D:.2f} m",
+                                 showarrow=False, font=dict(size=10, color="#666"),
+                                 textangle=-90))
     
     # Tykkelse T
-    fig.add_shape(type="line", x0=-B/2-0.15, y0=-D, x1=-B/2-0.15, y1=-D+T,
-                  line=dict(color="#666", width=1, dash="dot"))
-    fig.add_annotation(x=-B/2-0.25, y=-D+T/2, text=f"T = {T:.2f} m",
-                      showarrow=False, font=dict(size=9, color="#666"),
-                      textangle=-90)
+    shapes.append(dict(type="line", x0=-B/2-0.15, y0=-D, x1=-B/2-0.15, y1=-D+T,
+                       line=dict(color="#666", width=1, dash="dot")))
+    annotasjoner.append(dict(x=-B/2-0.25, y=-D+T/2, text=f"T = {T:.2f} m",
+                             showarrow=False, font=dict(size=9, color="#666"),
+                             textangle=-90))
     
     # Eksentrisitet e (hvis > 0)
     if abs(e_B) > 0.01:
-        fig.add_shape(type="line", x0=0, y0=-D+T+0.05, x1=e_B, y1=-D+T+0.05,
-                      line=dict(color="#ff6b35", width=2, dash="dash"))
-        fig.add_annotation(x=e_B/2, y=-D+T+0.12, text=f"e = {e_B:.3f} m",
-                          showarrow=False, font=dict(size=9, color="#ff6b35"))
+        shapes.append(dict(type="line", x0=0, y0=-D+T+0.05, x1=e_B, y1=-D+T+0.05,
+                           line=dict(color="#ff6b35", width=2, dash="dash")))
+        annotasjoner.append(dict(x=e_B/2, y=-D+T+0.12, text=f"e = {e_B:.3f} m",
+                                 showarrow=False, font=dict(size=9, color="#ff6b35")))
     
     # === SPENNINGSFORDELING ===
     q = resultat.grunntrykk
     q_scale = 0.25 * T
     n_piler = 7
     
+    # Alle piler som ett NaN-separert linjespor
+    piler = []
     for x in np.linspace(-Bo/2 + abs(e_B), Bo/2 - abs(e_B), n_piler):
-        fig.add_annotation(
-            x=x, y=-D-0.02,
-            ax=x, ay=-D-q_scale,
-            xref="x", yref="y",
-            axref="x", ayref="y",
-            showarrow=True,
-            arrowhead=2,
-            arrowsize=0.8,
-            arrowwidth=2,
-            arrowcolor="#ff6b35"
-        )
+        piler += _pil_opp(float(x), -D-q_scale, -D-0.02, hode=0.3*q_scale)
+    x_pil, y_pil = _segmenter(*piler)
+    spor.append(go.Scatter(
+        x=x_pil, y=y_pil,
+        mode='lines',
+        line=dict(color="#ff6b35", width=2),
+        showlegend=False,
+        hoverinfo='skip'
+    ))
     
-    fig.add_annotation(x=0, y=-D-q_scale-0.12,
-                      text=f"q = {q:.1f} kN/m²",
-                      showarrow=False,
-                      font=dict(size=11, color="#ff6b35", weight="bold"))
+    annotasjoner.append(dict(x=0, y=-D-q_scale-0.12,
+                             text=f"q = {q:.1f} kN/m²",
+                             showarrow=False,
+                             font=dict(size=11, color="#ff6b35", weight="bold")))
     
     # Layout
-    fig.update_layout(
-        showlegend=False,
-        plot_bgcolor="white",
-        paper_bgcolor="white",
-        margin=dict(l=20, r=20, t=30, b=20),
-        xaxis=dict(
-            showgrid=False, zeroline=False, showticklabels=False,
-            range=[-B*1.6, B*1.6], scaleanchor="y", scaleratio=1
-        ),
-        yaxis=dict(
-            showgrid=False, zeroline=False, showticklabels=False,
-            range=[-D-T-0.7, 0.9]
-        ),
-        height=450
+    return go.Figure(
+        data=spor,
+        layout=dict(
+            shapes=shapes,
+            annotations=annotasjoner,
+            showlegend=False,
+            plot_bgcolor="white",
+            paper_bgcolor="white",
+            margin=dict(l=20, r=20, t=30, b=20),
+            xaxis=dict(
+                showgrid=False, zeroline=False, showticklabels=False,
+                range=[-B*1.6, B*1.6], scaleanchor="y", scaleratio=1
+            ),
+            yaxis=dict(
+                showgrid=False, zeroline=False, showticklabels=False,
+                range=[-D-T-0.7, 0.9]
+            ),
+            height=450
+        )
     )
-    
-    return fig
 
 
 def lag_utnyttelse_gauge(utnyttelse: float) -> go.Figure:
@@ -288,3 +344,165 @@ def lag_utnyttelse_gauge(utnyttelse: float) -> go.Figure:
     )
     
     return fig
+
+
+def lag_tornado_figur(analyse, maks_antall: int = 12) -> go.Figure:
+    """Lager tornado-diagram for sensitivitet av utnyttelsesgraden"""
+    rader = [r for r in analyse.rader if r.spenn > 0][:maks_antall]
+    rader = rader[::-1]  # største spenn øverst
+    u0 = analyse.utnyttelsesgrad * 100
+    pst = analyse.variasjon * 100
+    
+    navn = [r.beskrivelse for r in rader]
+    lav = [r.u_lav * 100 - u0 for r in rader]
+    hoy = [r.u_hoy * 100 - u0 for r in rader]
+    
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        y=navn, x=lav, base=u0, orientation='h',
+        name=f"-{pst:.0f} %",
+        marker_color="#1565c0",
+        hovertemplate="%{y}<br>q/s = %{customdata:.1f} %<extra>-" + f"{pst:.0f} %</extra>",
+        customdata=[r.u_lav * 100 for r in rader]
+    ))
+    fig.add_trace(go.Bar(
+        y=navn, x=hoy, base=u0, orientation='h',
+        name=f"+{pst:.0f} %",
+        marker_color="#ff6b35",
+        hovertemplate="%{y}<br>q/s = %{customdata:.1f} %<extra>+" + f"{pst:.0f} %</extra>",
+        customdata=[r.u_hoy * 100 for r in rader]
+    ))
+    
+    # Grunnverdi og kapasitetsgrense
+    fig.add_vline(x=u0, line=dict(color="#1a1a2e", width=2))
+    fig.add_vline(x=100, line=dict(color="#c62828", width=1, dash="dash"))
+    
+    fig.update_layout(
+        barmode='overlay',
+        plot_bgcolor="white",
+        paper_bgcolor="white",
+        margin=dict(l=20, r=20, t=30, b=20),
+        xaxis=dict(title="Utnyttelsesgrad q/s [%]", showgrid=True, gridcolor="#eee"),
+        yaxis=dict(automargin=True),
+        legend=dict(orientation="h", y=1.08, x=0),
+        height=max(250, 40 + 28 * len(rader))
+    )
+    
+    return fig
+
+
+def lag_utnyttelseskart(kart: Utnyttelseskart) -> go.Figure:
+    """
+    Fargekart av q/s over to inndatafelt med konturen q/s = 1.0 og
+    gjeldende beregningspunkt
+
+    Ett Contour-spor tegner både fargene og konturlinjen, så rutenettet
+    sendes til nettleseren bare én gang (float32).
+    """
+    # q/s > UTNYTTELSE_MAKS (og uendelig når s ≤ 0) vises med siste farge
+    u = np.clip(np.nan_to_num(kart.utnyttelsesgrad, posinf=UTNYTTELSE_MAKS),
+                0, UTNYTTELSE_MAKS).astype(np.float32)
+    navn_x = FELTNAVN.get(kart.felt_x, kart.felt_x)
+    navn_y = FELTNAVN.get(kart.felt_y, kart.felt_y)
+    
+    spor = [
+        go.Contour(
+            x=kart.x.astype(np.float32), y=kart.y.astype(np.float32), z=u,
+            zmin=0, zmax=UTNYTTELSE_MAKS,
+            colorscale=UTNYTTELSE_FARGER,
+            contours=dict(coloring='heatmap', start=1.0, end=1.0, size=1.0,
+                          showlabels=True, labelfont=dict(color="white", size=12)),
+            line=dict(color="white", width=3),
+            colorbar=dict(title="q/s", tickvals=[0, 0.5, 1.0, UTNYTTELSE_MAKS],
+                          ticktext=["0", "0.5", "1.0", f"≥ {UTNYTTELSE_MAKS}"]),
+            hovertemplate=f"{navn_x}: %{{x:.3g}}<br>{navn_y}: %{{y:.3g}}<br>"
+                          "q/s = %{z:.3f}<extra></extra>",
+        ),
+        go.Scatter(
+            x=[kart.x0], y=[kart.y0], mode='markers',
+            marker=dict(symbol='x', size=14, color="#1a1a2e",
+                        line=dict(color="white", width=2)),
+            name="Gjeldende",
+            hovertemplate=f"Gjeldende<br>{navn_x}: {kart.x0:.3g}<br>{navn_y}: {kart.y0:.3g}<br>"
+                          f"q/s = {kart.u0:.3f}<extra></extra>",
+        ),
+    ]
+    
+    return go.Figure(
+        data=spor,
+        layout=dict(
+            plot_bgcolor="white",
+            paper_bgcolor="white",
+            margin=dict(l=20, r=20, t=30, b=20),
+            xaxis=dict(title=navn_x, range=[kart.x[0], kart.x[-1]]),
+            yaxis=dict(title=navn_y, range=[kart.y[0], kart.y[-1]]),
+            showlegend=False,
+            height=500
+        )
+    )
+
+
+def lag_omhyllingssnitt(omhylling: Kapasitetsomhylling,
+                        akse_x: str = 'vertikal',
+                        akse_y: str = 'horisontal_B',
+                        snittakse: Optional[str] = 'moment_B',
+                        snittverdier: Optional[Sequence[float]] = None,
+                        last: Optional[Dict[str, float]] = None,
+                        punkter: int = 100) -> go.Figure:
+    """
+    Snitt av kapasitetsomhyllingen: kurven q/s = 1.0 i planet (akse_x, akse_y)
+    for noen verdier av snittakse
+
+    Øvrige lastfelt holdes på verdiene i last (ellers 0, innenfor grensene).
+    last markeres med et kryss. Kurvene tegnes fra den interpolerte
+    omhyllingen, uten eksakt kontroll.
+    """
+    grenser = omhylling.grenser
+    last = last or {}
+    x = np.linspace(*grenser[akse_x], punkter)
+    y = np.linspace(*grenser[akse_y], punkter)
+    faste = {a: float(np.clip(last.get(a, 0.0), *grenser[a])) for a in omhylling.akser}
+    if snittakse is None:
+        snittverdier = [None]
+    elif snittverdier is None:
+        snittverdier = np.linspace(*grenser[snittakse], 5)
+    navn_x = FELTNAVN.get(akse_x, akse_x)
+    navn_y = FELTNAVN.get(akse_y, akse_y)
+    
+    spor = []
+    for i, verdi in enumerate(snittverdier):
+        laster = dict(faste, **{akse_x: x[None, :], akse_y: y[:, None]})
+        navn = "q/s = 1.0"
+        if snittakse is not None:
+            laster[snittakse] = verdi
+            navn = f"{FELTNAVN.get(snittakse, snittakse)} = {verdi:.4g}"
+        u, _ = omhylling.estimat(**laster)
+        farge = OMHYLLING_FARGER[round(i * (len(OMHYLLING_FARGER) - 1) / max(len(snittverdier) - 1, 1))]
+        spor.append(go.Contour(
+            x=x.astype(np.float32), y=y.astype(np.float32), z=u.astype(np.float32),
+            contours=dict(coloring='none', start=1.0, end=1.0, size=1.0),
+            line=dict(color=farge, width=2.5),
+            showscale=False, showlegend=True, name=navn,
+            hoverinfo='skip',
+        ))
+    
+    if akse_x in last and akse_y in last:
+        spor.append(go.Scatter(
+            x=[last[akse_x]], y=[last[akse_y]], mode='markers',
+            marker=dict(symbol='x', size=14, color="#ff6b35", line=dict(color="white", width=2)),
+            name="Lasttilfelle",
+            hovertemplate=f"{navn_x}: %{{x:.3g}}<br>{navn_y}: %{{y:.3g}}<extra></extra>",
+        ))
+    
+    return go.Figure(
+        data=spor,
+        layout=dict(
+            plot_bgcolor="white",
+            paper_bgcolor="white",
+            margin=dict(l=20, r=20, t=30, b=20),
+            xaxis=dict(title=navn_x, range=[x[0], x[-1]], gridcolor="#e0e0e0"),
+            yaxis=dict(title=navn_y, range=[y[0], y[-1]], gridcolor="#e0e0e0"),
+            legend=dict(title="Kapasitet (q/s = 1.0)"),
+            height=500
+        )
+    )